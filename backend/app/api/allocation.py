@@ -0,0 +1,126 @@
+import io
+
+from urllib.parse import quote
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+
+from .schemas import AllocationListCreate, KitClaimRequest, SubjectClaimRequest
+from ..services.allocation_service import (
+    ListExhaustedError,
+    ListNotFoundError,
+    get_allocation_service,
+)
+
+router = APIRouter(prefix="/allocation")
+
+
+def _not_found(list_id: str):
+    return HTTPException(status_code=404, detail=f"Allocation list not found: {list_id}")
+
+
+@router.post("/lists")
+def create_list(body: AllocationListCreate):
+    """
+    Generate a subject or drug list with the native engine and register it for allocation.
+    """
+    from ..services.sas_service import SASService
+    from sas_randomizer.native.block import generate_subject_list
+    from sas_randomizer.native.drug import generate_drug_list
+
+    generate = generate_drug_list if body.kind == "drug" else generate_subject_list
+    try:
+        study = SASService.study_design(body.request)
+        rand_list = generate(study, seed=body.seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return get_allocation_service().register(rand_list, name=body.name, source="native")
+
+
+@router.post("/lists/upload")
+def upload_list(file: UploadFile = File(...), name: str = None):
+    """
+    Register a delivered supplier CSV (_Rand_List / _Drug_List) for allocation.
+    """
+    from sas_randomizer.native.supplier_csv import read_list_csv
+
+    try:
+        text = file.file.read().decode("utf-8-sig")
+        rand_list = read_list_csv(io.StringIO(text))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return get_allocation_service().register(rand_list, name=name or file.filename, source="csv")
+
+
+@router.get("/lists")
+def list_lists():
+    return get_allocation_service().list_lists()
+
+
+@router.get("/lists/{list_id}")
+def get_list(list_id: str):
+    try:
+        return get_allocation_service().summary(list_id)
+    except ListNotFoundError:
+        raise _not_found(list_id)
+
+
+@router.get("/lists/{list_id}/export")
+def export_list(list_id: str, supplier: str = "供应商A", sec_rand: bool = False, status: str = ""):
+    """
+    Stream a registered list as the supplier CSV the export macros would write.
+    """
+    from sas_randomizer.native.writers import iter_list_csv, list_file_name
+
+    try:
+        rand_list = get_allocation_service().get_list(list_id)
+    except ListNotFoundError:
+        raise _not_found(list_id)
+    filename = list_file_name(rand_list.meta.get("study_id") or list_id, rand_list.kind, status)
+    return StreamingResponse(
+        iter_list_csv(rand_list, supplier=supplier, sec_rand=sec_rand),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"},
+    )
+
+
+@router.get("/lists/{list_id}/claims")
+def get_claims(list_id: str):
+    try:
+        return get_allocation_service().claims(list_id)
+    except ListNotFoundError:
+        raise _not_found(list_id)
+
+
+@router.post("/lists/{list_id}/subjects/next")
+def next_subject(list_id: str, body: SubjectClaimRequest):
+    """
+    Claim the next subject randomization number in a protocol/stratum.
+    """
+    try:
+        return get_allocation_service().next_subject(
+            list_id, protocol=body.protocol, stratum=body.stratum, category=body.category, ref=body.ref
+        )
+    except ListNotFoundError:
+        raise _not_found(list_id)
+    except ListExhaustedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/lists/{list_id}/kits/next")
+def next_kit(list_id: str, body: KitClaimRequest):
+    """
+    Claim the next kit number for an arm (and batch/stratum) in dispensing order.
+    """
+    try:
+        return get_allocation_service().next_kit(
+            list_id, arm=body.arm, batch=body.batch, stratum=body.stratum, ref=body.ref
+        )
+    except ListNotFoundError:
+        raise _not_found(list_id)
+    except ListExhaustedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,98 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from .endpoints import render_sas
+from .schemas import ConfigSave, SASGenerationRequest
+from ..http_cache import CACHE_CONTROL, cached_json, generation_etag, is_not_modified, not_modified
+from ..scheduler import client_id
+from ..services.config_store import ConfigNotFoundError, get_config_store
+from sas_randomizer.utils.logger import StageTimer
+
+router = APIRouter(prefix="/configs")
+
+
+def _not_found(config_id: str):
+    return HTTPException(status_code=404, detail=f"Config not found: {config_id}")
+
+
+@router.post("")
+def create_config(body: ConfigSave):
+    """
+    Save a study configuration (version 1). The stored content is the
+    validated request, exactly as /generate hashes it.
+    """
+    return get_config_store().create(body.request.model_dump(mode="json"), name=body.name, message=body.message)
+
+
+@router.get("")
+def search_configs(study_id: Optional[str] = None, client: Optional[str] = None, status: Optional[str] = None,
+                   q: Optional[str] = None, limit: int = 100, offset: int = 0):
+    """
+    Saved configs, most recently updated first. Filters combine; ``q``
+    matches study ids by prefix.
+    """
+    return get_config_store().search(study_id=study_id, client=client, status=status, q=q,
+                                     limit=limit, offset=offset)
+
+
+@router.get("/{config_id}")
+def get_config(config_id: str):
+    """Summary of a config plus its latest version."""
+    store = get_config_store()
+    try:
+        summary = store.summary(config_id)
+        return {**summary, "config": store.content(summary["head_hash"])}
+    except ConfigNotFoundError:
+        raise _not_found(config_id)
+
+
+@router.put("/{config_id}")
+def save_config(config_id: str, body: ConfigSave):
+    """Append a version; saving unchanged content does not create one."""
+    try:
+        return get_config_store().save(config_id, body.request.model_dump(mode="json"),
+                                       message=body.message, name=body.name)
+    except ConfigNotFoundError:
+        raise _not_found(config_id)
+
+
+@router.get("/{config_id}/versions")
+def list_versions(config_id: str):
+    try:
+        return get_config_store().versions(config_id)
+    except ConfigNotFoundError:
+        raise _not_found(config_id)
+
+
+@router.get("/{config_id}/versions/{version}")
+def get_version(config_id: str, version: int, request: Request):
+    try:
+        data = get_config_store().get_config(config_id, version)
+    except ConfigNotFoundError:
+        raise _not_found(f"{config_id}@{version}")
+    return cached_json(request, data)
+
+
+@router.get("/{config_id}/sas", response_class=PlainTextResponse)
+async def generate_config(config_id: str, request: Request, version: Optional[int] = None):
+    """
+    SAS code of a saved version (default: the latest), with the same ETag
+    /generate gives that configuration. Renders are cached per content, so
+    every version (of any config) with that content is rendered once.
+    """
+    store = get_config_store()
+    try:
+        version, digest = store.version_hash(config_id, version)
+        config = SASGenerationRequest.model_validate(store.content(digest))
+    except ConfigNotFoundError:
+        raise _not_found(config_id if version is None else f"{config_id}@{version}")
+    etag = generation_etag(config, digest=digest)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    try:
+        sas_code = await render_sas(config, digest, etag, client_id(request), StageTimer())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PlainTextResponse(sas_code, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -1,13 +1,27 @@
+import io
 import sys
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import PlainTextResponse, FileResponse, JSONResponse
-from .schemas import SASGenerationRequest
+from fastapi import APIRouter, HTTPException, BackgroundTasks, File, Form, Request, UploadFile
+from fastapi.responses import PlainTextResponse, FileResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from .schemas import SASGenerationRequest, SASPreviewRequest
 from ..services.sas_service import SASService
+from ..http_cache import (CACHE_CONTROL, cached_file, cached_json, generation_etag, is_not_modified, not_modified,
+                          template_version)
+from .. import profiling
+from ..metrics import collect as collect_metrics, get_metrics
+from ..scheduler import INTERACTIVE, client_id, get_scheduler
+from ..services.config_store import peek_config_store
+from ..services.render_cache import get_render_cache
+from sas_randomizer.utils.fingerprint import config_hash
+from sas_randomizer.utils.logger import StageTimer
+import logging
 import os
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 router = APIRouter()
+generation_log = logging.getLogger("rangen.generate")
 
 # Define project root and templates directory
 # Handle frozen (PyInstaller) vs dev mode
@@ -29,24 +43,189 @@ else:
     PROJECT_ROOT = BACKEND_DIR.parent
     TEMPLATES_DIR = PROJECT_ROOT / "assets" / "templates"
 
+def _interactive(client: str, fn, *args, **kwargs):
+    """Run ``fn`` in an interactive scheduler slot, so bulk and background jobs cannot starve it."""
+    with get_scheduler().slot(INTERACTIVE, client):
+        return fn(*args, **kwargs)
+
+
+def _profiled_generate(request: SASGenerationRequest):
+    """Generate under a ProfileCapture entered on this (worker) thread; returns (sas_code, capture)."""
+    with profiling.ProfileCapture(label=request.study_id) as capture:
+        sas_code = SASService.generate_sas_code(request)
+    return sas_code, capture
+
+
 @router.post("/generate", response_class=PlainTextResponse)
-async def generate_sas(request: SASGenerationRequest):
+async def generate_sas(request: SASGenerationRequest, http_request: Request):
     """
     Generate SAS Randomization Code based on the provided configuration.
-    Returns plain text SAS code.
+    Returns plain text SAS code with a strong ETag (config hash + template
+    version); a matching If-None-Match gets 304 without regenerating.
+
+    With an ``X-RanGen-Profile`` header (and profiling enabled) the generation
+    runs under cProfile/tracemalloc; the response names the stored capture in
+    ``X-RanGen-Profile-Id`` / ``X-RanGen-Profile-Url``.
     """
+    timer = StageTimer()
+    with timer.stage("hash"):
+        digest = config_hash(request)
+        etag = generation_etag(request, digest=digest)
+    profile = bool(http_request.headers.get(profiling.PROFILE_HEADER)) and profiling.profiling_enabled()
+    if not profile and is_not_modified(http_request, etag):
+        _log_generation(request, digest, timer, 304)
+        return not_modified(etag)
     try:
-        sas_code = SASService.generate_sas_code(request)
-        return sas_code
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if profile:
+            sas_code, capture = await run_in_threadpool(_interactive, client_id(http_request),
+                                                        _profiled_generate, request)
+            with timer.stage("profile_save"):
+                profile_id = await run_in_threadpool(capture.save, request.model_dump(mode="json"))
+            timer.timings["generate"] = round(capture.seconds * 1000, 3)
+            headers[profiling.PROFILE_ID_HEADER] = profile_id
+            headers[profiling.PROFILE_URL_HEADER] = http_request.url_for("download_profile", profile_id=profile_id).path
+        else:
+            sas_code = await render_sas(request, digest, etag, client_id(http_request), timer)
+        _log_generation(request, digest, timer, 200, size=len(sas_code))
+        return PlainTextResponse(sas_code, headers=headers)
     except ValueError as e:
+        _log_generation(request, digest, timer, 400, error=str(e))
         raise HTTPException(status_code=400, detail=str(e))
     except RuntimeError:
+        _log_generation(request, digest, timer, 500)
         raise HTTPException(status_code=500, detail="Internal server error. Please check the application logs.")
     except Exception:
+        _log_generation(request, digest, timer, 500)
         raise HTTPException(status_code=500, detail="Internal server error. Please check the application logs.")
 
+async def render_sas(request: SASGenerationRequest, digest: str, etag: str, client: str, timer: StageTimer) -> str:
+    """
+    SAS code of a request, from the first cache that has it: the shared render
+    cache (server mode), then the config store's renders of saved versions;
+    otherwise rendered in an interactive scheduler slot and cached in both.
+    """
+    cache = get_render_cache()
+    if cache is not None:
+        # Server mode: another worker may already have rendered this exact config
+        with timer.stage("render_cache"):
+            sas_code = cache.get(etag)
+        if sas_code is not None:
+            get_metrics().incr("render_cache_hits")
+            return sas_code
+    store = peek_config_store()
+    if store is not None:
+        with timer.stage("config_store"):
+            sas_code = store.get_render(digest, template_version())
+        if sas_code is not None:
+            get_metrics().incr("config_store_hits")
+            if cache is not None:
+                cache.put(etag, sas_code)
+            return sas_code
+    with timer.stage("generate"):
+        sas_code = await run_in_threadpool(_interactive, client, SASService.generate_sas_code, request)
+    get_metrics().incr("generate")
+    get_metrics().incr("generate_ms", timer.timings["generate"])
+    if cache is not None:
+        get_metrics().incr("render_cache_misses")
+        cache.put(etag, sas_code)
+    if store is not None:
+        store.put_render(digest, template_version(), sas_code)
+    return sas_code
+
+
+def _log_generation(request: SASGenerationRequest, digest: str, timer: StageTimer, status: int,
+                    size: Optional[int] = None, error: Optional[str] = None):
+    """One structured record per /generate call; successful calls are subject to log sampling."""
+    level = logging.INFO if status < 400 else logging.WARNING
+    if generation_log.isEnabledFor(level):
+        generation_log.log(level, "generate %s %s", request.study_id, status, extra={
+            "event": "generate", "study_id": request.study_id, "config_hash": digest, "status": status,
+            "bytes": size, "timings_ms": timer.timings, "error": error, "sample": status < 400})
+
+@router.post("/generate/preview")
+def preview_sas(body: SASPreviewRequest, http_request: Request):
+    """
+    Live preview. Sections are rendered through a section cache; when
+    ``previous`` names a recent result only the changed sections (or a
+    unified diff of the whole program) are returned.
+    """
+    from ..services.preview_service import get_preview_service
+
+    try:
+        return _interactive(client_id(http_request), get_preview_service().preview,
+                            body.request, previous=body.previous, fmt=body.format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/validate")
+def validate_design(request: SASGenerationRequest):
+    """
+    Pre-flight feasibility check: every problem that would fail or distort the
+    SAS run (block/ratio mismatch, unsolvable variable blocks, number overflow,
+    overlapping ranges, batch totals), with field paths. /generate runs the same
+    checks and rejects designs with errors.
+    """
+    from sas_randomizer.core_refactored.feasibility import analyze
+
+    try:
+        study = SASService.study_design(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return analyze(study).to_dict()
+
+@router.post("/sizing/plan")
+def plan_sizing(request: SASGenerationRequest):
+    """
+    Demand-driven block counts for the request's sizing policy: configured
+    versus planned blocks per list, per-stratum demand and rows saved.
+    Works whether or not the policy is enabled, so the saving can be shown first.
+    """
+    from sas_randomizer.core_refactored.sizing import plan_sizing as compute_plan
+
+    try:
+        study = SASService.study_design(request)
+        return study.sizing_report or compute_plan(study).to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/macro-library")
+async def download_macro_library(request: Request):
+    """
+    The shared SAS macro library that programs generated with
+    ``macro_library_dir`` %include. The file name carries the content hash;
+    the ETag is the full SHA-256 the programs check before including it.
+    """
+    from sas_randomizer.core_refactored.macro_library import library_filename, library_sha256, render_macro_library
+
+    etag = f'"{library_sha256()}"'
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return PlainTextResponse(render_macro_library(), headers={
+        "ETag": etag, "Cache-Control": CACHE_CONTROL,
+        "Content-Disposition": f'attachment; filename="{library_filename()}"'})
+
+@router.post("/verify")
+def verify_list(file: UploadFile = File(...), request: str = Form(...)):
+    """
+    Verify a delivered _Rand_List / _Drug_List CSV against the configuration
+    (the same JSON body /generate takes) that produced it. The upload is
+    parsed in chunks, so large kit lists are checked in bounded memory.
+    """
+    from sas_randomizer.native.verify import verify_list as run_verification
+
+    try:
+        study = SASService.study_design(SASGenerationRequest.model_validate_json(request))
+        text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        report = run_verification(text, study)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"配置格式错误: {e.errors()[0].get('msg')}")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return report.to_dict()
+
 @router.get("/config/defaults")
-async def get_defaults():
+async def get_defaults(request: Request):
     """
     Return default configuration values to populate the frontend form.
     """
@@ -56,11 +235,11 @@ async def get_defaults():
         DEFAULT_SUBJECT_SETTINGS
     )
     
-    return {
+    return cached_json(request, {
         "project": DEFAULT_PROJECT_SETTINGS,
         "randomization": DEFAULT_RANDOMIZATION_SETTINGS,
         "subject": DEFAULT_SUBJECT_SETTINGS
-    }
+    })
 
 @router.get("/templates", response_model=List[Dict[str, str]])
 async def list_templates():
@@ -101,8 +280,49 @@ async def debug_paths():
         "files": [p.name for p in TEMPLATES_DIR.glob("*")] if TEMPLATES_DIR.exists() else []
     }
 
+@router.get("/metrics")
+def get_server_metrics():
+    """
+    Request, generation and render-cache counters summed over every worker
+    process (server mode), with the per-worker snapshots.
+    """
+    return collect_metrics()
+
+@router.get("/scheduler")
+def get_scheduler_stats():
+    """
+    Execution slots of this process: per priority class the cap, running and
+    queued work, and a queue-wait histogram (milliseconds).
+    """
+    return get_scheduler().stats()
+
+@router.get("/debug/profiles")
+async def list_profiles():
+    """
+    Stored per-request profiles (newest first). Only available when profiling is enabled.
+    """
+    if not profiling.profiling_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    return profiling.list_profiles()
+
+@router.get("/debug/profiles/{profile_id}")
+def download_profile(profile_id: str):
+    """
+    Download one profile (pstats, collapsed stacks, allocation sites, request) as a zip.
+    """
+    if not profiling.profiling_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        archive = profiling.profile_archive(profile_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="性能分析记录不存在")
+    return Response(archive, media_type="application/zip",
+                    headers={"Content-Disposition": f'attachment; filename="rangen-profile-{profile_id}.zip"'})
+
 @router.get("/templates/{template_name}")
-async def download_template(template_name: str):
+async def download_template(template_name: str, request: Request):
     """
     Download a specific Excel template.
     """
@@ -120,8 +340,10 @@ async def download_template(template_name: str):
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Template not found")
         
-    return FileResponse(
-        path=file_path, 
+    # ETag / Last-Modified for conditional GET; Range requests resume interrupted downloads
+    return cached_file(
+        request,
+        file_path,
         filename=template_name,
         media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
@@ -0,0 +1,57 @@
+import io
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+
+from ..services.allocation_service import ListNotFoundError, get_allocation_service
+from ..services.index_service import IndexNotFoundError, get_index_service
+
+router = APIRouter(prefix="/index")
+
+
+@router.post("/{name}/upload")
+def build_from_csv(name: str, file: UploadFile = File(...)):
+    """
+    Build an emergency-unblinding index from a delivered supplier CSV.
+    """
+    from sas_randomizer.native.supplier_csv import read_list_csv
+
+    try:
+        text = file.file.read().decode("utf-8-sig")
+        return get_index_service().build(read_list_csv(io.StringIO(text)), name)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/{name}/from-list/{list_id}")
+def build_from_list(name: str, list_id: str):
+    """
+    Build an index from a list registered with the allocation service.
+    """
+    try:
+        rand_list = get_allocation_service().get_list(list_id)
+        return get_index_service().build(rand_list, name)
+    except ListNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Allocation list not found: {list_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("")
+def list_indexes():
+    return get_index_service().list_indexes()
+
+
+@router.get("/{name}/lookup/{number}")
+def lookup(name: str, number: str):
+    """
+    Resolve a randomization / kit number to its arm without loading the list.
+    """
+    try:
+        result = get_index_service().lookup(name, number)
+    except IndexNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Index not found: {name}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Number not found: {number}")
+    return result
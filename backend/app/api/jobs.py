@@ -0,0 +1,141 @@
+import asyncio
+import json
+import shutil
+
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from .schemas import AllocationListCreate, BulkJobCreate, SASGenerationRequest
+from ..scheduler import client_id
+from ..services.job_service import FINISHED, JobNotFoundError, JobQueueFullError, get_job_service
+from ..services.paths import get_bulk_root, resolve_under
+
+router = APIRouter(prefix="/jobs")
+
+# Server-sent events: poll interval of the job state, and keep-alive comment interval
+EVENT_POLL_SECONDS = 0.25
+KEEPALIVE_SECONDS = 15.0
+
+
+def _not_found(job_id: str):
+    return HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+
+def _submit(http_request: Request, kind: str, params: dict, prepare=None):
+    try:
+        return get_job_service().submit(kind, params, prepare, client=client_id(http_request))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/bulk", status_code=202)
+def submit_bulk(body: BulkJobCreate, http_request: Request):
+    """
+    Render every study config under a directory in the background (same as
+    ``python -m sas_randomizer generate``); progress counts rendered configs.
+    ``config_dir`` and ``out_dir`` must lie under the bulk root (<data dir>/bulk
+    or RANGEN_BULK_ROOT); relative paths are taken from there.
+    """
+    params = body.model_dump()
+    root = get_bulk_root()
+    try:
+        for key in ("config_dir", "out_dir"):
+            params[key] = str(resolve_under(root, params[key]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _submit(http_request, "bulk", params)
+
+
+@router.post("/verify", status_code=202)
+def submit_verify(http_request: Request, file: UploadFile = File(...), request: str = Form(...)):
+    """
+    Verify a delivered list CSV in the background. Takes the same form as
+    /verify; the result is the verification report.
+    """
+    try:
+        config = SASGenerationRequest.model_validate_json(request)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"配置格式错误: {e.errors()[0].get('msg')}")
+
+    def save_upload(directory):
+        with open(directory / "list.csv", "wb") as out:
+            shutil.copyfileobj(file.file, out, 1024 * 1024)
+
+    params = {"request": config.model_dump(mode="json"), "filename": file.filename}
+    return _submit(http_request, "verify", params, save_upload)
+
+
+@router.post("/allocation-lists", status_code=202)
+def submit_allocation_list(body: AllocationListCreate, http_request: Request):
+    """
+    Generate and register an allocation list in the background (same body as
+    /allocation/lists); the result is the list summary.
+    """
+    return _submit(http_request, "allocation_list", body.model_dump(mode="json"))
+
+
+@router.get("")
+def list_jobs():
+    return get_job_service().list_jobs()
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    try:
+        return get_job_service().get(job_id)
+    except JobNotFoundError:
+        raise _not_found(job_id)
+
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """
+    Cancel a job: a queued job never starts, a running one stops at its next
+    progress report. Finished jobs are returned unchanged.
+    """
+    try:
+        return get_job_service().cancel(job_id)
+    except JobNotFoundError:
+        raise _not_found(job_id)
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """
+    Progress as server-sent events: a ``progress`` event whenever the job
+    state changes and a final ``end`` event with the finished job.
+    """
+    service = get_job_service()
+    try:
+        service.get(job_id)
+    except JobNotFoundError:
+        raise _not_found(job_id)
+
+    async def stream():
+        last = None
+        quiet = 0.0
+        while True:
+            try:
+                job = service.get(job_id)
+            except JobNotFoundError:  # evicted while streaming
+                return
+            if job["status"] in FINISHED:
+                yield f"event: end\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                return
+            if job != last:
+                last, quiet = job, 0.0
+                yield f"event: progress\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            elif quiet >= KEEPALIVE_SECONDS:
+                quiet = 0.0
+                yield ": keepalive\n\n"
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+            quiet += EVENT_POLL_SECONDS
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Union, Any
+from typing import List, Dict, Literal, Optional, Union, Any
 
 class TreatmentArm(BaseModel):
     armcd: str
@@ -26,6 +26,14 @@ class DrugRandomizationConfig(BaseModel):
     drug_sec_rand_enabled: bool = False
     drug_batch_configs: Dict[str, Any] = {}
     
+class SizingPolicy(BaseModel):
+    """Demand-driven block counts replacing blocks_per_stratum / drug_block_layers when enabled."""
+    enabled: bool = False
+    overage_percent: float = Field(0.0, ge=0)
+    spare_blocks: int = Field(0, ge=0)
+    strata_targets: Dict[str, int] = {}
+    drug_strata_targets: Dict[str, int] = {}
+
 class SASGenerationRequest(BaseModel):
     study_id: str
     protocol_title: str
@@ -61,3 +69,58 @@ class SASGenerationRequest(BaseModel):
     # Server Execution Settings
     is_server_run: bool = False
     server_path: Optional[str] = None
+
+    # Demand-driven sizing (off by default)
+    sizing: Optional[SizingPolicy] = None
+
+    # SAS directory of the shared macro library; when set the program %includes it
+    macro_library_dir: Optional[str] = None
+
+
+class SASPreviewRequest(BaseModel):
+    """Live preview: the generation request plus the fingerprint of the last result seen."""
+    request: SASGenerationRequest
+    previous: Optional[str] = None
+    format: Literal["sections", "diff"] = "sections"
+
+
+class AllocationListCreate(BaseModel):
+    """Build an allocation list with the native engine from a generation request."""
+    request: SASGenerationRequest
+    kind: Literal["subject", "drug"] = "subject"
+    seed: Optional[int] = None
+    name: Optional[str] = None
+
+
+class ConfigSave(BaseModel):
+    """A study configuration saved to the server-side config store (a new config or a new version)."""
+    request: SASGenerationRequest
+    name: Optional[str] = None
+    message: Optional[str] = None
+
+
+class BulkJobCreate(BaseModel):
+    """
+    Background bulk render of a config directory (options of ``sas_randomizer generate``).
+    config_dir / out_dir are confined to the server's bulk root; macro_library_dir is
+    the SAS-side directory written into %include and is never opened by the server.
+    """
+    config_dir: str
+    out_dir: str
+    jobs: Optional[int] = None
+    force: bool = False
+    macro_library_dir: Optional[str] = None
+
+
+class SubjectClaimRequest(BaseModel):
+    protocol: Optional[str] = None
+    stratum: Optional[str] = None
+    category: int = 1
+    ref: Optional[str] = None
+
+
+class KitClaimRequest(BaseModel):
+    arm: str
+    batch: Optional[str] = None
+    stratum: Optional[str] = None
+    ref: Optional[str] = None
@@ -0,0 +1,105 @@
+"""启动引导 ASGI 应用
+
+run.py 把 LazyApp 交给 uvicorn：本模块只依赖标准库，端口立即绑定，
+/api/health 立即应答；FastAPI 应用（app.main）在后台线程导入并预热
+（编译模板、载入生成器与原生引擎）。导入完成前到达的其他请求等待导入结束后转发。
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+log = logging.getLogger("rangen")
+
+HEALTH_PATH = "/api/health"
+
+
+class LazyApp:
+    """
+    ASGI app that answers health checks at once and forwards everything
+    else to ``target`` ("module:attribute") once it has been imported.
+    The target's lifespan events are not forwarded, so it must not rely on them.
+    """
+
+    def __init__(self, target: str, warmup: Optional[str] = "warmup"):
+        self.target = target
+        self.warmup = warmup
+        self.started_at = time.perf_counter()
+        self.load_seconds: Optional[float] = None
+        self._app: Optional[Callable] = None
+        self._error: Optional[BaseException] = None
+        self._loaded = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "LazyApp":
+        """Begin importing the target in a background thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._load, name="rangen-import", daemon=True)
+            self._thread.start()
+        return self
+
+    def _load(self):
+        try:
+            module_name, _, attr = self.target.partition(":")
+            module = importlib.import_module(module_name)
+            self._app = getattr(module, attr or "app")
+            self.load_seconds = time.perf_counter() - self.started_at
+            log.info("Application loaded in %.2fs", self.load_seconds)
+        except BaseException as e:  # surfaced to every request instead of killing the server
+            log.exception("Failed to load %s", self.target)
+            self._error = e
+            self._loaded.set()
+            return
+        self._loaded.set()
+        hook = getattr(module, self.warmup, None) if self.warmup else None
+        if hook is not None:
+            try:
+                hook()
+                log.info("Warm-up finished %.2fs after start", time.perf_counter() - self.started_at)
+            except Exception:
+                log.exception("Warm-up failed (requests will load lazily)")
+
+    @property
+    def ready(self) -> bool:
+        return self._app is not None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._loaded.wait(timeout)
+
+    async def _send_json(self, send, status: int, body: Any):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(payload)).encode())]})
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if self._app is None:
+            if scope["type"] == "http" and scope["path"] == HEALTH_PATH and self._error is None:
+                await self._send_json(send, 200, {"status": "healthy", "service": "RanGen API", "ready": False})
+                return
+            self.start()
+            if not self._loaded.is_set():
+                await asyncio.get_running_loop().run_in_executor(None, self._loaded.wait)
+            if self._app is None:
+                if scope["type"] == "http":
+                    await self._send_json(send, 500, {"detail": f"Application failed to start: {self._error}"})
+                return
+        await self._app(scope, receive, send)
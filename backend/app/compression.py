@@ -0,0 +1,161 @@
+"""响应压缩中间件
+
+按 Accept-Encoding 协商 br（安装了 brotli 时）或 gzip，压缩超过阈值的文本类
+响应（SAS 代码、JSON、CSV 等）。流式响应逐块压缩，不整体缓冲。已编码的响应、
+非文本类型（xlsx/zip/图片）以及 206 分段响应原样透传。
+"""
+
+import zlib
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # optional dependency
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+# Streams whose chunks must reach the client as they are sent (a compressor would buffer them)
+UNBUFFERED_TYPES = ("text/event-stream",)
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Codings with q > 0 from an Accept-Encoding header."""
+    codings = []
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            codings.append(name.strip().lower())
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = accepted_encodings(accept_encoding or "")
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def feed(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish() if self.encoding == "br" else self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compress text responses of at least ``minimum_size`` bytes. A response
+    whose first body chunk is final and smaller than the threshold is sent
+    as-is; streamed responses are always compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _Responder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.mw = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start: Optional[Message] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    def _eligible(self, headers: MutableHeaders, status: int) -> Tuple[bool, bool]:
+        """(compressible type, may compress now)"""
+        content_type = headers.get("content-type", "")
+        compressible = content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNBUFFERED_TYPES)
+        may = (compressible and self.encoding is not None and status == 200
+               and "content-encoding" not in headers and "content-range" not in headers)
+        return compressible, may
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            # e.g. http.response.pathsend: nothing to compress
+            if self.start is not None:
+                self.passthrough = True
+                start, self.start = self.start, None
+                await self.downstream(start)
+            await self.downstream(message)
+            return
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            compressible, may = self._eligible(headers, start["status"])
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if not may or (not more and len(body) < self.mw.minimum_size):
+                self.passthrough = True
+                await self.downstream(start)
+                await self.downstream(message)
+                return
+            self.encoder = _Encoder(self.encoding, self.mw.gzip_level, self.mw.brotli_quality)
+            headers["Content-Encoding"] = self.encoding
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = f'{etag[:-1]}-{self.encoding}"'
+            if more:
+                del headers["content-length"]
+                await self.downstream(start)
+                await self.downstream({"type": "http.response.body",
+                                       "body": self.encoder.feed(body), "more_body": True})
+            else:
+                data = self.encoder.feed(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(data))
+                await self.downstream(start)
+                await self.downstream({"type": "http.response.body", "body": data})
+            return
+
+        body = self.encoder.feed(message.get("body", b""))
+        if message.get("more_body", False):
+            if body:
+                await self.downstream({"type": "http.response.body", "body": body, "more_body": True})
+        else:
+            await self.downstream({"type": "http.response.body", "body": body + self.encoder.finish()})
@@ -0,0 +1,104 @@
+"""HTTP 条件请求辅助
+
+生成代码、默认配置与 Excel 模板的响应携带强 ETag（以及文件的 Last-Modified），
+客户端带 If-None-Match / If-Modified-Since 重新请求时内容未变则返回 304，
+不再重复下载。压缩中间件会给 ETag 追加编码后缀，比较时忽略该后缀。
+"""
+
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+from sas_randomizer.utils.fingerprint import canonical_json, config_hash
+
+# Responses may be reused only after revalidating with the server
+CACHE_CONTROL = "no-cache"
+# Suffixes CompressionMiddleware appends to the ETag of an encoded body
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def strong_etag(*parts: str) -> str:
+    digest = hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+@lru_cache(maxsize=1)
+def template_version() -> str:
+    """Hash of the SAS templates and generator sources, computed once per process."""
+    from sas_randomizer.bulk import template_hash
+    return template_hash()
+
+
+def generation_etag(config: Any, digest: Optional[str] = None) -> str:
+    """Strong ETag of generated code: canonical config hash (or a precomputed ``digest``) + template version."""
+    return strong_etag(digest or config_hash(config), template_version())
+
+
+def _normalize(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag`` (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _normalize(etag)
+    return any(_normalize(tag) == target for tag in if_none_match.split(","))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """True when the request's validators show the client already has this representation."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    since = request.headers.get("if-modified-since")
+    if since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified(etag: str, last_modified: Optional[float] = None) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return Response(status_code=304, headers=headers)
+
+
+def cached_json(request: Request, data: Any) -> Response:
+    """JSON response with a content-derived ETag; 304 if the client's copy is current."""
+    etag = strong_etag(canonical_json(data))
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return JSONResponse(data, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def cached_file(request: Request, path: os.PathLike, media_type: str,
+                filename: Optional[str] = None) -> Response:
+    """
+    FileResponse with a strong ETag and Last-Modified. Range / If-Range
+    requests are served by FileResponse itself (206 partial content).
+    """
+    stat = os.stat(path)
+    etag = strong_etag(os.fspath(path), str(stat.st_mtime_ns), str(stat.st_size))
+    if is_not_modified(request, etag, stat.st_mtime):
+        return not_modified(etag, stat.st_mtime)
+    headers: Dict[str, str] = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    return FileResponse(path=path, filename=filename, media_type=media_type, headers=headers,
+                        stat_result=stat)
@@ -1,6 +1,5 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import sys
 import os
@@ -21,6 +20,14 @@ if not getattr(sys, 'frozen', False):
 
 from sas_randomizer.utils.version_info import VersionInfo
 from .api.endpoints import router as api_router
+from .api.allocation import router as allocation_router
+from .api.index import router as index_router
+from .api.jobs import router as jobs_router
+from .api.configs import router as configs_router
+from .compression import CompressionMiddleware
+from .metrics import SHARED_DIR_ENV
+from .request_log import RequestLogMiddleware
+from .static_files import PrecompressedStaticFiles
 
 app = FastAPI(
     title="RanGen API",
@@ -39,14 +46,45 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["ETag", "X-Request-ID", "X-RanGen-Profile-Id", "X-RanGen-Profile-Url"],
 )
 
+# Compress text responses (SAS code, JSON, CSV) for clients that accept br/gzip
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Outermost: request id for every log record of the request, plus a sampled access log
+app.add_middleware(RequestLogMiddleware)
+
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(allocation_router, prefix="/api/v1")
+app.include_router(index_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
+app.include_router(configs_router, prefix="/api/v1")
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "service": "RanGen API"}
+    return {"status": "healthy", "service": "RanGen API", "ready": True}
+
+
+def warmup():
+    """
+    Load the generator and native engines and compile every SAS template by
+    rendering a throwaway study, so the first real request is not slowed by it.
+    Called from a background thread by bootstrap.LazyApp.
+    """
+    from .api.schemas import SASGenerationRequest
+    from .services.sas_service import SASService
+    import sas_randomizer.native  # noqa: F401  (numpy + native engines)
+
+    request = SASGenerationRequest(
+        study_id="WARMUP", protocol_title="Warm-up", client="-", company="-",
+        treatment_arms=[{"armcd": "A", "arm": "A", "ratio": 1}, {"armcd": "B", "arm": "B", "ratio": 1}],
+        drug_randomization_config={"enabled": True,
+                                   "drug_arms": [{"code": "A", "name": "A", "ratio": 1},
+                                                 {"code": "B", "name": "B", "ratio": 1}]},
+    )
+    SASService.generate_sas_code(request)
 
 # --- Static File Serving (Standalone Mode) ---
 def get_web_root():
@@ -82,8 +120,8 @@ web_root_path = get_web_root()
 if web_root_path:
     print(f"Serving static files from: {web_root_path}")
     
-    # Mount the static directory
-    app.mount("/", StaticFiles(directory=web_root_path, html=True), name="static")
+    # Mount the static directory (indexed once; serves build-time .br/.gz siblings)
+    app.mount("/", PrecompressedStaticFiles(web_root_path), name="static")
 
     # Clean shutdown and browser open logic
     def open_browser():
@@ -91,8 +129,8 @@ if web_root_path:
         webbrowser.open("http://127.0.0.1:8000")
 
     # Only auto-open browser if we are serving static files (likely standalone mode)
-    # and not in a debug reloader
-    if not os.environ.get("UVICORN_RELOAD"):
+    # and not in a debug reloader or a server-mode worker
+    if not os.environ.get("UVICORN_RELOAD") and not os.environ.get(SHARED_DIR_ENV):
          threading.Thread(target=open_browser, daemon=True).start()
 
 else:
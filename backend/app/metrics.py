@@ -0,0 +1,132 @@
+"""进程计数器与跨进程汇总
+
+每个进程在内存中累计请求数、各状态类别响应数、生成次数与耗时、渲染缓存命中等计数器。
+多进程服务模式下各工作进程定期把快照写入 $RANGEN_SHARED_DIR/metrics/<pid>.json，
+/api/v1/metrics 读取全部快照求和；单机模式只有本进程的计数器。
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SHARED_DIR_ENV = "RANGEN_SHARED_DIR"
+METRICS_SUBDIR = "metrics"
+FLUSH_SECONDS = 5.0
+
+
+class Metrics:
+    """Thread-safe counters of one process."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self._counters: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def record_response(self, status: int, seconds: float):
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters[f"responses_{status // 100}xx"] += 1
+            self._counters["request_ms"] += seconds * 1000
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {k: round(v, 3) if isinstance(v, float) else v for k, v in self._counters.items()}
+        return {"pid": self.pid, "started_at": self.started_at, "updated_at": time.time(), "counters": counters}
+
+    def flush(self, directory: Path):
+        """Write this process's snapshot to ``directory/<pid>.json`` (atomic replace)."""
+        from sas_randomizer.utils.atomic_io import atomic_write_text
+
+        atomic_write_text(Path(directory) / f"{self.pid}.json", json.dumps(self.snapshot()))
+
+    def start_flusher(self, directory: Path, interval: float = FLUSH_SECONDS):
+        """Flush every ``interval`` seconds from a daemon thread, and once more at exit (idempotent)."""
+        if self._flusher is not None:
+            return
+
+        def flush_quietly():
+            try:
+                self.flush(directory)
+            except OSError:  # shared directory removed under us
+                pass
+
+        def run():
+            while True:
+                time.sleep(interval)
+                flush_quietly()
+
+        flush_quietly()
+        atexit.register(flush_quietly)
+        self._flusher = threading.Thread(target=run, name="rangen-metrics", daemon=True)
+        self._flusher.start()
+
+
+def metrics_dir() -> Optional[Path]:
+    shared = os.environ.get(SHARED_DIR_ENV)
+    return Path(shared) / METRICS_SUBDIR if shared else None
+
+
+def aggregate(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum the counters of every worker snapshot."""
+    total: Counter = Counter()
+    for snap in snapshots:
+        total.update(snap.get("counters", {}))
+    return {
+        "workers": len(snapshots),
+        "counters": {k: round(v, 3) if isinstance(v, float) else v for k, v in sorted(total.items())},
+        "per_worker": sorted(snapshots, key=lambda s: s.get("pid", 0)),
+    }
+
+
+def collect() -> Dict[str, Any]:
+    """
+    Counters across all workers: this process's live snapshot plus the
+    latest flushed snapshot of every other worker (at most FLUSH_SECONDS old).
+    """
+    own = get_metrics().snapshot()
+    directory = metrics_dir()
+    snapshots = [own]
+    if directory is not None and directory.is_dir():
+        for path in directory.glob("*.json"):
+            if path.stem == str(own["pid"]):
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):  # being replaced, or a worker that died mid-write
+                continue
+    return aggregate(snapshots)
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Process-wide counters; in server mode a flusher thread publishes them for the other workers."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+                directory = metrics_dir()
+                if directory is not None:
+                    _metrics.start_flusher(directory)
+    return _metrics
+
+
+def reset_metrics():
+    """Drop the process-wide counters (tests)."""
+    global _metrics
+    with _metrics_lock:
+        _metrics = None
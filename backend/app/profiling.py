@@ -0,0 +1,208 @@
+"""按请求性能分析
+
+请求 /generate 时带上 X-RanGen-Profile 头，该次生成会在 cProfile 与 tracemalloc 下运行，
+同时由采样线程记录调用栈。结果保存在数据目录的 profiles/<id>/ 下：
+
+- profile.pstats     cProfile 统计（python -m pstats / snakeviz 可读）
+- profile.collapsed  折叠调用栈（flamegraph.pl / speedscope 可直接绘制火焰图）
+- allocations.txt    内存分配最多的代码位置与峰值
+- request.json       触发分析的请求配置（便于复现）
+- meta.json          研究编号、耗时、峰值内存等
+
+功能需显式开启：RANGEN_PROFILING=1 开启、=0 关闭；未设置时仅单机开发模式（非打包运行）开启，
+多进程服务模式（设置了 RANGEN_SHARED_DIR）下默认关闭——分析结果含其他用户的请求配置。
+"""
+
+import cProfile
+import io
+import json
+import os
+import re
+import secrets
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .metrics import SHARED_DIR_ENV
+from .services.paths import get_data_dir
+
+PROFILE_HEADER = "X-RanGen-Profile"
+PROFILE_ID_HEADER = "X-RanGen-Profile-Id"
+PROFILE_URL_HEADER = "X-RanGen-Profile-Url"
+MAX_PROFILES = 20
+SAMPLE_INTERVAL = 0.001
+TOP_ALLOCATIONS = 25
+
+_PROFILE_ID = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{6}$")
+# cProfile installs a process-wide hook per thread; one capture at a time keeps results readable
+_capture_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    """
+    RANGEN_PROFILING wins when set; otherwise profiling is available in
+    standalone development mode only (not frozen builds, not server mode).
+    """
+    flag = os.environ.get("RANGEN_PROFILING")
+    if flag is not None:
+        return flag.strip().lower() in ("1", "true", "yes", "on")
+    return not getattr(sys, "frozen", False) and not os.environ.get(SHARED_DIR_ENV)
+
+
+def profiles_dir() -> Path:
+    path = get_data_dir() / "profiles"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack every ``interval`` seconds, below ``root``."""
+
+    def __init__(self, thread_id: int, root, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="rangen-profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels: List[str] = []
+            while frame is not None and frame is not self.root:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class ProfileCapture:
+    """
+    Context manager profiling the enclosed block on the current thread:
+    cProfile + tracemalloc + a stack sampler. ``save()`` writes the artifacts.
+    """
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.profile = cProfile.Profile()
+        self.seconds = 0.0
+        self.peak_bytes = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self._sampler: Optional[_StackSampler] = None
+        self._tracing_started = False
+
+    def __enter__(self) -> "ProfileCapture":
+        _capture_lock.acquire()
+        self._tracing_started = not tracemalloc.is_tracing()
+        if self._tracing_started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        # The sampler only runs when the GIL is handed over: switch as often as it samples
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SAMPLE_INTERVAL)
+        self._sampler = _StackSampler(threading.get_ident(), sys._getframe(0))
+        self._sampler.start()
+        self._started = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.profile.disable()
+            self.seconds = time.perf_counter() - self._started
+            self._sampler.stop()
+            sys.setswitchinterval(self._switch_interval)
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            self.snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            if self._tracing_started:
+                tracemalloc.stop()
+        finally:
+            _capture_lock.release()
+        return False
+
+    def collapsed_stacks(self) -> str:
+        """Folded stacks ("root;child;leaf count" per line) as read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self._sampler.stacks.items()))
+
+    def allocation_report(self, limit: int = TOP_ALLOCATIONS) -> str:
+        stats = self.snapshot.statistics("lineno")
+        lines = [f"peak traced memory: {self.peak_bytes / 1024:.1f} KiB",
+                 f"live at end: {sum(s.size for s in stats) / 1024:.1f} KiB in {sum(s.count for s in stats)} blocks",
+                 "", f"top {limit} allocation sites (live at end of request):"]
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, request: Optional[Dict[str, Any]] = None) -> str:
+        """Write the artifacts to a new profiles/<id>/ directory and return the id."""
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        target = profiles_dir() / profile_id
+        target.mkdir()
+        self.profile.dump_stats(str(target / "profile.pstats"))
+        (target / "profile.collapsed").write_text(self.collapsed_stacks(), encoding="utf-8")
+        (target / "allocations.txt").write_text(self.allocation_report(), encoding="utf-8")
+        if request is not None:
+            (target / "request.json").write_text(json.dumps(request, ensure_ascii=False, indent=2), encoding="utf-8")
+        meta = {
+            "id": profile_id,
+            "label": self.label,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "seconds": round(self.seconds, 6),
+            "peak_kib": round(self.peak_bytes / 1024, 1),
+            "samples": sum(self._sampler.stacks.values()),
+        }
+        (target / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        prune_profiles()
+        return profile_id
+
+
+def prune_profiles(keep: int = MAX_PROFILES):
+    """Delete all but the ``keep`` newest captures."""
+    captures = sorted(p for p in profiles_dir().iterdir() if p.is_dir() and _PROFILE_ID.match(p.name))
+    for old in captures[:-keep] if keep else captures:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Metadata of stored captures, newest first."""
+    result = []
+    for path in sorted(profiles_dir().iterdir(), reverse=True):
+        meta = path / "meta.json"
+        if path.is_dir() and _PROFILE_ID.match(path.name) and meta.exists():
+            result.append(json.loads(meta.read_text(encoding="utf-8")))
+    return result
+
+
+def profile_archive(profile_id: str) -> bytes:
+    """Zip of one capture's files. Raises ValueError for a malformed id, FileNotFoundError if absent."""
+    if not _PROFILE_ID.match(profile_id):
+        raise ValueError("无效的分析编号")
+    source = profiles_dir() / profile_id
+    if not source.is_dir():
+        raise FileNotFoundError(profile_id)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for file in sorted(source.iterdir()):
+            archive.write(file, f"{profile_id}/{file.name}")
+    return buffer.getvalue()
@@ -0,0 +1,67 @@
+"""请求编号与访问日志
+
+每个请求分配一个请求编号（沿用客户端的 X-Request-ID，否则随机生成），写入日志上下文
+并在响应头中返回；请求结束时记录一条抽样的结构化访问日志（方法、路径、状态码、耗时），
+并累计到进程计数器（metrics）。
+"""
+
+import logging
+import re
+import time
+import uuid
+
+from sas_randomizer.utils.logger import request_id_var
+
+from .metrics import get_metrics
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+access_log = logging.getLogger("rangen.access")
+
+
+def _incoming_request_id(scope) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if _VALID_REQUEST_ID.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex[:16]
+
+
+class RequestLogMiddleware:
+    """Pure ASGI middleware: request id context + response header + sampled access record."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = _incoming_request_id(scope)
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = dict(message, headers=list(message.get("headers", ()))
+                               + [(b"x-request-id", request_id.encode("latin-1"))])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            get_metrics().record_response(status, elapsed)
+            if access_log.isEnabledFor(logging.INFO):
+                access_log.log(
+                    logging.WARNING if status >= 500 else logging.INFO,
+                    "%s %s %s", scope["method"], scope["path"], status,
+                    extra={"event": "access", "method": scope["method"], "path": scope["path"], "status": status,
+                           "duration_ms": round(elapsed * 1000, 3), "sample": True})
+            request_id_var.reset(token)
@@ -0,0 +1,321 @@
+"""执行调度
+
+生成与预览、批量渲染、后台校验共用本进程的 CPU。调度器把执行能力划分为若干槽位
+（默认等于 CPU 数，RANGEN_SCHED_SLOTS 覆盖；至少 2 个，单核时交互请求与批量任务
+分时共用 CPU），任务按优先级类别排队：
+
+- interactive：/generate 与 /generate/preview，可使用全部槽位；
+- bulk：批量渲染、盲底生成任务，最多占用 槽位数-1，始终为交互请求留出一个；
+- background：盲底校验等，最多占用四分之一槽位。
+
+bulk 与 background 合计也不超过 槽位数-1，交互请求始终有一个槽位可用。
+
+高优先级类别有请求因槽位不足而等待时，低优先级类别不再派发；同一类别内按客户端
+（X-RanGen-Client 请求头，缺省为客户端地址）做加权公平排队，一个客户端的大批量任务
+不会挡住其他客户端。长任务在每个分块边界调用 checkpoint()，有更高优先级请求等待时
+让出槽位、稍后继续。每个类别记录排队等待时间直方图。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+BACKGROUND = "background"
+PRIORITY = (INTERACTIVE, BULK, BACKGROUND)
+
+SLOTS_ENV = "RANGEN_SCHED_SLOTS"
+# One slot is always reserved for interactive requests, so there must be another one to lend out
+MIN_CAPACITY = 2
+CLIENT_HEADER = "X-RanGen-Client"
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+# How often a waiter with an abort callback (a cancellable job) polls it
+ABORT_POLL_SECONDS = 0.25
+
+
+class _Waiter:
+    __slots__ = ("cls", "client", "cost", "enqueued", "event", "granted", "resumed")
+
+    def __init__(self, cls: str, client: str, cost: int, resumed: bool = False):
+        self.cls = cls
+        self.client = client
+        self.cost = cost
+        self.enqueued = time.perf_counter()
+        self.event = threading.Event()
+        self.granted = False
+        self.resumed = resumed
+
+
+class _ClassQueue:
+    """Waiters of one priority class: a FIFO per client, served in weighted fair order."""
+
+    def __init__(self, name: str, cap: int):
+        self.name = name
+        self.cap = cap
+        self.running = 0
+        self.waiting = 0
+        self.queues: Dict[str, Deque[_Waiter]] = {}
+        # Virtual time of each client with queued work: service received / weight
+        self.vtime: Dict[str, float] = {}
+        self.dispatched = 0
+        self.preempted = 0
+        self.histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_ms_sum = 0.0
+
+    def push(self, waiter: _Waiter, front: bool = False):
+        queue = self.queues.get(waiter.client)
+        if queue is None:
+            # A client that (re)joins starts level with the busiest-served active client, without credit
+            self.vtime[waiter.client] = min(self.vtime.values(), default=0.0)
+            queue = self.queues[waiter.client] = deque()
+        if front:
+            queue.appendleft(waiter)
+        else:
+            queue.append(waiter)
+        self.waiting += 1
+
+    def head(self) -> Optional[_Waiter]:
+        if not self.waiting:
+            return None
+        # min() keeps the first of equal clients: ties go to the client that queued first
+        client = min(self.queues, key=self.vtime.__getitem__)
+        return self.queues[client][0]
+
+    def remove(self, waiter: _Waiter, weight: float = 1.0, served: bool = False):
+        queue = self.queues[waiter.client]
+        queue.remove(waiter)
+        self.waiting -= 1
+        if served:
+            self.vtime[waiter.client] += waiter.cost / weight
+        if not queue:
+            del self.queues[waiter.client]
+            del self.vtime[waiter.client]
+
+    def record_wait(self, ms: float):
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if ms <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+        self.wait_ms_sum += ms
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the histogram bucket holding quantile ``q`` (None when empty or beyond the last bucket)."""
+        count = sum(self.histogram)
+        if not count:
+            return None
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if seen >= q * count:
+                return float(WAIT_BUCKETS_MS[i]) if i < len(WAIT_BUCKETS_MS) else None
+        return None
+
+    def stats(self) -> Dict:
+        buckets = {f"le_{bound}": n for bound, n in zip(WAIT_BUCKETS_MS, self.histogram)}
+        buckets["inf"] = self.histogram[-1]
+        return {
+            "cap": self.cap, "running": self.running, "queued": self.waiting,
+            "clients_queued": len(self.queues), "dispatched": self.dispatched, "preempted": self.preempted,
+            "queue_wait_ms": {"count": sum(self.histogram), "sum": round(self.wait_ms_sum, 3),
+                              "p50": self.percentile(0.5), "p95": self.percentile(0.95), "buckets": buckets},
+        }
+
+
+class Slot:
+    """Capacity granted to one task; release it (or use ``Scheduler.slot``) when done."""
+
+    def __init__(self, scheduler: "Scheduler", waiter: _Waiter):
+        self._scheduler = scheduler
+        self._waiter = waiter
+        self.released = False
+
+    @property
+    def cls(self) -> str:
+        return self._waiter.cls
+
+    @property
+    def cost(self) -> int:
+        return self._waiter.cost
+
+    def checkpoint(self, abort: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Chunk boundary of a long task: yield the slot while a higher-priority
+        request is waiting for capacity, and block until it is granted again.
+        Returns False when ``abort()`` became true while waiting (slot released).
+        """
+        waiter = self._scheduler._yield(self._waiter)
+        if waiter is None:
+            return True
+        self._waiter = waiter
+        if not self._scheduler._await(waiter, abort):
+            self.released = True
+            return False
+        return True
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._scheduler._release(self._waiter)
+
+
+class Scheduler:
+    """Priority classes with concurrency caps in front of the process's execution capacity."""
+
+    def __init__(self, capacity: Optional[int] = None, caps: Optional[Dict[str, int]] = None,
+                 client_weights: Optional[Dict[str, float]] = None):
+        self.capacity = max(MIN_CAPACITY, capacity or os.cpu_count() or 1)
+        limits = {INTERACTIVE: self.capacity, BULK: self.capacity - 1,
+                  BACKGROUND: max(1, self.capacity // 4)}
+        limits.update(caps or {})
+        # Lower classes never get the interactive reserve, whatever the configured caps
+        reserve = {INTERACTIVE: self.capacity, BULK: self.capacity - 1, BACKGROUND: self.capacity - 1}
+        self.classes = {name: _ClassQueue(name, max(1, min(limits[name], reserve[name]))) for name in PRIORITY}
+        self.client_weights: Dict[str, float] = dict(client_weights or {})
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def clamp_cost(self, cls: str, cost: int) -> int:
+        """Largest cost a task of ``cls`` may ask for (at least 1, at most the class cap)."""
+        return max(1, min(int(cost), self.classes[cls].cap))
+
+    def acquire(self, cls: str, client: str = "", cost: int = 1,
+                abort: Optional[Callable[[], bool]] = None) -> Optional[Slot]:
+        """
+        Queue for ``cost`` slots of class ``cls``.
+
+        Args:
+            cls: 优先级类别（interactive / bulk / background）
+            client: 客户端标识，同一类别内按客户端公平排队
+            cost: 占用槽位数（如批量渲染的进程数），超过类别上限时按上限计
+            abort: 等待期间定期调用，返回 True 时放弃排队
+
+        Returns:
+            Slot: 已获得的槽位；abort 放弃时为 None
+        """
+        if cls not in self.classes:
+            raise ValueError(f"未知的调度类别: {cls}")
+        waiter = _Waiter(cls, client, self.clamp_cost(cls, cost))
+        with self._lock:
+            self.classes[cls].push(waiter)
+            self._dispatch()
+        if not self._await(waiter, abort):
+            return None
+        return Slot(self, waiter)
+
+    @contextmanager
+    def slot(self, cls: str, client: str = "", cost: int = 1) -> Iterator[Slot]:
+        slot = self.acquire(cls, client, cost)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"capacity": self.capacity, "in_use": self.in_use,
+                    "classes": {name: queue.stats() for name, queue in self.classes.items()}}
+
+    # ------------------------------------------------------------------
+    def _await(self, waiter: _Waiter, abort: Optional[Callable[[], bool]]) -> bool:
+        if abort is None:
+            waiter.event.wait()
+            return True
+        while not waiter.event.wait(ABORT_POLL_SECONDS):
+            if abort():
+                with self._lock:
+                    if not waiter.granted:
+                        self.classes[waiter.cls].remove(waiter)
+                        self._dispatch()
+                        return False
+        return True
+
+    def _blocked_by_capacity(self, queue: _ClassQueue) -> bool:
+        """The class's next waiter is within its cap and waits only for free capacity."""
+        waiter = queue.head()
+        return waiter is not None and queue.running + waiter.cost <= queue.cap
+
+    def _dispatch(self):
+        for queue in self.classes.values():
+            while True:
+                waiter = queue.head()
+                if waiter is None or queue.running + waiter.cost > queue.cap:
+                    break
+                if self.in_use + waiter.cost > self.capacity:
+                    # Lower classes must not take the capacity this class is waiting for
+                    return
+                if queue.name != INTERACTIVE and self._lower_in_use() + waiter.cost > self.capacity - 1:
+                    # Bulk and background together leave the interactive reserve free
+                    break
+                queue.remove(waiter, self.client_weights.get(waiter.client, 1.0), served=True)
+                queue.running += waiter.cost
+                self.in_use += waiter.cost
+                if waiter.resumed:
+                    queue.preempted += 1
+                else:
+                    queue.dispatched += 1
+                    queue.record_wait((time.perf_counter() - waiter.enqueued) * 1000)
+                waiter.granted = True
+                waiter.event.set()
+
+    def _lower_in_use(self) -> int:
+        return self.in_use - self.classes[INTERACTIVE].running
+
+    def _release(self, waiter: _Waiter):
+        with self._lock:
+            self.classes[waiter.cls].running -= waiter.cost
+            self.in_use -= waiter.cost
+            self._dispatch()
+
+    def _yield(self, waiter: _Waiter) -> Optional[_Waiter]:
+        """Release ``waiter``'s slots and re-queue it at the front of its client if a higher class is starved."""
+        with self._lock:
+            higher: List[_ClassQueue] = []
+            for name in PRIORITY:
+                if name == waiter.cls:
+                    break
+                higher.append(self.classes[name])
+            if not any(self._blocked_by_capacity(queue) for queue in higher):
+                return None
+            queue = self.classes[waiter.cls]
+            queue.running -= waiter.cost
+            self.in_use -= waiter.cost
+            resumed = _Waiter(waiter.cls, waiter.client, waiter.cost, resumed=True)
+            queue.push(resumed, front=True)
+            self._dispatch()
+            return resumed
+
+
+def client_id(request) -> str:
+    """Fair-queuing key of an HTTP request: the X-RanGen-Client header, else the client address."""
+    header = request.headers.get(CLIENT_HEADER)
+    if header:
+        return header[:64]
+    return request.client.host if request.client else ""
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Process-wide scheduler sized by RANGEN_SCHED_SLOTS (default: CPU count)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                slots = os.environ.get(SLOTS_ENV)
+                _scheduler = Scheduler(int(slots) if slots else None)
+    return _scheduler
+
+
+def reset_scheduler():
+    """Drop the process-wide scheduler (tests)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
@@ -0,0 +1,83 @@
+"""多进程服务模式
+
+桌面版（单机模式）以单进程运行在 127.0.0.1:8000。共享部署可以用命令行参数或环境变量
+（RANGEN_WORKERS / RANGEN_HOST / RANGEN_PORT）启动多个工作进程：各进程通过
+RANGEN_SHARED_DIR 共享磁盘渲染缓存、计数器快照，通过 RANGEN_TEMPLATE_CACHE_DIR
+共享编译后的模板字节码；每个进程启动后立即在后台预热。
+"""
+
+import argparse
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, MutableMapping, Optional
+
+from .bootstrap import LazyApp
+from .metrics import METRICS_SUBDIR, SHARED_DIR_ENV
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+TEMPLATE_SUBDIR = "templates"
+
+# Import-string target for uvicorn worker processes ("app.server:application")
+application = LazyApp("app.main:app")
+
+
+@dataclass
+class ServerConfig:
+    host: str = DEFAULT_HOST
+    port: int = DEFAULT_PORT
+    workers: int = 1
+    shared_dir: Optional[Path] = None
+
+    @property
+    def server_mode(self) -> bool:
+        return self.workers > 1
+
+
+def parse_server_config(argv: Optional[List[str]], data_dir: Path) -> ServerConfig:
+    """
+    Server settings from the command line, falling back to RANGEN_* variables.
+
+    Args:
+        argv: run.py 的命令行参数（不含程序名）
+        data_dir: 数据目录；共享缓存默认位于其下的 shared/
+
+    Returns:
+        ServerConfig: 无参数时为单机模式默认值
+    """
+    parser = argparse.ArgumentParser(prog="run.py", description="RanGen 后端服务")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("RANGEN_WORKERS", "1")),
+                        help="工作进程数（>1 为多进程服务模式）")
+    parser.add_argument("--host", default=os.environ.get("RANGEN_HOST", DEFAULT_HOST), help="监听地址")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("RANGEN_PORT", str(DEFAULT_PORT))),
+                        help="监听端口")
+    parser.add_argument("--shared-dir", default=os.environ.get(SHARED_DIR_ENV),
+                        help="多进程共享缓存目录（默认 <数据目录>/shared）")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers 必须为正整数")
+    config = ServerConfig(host=args.host, port=args.port, workers=args.workers)
+    if config.server_mode:
+        config.shared_dir = Path(args.shared_dir) if args.shared_dir else data_dir / "shared"
+    return config
+
+
+def prepare_shared_dirs(config: ServerConfig, environ: Optional[MutableMapping[str, str]] = None):
+    """
+    Create the shared directories and export them to the worker processes
+    (through ``environ``, default os.environ). Counter snapshots of a previous
+    run are removed; render and template caches are kept (their keys include
+    the template version).
+    """
+    # Imported here: the renderer module pulls in the generator, which the
+    # supervisor process does not otherwise need
+    from sas_randomizer.core_refactored.utils.template_renderer import TEMPLATE_CACHE_ENV
+
+    environ = os.environ if environ is None else environ
+    shared = config.shared_dir
+    shutil.rmtree(shared / METRICS_SUBDIR, ignore_errors=True)
+    (shared / METRICS_SUBDIR).mkdir(parents=True, exist_ok=True)
+    environ[SHARED_DIR_ENV] = str(shared)
+    environ[TEMPLATE_CACHE_ENV] = str(shared / TEMPLATE_SUBDIR)
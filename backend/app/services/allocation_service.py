@@ -0,0 +1,309 @@
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from sas_randomizer.native.columnar import LIST_SUFFIX, load_list, save_list
+from sas_randomizer.native.rand_list import DRUG, SUBJECT, CATEGORY_LABELS, RandList
+
+
+class ListNotFoundError(KeyError):
+    """Unknown allocation list id."""
+
+
+class ListExhaustedError(ValueError):
+    """No unclaimed numbers left for the requested key."""
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lists(
+    list_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT,
+    source TEXT,
+    n_rows INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors(
+    list_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    next_pos INTEGER NOT NULL,
+    PRIMARY KEY(list_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS claims(
+    list_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    number TEXT NOT NULL,
+    ref TEXT,
+    claimed_at TEXT NOT NULL,
+    PRIMARY KEY(list_id, key, pos)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_claims_ref ON claims(list_id, ref) WHERE ref IS NOT NULL;
+"""
+
+
+class _ListIndex:
+    """
+    In-memory index of one list: allocation key -> row indices in hand-out order.
+
+    Subject keys are (protocol, stratum, category); kit keys are (arm, batch,
+    stratum). Rows within a key are ordered by seq (subjects) or by the
+    dispensing order secorder (kits).
+    """
+
+    def __init__(self, rand_list: RandList):
+        self.list = rand_list
+        self.numbers = rand_list.number_strings()
+        cols = rand_list.columns
+        n = len(rand_list)
+        zeros = np.zeros(n, dtype=np.int16)
+        if rand_list.kind == SUBJECT:
+            self.key_columns = ('protocol', 'strata', 'catord')
+            parts = [cols.get('protocol', zeros), cols.get('strata', zeros), cols['catord']]
+            order_by = cols['seq']
+        else:
+            self.key_columns = ('drugcd', 'batch', 'strata')
+            parts = [cols['drugcd'], cols.get('batch', zeros), cols.get('strata', zeros)]
+            order_by = cols.get('secorder', cols['seq'])
+        self.groups: Dict[Tuple[int, ...], np.ndarray] = {}
+        if n == 0:
+            return
+        order = np.lexsort([order_by] + parts[::-1])
+        keys = np.column_stack([p[order] for p in parts])
+        bounds = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        for rows in np.split(order, bounds):
+            self.groups[tuple(int(p[rows[0]]) for p in parts)] = rows
+
+    def _label(self, column: str, code: int) -> str:
+        if column == 'catord':
+            return CATEGORY_LABELS.get(code, str(code))
+        table = self.list.dictionaries.get(column)
+        return table[code] if table and code < len(table) else ''
+
+    def _resolve(self, column: str, value: Optional[str], position: int) -> int:
+        """Map a requested value to its code; omitted values are allowed only if unambiguous."""
+        if column == 'catord':
+            return int(value) if value is not None else 1
+        present = sorted({k[position] for k in self.groups})
+        if value is None:
+            if len(present) > 1:
+                raise ValueError(f"该列表存在多个{column}取值，请指定 {column}")
+            return present[0] if present else 0
+        table = self.list.dictionaries.get(column, [''])
+        if value in table:
+            return table.index(value)
+        raise ValueError(f"列表中不存在 {column}='{value}'")
+
+    def key(self, values: Tuple[Optional[str], ...]) -> Tuple[int, ...]:
+        return tuple(self._resolve(c, v, i) for i, (c, v) in enumerate(zip(self.key_columns, values)))
+
+    def describe(self, key: Tuple[int, ...]) -> Dict[str, str]:
+        return {c: self._label(c, code) for c, code in zip(self.key_columns, key)}
+
+
+class AllocationService:
+    """
+    Local IWRS stand-in: hands out the next subject number / kit from a list.
+
+    Lists are indexed in memory; claims are persisted in SQLite (WAL mode) and
+    each next-number claim is a single atomic cursor increment, so concurrent
+    requests (threads or processes sharing the database) never receive the same
+    number. A client-supplied ``ref`` makes retries idempotent.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.list_dir = self.data_dir / "allocation_lists"
+        self.list_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, _ListIndex] = {}
+        self._conn = sqlite3.connect(
+            str(self.data_dir / "allocation.sqlite3"), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Lists
+    # ------------------------------------------------------------------
+    def register(self, rand_list: RandList, name: Optional[str] = None, source: str = "native") -> Dict:
+        """Persist a list and make it available for allocation."""
+        list_id = uuid.uuid4().hex[:12]
+        self._save_list(list_id, rand_list)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO lists(list_id, kind, name, source, n_rows, created_at) VALUES(?,?,?,?,?,?)",
+                (list_id, rand_list.kind, name or rand_list.meta.get("study_id"), source,
+                 len(rand_list), datetime.now().isoformat(timespec="seconds")),
+            )
+            self._indexes[list_id] = _ListIndex(rand_list)
+        return self.summary(list_id)
+
+    def list_lists(self) -> List[Dict]:
+        cur = self._conn.execute(
+            "SELECT list_id, kind, name, source, n_rows, created_at FROM lists ORDER BY created_at DESC"
+        )
+        names = ("list_id", "kind", "name", "source", "rows", "created_at")
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def summary(self, list_id: str) -> Dict:
+        index = self._index(list_id)
+        used = dict(self._conn.execute(
+            "SELECT key, next_pos FROM cursors WHERE list_id=?", (list_id,)
+        ).fetchall())
+        keys = []
+        for key, rows in index.groups.items():
+            claimed = min(used.get(self._key_text(key), 0), len(rows))
+            keys.append({**index.describe(key), "total": len(rows), "claimed": claimed,
+                         "remaining": len(rows) - claimed})
+        return {"list_id": list_id, "kind": index.list.kind, "rows": len(index.list), "keys": keys}
+
+    def get_list(self, list_id: str) -> RandList:
+        """The registered list itself (raises ListNotFoundError)."""
+        return self._index(list_id).list
+
+    def _index(self, list_id: str) -> _ListIndex:
+        index = self._indexes.get(list_id)
+        if index is not None:
+            return index
+        with self._lock:
+            if list_id not in self._indexes:
+                row = self._conn.execute("SELECT 1 FROM lists WHERE list_id=?", (list_id,)).fetchone()
+                if row is None:
+                    raise ListNotFoundError(list_id)
+                self._indexes[list_id] = _ListIndex(self._load_list(list_id))
+            return self._indexes[list_id]
+
+    def _save_list(self, list_id: str, rand_list: RandList):
+        save_list(rand_list, str(self.list_dir / f"{list_id}{LIST_SUFFIX}"))
+
+    def _load_list(self, list_id: str) -> RandList:
+        return load_list(str(self.list_dir / f"{list_id}{LIST_SUFFIX}"))
+
+    # ------------------------------------------------------------------
+    # Claims
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _key_text(key: Tuple[int, ...]) -> str:
+        return ",".join(map(str, key))
+
+    def next_subject(self, list_id: str, protocol: Optional[str] = None, stratum: Optional[str] = None,
+                     category: int = 1, ref: Optional[str] = None) -> Dict:
+        """Claim the next subject number in (protocol, stratum, category)."""
+        index = self._index(list_id)
+        if index.list.kind != SUBJECT:
+            raise ValueError("该列表不是受试者随机列表")
+        result = self._claim(list_id, index, index.key((protocol, stratum, category)), ref)
+        row = result["row"]
+        cols = index.list.columns
+        result["armcd"] = index.list.dictionaries["armcd"][cols["armcd"][row]]
+        result["arm"] = index.list.dictionaries["arm"][cols["arm"][row]]
+        return result
+
+    def next_kit(self, list_id: str, arm: str, batch: Optional[str] = None, stratum: Optional[str] = None,
+                 ref: Optional[str] = None) -> Dict:
+        """Claim the next kit for (arm, batch, stratum) in dispensing order."""
+        index = self._index(list_id)
+        if index.list.kind != DRUG:
+            raise ValueError("该列表不是药物列表")
+        return self._claim(list_id, index, index.key((arm, batch, stratum)), ref)
+
+    def _claim(self, list_id: str, index: _ListIndex, key: Tuple[int, ...], ref: Optional[str]) -> Dict:
+        rows = index.groups.get(key)
+        if rows is None:
+            raise ValueError(f"列表中没有满足条件的号码: {index.describe(key)}")
+        key_text = self._key_text(key)
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if ref is not None:
+                    existing = conn.execute(
+                        "SELECT key, pos, row, number, claimed_at FROM claims WHERE list_id=? AND ref=?",
+                        (list_id, ref),
+                    ).fetchone()
+                    if existing is not None:
+                        conn.execute("COMMIT")
+                        return self._claim_result(index, existing[0], existing[1], existing[2],
+                                                  existing[3], ref, existing[4], replay=True)
+                pos = conn.execute(
+                    "INSERT INTO cursors(list_id, key, next_pos) VALUES(?,?,1) "
+                    "ON CONFLICT(list_id, key) DO UPDATE SET next_pos=next_pos+1 RETURNING next_pos",
+                    (list_id, key_text),
+                ).fetchone()[0] - 1
+                if pos >= len(rows):
+                    conn.execute("ROLLBACK")
+                    raise ListExhaustedError(f"号码已用尽: {index.describe(key)}")
+                row = int(rows[pos])
+                number = str(index.numbers[row])
+                claimed_at = datetime.now().isoformat(timespec="milliseconds")
+                conn.execute(
+                    "INSERT INTO claims(list_id, key, pos, row, number, ref, claimed_at) VALUES(?,?,?,?,?,?,?)",
+                    (list_id, key_text, pos, row, number, ref, claimed_at),
+                )
+                conn.execute("COMMIT")
+            except ListExhaustedError:
+                raise
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        return self._claim_result(index, key_text, pos, row, number, ref, claimed_at)
+
+    @staticmethod
+    def _claim_result(index: _ListIndex, key_text: str, pos: int, row: int, number: str,
+                      ref: Optional[str], claimed_at: str, replay: bool = False) -> Dict:
+        key = tuple(int(k) for k in key_text.split(","))
+        return {
+            **index.describe(key),
+            "number": number,
+            "position": pos + 1,
+            "row": row,
+            "seq": int(index.list.columns["seq"][row]),
+            "ref": ref,
+            "claimed_at": claimed_at,
+            "replay": replay,
+        }
+
+    def claims(self, list_id: str) -> List[Dict]:
+        self._index(list_id)
+        cur = self._conn.execute(
+            "SELECT key, pos, number, ref, claimed_at FROM claims WHERE list_id=? ORDER BY claimed_at",
+            (list_id,),
+        )
+        return [dict(zip(("key", "position", "number", "ref", "claimed_at"), r)) for r in cur.fetchall()]
+
+
+_service: Optional[AllocationService] = None
+_service_lock = threading.Lock()
+
+
+def get_allocation_service() -> AllocationService:
+    """Process-wide AllocationService rooted in the RanGen data directory."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from .paths import get_data_dir
+                _service = AllocationService(get_data_dir())
+    return _service
+
+
+def reset_allocation_service():
+    """Drop the cached service (used when the data directory changes, e.g. in tests)."""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.close()
+        _service = None
@@ -0,0 +1,409 @@
+"""研究配置库
+
+服务器端保存研究配置并保留版本历史，供列表、检索和按版本重新生成使用。
+配置以规范化 JSON（与 /generate 的配置哈希一致）为内容，按内容哈希去重、zlib 压缩；
+新版本存为相对上一版本的增量（仅记录变化的键，嵌套对象逐层比较），每隔若干版本
+存一次完整内容以限制还原链长度。studies 表在 study_id / client / status / 更新时间上
+建索引，列表与检索只读该表。已保存版本的生成结果按（内容哈希, 模板版本）缓存，
+/generate 收到与某个已保存版本相同的配置时直接返回缓存结果。
+"""
+
+import json
+import sqlite3
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sas_randomizer.utils.fingerprint import canonical_json, config_hash
+
+DB_NAME = "configs.sqlite3"
+# A full copy is stored once a delta chain reaches this length
+MAX_CHAIN = 16
+# Decoded contents kept in memory (contents are immutable)
+CONTENT_CACHE_SIZE = 256
+LIST_LIMIT = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS studies(
+    config_id TEXT PRIMARY KEY,
+    study_id TEXT NOT NULL,
+    name TEXT,
+    client TEXT,
+    status TEXT,
+    head_version INTEGER NOT NULL,
+    head_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_studies_updated ON studies(updated_at);
+CREATE INDEX IF NOT EXISTS ix_studies_study ON studies(study_id, updated_at);
+CREATE INDEX IF NOT EXISTS ix_studies_client ON studies(client, updated_at);
+CREATE INDEX IF NOT EXISTS ix_studies_status ON studies(status, updated_at);
+CREATE TABLE IF NOT EXISTS versions(
+    config_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    message TEXT,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY(config_id, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS contents(
+    hash TEXT PRIMARY KEY,
+    base_hash TEXT,
+    depth INTEGER NOT NULL,
+    payload BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS renders(
+    hash TEXT NOT NULL,
+    template_version TEXT NOT NULL,
+    sas BLOB NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY(hash, template_version)
+) WITHOUT ROWID;
+"""
+_STUDY_COLUMNS = ("config_id", "study_id", "name", "client", "status", "head_version", "head_hash",
+                  "created_at", "updated_at")
+
+
+class ConfigNotFoundError(KeyError):
+    """Unknown config id or version."""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="milliseconds")
+
+
+def _pack(data: Any) -> bytes:
+    return zlib.compress(canonical_json(data).encode("utf-8"), 6)
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Delta turning ``old`` into ``new``: ``set`` (new or replaced keys), ``unset``
+    (removed keys) and ``sub`` (deltas of nested objects present in both).
+    """
+    delta: Dict[str, Any] = {}
+    changed = {}
+    nested = {}
+    for key, value in new.items():
+        if key not in old:
+            changed[key] = value
+        elif old[key] != value:
+            if isinstance(value, dict) and isinstance(old[key], dict):
+                nested[key] = diff(old[key], value)
+            else:
+                changed[key] = value
+    removed = [key for key in old if key not in new]
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["unset"] = removed
+    if nested:
+        delta["sub"] = nested
+    return delta
+
+
+def patch(old: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a diff() delta (``old`` is not modified)."""
+    new = dict(old)
+    for key in delta.get("unset", ()):
+        new.pop(key, None)
+    new.update(delta.get("set", {}))
+    for key, sub in delta.get("sub", {}).items():
+        new[key] = patch(new[key], sub)
+    return new
+
+
+class ConfigStore:
+    """
+    Versioned study configurations in SQLite (WAL mode).
+
+    A config id names one study configuration; each save appends a version
+    whose content is the canonical JSON of the validated request. Identical
+    contents are stored once, whichever config or version they belong to.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._contents: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._conn = sqlite3.connect(
+            str(self.data_dir / DB_NAME), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Configs and versions
+    # ------------------------------------------------------------------
+    def create(self, config: Dict[str, Any], name: Optional[str] = None, message: Optional[str] = None) -> Dict:
+        """Save a new study configuration as version 1."""
+        digest = config_hash(config)
+        config_id = uuid.uuid4().hex[:12]
+        now = _now()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._store_content(digest, config, None)
+                self._conn.execute(
+                    "INSERT INTO studies(config_id, study_id, name, client, status, head_version, head_hash, "
+                    "created_at, updated_at) VALUES(?,?,?,?,?,?,?,?,?)",
+                    (config_id, config.get("study_id", ""), name, config.get("client"), config.get("status"),
+                     1, digest, now, now),
+                )
+                self._conn.execute(
+                    "INSERT INTO versions(config_id, version, hash, message, created_at) VALUES(?,?,?,?,?)",
+                    (config_id, 1, digest, message, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._remember(digest, config)
+        return self.summary(config_id)
+
+    def save(self, config_id: str, config: Dict[str, Any], message: Optional[str] = None,
+             name: Optional[str] = None) -> Dict:
+        """
+        Append a version to ``config_id``.
+
+        Args:
+            config_id: 配置号
+            config: 规范化后的配置（与 /generate 请求体相同）
+            message: 版本说明
+            name: 新的显示名称（不传则不变）
+
+        Returns:
+            Dict: 配置摘要；内容与当前版本相同时不新增版本
+        """
+        digest = config_hash(config)
+        now = _now()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT head_version, head_hash FROM studies WHERE config_id=?", (config_id,)
+                ).fetchone()
+                if row is None:
+                    raise ConfigNotFoundError(config_id)
+                head_version, head_hash = row
+                if digest != head_hash:
+                    self._store_content(digest, config, head_hash)
+                    self._conn.execute(
+                        "INSERT INTO versions(config_id, version, hash, message, created_at) VALUES(?,?,?,?,?)",
+                        (config_id, head_version + 1, digest, message, now),
+                    )
+                    self._conn.execute(
+                        "UPDATE studies SET study_id=?, client=?, status=?, head_version=?, head_hash=?, "
+                        "updated_at=? WHERE config_id=?",
+                        (config.get("study_id", ""), config.get("client"), config.get("status"),
+                         head_version + 1, digest, now, config_id),
+                    )
+                if name is not None:
+                    self._conn.execute("UPDATE studies SET name=? WHERE config_id=?", (name, config_id))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._remember(digest, config)
+        return self.summary(config_id)
+
+    def summary(self, config_id: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_STUDY_COLUMNS)} FROM studies WHERE config_id=?", (config_id,)
+            ).fetchone()
+        if row is None:
+            raise ConfigNotFoundError(config_id)
+        return dict(zip(_STUDY_COLUMNS, row))
+
+    def search(self, study_id: Optional[str] = None, client: Optional[str] = None, status: Optional[str] = None,
+               q: Optional[str] = None, limit: int = LIST_LIMIT, offset: int = 0) -> Dict:
+        """
+        Configs matching every given filter, most recently updated first.
+        ``q`` is a prefix of the study id (the ix_studies_study index serves it).
+        """
+        where, args = [], []
+        if study_id is not None:
+            where.append("study_id = ?")
+            args.append(study_id)
+        if client is not None:
+            where.append("client = ?")
+            args.append(client)
+        if status is not None:
+            where.append("status = ?")
+            args.append(status)
+        if q:
+            # Prefix range instead of LIKE, so the index is used
+            where.append("study_id >= ? AND study_id < ?")
+            args.extend([q, q + "\U0010ffff"])
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM studies{clause}", args).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_STUDY_COLUMNS)} FROM studies{clause} ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+                args + [min(max(limit, 1), 1000), max(offset, 0)],
+            ).fetchall()
+        return {"total": total, "items": [dict(zip(_STUDY_COLUMNS, row)) for row in rows]}
+
+    def versions(self, config_id: str) -> List[Dict]:
+        self.summary(config_id)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, hash, message, created_at FROM versions WHERE config_id=? ORDER BY version DESC",
+                (config_id,),
+            ).fetchall()
+        return [dict(zip(("version", "hash", "message", "created_at"), row)) for row in rows]
+
+    def version_hash(self, config_id: str, version: Optional[int] = None) -> Tuple[int, str]:
+        """(version, content hash) of ``version`` (default: the latest)."""
+        if version is None:
+            summary = self.summary(config_id)
+            return summary["head_version"], summary["head_hash"]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash FROM versions WHERE config_id=? AND version=?", (config_id, version)
+            ).fetchone()
+        if row is None:
+            raise ConfigNotFoundError(f"{config_id}@{version}")
+        return version, row[0]
+
+    def get_config(self, config_id: str, version: Optional[int] = None) -> Dict[str, Any]:
+        return self.content(self.version_hash(config_id, version)[1])
+
+    # ------------------------------------------------------------------
+    # Contents
+    # ------------------------------------------------------------------
+    def content(self, digest: str) -> Dict[str, Any]:
+        """Decode a stored content: its nearest full copy plus the deltas after it."""
+        with self._lock:
+            cached = self._contents.get(digest)
+            if cached is not None:
+                self._contents.move_to_end(digest)
+                return cached
+        chain = []
+        current: Optional[str] = digest
+        data = None
+        while current is not None:
+            with self._lock:
+                data = self._contents.get(current)
+                if data is not None:
+                    break
+                row = self._conn.execute(
+                    "SELECT base_hash, payload FROM contents WHERE hash=?", (current,)).fetchone()
+            if row is None:
+                raise ConfigNotFoundError(digest)
+            chain.append(_unpack(row[1]))
+            current = row[0]
+        if data is None:
+            data = chain.pop()
+        for delta in reversed(chain):
+            data = patch(data, delta)
+        self._remember(digest, data)
+        return data
+
+    def _remember(self, digest: str, data: Dict[str, Any]):
+        with self._lock:
+            self._contents[digest] = data
+            self._contents.move_to_end(digest)
+            while len(self._contents) > CONTENT_CACHE_SIZE:
+                self._contents.popitem(last=False)
+
+    def _store_content(self, digest: str, config: Dict[str, Any], base: Optional[str]):
+        """Insert a content unless already stored: a delta from ``base`` while its chain is short, else in full."""
+        if self._conn.execute("SELECT 1 FROM contents WHERE hash=?", (digest,)).fetchone():
+            return
+        payload, base_hash, depth = _pack(config), None, 0
+        if base is not None:
+            row = self._conn.execute("SELECT depth FROM contents WHERE hash=?", (base,)).fetchone()
+            if row is not None and row[0] + 1 < MAX_CHAIN:
+                delta = _pack(diff(self.content(base), config))
+                if len(delta) < len(payload):
+                    payload, base_hash, depth = delta, base, row[0] + 1
+        self._conn.execute(
+            "INSERT INTO contents(hash, base_hash, depth, payload) VALUES(?,?,?,?)",
+            (digest, base_hash, depth, payload),
+        )
+
+    # ------------------------------------------------------------------
+    # Rendered programs of saved contents
+    # ------------------------------------------------------------------
+    def get_render(self, digest: str, template_version: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sas FROM renders WHERE hash=? AND template_version=?", (digest, template_version)
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def put_render(self, digest: str, template_version: str, sas_code: str) -> bool:
+        """
+        Cache the program rendered from a saved content (other configs are
+        ignored); renders of older template versions are dropped.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO renders(hash, template_version, sas, created_at) "
+                "SELECT ?, ?, ?, ? WHERE EXISTS(SELECT 1 FROM contents WHERE hash=?)",
+                (digest, template_version, zlib.compress(sas_code.encode("utf-8"), 6), _now(), digest),
+            )
+            if cursor.rowcount:
+                self._conn.execute("DELETE FROM renders WHERE template_version != ?", (template_version,))
+        return bool(cursor.rowcount)
+
+    def stats(self) -> Dict[str, int]:
+        counts = {}
+        with self._lock:
+            for table in ("studies", "versions", "contents", "renders"):
+                counts[table] = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            counts["content_bytes"] = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM contents").fetchone()[0]
+        return counts
+
+
+_store: Optional[ConfigStore] = None
+_store_lock = threading.Lock()
+
+
+def get_config_store() -> ConfigStore:
+    """Process-wide ConfigStore rooted in the RanGen data directory."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from .paths import get_data_dir
+                _store = ConfigStore(get_data_dir())
+    return _store
+
+
+def peek_config_store() -> Optional[ConfigStore]:
+    """The store if one exists (opened here, or saved to before); /generate does not create it."""
+    if _store is not None:
+        return _store
+    from .paths import get_data_dir
+    if (get_data_dir() / DB_NAME).exists():
+        return get_config_store()
+    return None
+
+
+def reset_config_store():
+    """Drop the cached store (used when the data directory changes, e.g. in tests)."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = None
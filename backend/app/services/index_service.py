@@ -0,0 +1,107 @@
+"""紧急揭盲索引服务
+
+在数据目录 indexes/ 下保存 .rgx 索引，并缓存已 mmap 打开的 KitIndex，
+查找时不再读取盲底 CSV。
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sas_randomizer.native.kit_index import INDEX_SUFFIX, KitIndex, build_index
+from sas_randomizer.native.rand_list import RandList
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.\-]{1,64}$")
+
+
+class IndexNotFoundError(KeyError):
+    """No index with the requested name."""
+
+
+class IndexService:
+    """Builds indexes into ``data_dir/indexes`` and serves lookups from mmap."""
+
+    def __init__(self, data_dir: Path, max_open: int = 16):
+        self.index_dir = Path(data_dir) / "indexes"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._open: "OrderedDict[str, KitIndex]" = OrderedDict()
+
+    def _path(self, name: str) -> Path:
+        if not _NAME_RE.match(name or ""):
+            raise ValueError("索引名称只能包含字母、数字、'_'、'-'、'.'（最长64个字符）")
+        return self.index_dir / f"{name}{INDEX_SUFFIX}"
+
+    def build(self, rand_list: RandList, name: str) -> Dict:
+        path = self._path(name)
+        with self._lock:
+            # Replacing an index: drop the stale mapping before the new file lands
+            stale = self._open.pop(name, None)
+            if stale is not None:
+                stale.close()
+        info = build_index(rand_list, str(path))
+        return {"name": name, **info, "size_bytes": path.stat().st_size}
+
+    def list_indexes(self) -> List[Dict]:
+        result = []
+        for path in sorted(self.index_dir.glob(f"*{INDEX_SUFFIX}")):
+            name = path.name[:-len(INDEX_SUFFIX)]
+            try:
+                index = self._get(name)
+            except ValueError:
+                continue
+            result.append({"name": name, "kind": index.kind, "rows": index.rows,
+                           "size_bytes": path.stat().st_size})
+        return result
+
+    def _get(self, name: str) -> KitIndex:
+        path = self._path(name)
+        with self._lock:
+            index = self._open.get(name)
+            if index is not None:
+                self._open.move_to_end(name)
+                return index
+            if not path.exists():
+                raise IndexNotFoundError(name)
+            index = KitIndex(str(path))
+            self._open[name] = index
+            while len(self._open) > self.max_open:
+                _, evicted = self._open.popitem(last=False)
+                evicted.close()
+            return index
+
+    def lookup(self, name: str, number: str) -> Optional[Dict]:
+        return self._get(name).lookup(number)
+
+    def close(self):
+        with self._lock:
+            for index in self._open.values():
+                index.close()
+            self._open.clear()
+
+
+_service: Optional[IndexService] = None
+_service_lock = threading.Lock()
+
+
+def get_index_service() -> IndexService:
+    """Process-wide IndexService rooted in the RanGen data directory."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from .paths import get_data_dir
+                _service = IndexService(get_data_dir())
+    return _service
+
+
+def reset_index_service():
+    """Drop the cached service (used when the data directory changes, e.g. in tests)."""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.close()
+        _service = None
@@ -0,0 +1,499 @@
+"""后台任务管理
+
+批量渲染、盲底生成、盲底校验等耗时操作可能超过前端 60 秒的请求超时。任务提交后立即
+返回任务号，由进程内的线程池执行（同时运行的任务数有上限，其余排队），进度、状态和
+结果保存在数据目录下的 jobs.sqlite3，客户端通过 SSE 订阅进度或轮询状态，可随时取消。
+结束的任务保留一段时间（TTL）后连同工作目录一起清理。无需外部消息队列。
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ..scheduler import BACKGROUND, BULK, Slot, get_scheduler
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+DEFAULT_MAX_CONCURRENT = 2
+DEFAULT_MAX_QUEUED = 100
+DEFAULT_TTL_SECONDS = 24 * 3600
+# Progress is written to SQLite (and the cancel flag read back) at most this often
+PERSIST_SECONDS = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs(
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner_pid INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_finished ON jobs(finished_at) WHERE finished_at IS NOT NULL;
+"""
+_COLUMNS = ("job_id", "kind", "status", "params", "done", "total", "message", "result", "error",
+            "cancel_requested", "created_at", "started_at", "finished_at")
+
+
+class JobNotFoundError(KeyError):
+    """Unknown (or already evicted) job id."""
+
+
+class JobQueueFullError(RuntimeError):
+    """Too many jobs waiting for a worker."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancellation was requested."""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="milliseconds")
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobContext:
+    """Handed to a job function: its work directory, parameters and progress reporting."""
+
+    def __init__(self, manager: "JobManager", job_id: str, params: Dict[str, Any], directory: Path, slot: Slot):
+        self.job_id = job_id
+        self.params = params
+        self.directory = directory
+        self.slot = slot
+        self._manager = manager
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None):
+        """
+        Record progress; raises JobCancelled once the job has been cancelled.
+        This is also the job's chunk boundary: it may pause here while
+        higher-priority work needs the scheduler slot.
+        """
+        self._manager._progress(self.job_id, done, total, message)
+
+    def check_cancelled(self):
+        self._manager._progress(self.job_id, None, None, None)
+
+
+JobFunction = Callable[[JobContext], Any]
+JOB_KINDS: Dict[str, JobFunction] = {}
+JOB_PRIORITIES: Dict[str, str] = {}
+# Kinds that run params["jobs"] (default: CPU count) processes and take that many scheduler slots
+PARALLEL_KINDS = set()
+
+
+def job_kind(name: str, priority: str = BULK, parallel: bool = False):
+    """Register ``fn(ctx) -> JSON-serialisable result`` as the runner of job kind ``name``."""
+    def register(fn: JobFunction) -> JobFunction:
+        JOB_KINDS[name] = fn
+        JOB_PRIORITIES[name] = priority
+        if parallel:
+            PARALLEL_KINDS.add(name)
+        return fn
+    return register
+
+
+class _LiveJob:
+    """In-memory state of a job submitted by this process."""
+
+    def __init__(self, row: Dict[str, Any]):
+        self.row = row
+        self.cancel = threading.Event()
+        self.persisted_at = 0.0
+        self.slot: Optional[Slot] = None
+
+
+class JobManager:
+    """
+    In-process job runner with persisted status.
+
+    Jobs run on a bounded thread pool once the scheduler grants a slot of
+    their kind's priority class (bulk or background); everything a client can see lives in
+    SQLite, so status survives restarts (jobs interrupted by one are marked
+    failed) and any worker process sharing the data directory can report on
+    or cancel a job. Cancellation is cooperative: the job function stops at
+    its next ``ctx.progress()`` call.
+    """
+
+    def __init__(self, data_dir: Path, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 max_queued: int = DEFAULT_MAX_QUEUED, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.data_dir = Path(data_dir)
+        self.job_dir = self.data_dir / "jobs"
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._live: Dict[str, _LiveJob] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="rangen-job")
+        self._conn = sqlite3.connect(
+            str(self.data_dir / "jobs.sqlite3"), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self._recover()
+
+    def close(self, wait: bool = False):
+        with self._lock:
+            live = list(self._live.values())
+        for job in live:
+            job.cancel.set()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Client API
+    # ------------------------------------------------------------------
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None,
+               prepare: Optional[Callable[[Path], None]] = None, client: str = "") -> Dict:
+        """
+        Queue a job of a registered kind.
+
+        Args:
+            kind: 任务类型（JOB_KINDS 中注册的名称）
+            params: 任务参数（JSON 可序列化）
+            prepare: 入队前调用 prepare(工作目录)，如保存上传文件
+            client: 提交者标识，调度器按它公平排队
+
+        Returns:
+            Dict: 任务状态
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"未知的任务类型: {kind}")
+        self.purge_expired()
+        with self._lock:
+            waiting = sum(1 for job in self._live.values() if job.row["status"] == QUEUED)
+            if waiting >= self.max_queued:
+                raise JobQueueFullError(f"排队任务已达上限 {self.max_queued}，请稍后再试")
+        job_id = uuid.uuid4().hex[:12]
+        directory = self.job_dir / job_id
+        directory.mkdir(parents=True)
+        try:
+            if prepare is not None:
+                prepare(directory)
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        row = {"job_id": job_id, "kind": kind, "status": QUEUED, "params": params or {}, "done": 0,
+               "total": None, "message": None, "result": None, "error": None, "cancel_requested": 0,
+               "created_at": _now(), "started_at": None, "finished_at": None, "client": client}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs(job_id, kind, status, params, owner_pid, created_at) VALUES(?,?,?,?,?,?)",
+                (job_id, kind, QUEUED, json.dumps(row["params"], ensure_ascii=False), os.getpid(),
+                 row["created_at"]),
+            )
+            self._live[job_id] = _LiveJob(row)
+        self._pool.submit(self._run, job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Dict:
+        """Job status (live state for this process's jobs, the database otherwise)."""
+        with self._lock:
+            live = self._live.get(job_id)
+            if live is not None:
+                return self._public(live.row)
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id=?", (job_id,)
+            ).fetchone()
+        if row is None:
+            raise JobNotFoundError(job_id)
+        return self._public(self._decode(row))
+
+    def list_jobs(self, limit: int = 100) -> List[Dict]:
+        self.purge_expired()
+        jobs = []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            for row in rows:
+                decoded = self._decode(row)
+                live = self._live.get(decoded["job_id"])
+                jobs.append(self._public(live.row if live is not None else decoded, with_result=False))
+        return jobs
+
+    def cancel(self, job_id: str) -> Dict:
+        """Request cancellation; a queued job is cancelled at once, a running one at its next progress report."""
+        job = self.get(job_id)
+        if job["status"] in FINISHED:
+            return job
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET cancel_requested=1 WHERE job_id=?", (job_id,))
+            live = self._live.get(job_id)
+            if live is not None:
+                live.cancel.set()
+                live.row["cancel_requested"] = 1
+        return self.get(job_id)
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs (and their work directories) older than the TTL."""
+        cutoff = (datetime.now() - timedelta(seconds=self.ttl_seconds)).isoformat(timespec="milliseconds")
+        with self._lock:
+            expired = [r[0] for r in self._conn.execute(
+                "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            ).fetchall()]
+            if expired:
+                self._conn.executemany("DELETE FROM jobs WHERE job_id=?", [(j,) for j in expired])
+        for job_id in expired:
+            shutil.rmtree(self.job_dir / job_id, ignore_errors=True)
+        return len(expired)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+    def _run(self, job_id: str):
+        with self._lock:
+            live = self._live.get(job_id)
+        if live is None:
+            return
+        row = live.row
+        kind = row["kind"]
+        cost = (row["params"].get("jobs") or os.cpu_count() or 1) if kind in PARALLEL_KINDS else 1
+        # Stays queued until the scheduler grants a slot of the kind's priority class
+        live.slot = get_scheduler().acquire(JOB_PRIORITIES[kind], row["client"], cost,
+                                            abort=lambda: self._aborted(job_id))
+        slot = live.slot
+        if slot is None or self._aborted(job_id):
+            if slot is not None:
+                slot.release()
+            self._finish(job_id, CANCELLED, message="任务已取消")
+            return
+        try:
+            self._update(job_id, status=RUNNING, started_at=_now())
+            ctx = JobContext(self, job_id, row["params"], self.job_dir / job_id, slot)
+            try:
+                result = JOB_KINDS[kind](ctx)
+            except JobCancelled:
+                self._finish(job_id, CANCELLED, message="任务已取消")
+            except Exception as e:  # reported to the client, never raised into the pool
+                self._finish(job_id, FAILED, error=str(e) or type(e).__name__)
+            else:
+                self._finish(job_id, SUCCEEDED, result=result)
+        finally:
+            slot.release()
+
+    def _progress(self, job_id: str, done: Optional[int], total: Optional[int], message: Optional[str]):
+        with self._lock:
+            live = self._live[job_id]
+            if done is not None:
+                live.row["done"] = int(done)
+            if total is not None:
+                live.row["total"] = int(total)
+            if message is not None:
+                live.row["message"] = message
+            due = time.monotonic() - live.persisted_at >= PERSIST_SECONDS
+        if due:
+            # Another worker process may have requested cancellation through the database
+            if self._cancel_requested(job_id):
+                live.cancel.set()
+            self._persist(job_id)
+        if live.cancel.is_set():
+            raise JobCancelled(job_id)
+        if live.slot is not None and not live.slot.checkpoint(abort=lambda: self._aborted(job_id)):
+            raise JobCancelled(job_id)
+
+    def _aborted(self, job_id: str) -> bool:
+        """Cancelled here or (through the database) by another worker process."""
+        live = self._live[job_id]
+        if not live.cancel.is_set() and self._cancel_requested(job_id):
+            live.cancel.set()
+        return live.cancel.is_set()
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._live[job_id].row.update(fields)
+        self._persist(job_id)
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None,
+                message: Optional[str] = None):
+        fields = {"status": status, "result": result, "error": error, "finished_at": _now()}
+        if message is not None:
+            fields["message"] = message
+        with self._lock:
+            live = self._live[job_id]
+            if status == SUCCEEDED and live.row["total"] is not None:
+                live.row["done"] = live.row["total"]
+        self._update(job_id, **fields)
+        with self._lock:
+            self._live.pop(job_id, None)
+
+    def _persist(self, job_id: str):
+        with self._lock:
+            live = self._live[job_id]
+            row = live.row
+            self._conn.execute(
+                "UPDATE jobs SET status=?, done=?, total=?, message=?, result=?, error=?, started_at=?, "
+                "finished_at=? WHERE job_id=?",
+                (row["status"], row["done"], row["total"], row["message"],
+                 None if row["result"] is None else json.dumps(row["result"], ensure_ascii=False),
+                 row["error"], row["started_at"], row["finished_at"], job_id),
+            )
+            live.persisted_at = time.monotonic()
+
+    def _recover(self):
+        """Jobs left queued or running by a process that has exited can never finish: mark them failed."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, owner_pid FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            finished_at = _now()
+            self._conn.executemany(
+                "UPDATE jobs SET status=?, error=?, finished_at=? WHERE job_id=?",
+                [(FAILED, "服务重启，任务已中断", finished_at, job_id)
+                 for job_id, pid in rows if not _process_alive(pid)],
+            )
+
+    @staticmethod
+    def _decode(row) -> Dict[str, Any]:
+        data = dict(zip(_COLUMNS, row))
+        data["params"] = json.loads(data["params"])
+        data["result"] = json.loads(data["result"]) if data["result"] is not None else None
+        return data
+
+    @staticmethod
+    def _public(row: Dict[str, Any], with_result: bool = True) -> Dict:
+        total = row["total"]
+        job = {
+            "job_id": row["job_id"], "kind": row["kind"], "status": row["status"],
+            "done": row["done"], "total": total,
+            "percent": round(100.0 * row["done"] / total, 1) if total else None,
+            "message": row["message"], "error": row["error"],
+            "cancel_requested": bool(row["cancel_requested"]),
+            "created_at": row["created_at"], "started_at": row["started_at"], "finished_at": row["finished_at"],
+        }
+        if with_result:
+            job["result"] = row["result"]
+        return job
+
+
+# ----------------------------------------------------------------------
+# Job kinds
+# ----------------------------------------------------------------------
+@job_kind("bulk", priority=BULK, parallel=True)
+def _bulk_job(ctx: JobContext):
+    """Render a directory of study configs (sas_randomizer bulk)."""
+    from sas_randomizer.bulk import generate_tree
+
+    p = ctx.params
+    result = generate_tree(p["config_dir"], p["out_dir"], jobs=ctx.slot.cost, force=p.get("force", False),
+                           macro_library_dir=p.get("macro_library_dir"),
+                           progress=lambda done, total: ctx.progress(done, total, f"已渲染 {done}/{total}"))
+    return {"ok": result.ok, "generated": result.generated, "unchanged": result.unchanged,
+            "failed": result.failed, "removed": result.removed}
+
+
+@job_kind("verify", priority=BACKGROUND)
+def _verify_job(ctx: JobContext):
+    """Verify the uploaded list CSV (list.csv in the work directory) against the request config."""
+    import io
+
+    from sas_randomizer.native.verify import verify_list
+    from ..api.schemas import SASGenerationRequest
+    from .sas_service import SASService
+
+    study = SASService.study_design(SASGenerationRequest.model_validate(ctx.params["request"]))
+    path = ctx.directory / "list.csv"
+    size = path.stat().st_size
+    with open(path, "rb") as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        report = verify_list(text, study, progress=lambda rows: ctx.progress(
+            raw.tell(), size, f"已校验 {rows} 行"))
+    return report.to_dict()
+
+
+@job_kind("allocation_list", priority=BULK)
+def _allocation_list_job(ctx: JobContext):
+    """Generate a list with the native engine and register it for allocation."""
+    from sas_randomizer.native.block import generate_subject_list
+    from sas_randomizer.native.drug import generate_drug_list
+    from ..api.schemas import AllocationListCreate
+    from .allocation_service import get_allocation_service
+    from .sas_service import SASService
+
+    body = AllocationListCreate.model_validate(ctx.params)
+    generate = generate_drug_list if body.kind == "drug" else generate_subject_list
+    ctx.progress(0, 2, "生成盲底")
+    rand_list = generate(SASService.study_design(body.request), seed=body.seed)
+    ctx.progress(1, 2, "登记列表")
+    return get_allocation_service().register(rand_list, name=body.name, source="native")
+
+
+_service: Optional[JobManager] = None
+_service_lock = threading.Lock()
+
+
+def get_job_service() -> JobManager:
+    """Process-wide JobManager rooted in the RanGen data directory (RANGEN_JOB_* override the limits)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from .paths import get_data_dir
+                _service = JobManager(
+                    get_data_dir(),
+                    max_concurrent=int(os.environ.get("RANGEN_JOB_WORKERS", DEFAULT_MAX_CONCURRENT)),
+                    max_queued=int(os.environ.get("RANGEN_JOB_QUEUE", DEFAULT_MAX_QUEUED)),
+                    ttl_seconds=float(os.environ.get("RANGEN_JOB_TTL", DEFAULT_TTL_SECONDS)),
+                )
+    return _service
+
+
+def reset_job_service():
+    """Drop the cached service (used when the data directory changes, e.g. in tests)."""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.close(wait=True)
+        _service = None
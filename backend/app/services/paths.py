@@ -0,0 +1,45 @@
+import os
+import sys
+from pathlib import Path
+
+BULK_SUBDIR = "bulk"
+
+
+def get_data_dir() -> Path:
+    """
+    Per-user RanGen data directory (same location backend/run.py logs to).
+    Uses %LOCALAPPDATA%/RanGen on Windows, ~/RanGen elsewhere; RANGEN_DATA_DIR overrides.
+    """
+    override = os.environ.get("RANGEN_DATA_DIR")
+    if override:
+        data_dir = Path(override)
+    else:
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        else:
+            base = os.path.expanduser("~")
+        data_dir = Path(base) / "RanGen"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
+
+def get_bulk_root() -> Path:
+    """
+    Directory that HTTP-submitted bulk jobs may read configs from and write
+    programs to: <data dir>/bulk, or RANGEN_BULK_ROOT.
+    """
+    override = os.environ.get("RANGEN_BULK_ROOT")
+    root = Path(override) if override else get_data_dir() / BULK_SUBDIR
+    root.mkdir(parents=True, exist_ok=True)
+    return root.resolve()
+
+
+def resolve_under(root: Path, path: str) -> Path:
+    """
+    ``path`` (relative to ``root``, or absolute) resolved with symlinks and
+    ``..`` followed; ValueError unless it is ``root`` or inside it.
+    """
+    resolved = (root / path).resolve()
+    if resolved != root and root not in resolved.parents:
+        raise ValueError(f"路径必须位于 {root} 之下: {path}")
+    return resolved
@@ -0,0 +1,102 @@
+"""实时预览服务
+
+按段渲染 SAS 程序并缓存：未变化的段复用缓存文本，每次结果按各段指纹登记。
+前端带上一次结果的指纹提交时，只返回变化的段或完整程序的 unified diff。
+"""
+
+import difflib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
+from sas_randomizer.core_refactored.sections import SectionCache, text_fingerprint
+
+from ..api.schemas import SASGenerationRequest
+
+FORMAT_SECTIONS = "sections"
+FORMAT_DIFF = "diff"
+
+
+def _join(sections: Dict[str, str]) -> str:
+    return "\n\n".join(sections.values())
+
+
+class PreviewService:
+    """Section cache plus a bounded history of recent results keyed by fingerprint."""
+
+    def __init__(self, max_results: int = 128, max_sections: int = 256):
+        self.cache = SectionCache(max_entries=max_sections)
+        self.max_results = max_results
+        self._results: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, fingerprint: str, sections: Dict[str, str]):
+        with self._lock:
+            self._results[fingerprint] = sections
+            self._results.move_to_end(fingerprint)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def _recall(self, fingerprint: Optional[str]) -> Optional[Dict[str, str]]:
+        if not fingerprint:
+            return None
+        with self._lock:
+            return self._results.get(fingerprint)
+
+    def preview(self, request: SASGenerationRequest, previous: Optional[str] = None,
+                fmt: str = FORMAT_SECTIONS) -> Dict[str, Any]:
+        """
+        Render ``request`` and compare it with the result ``previous`` identifies.
+
+        Returns:
+            dict: fingerprint / order / section_fingerprints，以及
+                  - full=True 时: 全部段 (sections)
+                  - sections 格式: 变化的段 (sections) 与未变化的段名 (unchanged)
+                  - diff 格式: 完整程序的 unified diff (diff)
+        """
+        generator = SASRandomizationGenerator(**request.model_dump())
+        sections = generator.generate_sections(cache=self.cache)
+        section_fingerprints = {name: text_fingerprint(text) for name, text in sections.items()}
+        fingerprint = text_fingerprint("\n".join(f"{k}:{v}" for k, v in section_fingerprints.items()))
+        before = self._recall(previous)
+        self._remember(fingerprint, sections)
+
+        result: Dict[str, Any] = {
+            "fingerprint": fingerprint,
+            "order": list(sections),
+            "section_fingerprints": section_fingerprints,
+            "full": before is None,
+        }
+        if before is None:
+            result["sections"] = dict(sections)
+        elif fmt == FORMAT_DIFF:
+            result["diff"] = "".join(difflib.unified_diff(
+                _join(before).splitlines(keepends=True), _join(sections).splitlines(keepends=True),
+                fromfile=previous, tofile=fingerprint))
+        else:
+            result["sections"] = {k: v for k, v in sections.items() if before.get(k) != v}
+            result["unchanged"] = [k for k, v in sections.items() if before.get(k) == v]
+            result["removed"] = [k for k in before if k not in sections]
+        return result
+
+
+_service: Optional[PreviewService] = None
+_service_lock = threading.Lock()
+
+
+def get_preview_service() -> PreviewService:
+    """Process-wide PreviewService (in memory only)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PreviewService()
+    return _service
+
+
+def reset_preview_service():
+    """Drop the cached service and its section cache."""
+    global _service
+    with _service_lock:
+        _service = None
@@ -0,0 +1,141 @@
+"""跨进程渲染缓存
+
+多进程服务模式下各工作进程共享的磁盘缓存：/generate 的完整 SAS 程序以生成 ETag
+（配置哈希 + 模板版本）为键存为文件，一个进程渲染过的配置其他进程直接读取。
+写入先写临时文件再原子替换，读取命中时刷新修改时间；总大小超过上限时按修改时间
+淘汰最旧的文件。缓存只是加速手段：读写出错时记录日志并按未命中处理，不影响请求。
+未设置 RANGEN_SHARED_DIR（单机模式）时不启用。
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from ..metrics import SHARED_DIR_ENV
+from sas_randomizer.utils.atomic_io import atomic_write_text, is_temp_file
+
+log = logging.getLogger("rangen.render_cache")
+
+RENDER_SUBDIR = "render"
+SUFFIX = ".sas"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Pruning stops once the cache is back under this share of the limit
+PRUNE_TARGET = 0.8
+
+
+class DiskRenderCache:
+    """Rendered programs stored as ``<dir>/<key[:2]>/<key>.sas``, shared by every worker process."""
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._bytes = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def _key(etag: str) -> str:
+        key = etag.strip().strip('"')
+        if not key or not key.isalnum():
+            raise ValueError(f"无效的缓存键: {etag}")
+        return key
+
+    def _path(self, etag: str) -> Path:
+        key = self._key(etag)
+        return self.directory / key[:2] / f"{key}{SUFFIX}"
+
+    def _entries(self):
+        for path in self.directory.glob(f"*/*{SUFFIX}"):
+            if is_temp_file(path.name):  # another worker's write in flight
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # pruned by another worker
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    def get(self, etag: str) -> Optional[str]:
+        path = self._path(etag)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError as e:
+            if not isinstance(e, FileNotFoundError):
+                log.warning("render cache read failed: %s: %s", path, e)
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, etag: str, text: str):
+        """Store a rendered program; a failed write is logged and otherwise ignored."""
+        path = self._path(etag)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        try:
+            atomic_write_text(path, text)
+        except OSError as e:
+            log.warning("render cache write failed: %s: %s", path, e)
+            return
+        with self._lock:
+            self._bytes += len(text.encode("utf-8")) - replaced
+            over = self._bytes > self.max_bytes
+        if over:
+            self.prune()
+
+    def prune(self):
+        """Delete the least recently used files until the cache is under PRUNE_TARGET of its limit."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes * PRUNE_TARGET:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.warning("render cache prune failed: %s: %s", path, e)
+                continue
+            total -= size
+        with self._lock:
+            self._bytes = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._bytes}
+
+
+_cache: Optional[DiskRenderCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> Optional[DiskRenderCache]:
+    """Shared render cache under $RANGEN_SHARED_DIR/render, or None in standalone mode."""
+    global _cache
+    shared = os.environ.get(SHARED_DIR_ENV)
+    if not shared:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskRenderCache(Path(shared) / RENDER_SUBDIR)
+    return _cache
+
+
+def reset_render_cache():
+    """Forget the process-wide cache object (files on disk are kept)."""
+    global _cache
+    with _cache_lock:
+        _cache = None
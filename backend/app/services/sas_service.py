@@ -1,13 +1,22 @@
+from functools import lru_cache
 from typing import Dict, Any
 import logging
 from ..api.schemas import SASGenerationRequest
 
-# Import the core generator
-try:
-    from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
-except ImportError as e:
-    logging.error(f"Failed to import SASRandomizationGenerator. Ensure project root is in sys.path. Error: {e}")
-    raise
+
+@lru_cache(maxsize=1)
+def generator_class():
+    """
+    The core generator, imported on first use: it pulls in Jinja2 and the
+    template environments, which should not delay server start-up.
+    """
+    try:
+        from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
+    except ImportError as e:
+        logging.error(f"Failed to import SASRandomizationGenerator. Ensure project root is in sys.path. Error: {e}")
+        raise
+    return SASRandomizationGenerator
+
 
 class SASService:
     @staticmethod
@@ -23,6 +32,7 @@ class SASService:
         
         data = request.model_dump()
         
+        SASRandomizationGenerator = generator_class()
         try:
             generator = SASRandomizationGenerator(**data)
             code = generator.generate_sas_code()
@@ -33,3 +43,15 @@ class SASService:
         except Exception as e:
             logging.error(f"Unexpected error generating SAS code: {e}", exc_info=True)
             raise RuntimeError("SAS Code Generation Failed") from e
+
+    @staticmethod
+    def study_design(request: SASGenerationRequest):
+        """
+        Validates the request the same way generation does and returns the
+        StudyDesignConfig used by the native engines.
+        """
+        from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+
+        data = request.model_dump()
+        generator_class()(**data)  # raises ValueError on invalid input
+        return convert_ui_payload_to_study_design(data)
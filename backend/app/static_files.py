@@ -0,0 +1,168 @@
+"""独立模式的前端静态文件服务
+
+启动时扫描一次 Next.js 导出目录，在内存中建立 URL 路径 -> 文件条目的索引
+（大小、修改时间、ETag、类型、预压缩副本），请求时不再逐个探测文件系统。
+构建时 build_standalone_web.py 调用 precompress_tree 为文本资源生成 .br/.gz
+副本；客户端接受时直接发送副本。_next/static 下的文件名带内容哈希，
+以 immutable 长期缓存；HTML 等其他文件每次用 ETag 重新验证。
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from .compression import accepted_encodings, brotli
+from .http_cache import CACHE_CONTROL, etag_matches
+
+PRECOMPRESS_EXTENSIONS = ('.html', '.js', '.css', '.json', '.txt', '.svg', '.map', '.xml', '.ico')
+# Precompressed siblings: suffix -> Content-Encoding
+VARIANTS = (('.br', 'br'), ('.gz', 'gzip'))
+IMMUTABLE_PREFIX = '_next/static/'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+NOT_FOUND_PAGE = '404.html'
+
+
+def precompress_tree(root: str, min_size: int = 1024,
+                     extensions: Iterable[str] = PRECOMPRESS_EXTENSIONS) -> Tuple[int, int]:
+    """
+    Write .gz (and .br when brotli is installed) siblings for text assets
+    under ``root``. Siblings that do not save space are not kept.
+
+    Returns:
+        (原始字节数, 压缩后字节数)，按每个文件的最小副本统计
+    """
+    extensions = tuple(extensions)
+    before = after = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(extensions):
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            encoded = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                encoded['.br'] = brotli.compress(data, quality=11)
+            smallest = len(data)
+            for suffix, payload in encoded.items():
+                if len(payload) < len(data):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(payload)
+                    smallest = min(smallest, len(payload))
+            before += len(data)
+            after += smallest
+    return before, after
+
+
+@dataclass
+class _Entry:
+    path: str
+    stat: os.stat_result
+    etag: str
+    media_type: str
+    cache_control: str
+    # Content-Encoding -> (sibling path, its stat)
+    variants: Dict[str, Tuple[str, os.stat_result]] = field(default_factory=dict)
+
+
+class PrecompressedStaticFiles:
+    """
+    ASGI app serving a static export from an in-memory index. URL lookup
+    tries the exact file, then ``<path>.html``, then ``<path>/index.html``;
+    unknown paths get 404.html when the export has one.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        self.index: Dict[str, _Entry] = {}
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the index (call after replacing files on disk)."""
+        index: Dict[str, _Entry] = {}
+        variant_suffixes = tuple(suffix for suffix, _ in VARIANTS)
+        for dirpath, _, filenames in os.walk(self.directory):
+            names = set(filenames)
+            for name in filenames:
+                if name.endswith(variant_suffixes) and name[:-3] in names:
+                    continue
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                rel = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                media_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                if media_type.startswith('text/') or media_type == 'application/javascript':
+                    media_type += '; charset=utf-8'
+                digest = hashlib.sha256(f"{rel}\0{stat.st_mtime_ns}\0{stat.st_size}".encode()).hexdigest()[:32]
+                entry = _Entry(
+                    path=path, stat=stat, etag=f'"{digest}"',
+                    media_type=media_type,
+                    cache_control=IMMUTABLE_CACHE_CONTROL if rel.startswith(IMMUTABLE_PREFIX) else CACHE_CONTROL,
+                )
+                for suffix, encoding in VARIANTS:
+                    if name + suffix in names:
+                        variant = path + suffix
+                        entry.variants[encoding] = (variant, os.stat(variant))
+                index[rel] = entry
+        self.index = index
+
+    def lookup(self, url_path: str) -> Optional[_Entry]:
+        rel = url_path.lstrip('/')
+        if rel == '' or rel.endswith('/'):
+            return self.index.get(rel + 'index.html')
+        return self.index.get(rel) or self.index.get(rel + '.html') or self.index.get(rel + '/index.html')
+
+    @staticmethod
+    def _encoding(entry: _Entry, headers: Headers) -> Optional[str]:
+        if not entry.variants or 'range' in headers:
+            return None
+        accepted = accepted_encodings(headers.get('accept-encoding', ''))
+        for _, encoding in VARIANTS:
+            if encoding in entry.variants and encoding in accepted:
+                return encoding
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['method'] not in ('GET', 'HEAD'):
+            await PlainTextResponse('Method Not Allowed', status_code=405)(scope, receive, send)
+            return
+        path = scope['path']
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+
+        status = 200
+        entry = self.lookup(path)
+        if entry is None:
+            entry, status = self.index.get(NOT_FOUND_PAGE), 404
+            if entry is None:
+                await PlainTextResponse('Not Found', status_code=404)(scope, receive, send)
+                return
+
+        headers = Headers(scope=scope)
+        encoding = self._encoding(entry, headers)
+        etag = entry.etag if encoding is None else f'{entry.etag[:-1]}-{encoding}"'
+        response_headers = {'Cache-Control': entry.cache_control, 'ETag': etag}
+        if entry.variants:
+            response_headers['Vary'] = 'Accept-Encoding'
+
+        if status == 200 and etag_matches(headers.get('if-none-match'), etag):
+            response = Response(status_code=304, headers=response_headers)
+        else:
+            file_path, stat = entry.path, entry.stat
+            if encoding is not None:
+                file_path, stat = entry.variants[encoding]
+                response_headers['Content-Encoding'] = encoding
+            response_headers['Last-Modified'] = formatdate(entry.stat.st_mtime, usegmt=True)
+            response = FileResponse(file_path, status_code=status, headers=response_headers,
+                                    media_type=entry.media_type, stat_result=stat)
+        await response(scope, receive, send)
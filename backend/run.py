@@ -11,20 +11,31 @@ import socket
 # In dev mode, keep console output as normal.
 
 def _get_data_dir() -> Path:
-    """Determine the data directory. Uses %LOCALAPPDATA%/RanGen on Windows."""
-    if sys.platform == "win32":
-        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
-    else:
-        base = os.path.expanduser("~")
-    data_dir = Path(base) / "RanGen"
-    data_dir.mkdir(parents=True, exist_ok=True)
-    return data_dir
+    """The data directory the services use (%LOCALAPPDATA%/RanGen on Windows; RANGEN_DATA_DIR overrides)."""
+    _ensure_import_paths()
+    from app.services.paths import get_data_dir
+    return get_data_dir()
+
+
+def _ensure_import_paths():
+    """Make ``app`` and ``sas_randomizer`` importable (dev mode runs from backend/)."""
+    if getattr(sys, "frozen", False):
+        return
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in (os.path.dirname(current_dir), current_dir):
+        if path not in sys.path:
+            sys.path.insert(0, path)
 
 
 def _setup_logging():
-    """Configure logging: file in frozen mode, console in dev mode."""
-    logger = logging.getLogger("rangen")
-    logger.setLevel(logging.INFO)
+    """
+    Configure logging: JSON lines to a rotating file in frozen mode, console in dev mode.
+    Records go through a bounded queue and are written by a background thread, so
+    request handlers never wait on the disk. RANGEN_LOG_SAMPLE (0-1) thins out the
+    high-volume access/generation records; warnings and errors are always kept.
+    """
+    _ensure_import_paths()
+    from sas_randomizer.utils.logger import JsonFormatter, start_queue_logging
 
     if getattr(sys, "frozen", False):
         # Standalone: log to file with rotation (max 1 MB, keep 3 backups)
@@ -32,40 +43,53 @@ def _setup_logging():
         handler = RotatingFileHandler(
             str(log_file), maxBytes=1_000_000, backupCount=3, encoding="utf-8"
         )
-        handler.setFormatter(logging.Formatter(
-            "%(asctime)s [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-        ))
-        logger.addHandler(handler)
-        # Also redirect stdout/stderr — previously NullWriter dropped them entirely
-        sys.stdout = _LogWriter(logger, logging.INFO)
-        sys.stderr = _LogWriter(logger, logging.ERROR)
+        handler.setFormatter(JsonFormatter())
     else:
         # Dev mode: console only
         handler = logging.StreamHandler(sys.__stdout__ or sys.stdout)
         handler.setFormatter(logging.Formatter(
             "%(asctime)s [%(levelname)s] %(message)s", datefmt="%H:%M:%S"
         ))
-        logger.addHandler(handler)
+
+    try:
+        sample_rate = float(os.environ.get("RANGEN_LOG_SAMPLE", "1"))
+    except ValueError:
+        sample_rate = 1.0
+    start_queue_logging([handler], loggers=("rangen", "sas_randomizer"), sample_rate=sample_rate)
+    logger = logging.getLogger("rangen")
+
+    if getattr(sys, "frozen", False):
+        # Also redirect stdout/stderr — previously NullWriter dropped them entirely
+        sys.stdout = _LogWriter(logger, logging.INFO)
+        sys.stderr = _LogWriter(logger, logging.ERROR)
 
     return logger
 
 
 class _LogWriter:
-    """File-like object that redirects writes to a logger."""
+    """File-like object that redirects writes to a logger, one record per complete line."""
     def __init__(self, logger: logging.Logger, level: int):
         self._logger = logger
         self._level = level
         self._buffer = ""
 
     def write(self, text: str):
-        if text and text.strip():
-            for line in text.splitlines():
+        if not text:
+            return 0
+        self._buffer += text
+        if "\n" in self._buffer:
+            *lines, self._buffer = self._buffer.split("\n")
+            for line in lines:
                 line = line.strip()
                 if line:
                     self._logger.log(self._level, line)
+        return len(text)
 
     def flush(self):
-        pass
+        line = self._buffer.strip()
+        self._buffer = ""
+        if line:
+            self._logger.log(self._level, line)
 
     def isatty(self):
         return False
@@ -107,11 +131,11 @@ def _remove_pid_file():
         pass
 
 
-def _detect_instance() -> bool:
+def _detect_instance(host: str = HOST, port: int = PORT) -> bool:
     """Check if another RanGen instance may already be running.
     Returns True if an existing instance is detected."""
-    if not _check_port_available(HOST, PORT):
-        log.warning("Port %s:%d is already in use — possible existing instance.", HOST, PORT)
+    if not _check_port_available(host, port):
+        log.warning("Port %s:%d is already in use — possible existing instance.", host, port)
         return True
 
     if PID_FILE.exists():
@@ -144,21 +168,34 @@ if __name__ == "__main__":
             sys.path.insert(0, base_path)
         log.info("Running in frozen mode. Base path: %s", base_path)
     else:
-        project_root = os.path.dirname(current_dir)
-        if project_root not in sys.path:
-            sys.path.insert(0, project_root)
-        if current_dir not in sys.path:
-            sys.path.insert(0, current_dir)
-        log.info("Running in development mode. Project root: %s", project_root)
+        log.info("Running in development mode. Project root: %s", os.path.dirname(current_dir))
+
+    from app.server import parse_server_config, prepare_shared_dirs
+    config = parse_server_config(sys.argv[1:], _get_data_dir())
 
     # Instance detection: warn if port is already taken
-    _detect_instance()
+    _detect_instance(config.host, config.port)
 
     log.info("Starting RanGen Backend Server...")
     _write_pid_file()
 
     try:
-        from app.main import app as application
-        uvicorn.run(application, host=HOST, port=PORT, reload=False, workers=1)
+        if config.server_mode:
+            # Server mode: worker processes import the app themselves, warm up on start and
+            # share the render cache, compiled templates and counters under shared_dir
+            prepare_shared_dirs(config)
+            # Each worker schedules its share of the cores
+            os.environ.setdefault("RANGEN_SCHED_SLOTS", str(max(1, (os.cpu_count() or 1) // config.workers)))
+            log.info("Server mode: %d workers on %s:%d, shared cache %s",
+                     config.workers, config.host, config.port, config.shared_dir)
+            uvicorn.run("app.server:application", host=config.host, port=config.port, reload=False,
+                        workers=config.workers, access_log=False)
+        else:
+            # Bind and answer /api/health right away; app.main is imported and warmed in the background
+            from app.bootstrap import LazyApp
+            application = LazyApp("app.main:app").start()
+            # Access records come from RequestLogMiddleware (structured, sampled, queued)
+            uvicorn.run(application, host=config.host, port=config.port, reload=False, workers=1,
+                        access_log=False)
     finally:
         _remove_pid_file()
@@ -0,0 +1,289 @@
+"""Speed benchmarks for the SAS generation core.
+
+Times, on a synthetic matrix of study designs:
+
+* transform        - convert_ui_payload_to_study_design
+* generate         - SASRandomizationGenerator(...).generate_sas_code()
+* render:<section> - each top-level template rendered on its own
+
+Each case varies one axis from a small base study (arms 2-10, strata 1-2000,
+protocols 1-30, drug batches 1-500, fixed vs variable blocks), plus one case
+with every axis at its maximum. For every (case, target) the median wall time,
+the tracemalloc peak (measured in a separate run so it does not skew timing)
+and the output size are recorded.
+
+Results are compared with a JSON baseline; a target whose time or peak memory
+grew beyond the tolerance is reported and the script exits 1.
+
+    python benchmarks/generation.py                      # compare with the stored baseline
+    python benchmarks/generation.py --case strata --quick
+    python benchmarks/generation.py --update             # record a new baseline
+
+Baselines are machine specific: record one on the machine that compares against it.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator  # noqa: E402
+from sas_randomizer.core_refactored.sections import SECTIONS  # noqa: E402
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design  # noqa: E402
+from sas_randomizer.core_refactored.utils.template_renderer import TemplateRenderer  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "generation.json")
+NOW = "2024-01-01 00:00:00"
+
+BASE_CASE = {"arms": 2, "strata": 1, "protocols": 1, "batches": 1, "variable": False}
+AXES = {
+    "arms": (2, 4, 10),
+    "strata": (1, 50, 500, 2000),
+    "protocols": (1, 5, 30),
+    "batches": (1, 50, 500),
+    "variable": (False, True),
+}
+MAX_CASE = {axis: values[-1] for axis, values in AXES.items()}
+
+
+def case_name(params: Dict[str, Any]) -> str:
+    blocks = "var" if params["variable"] else "fixed"
+    return (f"arms={params['arms']} strata={params['strata']} protocols={params['protocols']} "
+            f"batches={params['batches']} blocks={blocks}")
+
+
+def matrix() -> List[Dict[str, Any]]:
+    """The base case, one sweep per axis, and the all-maximum case (duplicates removed)."""
+    cases = [dict(BASE_CASE)]
+    for axis, values in AXES.items():
+        cases.extend(dict(BASE_CASE, **{axis: value}) for value in values)
+    cases.append(dict(MAX_CASE))
+    unique: Dict[str, Dict[str, Any]] = {}
+    for params in cases:
+        unique.setdefault(case_name(params), params)
+    return list(unique.values())
+
+
+def _strata_levels(strata: int) -> Dict[str, List[str]]:
+    """One factor up to 50 strata, otherwise two factors whose level product is >= ``strata``."""
+    if strata <= 50:
+        return {"SITE": [f"S{i:02d}" for i in range(1, strata + 1)]}
+    first = math.ceil(math.sqrt(strata))
+    second = math.ceil(strata / first)
+    return {"SITE": [f"S{i:03d}" for i in range(1, first + 1)],
+            "AGE": [f"A{i:03d}" for i in range(1, second + 1)]}
+
+
+def _drug_config(arms: int, batches: int, tag: str = "") -> Dict[str, Any]:
+    levels = ["CN", "EU"]
+    return {
+        "enabled": True,
+        "drug_arms": [{"code": f"D{i}{tag}", "name": f"Drug {i}{tag}", "ratio": 1, "drug_spec": "10mg"}
+                      for i in range(1, arms + 1)],
+        "drug_stratification_factors": ["批次"],
+        "drug_strata_levels": {"批次": levels},
+        "drug_batch_configs": {
+            "supply_factor": "批次",
+            "configs": {level: [{"batch_no": f"{level}{n:03d}", "quantity": 100} for n in range(1, batches + 1)]
+                        for level in levels},
+        },
+        "drug_block_size": arms * 2,
+        "drug_block_layers": 600,
+        "drug_number_prefix": "D",
+        "drug_number_length": 5,
+    }
+
+
+def synthetic_payload(arms: int = 2, strata: int = 1, protocols: int = 1,
+                      batches: int = 1, variable: bool = False) -> Dict[str, Any]:
+    """Generator keyword arguments for a synthetic study with the given dimensions."""
+    levels = _strata_levels(strata) if strata > 1 else {}
+    multi = protocols > 1
+    return {
+        "study_id": "BENCH",
+        "protocol_title": "Benchmark study",
+        "client": "Bench Client",
+        "company": "Bench Company",
+        "treatment_arms": [{"armcd": f"A{i}", "arm": f"Arm {i}", "ratio": 1} for i in range(1, arms + 1)],
+        "stratification_factors": list(levels),
+        "strata_levels": levels,
+        "blocks_per_stratum": 10,
+        "block_size": arms * 2,
+        # Six-digit subject numbers: the largest case has 90000 subjects per protocol
+        "start_subject_number": 100001,
+        "subject_number_length": 6,
+        "macro_type": "可变" if variable else "标准",
+        "variable_block_enabled": variable,
+        "variable_block_sizes": [arms, arms * 2, arms * 3] if variable else [],
+        "total_sample_size": 100 * arms,
+        "subject_seed": 12345,
+        "drug_seed": 67890,
+        "drug_randomization_config": _drug_config(arms, batches),
+        "multi_protocol": multi,
+        "protocols": [{"id": f"P{i}", "name": f"Cohort {i}",
+                       "drug_randomization_config": _drug_config(arms, batches, tag=f"_{i}")}
+                      for i in range(1, protocols + 1)] if multi else [],
+    }
+
+
+def targets(payload: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    """Named zero-argument callables to measure for one payload; each returns the output."""
+    study = convert_ui_payload_to_study_design(payload)
+    renderer = TemplateRenderer()
+    measured: Dict[str, Callable[[], Any]] = {
+        "transform": lambda: convert_ui_payload_to_study_design(payload),
+        "generate": lambda: SASRandomizationGenerator(**payload).generate_sas_code(),
+    }
+    for section in SECTIONS:
+        context = {"study": study, "now": NOW}
+        measured[f"render:{section}"] = (
+            lambda template=f"{section}.sas.j2", context=context: renderer.render(template, context))
+    return measured
+
+
+def output_bytes(output: Any) -> int:
+    if isinstance(output, str):
+        return len(output.encode("utf-8"))
+    return len(output.model_dump_json().encode("utf-8"))
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_seconds: float) -> Dict[str, float]:
+    """Median of at least ``repeat`` timed calls (more while under ``min_seconds``), then one traced call."""
+    output = fn()  # warm-up: template compilation, imports
+    timings: List[float] = []
+    started = time.perf_counter()
+    while len(timings) < repeat or (time.perf_counter() - started < min_seconds and len(timings) < 1000):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": statistics.median(timings), "runs": len(timings),
+            "peak_kib": round(peak / 1024, 1), "output_bytes": output_bytes(output)}
+
+
+def run(cases: Iterable[Dict[str, Any]], repeat: int = 5, min_seconds: float = 0.2,
+        progress: Optional[Callable[[str], None]] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for params in cases:
+        name = case_name(params)
+        results[name] = {}
+        for target, fn in targets(synthetic_payload(**params)).items():
+            results[name][target] = measure(fn, repeat, min_seconds)
+        if progress:
+            progress(name)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Dict[str, float]]], baseline: Dict[str, Dict[str, Dict[str, float]]],
+            tolerance: float, min_delta_ms: float = 0.5) -> Tuple[List[str], List[str]]:
+    """
+    Compare ``results`` with ``baseline``.
+
+    Returns:
+        (regressions, notes): time/peak-memory growth beyond ``tolerance`` (time deltas under
+        ``min_delta_ms`` are treated as noise), and informational notes such as output size changes.
+    """
+    regressions: List[str] = []
+    notes: List[str] = []
+    for case, measured in results.items():
+        for target, now in measured.items():
+            before = baseline.get(case, {}).get(target)
+            if before is None:
+                notes.append(f"{case} {target}: no baseline")
+                continue
+            delta_ms = (now["seconds"] - before["seconds"]) * 1000
+            if now["seconds"] > before["seconds"] * (1 + tolerance) and delta_ms > min_delta_ms:
+                regressions.append(f"{case} {target}: time {before['seconds'] * 1000:.2f} -> "
+                                   f"{now['seconds'] * 1000:.2f} ms (+{now['seconds'] / before['seconds'] - 1:.0%})")
+            if now["peak_kib"] > before["peak_kib"] * (1 + tolerance) and now["peak_kib"] - before["peak_kib"] > 64:
+                regressions.append(f"{case} {target}: peak memory {before['peak_kib']:.0f} -> "
+                                   f"{now['peak_kib']:.0f} KiB")
+            if now["output_bytes"] != before["output_bytes"]:
+                notes.append(f"{case} {target}: output {before['output_bytes']} -> {now['output_bytes']} bytes")
+    return regressions, notes
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, Dict[str, float]]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, Dict[str, float]]]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    document = {"python": platform.python_version(), "machine": platform.machine(),
+                "processor": platform.processor() or platform.machine(), "results": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def print_table(results: Dict[str, Dict[str, Dict[str, float]]]):
+    print(f"{'case':<58} {'target':<32} {'median':>10} {'peak':>10} {'output':>10}")
+    for case, measured in results.items():
+        for target, m in measured.items():
+            print(f"{case:<58} {target:<32} {m['seconds'] * 1000:>8.2f}ms {m['peak_kib']:>7.0f}KiB "
+                  f"{m['output_bytes'] / 1024:>7.1f}KiB")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--case", action="append", default=[],
+                        help="only run cases whose name contains this text (repeatable), e.g. 'strata=2000'")
+    parser.add_argument("--quick", action="store_true", help="fewer timed runs (noisier)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed growth before a regression (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON path")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--json", dest="json_out", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in matrix() if not args.case or any(text in case_name(c) for text in args.case)]
+    if not cases:
+        print("no case matches", file=sys.stderr)
+        return 2
+    repeat, min_seconds = (3, 0.05) if args.quick else (7, 0.3)
+    results = run(cases, repeat, min_seconds, progress=lambda name: print(f"  done: {name}", file=sys.stderr))
+    print_table(results)
+    if args.json_out:
+        save_baseline(args.json_out, results)
+
+    if args.update:
+        merged = dict(load_baseline(args.baseline), **results)
+        save_baseline(args.baseline, merged)
+        print(f"\nbaseline written: {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"\nno baseline at {args.baseline}; run with --update to record one")
+        return 0
+    regressions, notes = compare(results, baseline, args.tolerance)
+    for note in notes:
+        print(f"note: {note}")
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if not regressions:
+        print(f"\nno regressions beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Start-up budget check for the backend.
+
+Measures, each in a fresh interpreter:
+
+* bootstrap  - importing what run.py needs before the port is bound
+               (uvicorn + app.bootstrap); this is what users wait for
+* health     - wall time from process spawn to the first /api/health 200
+* app        - importing the full FastAPI application (app.main), which
+               happens in the background; reported, not budgeted by default
+
+and prints the heaviest modules by cumulative import time (python -X importtime).
+Exits 1 when a budget is exceeded.
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --bootstrap-ms 300 --health-ms 1500 --top 25
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, "backend")
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([BACKEND, ROOT, env.get("PYTHONPATH", "")])
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def import_profile(statement: str) -> List[Tuple[str, int, int, int]]:
+    """Run ``statement`` under -X importtime; returns (module, self_us, cumulative_us, depth)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                          cwd=BACKEND, env=_env(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return rows
+
+
+def total_ms(rows) -> float:
+    return sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+
+
+def best_of(statement: str, runs: int):
+    """Fastest of ``runs`` cold imports (less noise from the OS page cache)."""
+    profiles = [import_profile(statement) for _ in range(runs)]
+    return min(profiles, key=total_ms)
+
+
+def time_to_health(timeout: float = 30.0) -> float:
+    """Seconds from spawning a LazyApp server to its first /api/health response."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    code = ("import uvicorn; from app.bootstrap import LazyApp; "
+            f"uvicorn.run(LazyApp('app.main:app').start(), host='127.0.0.1', port={port}, log_level='warning')")
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=BACKEND, env=_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise SystemExit("server did not answer /api/health")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def report(title: str, rows, top: int):
+    print(f"\n{title}: {total_ms(rows):.0f} ms")
+    print(f"  {'cumulative':>10}  {'self':>8}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f"  {cumulative_us / 1000:>8.1f}ms  {self_us / 1000:>6.1f}ms  {'  ' * depth}{name}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bootstrap-ms", type=float, default=400.0, help="budget for the pre-bind imports")
+    parser.add_argument("--health-ms", type=float, default=1000.0, help="budget for spawn -> first /api/health")
+    parser.add_argument("--app-ms", type=float, default=None, help="optional budget for importing app.main")
+    parser.add_argument("--runs", type=int, default=3, help="cold runs per measurement (best is kept)")
+    parser.add_argument("--top", type=int, default=20, help="modules to list per report")
+    args = parser.parse_args(argv)
+
+    bootstrap = best_of("import uvicorn, app.bootstrap", args.runs)
+    application = best_of("import app.main", args.runs)
+    report("bootstrap (before the port is bound)", bootstrap, args.top)
+    report("app.main (background import)", application, args.top)
+    health = min(time_to_health() for _ in range(args.runs)) * 1000
+    print(f"\nspawn -> first /api/health: {health:.0f} ms")
+
+    failures = []
+    if total_ms(bootstrap) > args.bootstrap_ms:
+        failures.append(f"bootstrap imports {total_ms(bootstrap):.0f} ms > {args.bootstrap_ms:.0f} ms")
+    if health > args.health_ms:
+        failures.append(f"time to health {health:.0f} ms > {args.health_ms:.0f} ms")
+    if args.app_ms is not None and total_ms(application) > args.app_ms:
+        failures.append(f"app.main import {total_ms(application):.0f} ms > {args.app_ms:.0f} ms")
+    for failure in failures:
+        print(f"BUDGET EXCEEDED: {failure}")
+    if not failures:
+        print("within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+"""HTTP load test for the RanGen API.
+
+Replays a weighted corpus of SASGenerationRequest payloads, from the shipped
+defaults (sas_randomizer.config) up to 30-protocol studies with hundreds of
+drug batches, against
+
+* the application in-process (httpx.ASGITransport, default),
+* a uvicorn server this script starts (--spawn; with --workers N > 1 the
+  multi-worker server mode, sharing a render cache and counters under a
+  temporary RANGEN_SHARED_DIR, as backend/run.py --workers starts it), or
+* an already running server (--url, optionally --server-pid for memory).
+
+Two load models:
+
+* closed loop (default): --concurrency clients, each sending its next request
+  as soon as the previous one completes;
+* open loop (--rate): Poisson arrivals at the given requests/second, at most
+  --concurrency in flight. Latency is measured from the scheduled arrival, so
+  time spent waiting for a free slot counts (no coordinated omission).
+
+Reports throughput, p50/p95/p99 latency, error rate (non-2xx or transport
+errors), a per-payload breakdown and server RSS growth (Linux /proc; summed over
+the server process and its children, i.e. every worker of a multi-worker server).
+
+    python benchmarks/load_test.py --duration 20 --concurrency 16
+    python benchmarks/load_test.py --spawn --rate 50 --duration 30 --json load.json
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --server-pid 1234 --endpoint preview
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, "backend")
+for _path in (ROOT, BACKEND):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from benchmarks.generation import synthetic_payload  # noqa: E402
+from sas_randomizer.config import (  # noqa: E402
+    DEFAULT_PROJECT_SETTINGS,
+    DEFAULT_RANDOMIZATION_SETTINGS,
+    DEFAULT_SUBJECT_SETTINGS,
+)
+
+ENDPOINTS = {"generate": "/api/v1/generate", "preview": "/api/v1/generate/preview"}
+
+
+def default_payload() -> Dict[str, Any]:
+    """The request the UI sends for a new study (shipped defaults)."""
+    return copy.deepcopy({**DEFAULT_PROJECT_SETTINGS, **DEFAULT_RANDOMIZATION_SETTINGS, **DEFAULT_SUBJECT_SETTINGS})
+
+
+def builtin_corpus() -> List[Tuple[str, float, Dict[str, Any]]]:
+    """(name, weight, payload): mostly small studies, a long tail of huge ones."""
+    return [
+        ("defaults", 40, default_payload()),
+        ("stratified", 30, synthetic_payload(arms=3, strata=24, batches=5)),
+        ("variable_blocks", 15, synthetic_payload(arms=4, strata=8, batches=10, variable=True)),
+        ("multi_protocol", 10, synthetic_payload(arms=4, strata=100, protocols=8, batches=40)),
+        ("huge", 5, synthetic_payload(arms=10, strata=2000, protocols=30, batches=300, variable=True)),
+    ]
+
+
+def load_corpus(path: str) -> List[Tuple[str, float, Dict[str, Any]]]:
+    """A JSON file (one payload or a list) or a directory of *.json payloads, equal weights."""
+    files = ([os.path.join(path, n) for n in sorted(os.listdir(path)) if n.endswith(".json")]
+             if os.path.isdir(path) else [path])
+    corpus = []
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            data = json.load(f)
+        items = data if isinstance(data, list) else [data]
+        base = os.path.splitext(os.path.basename(file))[0]
+        corpus.extend((f"{base}[{i}]" if len(items) > 1 else base, 1.0, item) for i, item in enumerate(items))
+    if not corpus:
+        raise ValueError(f"no payloads in {path}")
+    return corpus
+
+
+def _process_tree(pid: int) -> List[int]:
+    """``pid`` and all its descendants (/proc/<pid>/task/<tid>/children)."""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            tasks = os.listdir(f"/proc/{current}/task")
+        except OSError:
+            continue
+        for tid in tasks:
+            try:
+                with open(f"/proc/{current}/task/{tid}/children", encoding="ascii") as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+    return pids
+
+
+def _vm_rss(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def rss_bytes(pid: Optional[int]) -> Optional[int]:
+    """
+    Resident set size of ``pid`` plus its child processes, from /proc (None
+    where unavailable). A uvicorn supervisor serves nothing itself: its
+    worker processes are the children.
+    """
+    if pid is None:
+        return None
+    sizes = [size for size in map(_vm_rss, _process_tree(pid)) if size is not None]
+    return sum(sizes) if sizes else None
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-q * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class Sample:
+    name: str
+    seconds: float
+    status: int  # 0: transport error
+
+
+@dataclass
+class LoadResult:
+    samples: List[Sample] = field(default_factory=list)
+    wall_seconds: float = 0.0
+    rss_before: Optional[int] = None
+    rss_after: Optional[int] = None
+
+    def summary(self) -> Dict[str, Any]:
+        def stats(samples: List[Sample]) -> Dict[str, Any]:
+            latencies = sorted(s.seconds for s in samples)
+            errors = sum(1 for s in samples if not 200 <= s.status < 400)
+            return {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": errors / len(samples) if samples else 0.0,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+                "mean_ms": (statistics.fmean(latencies) if latencies else 0.0) * 1000,
+            }
+
+        summary = stats(self.samples)
+        summary["throughput_rps"] = len(self.samples) / self.wall_seconds if self.wall_seconds else 0.0
+        summary["wall_seconds"] = self.wall_seconds
+        summary["rss_before_mib"] = self.rss_before / 2**20 if self.rss_before else None
+        summary["rss_after_mib"] = self.rss_after / 2**20 if self.rss_after else None
+        summary["rss_growth_mib"] = ((self.rss_after - self.rss_before) / 2**20
+                                     if self.rss_before and self.rss_after else None)
+        names = sorted({s.name for s in self.samples})
+        summary["by_payload"] = {n: stats([s for s in self.samples if s.name == n]) for n in names}
+        status_counts: Dict[str, int] = {}
+        for s in self.samples:
+            status_counts[str(s.status)] = status_counts.get(str(s.status), 0) + 1
+        summary["status_counts"] = status_counts
+        return summary
+
+
+class LoadTest:
+    """Drive one endpoint with a weighted payload corpus."""
+
+    def __init__(self, client: httpx.AsyncClient, corpus: List[Tuple[str, float, Dict[str, Any]]],
+                 endpoint: str = "generate", seed: int = 0, server_pid: Optional[int] = None):
+        self.client = client
+        self.corpus = corpus
+        self.path = ENDPOINTS[endpoint]
+        self.endpoint = endpoint
+        self.random = random.Random(seed)
+        self.server_pid = server_pid
+        self._counter = 0
+
+    def _next_request(self) -> Tuple[str, Dict[str, Any]]:
+        name, _, payload = self.random.choices(self.corpus, weights=[w for _, w, _ in self.corpus])[0]
+        self._counter += 1
+        # Distinct seeds per request: every request is real work, not a cache hit.
+        body = dict(payload, subject_seed=str(1000 + self._counter), drug_seed=str(5000 + self._counter))
+        return name, ({"request": body} if self.endpoint == "preview" else body)
+
+    async def _send(self, name: str, body: Dict[str, Any], started: float) -> Sample:
+        try:
+            response = await self.client.post(self.path, json=body)
+            await response.aread()
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        return Sample(name, time.perf_counter() - started, status)
+
+    async def warmup(self, requests: int):
+        for _ in range(requests):
+            name, body = self._next_request()
+            await self._send(name, body, time.perf_counter())
+
+    async def closed_loop(self, concurrency: int, duration: float, max_requests: Optional[int]) -> LoadResult:
+        result = LoadResult(rss_before=rss_bytes(self.server_pid))
+        deadline = time.perf_counter() + duration
+
+        async def client_loop():
+            while time.perf_counter() < deadline and (max_requests is None or self._issued < max_requests):
+                self._issued += 1
+                name, body = self._next_request()
+                result.samples.append(await self._send(name, body, time.perf_counter()))
+
+        self._issued = 0
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        result.wall_seconds = time.perf_counter() - started
+        result.rss_after = rss_bytes(self.server_pid)
+        return result
+
+    async def open_loop(self, rate: float, concurrency: int, duration: float,
+                        max_requests: Optional[int]) -> LoadResult:
+        result = LoadResult(rss_before=rss_bytes(self.server_pid))
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(name: str, body: Dict[str, Any], scheduled: float):
+            async with slots:
+                result.samples.append(await self._send(name, body, scheduled))
+
+        tasks = []
+        started = time.perf_counter()
+        arrival = started
+        while arrival - started < duration and (max_requests is None or len(tasks) < max_requests):
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name, body = self._next_request()
+            tasks.append(asyncio.create_task(one(name, body, arrival)))
+            arrival += self.random.expovariate(rate)
+        await asyncio.gather(*tasks)
+        result.wall_seconds = time.perf_counter() - started
+        result.rss_after = rss_bytes(self.server_pid)
+        return result
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(workers: int = 1, shared_dir: Optional[str] = None,
+                 timeout: float = 60.0) -> Tuple[subprocess.Popen, str]:
+    """
+    Start uvicorn from backend/ on a free port; returns (process, base url).
+    One worker serves ``app.main:app``; more run the server mode
+    (``app.server:application``) with ``shared_dir`` as RANGEN_SHARED_DIR.
+    """
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([BACKEND, ROOT, os.environ.get("PYTHONPATH", "")]))
+    target = "app.main:app"
+    if workers > 1:
+        from app.server import ServerConfig, prepare_shared_dirs
+
+        if shared_dir is None:
+            raise ValueError("server mode needs a shared directory")
+        prepare_shared_dirs(ServerConfig(workers=workers, shared_dir=Path(shared_dir)), env)
+        # Each worker schedules its share of the cores, as backend/run.py sets it
+        env.setdefault("RANGEN_SCHED_SLOTS", str(max(1, (os.cpu_count() or 1) // workers)))
+        target = "app.server:application"
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1",
+                             "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+                            cwd=BACKEND, env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"{url}/api/health", timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("server did not become healthy")
+
+
+async def run_load(args, corpus) -> Dict[str, Any]:
+    proc = None
+    shared_dir = None
+    server_pid = args.server_pid
+    if args.spawn:
+        if args.workers > 1:
+            shared_dir = tempfile.mkdtemp(prefix="rangen-load-")
+        proc, url = spawn_server(args.workers, shared_dir)
+        # The supervisor's RSS plus its workers' (rss_bytes follows child processes)
+        server_pid = proc.pid
+    else:
+        url = args.url
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        if url:
+            client = httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits)
+        else:
+            from app.main import app
+            server_pid = os.getpid()
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://rangen",
+                                       timeout=args.timeout)
+        async with client:
+            test = LoadTest(client, corpus, endpoint=args.endpoint, seed=args.seed, server_pid=server_pid)
+            await test.warmup(args.warmup)
+            if args.rate:
+                result = await test.open_loop(args.rate, args.concurrency, args.duration, args.requests)
+            else:
+                result = await test.closed_loop(args.concurrency, args.duration, args.requests)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        if shared_dir is not None:
+            shutil.rmtree(shared_dir, ignore_errors=True)
+    summary = result.summary()
+    summary["target"] = url or "in-process"
+    summary["endpoint"] = args.endpoint
+    summary["model"] = f"open loop {args.rate}/s" if args.rate else "closed loop"
+    summary["concurrency"] = args.concurrency
+    return summary
+
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"{summary['target']} {summary['endpoint']} - {summary['model']}, concurrency {summary['concurrency']}")
+    print(f"  requests {summary['requests']} in {summary['wall_seconds']:.1f}s = "
+          f"{summary['throughput_rps']:.1f} req/s, errors {summary['errors']} ({summary['error_rate']:.2%})")
+    print(f"  latency p50 {summary['p50_ms']:.1f} ms  p95 {summary['p95_ms']:.1f} ms  "
+          f"p99 {summary['p99_ms']:.1f} ms  max {summary['max_ms']:.1f} ms")
+    if summary["rss_growth_mib"] is not None:
+        print(f"  server RSS {summary['rss_before_mib']:.1f} -> {summary['rss_after_mib']:.1f} MiB "
+              f"({summary['rss_growth_mib']:+.1f} MiB)")
+    print(f"  {'payload':<18} {'requests':>8} {'errors':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, s in summary["by_payload"].items():
+        print(f"  {name:<18} {s['requests']:>8} {s['errors']:>7} {s['p50_ms']:>7.1f}ms "
+              f"{s['p95_ms']:>7.1f}ms {s['p99_ms']:>7.1f}ms")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="base URL of a running server (default: in-process)")
+    target.add_argument("--spawn", action="store_true", help="start a local uvicorn server for the run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn (more than one: server mode with a shared cache)")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for RSS sampling")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="generate")
+    parser.add_argument("--corpus", help="JSON payload file or directory (default: built-in corpus)")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients (closed loop) or max in flight (open loop)")
+    parser.add_argument("--rate", type=float, help="open loop: mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before the run")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout (seconds)")
+    parser.add_argument("--seed", type=int, default=0, help="payload selection / arrival seed")
+    parser.add_argument("--json", dest="json_out", help="write the summary to this file")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus) if args.corpus else builtin_corpus()
+    summary = asyncio.run(run_load(args, corpus))
+    print_summary(summary)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=1)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
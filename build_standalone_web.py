@@ -149,6 +149,11 @@ def main():
                 shutil.rmtree(dest_web_root)
             shutil.copytree(frontend_out_dir, dest_web_root)
             print("Assets copied successfully.")
+            # Precompressed .br/.gz siblings, served directly by the backend
+            sys.path.insert(0, os.path.join(root_dir, "backend"))
+            from app.static_files import precompress_tree
+            raw, packed = precompress_tree(dest_web_root)
+            print(f"Precompressed web assets: {raw / 1024:.0f} KB -> {packed / 1024:.0f} KB")
         except Exception as e:
             print(f"Failed to copy assets: {e}")
             sys.exit(1)
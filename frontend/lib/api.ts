@@ -1,5 +1,6 @@
 "use client";
 
+import { useRef } from "react";
 import axios, { AxiosError } from "axios";
 import { useMutation, useQuery } from "@tanstack/react-query";
 import { TASASGenerationSchema } from "./schemas";
@@ -24,13 +25,22 @@ api.interceptors.response.use(
 );
 
 export const useGenerateSAS = () => {
+    // Last result and its ETag: an unchanged config is answered with 304 and no body
+    const last = useRef<{ etag: string; code: string } | null>(null);
     return useMutation({
         mutationFn: async (data: TASASGenerationSchema) => {
             const response = await api.post("/generate", data, {
                 headers: {
                     "Content-Type": "application/json",
+                    ...(last.current ? { "If-None-Match": last.current.etag } : {}),
                 },
+                validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
             });
+            if (response.status === 304 && last.current) {
+                return last.current.code;
+            }
+            const etag = response.headers["etag"];
+            last.current = etag ? { etag, code: response.data } : null;
             return response.data;
         },
         onError: (error: Error) => {
@@ -43,6 +53,29 @@ export const useGenerateSAS = () => {
     });
 };
 
+// Live preview: sends the last fingerprint so the backend only returns changed sections
+export const usePreviewSAS = () => {
+    const last = useRef<{ fingerprint: string; sections: Record<string, string> } | null>(null);
+    return useMutation({
+        mutationFn: async (data: TASASGenerationSchema) => {
+            const response = await api.post("/generate/preview", {
+                request: data,
+                previous: last.current?.fingerprint,
+            });
+            const body = response.data as {
+                fingerprint: string;
+                order: string[];
+                full: boolean;
+                sections: Record<string, string>;
+            };
+            const known = body.full ? body.sections : { ...last.current?.sections, ...body.sections };
+            const sections = Object.fromEntries(body.order.map((name) => [name, known[name]]));
+            last.current = { fingerprint: body.fingerprint, sections };
+            return body.order.map((name) => sections[name]).join("\n\n");
+        },
+    });
+};
+
 export const useDefaultConfig = () => {
     return useQuery({
         queryKey: ["defaults"],
@@ -84,3 +117,77 @@ export const useAppVersion = () => {
         },
     });
 };
+
+export type Job = {
+    job_id: string;
+    kind: string;
+    status: "queued" | "running" | "succeeded" | "failed" | "cancelled";
+    done: number;
+    total: number | null;
+    percent: number | null;
+    message: string | null;
+    error: string | null;
+    result?: unknown;
+};
+
+// Long operations run as background jobs: follow progress over server-sent events
+// instead of holding a request open past the axios timeout
+export const followJob = (jobId: string, onProgress?: (job: Job) => void): Promise<Job> =>
+    new Promise((resolve, reject) => {
+        const source = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+        source.addEventListener("progress", (event) => onProgress?.(JSON.parse((event as MessageEvent).data)));
+        source.addEventListener("end", (event) => {
+            source.close();
+            const job: Job = JSON.parse((event as MessageEvent).data);
+            if (job.status === "succeeded") {
+                resolve(job);
+            } else {
+                reject(new Error(job.error || job.message || `Job ${job.status}`));
+            }
+        });
+        source.onerror = () => {
+            source.close();
+            reject(new Error("Lost connection to job progress stream"));
+        };
+    });
+
+export const cancelJob = async (jobId: string): Promise<Job> => {
+    const response = await api.post(`/jobs/${jobId}/cancel`);
+    return response.data;
+};
+
+export type SavedConfig = {
+    config_id: string;
+    study_id: string;
+    name: string | null;
+    client: string | null;
+    status: string | null;
+    head_version: number;
+    head_hash: string;
+    created_at: string;
+    updated_at: string;
+};
+
+export type ConfigSearch = { study_id?: string; client?: string; status?: string; q?: string; limit?: number; offset?: number };
+
+// Server-side config store: saving the current config creates a config, or a new version of configId
+export const saveConfig = async (
+    request: TASASGenerationSchema,
+    options: { configId?: string; name?: string; message?: string } = {},
+): Promise<SavedConfig> => {
+    const body = { request, name: options.name, message: options.message };
+    const response = options.configId
+        ? await api.put(`/configs/${options.configId}`, body)
+        : await api.post("/configs", body);
+    return response.data;
+};
+
+export const useSavedConfigs = (search: ConfigSearch = {}) => {
+    return useQuery({
+        queryKey: ["configs", search],
+        queryFn: async () => {
+            const response = await api.get<{ total: number; items: SavedConfig[] }>("/configs", { params: search });
+            return response.data;
+        },
+    });
+};
@@ -0,0 +1,222 @@
+"""批量生成 SAS 程序
+
+扫描目录树中的研究配置 JSON（界面请求格式），用进程池渲染为 .sas 程序，
+输出目录镜像配置目录结构。输出目录中的清单文件记录每个研究的配置哈希
+与模板哈希：只有配置或模板（含生成器包内全部代码）变化的研究才重新生成，
+配置已删除的研究，其输出程序随之删除。
+指定宏库目录时，共享宏库只在输出根目录写一次，各程序 %include 它。
+所有文件先写临时文件再原子替换，中断不会留下半截输出。
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .utils.atomic_io import atomic_write_text
+from .utils.fingerprint import config_hash
+
+MANIFEST_NAME = '.rangen-manifest.json'
+MANIFEST_VERSION = 1
+OUTPUT_SUFFIX = '.sas'
+
+_CORE_DIR = Path(__file__).resolve().parent / 'core_refactored'
+# Everything that shapes the rendered program besides the study config: the templates and
+# every module of the generator package (schemas defaults, sizing, sections, renderer, ...)
+_TEMPLATE_SOURCES = (
+    ('templates', '*'),
+    ('.', '*.py'),
+)
+
+
+def template_hash(root: Path = _CORE_DIR) -> str:
+    """SHA-256 over the templates and all generator package sources (path + content)."""
+    digest = hashlib.sha256()
+    for sub, pattern in _TEMPLATE_SOURCES:
+        for path in sorted((root / sub).rglob(pattern)):
+            if path.is_file() and '__pycache__' not in path.parts:
+                digest.update(path.relative_to(root).as_posix().encode('utf-8') + b'\0')
+                digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def render_study(data: Dict[str, Any], macro_library_dir: Optional[str] = None) -> str:
+    """Render one UI request payload to SAS code (ValueError on invalid config)."""
+    from .core_refactored.sas_generator import SASRandomizationGenerator
+
+    if macro_library_dir:
+        data = {**data, 'macro_library_dir': macro_library_dir}
+    return SASRandomizationGenerator(**data).generate_sas_code()
+
+
+def _render_job(job: Tuple[str, str, Optional[str]]) -> Optional[str]:
+    """Process-pool worker: render ``config`` into ``output``; returns an error message or None."""
+    config, output, macro_library_dir = job
+    try:
+        with open(config, 'r', encoding='utf-8') as f:
+            code = render_study(json.load(f), macro_library_dir)
+        atomic_write_text(Path(output), code)
+    except (ValueError, OSError) as e:
+        return str(e)
+    except Exception as e:  # one malformed config must not abort the run
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def _map_bounded(pool: ProcessPoolExecutor, workers: int, job_args: List[Tuple[str, str, Optional[str]]],
+                 progress: Optional[Callable[[int, int], None]]) -> List[Optional[str]]:
+    """
+    _render_job over ``job_args`` with at most two renders per worker in flight.
+    A progress callback that blocks (a paused job) therefore stops new work
+    from being handed to the pool within one render per worker.
+    """
+    window = 2 * workers
+    errors: List[Optional[str]] = [None] * len(job_args)
+    running = {}
+    submitted = done_count = 0
+    while done_count < len(job_args):
+        while submitted < len(job_args) and len(running) < window:
+            running[pool.submit(_render_job, job_args[submitted])] = submitted
+            submitted += 1
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            errors[running.pop(future)] = future.result()
+            done_count += 1
+            if progress:
+                progress(done_count, len(job_args))
+    return errors
+
+
+@dataclass
+class BulkResult:
+    """Outcome of one bulk run (paths relative to the config root)."""
+    generated: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    # Configs gone since the last run; their outputs have been deleted
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def load_manifest(out_dir: Path) -> Dict[str, Any]:
+    path = out_dir / MANIFEST_NAME
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'version': MANIFEST_VERSION, 'studies': {}}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'studies': {}}
+    return manifest
+
+
+def discover_configs(config_dir: Path) -> List[Path]:
+    """Study config JSON files under ``config_dir`` (hidden files and directories skipped)."""
+    return sorted(
+        p for p in config_dir.rglob('*.json')
+        if p.is_file() and not any(part.startswith('.') for part in p.relative_to(config_dir).parts)
+    )
+
+
+def _remove_outputs(out_root: Path, outputs: List[Optional[str]], keep: set) -> None:
+    """Delete the outputs of configs that no longer exist (only files inside ``out_root``)."""
+    root = out_root.resolve()
+    for output in outputs:
+        if not output or output in keep:
+            continue
+        path = (out_root / output).resolve()
+        if root in path.parents and path.is_file():
+            path.unlink()
+
+
+def generate_tree(config_dir: str, out_dir: str, jobs: Optional[int] = None,
+                  force: bool = False, macro_library_dir: Optional[str] = None,
+                  progress: Optional[Callable[[int, int], None]] = None) -> BulkResult:
+    """
+    Render every study config under ``config_dir`` into ``out_dir``.
+
+    Args:
+        config_dir: 研究配置 JSON 所在目录（递归扫描）
+        out_dir: 输出目录，a/b/STUDY.json -> a/b/STUDY.sas
+        jobs: 进程数（默认 CPU 数；1 表示在当前进程内渲染）
+        force: 忽略清单，全部重新生成
+        macro_library_dir: 运行时宏库所在的 SAS 目录；设置后宏库写入 out_dir 根目录，
+            程序改为 %include 它
+        progress: 每渲染完一个配置调用 progress(已完成数, 待渲染总数)；回调抛出的异常
+            （如任务取消）会停止后续渲染，不写入清单
+
+    Returns:
+        BulkResult: 重新生成 / 未变化 / 失败 / 已删除配置的列表；已删除配置的 .sas 输出
+            一并从 out_dir 删除
+    """
+    config_root, out_root = Path(config_dir), Path(out_dir)
+    if not config_root.is_dir():
+        raise ValueError(f"配置目录不存在: {config_dir}")
+    out_root.mkdir(parents=True, exist_ok=True)
+
+    templates = template_hash()
+    library = None
+    if macro_library_dir:
+        from .core_refactored.macro_library import write_macro_library
+        library = write_macro_library(out_root).name
+    manifest = load_manifest(out_root)
+    previous: Dict[str, Any] = manifest['studies']
+    studies: Dict[str, Any] = {}
+    result = BulkResult()
+    pending: List[Tuple[str, Dict[str, Any]]] = []
+
+    for config in discover_configs(config_root):
+        rel = config.relative_to(config_root).as_posix()
+        output = Path(rel).with_suffix(OUTPUT_SUFFIX).as_posix()
+        try:
+            with open(config, 'r', encoding='utf-8') as f:
+                digest = config_hash(json.load(f))
+        except ValueError as e:
+            result.failed[rel] = f"JSON 解析失败: {e}"
+            continue
+        entry = {'config_hash': digest, 'template_hash': templates, 'output': output}
+        if library:
+            entry['macro_library'] = f"{macro_library_dir}|{library}"
+        if not force and previous.get(rel) == entry and (out_root / output).exists():
+            studies[rel] = entry
+            result.unchanged.append(rel)
+        else:
+            pending.append((rel, entry))
+
+    job_args = [(str(config_root / rel), str(out_root / entry['output']), macro_library_dir)
+                for rel, entry in pending]
+    errors: List[Optional[str]] = []
+    if jobs == 1 or len(job_args) <= 1:
+        for job in job_args:
+            errors.append(_render_job(job))
+            if progress:
+                progress(len(errors), len(job_args))
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        try:
+            errors = _map_bounded(pool, jobs or os.cpu_count() or 1, job_args, progress)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown()
+
+    for (rel, entry), error in zip(pending, errors):
+        if error is None:
+            studies[rel] = entry
+            result.generated.append(rel)
+        else:
+            result.failed[rel] = error
+    result.removed = sorted(set(previous) - set(studies) - set(result.failed))
+    _remove_outputs(out_root, [previous[rel].get('output') for rel in result.removed],
+                    keep={entry['output'] for entry in studies.values()})
+
+    manifest = {'version': MANIFEST_VERSION, 'template_hash': templates, 'studies': studies}
+    atomic_write_text(out_root / MANIFEST_NAME,
+                      json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True))
+    return result
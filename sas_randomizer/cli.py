@@ -0,0 +1,209 @@
+"""RanGen 命令行入口
+
+用法:
+    python -m sas_randomizer index build DEMO_Drug_List.csv
+    python -m sas_randomizer index lookup DEMO_Drug_List.rgx D0123 D0456
+    python -m sas_randomizer export request.json --supplier "供应商B 5.X" -o out/
+    python -m sas_randomizer export request.json --kind drug -o out/
+    python -m sas_randomizer verify TEST001_Rand_List.csv --config request.json
+    python -m sas_randomizer pack request.json -o TEST001_Rand_List.rgl
+    python -m sas_randomizer generate studies/ -o programs/ -j 8
+    python -m sas_randomizer generate studies/ -o programs/ --macro-library "D:\\rangen\\macros"
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+
+def _cmd_index_build(args) -> int:
+    from .native.kit_index import build_index, default_index_path
+    from .native.supplier_csv import read_list_csv
+
+    start = time.perf_counter()
+    rand_list = read_list_csv(args.list)
+    out = args.output or default_index_path(args.list)
+    info = build_index(rand_list, out)
+    print(f"Index written: {out} ({info['rows']} rows, {info['kind']}, "
+          f"{time.perf_counter() - start:.2f}s)")
+    return 0
+
+
+def _cmd_index_lookup(args) -> int:
+    from .native.kit_index import KitIndex
+
+    missing = 0
+    with KitIndex(args.index) as index:
+        for number in args.numbers:
+            result = index.lookup(number)
+            if result is None:
+                missing += 1
+                print(json.dumps({"number": number, "found": False}, ensure_ascii=False))
+            else:
+                print(json.dumps({**result, "found": True}, ensure_ascii=False))
+    return 1 if missing else 0
+
+
+def _load_list(source: str, seed: Optional[int] = None, kind: str = "subject"):
+    """
+    A UI request JSON is generated with the native engine (subject or drug
+    list per ``kind``), a .rgl file is mapped, anything else is parsed as a
+    delivered CSV.
+    """
+    if source.lower().endswith('.rgl'):
+        from .native.columnar import load_list
+        return load_list(source), None
+    if source.lower().endswith('.json'):
+        from .core_refactored.transformers import convert_ui_payload_to_study_design
+        from .native.block import generate_subject_list
+        from .native.drug import generate_drug_list
+
+        with open(source, 'r', encoding='utf-8') as f:
+            study = convert_ui_payload_to_study_design(json.load(f))
+        generate = generate_drug_list if kind == "drug" else generate_subject_list
+        return generate(study, seed=seed), study
+    from .native.supplier_csv import read_list_csv
+    return read_list_csv(source), None
+
+
+def _cmd_export(args) -> int:
+    from .native.writers import write_deliverables
+
+    start = time.perf_counter()
+    rand_list, study = _load_list(args.source, args.seed, args.kind)
+    supplier = args.supplier or (study.output_settings.supplier if study else None) or rand_list.meta.get('supplier')
+    status = args.status if args.status is not None else (study.status if study else '')
+    sec_rand = args.sec_rand or bool(rand_list.meta.get('sec_rand'))
+    paths = write_deliverables(rand_list, args.output, supplier=supplier, sec_rand=sec_rand, status=status)
+    for path in paths:
+        print(path)
+    print(f"{len(rand_list)} rows, {supplier}, {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def _load_study(config: str):
+    from .core_refactored.transformers import convert_ui_payload_to_study_design
+
+    with open(config, 'r', encoding='utf-8') as f:
+        return convert_ui_payload_to_study_design(json.load(f))
+
+
+def _cmd_verify(args) -> int:
+    from .native.verify import verify_list
+
+    start = time.perf_counter()
+    report = verify_list(args.list, _load_study(args.config), chunk_rows=args.chunk_rows)
+    if args.json:
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(f"{report.kind} list, {report.supplier}, {report.rows} rows "
+              f"({time.perf_counter() - start:.2f}s)")
+        for check, status in report.checks.items():
+            print(f"  {check:<22} {status}")
+        for issue in report.issues:
+            rows = ', '.join(str(r) for r in issue.rows)
+            print(f"[{issue.check}] {issue.message} x{issue.count}" + (f" (行: {rows})" if rows else ""))
+    return 0 if report.ok else 1
+
+
+def _cmd_pack(args) -> int:
+    from .native.columnar import LIST_SUFFIX, save_list
+
+    start = time.perf_counter()
+    rand_list, _ = _load_list(args.source, args.seed, args.kind)
+    out = args.output or os.path.splitext(args.source)[0] + LIST_SUFFIX
+    info = save_list(rand_list, out)
+    source_size = os.path.getsize(args.source)
+    print(f"{out}: {info['rows']} rows, {info['size_bytes']} bytes "
+          f"({source_size} bytes source), {time.perf_counter() - start:.2f}s")
+    if args.verbose:
+        for name, encoding in info['columns'].items():
+            print(f"  {name:<16} {encoding}")
+    return 0
+
+
+def _cmd_generate(args) -> int:
+    from .bulk import generate_tree
+
+    start = time.perf_counter()
+    result = generate_tree(args.configs, args.output, jobs=args.jobs, force=args.force,
+                           macro_library_dir=args.macro_library)
+    for rel, error in result.failed.items():
+        print(f"FAILED {rel}: {error}", file=sys.stderr)
+    if args.verbose:
+        for rel in result.generated:
+            print(f"generated {rel}")
+        for rel in result.removed:
+            print(f"removed   {rel}")
+    print(f"{len(result.generated)} generated, {len(result.unchanged)} unchanged, "
+          f"{len(result.failed)} failed ({time.perf_counter() - start:.2f}s)")
+    return 0 if result.ok else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m sas_randomizer", description="RanGen 命令行工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="紧急揭盲索引")
+    index_commands = index.add_subparsers(dest="index_command", required=True)
+
+    build = index_commands.add_parser("build", help="由供应商CSV盲底构建 .rgx 索引")
+    build.add_argument("list", help="_Rand_List / _Drug_List CSV 路径")
+    build.add_argument("-o", "--output", help="索引输出路径（默认与CSV同目录同名 .rgx）")
+    build.set_defaults(func=_cmd_index_build)
+
+    lookup = index_commands.add_parser("lookup", help="按随机号/药物编号查询组别")
+    lookup.add_argument("index", help=".rgx 索引路径")
+    lookup.add_argument("numbers", nargs="+", help="要查询的编号")
+    lookup.set_defaults(func=_cmd_index_lookup)
+
+    export = commands.add_parser("export", help="不经 SAS 直接写出供应商版式盲底（草稿）")
+    export.add_argument("source", help="界面请求 JSON（原生引擎生成）或已交付的 CSV（转换版式）")
+    export.add_argument("-o", "--output", default=".", help="输出目录")
+    export.add_argument("--supplier", help="供应商版式（默认取配置或CSV中的版式）")
+    export.add_argument("--kind", choices=("subject", "drug"), default="subject",
+                        help="由请求 JSON 生成受试者列表或药物列表")
+    export.add_argument("--sec-rand", action="store_true", help="药物列表二次随机版式（原生生成的二次随机列表自动启用）")
+    export.add_argument("--status", help="文件名状态后缀，如 UAT（FINAL 不加后缀）")
+    export.add_argument("--seed", type=int, help="覆盖配置中的随机种子")
+    export.set_defaults(func=_cmd_export)
+
+    verify = commands.add_parser("verify", help="按配置核对交付的盲底 CSV")
+    verify.add_argument("list", help="_Rand_List / _Drug_List CSV 路径")
+    verify.add_argument("--config", required=True, help="生成该盲底的界面请求 JSON")
+    verify.add_argument("--chunk-rows", type=int, default=65536, help="每块解析的行数")
+    verify.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    verify.set_defaults(func=_cmd_verify)
+
+    pack = commands.add_parser("pack", help="转换为紧凑列式盲底文件 (.rgl)")
+    pack.add_argument("source", help="界面请求 JSON（原生引擎生成）或已交付的 CSV")
+    pack.add_argument("-o", "--output", help="输出路径（默认与源文件同名 .rgl）")
+    pack.add_argument("--kind", choices=("subject", "drug"), default="subject",
+                      help="由请求 JSON 生成受试者列表或药物列表")
+    pack.add_argument("--seed", type=int, help="覆盖配置中的随机种子")
+    pack.add_argument("-v", "--verbose", action="store_true", help="列出各列的存储方式")
+    pack.set_defaults(func=_cmd_pack)
+
+    generate = commands.add_parser("generate", help="批量渲染研究配置为 SAS 程序（增量）")
+    generate.add_argument("configs", help="研究配置 JSON 所在目录（递归扫描）")
+    generate.add_argument("-o", "--output", required=True, help="SAS 程序输出目录")
+    generate.add_argument("-j", "--jobs", type=int, help="并行进程数（默认 CPU 数）")
+    generate.add_argument("--force", action="store_true", help="忽略清单，全部重新生成")
+    generate.add_argument("--macro-library", metavar="SAS_DIR",
+                          help="共享宏库运行时所在的 SAS 目录；宏库写入输出根目录，程序 %%include 它")
+    generate.add_argument("-v", "--verbose", action="store_true", help="列出重新生成的研究")
+    generate.set_defaults(func=_cmd_generate)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (ValueError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
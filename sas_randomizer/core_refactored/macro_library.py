@@ -0,0 +1,67 @@
+"""共享 SAS 宏库
+
+RandStyle、m_rand、m_rpt、m_rpe、m_rpt_drug 与研究无关，默认逐字内联在每个生成的
+程序中。宏库模式下这些宏只渲染一次，写成以内容哈希命名的版本化文件
+（rangen_macros_<sha256 前 12 位>.sas），程序先校验文件的 SHA-256 再 %include，
+只保留研究相关的驱动代码与 m_rpe_drug（其中注入了本研究的批次逻辑）。
+模板变化时文件名随之变化，新旧版本的宏库可以并存。
+"""
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple
+
+from ..utils.atomic_io import atomic_write_text
+from .schemas import MacroLibraryRef, OutputSettings
+from .utils.template_renderer import TemplateRenderer
+
+LIBRARY_TEMPLATE = 'macro_library.sas.j2'
+LIBRARY_PREFIX = 'rangen_macros_'
+LIBRARY_SUFFIX = '.sas'
+# Default supplier= of m_rpe in the library; generated programs always pass supplier explicitly
+LIBRARY_SUPPLIER = OutputSettings().supplier
+
+
+@lru_cache(maxsize=1)
+def _rendered() -> Tuple[str, str]:
+    text = TemplateRenderer().render(LIBRARY_TEMPLATE, {'default_supplier': LIBRARY_SUPPLIER})
+    return text, hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def render_macro_library() -> str:
+    """SAS text of the shared macro library (rendered once per process)."""
+    return _rendered()[0]
+
+
+def library_sha256() -> str:
+    """SHA-256 of the library file exactly as write_macro_library writes it (UTF-8, LF)."""
+    return _rendered()[1]
+
+
+def library_filename() -> str:
+    return f"{LIBRARY_PREFIX}{library_sha256()[:12]}{LIBRARY_SUFFIX}"
+
+
+def library_ref(directory: str) -> MacroLibraryRef:
+    """Reference for programs that %include the library from ``directory`` (a SAS path)."""
+    if not directory or not directory.strip():
+        raise ValueError("宏库目录不能为空")
+    return MacroLibraryRef(directory=directory.strip().rstrip('\\/'), filename=library_filename(),
+                           sha256=library_sha256())
+
+
+def write_macro_library(out_dir) -> Path:
+    """
+    Write the library into ``out_dir`` under its versioned name.
+
+    Args:
+        out_dir: 输出目录
+
+    Returns:
+        Path: 宏库文件路径（同名文件已存在时内容必然相同，不重复写入）
+    """
+    path = Path(out_dir) / library_filename()
+    if not path.exists():
+        atomic_write_text(path, render_macro_library())
+    return path
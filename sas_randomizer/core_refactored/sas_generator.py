@@ -6,15 +6,7 @@
 import textwrap
 from typing import List, Dict, Optional, Union, Any
 
-from .builders.subject_builder import (
-    generate_subject_builder_code
-)
-from .builders.drug_builder import (
-    generate_drug_builder_code
-)
-from .utils.template_renderer import TemplateRenderer
-
-renderer = TemplateRenderer()
+from .sections import SectionCache, render_sections
 
 
 class SASRandomizationGenerator:
@@ -58,6 +50,8 @@ class SASRandomizationGenerator:
         supplier: str = "供应商A",  # 新增：供应商参数
         is_server_run: bool = False,
         server_path: Optional[str] = None,
+        sizing: Optional[Dict[str, Any]] = None,
+        macro_library_dir: Optional[str] = None,
     ):
         """
         初始化SAS随机化代码生成器
@@ -92,6 +86,8 @@ class SASRandomizationGenerator:
             protocols: 子方案列表
             main_study_name: 主研究名称
             supplier: 供应商名称
+            sizing: 按需求计算区组数的策略（见 sizing.SizingPolicy）
+            macro_library_dir: 共享宏库所在的 SAS 目录；设置后程序 %include 宏库而不内联宏定义
         """
         self.study_id = study_id
         self.protocol_title = protocol_title
@@ -125,6 +121,8 @@ class SASRandomizationGenerator:
         self.supplier = supplier  # 新增：供应商参数
         self.is_server_run = is_server_run
         self.server_path = server_path
+        self.sizing = sizing
+        self.macro_library_dir = macro_library_dir
         
         # 验证参数
         self._validate_parameters()
@@ -172,11 +170,30 @@ class SASRandomizationGenerator:
         Returns:
             str: 生成的SAS代码
         """
-        code_sections = []
-        
+        return "\n\n".join(self.generate_sections().values())
+
+    def generate_sections(self, cache: Optional[SectionCache] = None) -> Dict[str, str]:
+        """
+        按段生成SAS代码（common_header / macro_definitions / subject_randomization /
+        drug_randomization），供实时预览做段级缓存与差异比较
+
+        Args:
+            cache: 段缓存，未变化的段直接复用
+
+        Returns:
+            Dict[str, str]: 有序的 段名 -> SAS代码
+        """
+        import datetime
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return render_sections(self.build_payload(), now, cache=cache)
+
+    def build_payload(self) -> Dict[str, Any]:
+        """
+        构建统一 Payload，供 transformers 转换为 StudyDesignConfig
+        """
         # 0. 构建统一 Payload
         # 这个Payload将被 Subject Builder 和 Drug Builder 共同使用
-        full_payload = {
+        return {
             'study_id': self.study_id,
             'protocol_title': self.protocol_title,
             'client': self.client,
@@ -208,42 +225,10 @@ class SASRandomizationGenerator:
             'drug_randomization_config': self.drug_randomization_config,
             'is_double_blind': self.is_double_blind,
             'is_server_run': self.is_server_run,
-            'server_path': self.server_path
+            'server_path': self.server_path,
+            'sizing': self.sizing,
+            'macro_library_dir': self.macro_library_dir,
         }
-
-        # 1. 头部信息和格式定义 (Template-Based)
-        import datetime
-        full_payload['now'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # 为了兼容 template 里的 study 对象访问方式
-        # 我们这里临时构建一个 simple wrapper 或者直接传 payload
-        # 但 best practice 是统一都过 transformers
-        # 考虑到 subject_builder 里也会转，我们可以在这里先转一次，或者让 template 接受 dict
-        # 简单起见，我们假设 template 使用 {{ study.xxx }} 访问
-        # 所以我们需要把 payload 包装在 'study' key 里，或者让 transformers 处理
-        
-        from .transformers import convert_ui_payload_to_study_design
-        study_design = convert_ui_payload_to_study_design(full_payload)
-        
-        code_sections.append(renderer.render('common_header.sas.j2', {
-            'study': study_design,
-            'now': full_payload['now']
-        }))
-        
-        # 2. 宏定义 (Separated)
-        code_sections.append(renderer.render('macro_definitions.sas.j2', {
-             'study': study_design
-        }))
-        
-        # 3. 受试者随机化 (New Template-Based Builder)
-        # 包含：宏定义、变量设置、随机化调用、后处理、报告
-        code_sections.append(generate_subject_builder_code(full_payload))
-        
-        # 4. 药物随机化 (如果配置)
-        if self.drug_randomization_config and self.drug_randomization_config.get('enabled', False):
-            code_sections.append(generate_drug_builder_code(full_payload))
-        
-        return "\n\n".join(code_sections)
     
     def _generate_macro_definitions(self) -> str:
         """
@@ -1,7 +1,11 @@
 from __future__ import annotations
+from itertools import accumulate
 from typing import List, Dict, Optional, Union, Any, Literal
 from pydantic import BaseModel, Field, field_validator
 
+# Quantity assumed for a batch whose quantity is 'auto'
+AUTO_BATCH_QUANTITY = 10
+
 class DrugArm(BaseModel):
     id: Optional[str] = None
     code: str
@@ -23,6 +27,17 @@ class BatchItem(BaseModel):
         except ValueError:
             return 0
 
+    @property
+    def resolved_quantity(self) -> int:
+        """Quantity with 'auto' resolved to AUTO_BATCH_QUANTITY."""
+        return AUTO_BATCH_QUANTITY if self.quantity == 'auto' else self.quantity
+
+
+def cumulative_thresholds(batches: List[BatchItem]) -> List[int]:
+    """Running totals of batch quantities: batch i covers secondary orders (t[i-1], t[i]]."""
+    return list(accumulate(b.resolved_quantity for b in batches))
+
+
 class StratumBatchSettings(BaseModel):
     """
     Batch configurations for a specific stratification factor.
@@ -31,6 +46,19 @@ class StratumBatchSettings(BaseModel):
     """
     levels: Dict[str, List[BatchItem]] = Field(default_factory=dict)
 
+
+class BatchStratum(BaseModel):
+    """One stratum of the secondary (batch) randomization, as emitted into SAS."""
+    strata_n: int
+    level: str
+    factor_name: Optional[str] = None  # None for independent batch settings
+    thresholds: List[int] = Field(default_factory=list)
+    batch_nos: List[str] = Field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.thresholds[-1] if self.thresholds else 0
+
 class StratificationFactor(BaseModel):
     factor_name: str
     levels: List[str] = Field(default_factory=list)
@@ -76,6 +104,28 @@ class DrugRandomizationConfig(BaseModel):
         """Check if we need complex DATA Step logic for batch assignment."""
         return bool(self.stratification_factors and any(f.batch_enabled for f in self.stratification_factors))
 
+    def batch_strata(self) -> List[BatchStratum]:
+        """
+        Batch-configured levels in SAS stratum order (StrataN 1, 2, ...) with their
+        cumulative thresholds: levels of batch-enabled factors, otherwise the
+        independent batch settings.
+        """
+        strata: List[BatchStratum] = []
+        if self.has_complex_batch_logic():
+            for factor in self.stratification_factors:
+                if factor.batch_enabled:
+                    for level, batches in factor.batch_settings.levels.items():
+                        strata.append(BatchStratum(strata_n=len(strata) + 1, level=level,
+                                                   factor_name=factor.factor_name,
+                                                   thresholds=cumulative_thresholds(batches),
+                                                   batch_nos=[str(b.batch_no) for b in batches]))
+        elif self.independent_batch_settings:
+            for level, batches in self.independent_batch_settings.items():
+                strata.append(BatchStratum(strata_n=len(strata) + 1, level=level,
+                                           thresholds=cumulative_thresholds(batches),
+                                           batch_nos=[str(b.batch_no) for b in batches]))
+        return strata
+
 class CohortConfig(BaseModel):
     """
     Represents a specific sub-population or protocol arm in the study.
@@ -87,9 +137,16 @@ class CohortConfig(BaseModel):
     # Randomization Config for this cohort
     config: DrugRandomizationConfig
 
+class MacroLibraryRef(BaseModel):
+    """Shared macro library a program %includes after checking its SHA-256."""
+    directory: str  # SAS path of the directory holding the library
+    filename: str
+    sha256: str
+
 class OutputSettings(BaseModel):
     path: str = "&_rootpath."
     supplier: str = "供应商A"  # Default supplier
+    macro_library: Optional[MacroLibraryRef] = None
 
 class TreatmentArm(BaseModel):
     armcd: str
@@ -100,6 +157,20 @@ class ProtocolConfig(BaseModel):
     id: Optional[str] = None
     name: str
 
+class SizingPolicy(BaseModel):
+    """
+    Demand-driven block counts. When enabled, blocks_per_stratum and the drug
+    block_layers are replaced by the fewest blocks that cover demand
+    (see sizing.plan_sizing).
+    """
+    enabled: bool = False
+    overage_percent: float = 0.0  # 在入组目标/药物需求之上预留的百分比
+    spare_blocks: int = 0  # 每层额外追加的整区组数
+    # 受试者各分层（水平）的入组目标；未列出的分层按 total_sample_size
+    strata_targets: Dict[str, int] = Field(default_factory=dict)
+    # 无批次配置的药物分层（水平）的需求量；未列出时保留配置的 block_layers
+    drug_strata_targets: Dict[str, int] = Field(default_factory=dict)
+
 class StudyDesignConfig(BaseModel):
     """
     The Root Configuration Object (Superset).
@@ -159,6 +230,10 @@ class StudyDesignConfig(BaseModel):
     # Supplier
     supplier: str = "供应商A"
 
+    # Demand-driven sizing; sizing_report is filled in when the plan was applied
+    sizing: SizingPolicy = Field(default_factory=SizingPolicy)
+    sizing_report: Optional[Dict[str, Any]] = None
+
     @field_validator('cohorts')
     def validate_cohorts(cls, v):
         if not v:
@@ -0,0 +1,136 @@
+"""按段渲染与段级缓存
+
+SAS 程序由四段组成：common_header、macro_definitions、subject_randomization、
+drug_randomization。每段渲染时用记录代理包装 StudyDesignConfig，记下模板实际读取
+的顶层字段；缓存以这些字段的取值指纹为键。配置变化时只有读取了变化字段的段
+需要重新渲染，其余段直接复用缓存文本。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from ..utils.fingerprint import canonical_json
+from .feasibility import check_feasibility
+from .schemas import StudyDesignConfig
+from .transformers import convert_ui_payload_to_study_design
+from .utils.template_renderer import TemplateRenderer
+
+SECTIONS = ('common_header', 'macro_definitions', 'subject_randomization', 'drug_randomization')
+
+_TEMPLATES = {
+    'common_header': 'common_header.sas.j2',
+    'macro_definitions': 'macro_definitions.sas.j2',
+    'subject_randomization': 'subject_randomization.sas.j2',
+    'drug_randomization': 'drug_randomization.sas.j2',
+}
+
+renderer = TemplateRenderer()
+
+
+class _RecordingStudy:
+    """Proxy handed to templates as ``study``: records every top-level attribute read."""
+
+    def __init__(self, study: StudyDesignConfig):
+        object.__setattr__(self, '_study', study)
+        object.__setattr__(self, '_reads', set())
+
+    def __getattr__(self, name: str):
+        self._reads.add(name)
+        return getattr(self._study, name)
+
+
+def text_fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _drug_enabled(payload: Dict[str, Any]) -> bool:
+    config = payload.get('drug_randomization_config')
+    return bool(config and config.get('enabled', False))
+
+
+class SectionCache:
+    """
+    Bounded LRU of rendered sections. Each section keeps the dependency sets
+    seen so far; a lookup fingerprints the current values of each set and
+    reuses the text whose fingerprint matches.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._deps: Dict[str, List[FrozenSet[str]]] = {name: [] for name in SECTIONS}
+        self._texts: 'OrderedDict[Tuple[str, str], str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(values: Dict[str, Any], deps: FrozenSet[str]) -> Optional[str]:
+        if not deps <= values.keys():
+            return None  # a non-field attribute was read: never cached
+        return canonical_json({name: values[name] for name in sorted(deps)})
+
+    def get(self, section: str, values: Dict[str, Any]) -> Optional[str]:
+        with self._lock:
+            for deps in self._deps[section]:
+                key = self._key(values, deps)
+                if key is not None and (section, key) in self._texts:
+                    self._texts.move_to_end((section, key))
+                    self.hits += 1
+                    return self._texts[(section, key)]
+            self.misses += 1
+            return None
+
+    def put(self, section: str, values: Dict[str, Any], deps: FrozenSet[str], text: str):
+        key = self._key(values, deps)
+        if key is None:
+            return
+        with self._lock:
+            if deps not in self._deps[section]:
+                self._deps[section].append(deps)
+            self._texts[(section, key)] = text
+            while len(self._texts) > self.max_entries:
+                self._texts.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            for deps in self._deps.values():
+                deps.clear()
+            self._texts.clear()
+
+
+def render_sections(payload: Dict[str, Any], now: str,
+                    cache: Optional[SectionCache] = None) -> 'OrderedDict[str, str]':
+    """
+    Render the program sections for a generator payload.
+
+    Args:
+        payload: SASRandomizationGenerator 的完整 payload（界面请求字段）
+        now: 写入 common_header 的生成时间
+        cache: 段缓存；命中时 common_header 保留首次渲染时的生成时间
+
+    Returns:
+        OrderedDict: 段名 -> SAS 代码；未启用药物随机化时不含 drug_randomization
+
+    Raises:
+        FeasibilityError: 设计不可行（ValueError 子类，列出全部问题）
+    """
+    study = convert_ui_payload_to_study_design(payload)
+    check_feasibility(study)  # every design error at once, before any template work
+    names = [name for name in SECTIONS if name != 'drug_randomization' or _drug_enabled(payload)]
+    values = study.model_dump(mode='json') if cache is not None else {}
+
+    sections: 'OrderedDict[str, str]' = OrderedDict()
+    for name in names:
+        text = cache.get(name, values) if cache is not None else None
+        if text is None:
+            proxy = _RecordingStudy(study)
+            context = {'study': proxy}
+            if name == 'common_header':
+                context['now'] = now
+            text = renderer.render(_TEMPLATES[name], context)
+            if cache is not None:
+                cache.put(name, values, frozenset(proxy._reads), text)
+        sections[name] = text
+    return sections
@@ -0,0 +1,181 @@
+"""按需求计算区组数
+
+blocks_per_stratum 与药物 block_layers（默认 600）是固定值，生成的程序往往产生远多于
+实际需要的随机号与药物编号，而每一行都要经过 m_rpe_drug / m_rpt_drug 中的全部排序。
+本模块按各分层的需求量（受试者入组目标、药物批次总量或药物需求量）与预留策略
+计算覆盖需求的最少区组数，并可将结果写回配置供模板使用。
+
+m_rand 的 PROC PLAN 对所有分层使用同一个 Block 数，因此计划取各分层所需区组数的最大值。
+"""
+
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from .schemas import DrugRandomizationConfig, SizingPolicy, StudyDesignConfig
+
+SUBJECT = 'subject'
+DRUG = 'drug'
+
+# 需求来源
+SOURCE_TARGET = 'target'            # 策略中给出的分层目标
+SOURCE_SAMPLE_SIZE = 'sample_size'  # total_sample_size（任一分层都可能入组全部受试者）
+SOURCE_BATCH = 'batch'              # 该分层批次数量之和（实物供应，不加预留）
+SOURCE_CONFIGURED = 'configured'    # 无需求信息，保留配置值
+
+
+@dataclass
+class StratumDemand:
+    stratum: str
+    demand: int
+    source: str
+    blocks: int
+
+
+@dataclass
+class ListSizing:
+    """Configured versus planned block count for one list (subject or drug)."""
+    kind: str
+    block_size: int
+    configured_blocks: int
+    planned_blocks: int
+    strata: List[StratumDemand]
+    # Rows per block and stratum beyond block_size: protocols x (2 with mirror replacement)
+    copies: int = 1
+    notes: List[str] = field(default_factory=list)
+
+    def rows(self, blocks: int) -> int:
+        return len(self.strata) * blocks * self.block_size * self.copies
+
+    @property
+    def configured_rows(self) -> int:
+        return self.rows(self.configured_blocks)
+
+    @property
+    def planned_rows(self) -> int:
+        return self.rows(self.planned_blocks)
+
+    @property
+    def saved_rows(self) -> int:
+        return self.configured_rows - self.planned_rows
+
+    def to_dict(self) -> dict:
+        result = asdict(self)
+        result.update(configured_rows=self.configured_rows, planned_rows=self.planned_rows,
+                      saved_rows=self.saved_rows)
+        return result
+
+
+@dataclass
+class SizingPlan:
+    subject: Optional[ListSizing] = None
+    drug: Optional[ListSizing] = None
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def saved_rows(self) -> int:
+        return sum(part.saved_rows for part in (self.subject, self.drug) if part is not None)
+
+    def to_dict(self) -> dict:
+        return {
+            'subject': self.subject.to_dict() if self.subject else None,
+            'drug': self.drug.to_dict() if self.drug else None,
+            'saved_rows': self.saved_rows,
+            'notes': list(self.notes),
+        }
+
+
+def blocks_for(demand: int, block_size: int, policy: SizingPolicy, overage: bool = True) -> int:
+    """Fewest blocks holding ``demand`` plus the overage percentage and spare blocks (at least one)."""
+    if block_size <= 0:
+        raise ValueError(f"区组大小必须为正整数。当前值: {block_size}")
+    needed = demand * (1 + max(policy.overage_percent, 0) / 100) if overage else demand
+    # round() first so e.g. 100 * 1.1 does not become 111 through float error
+    blocks = math.ceil(round(needed, 9) / block_size) + max(int(policy.spare_blocks), 0)
+    return max(blocks, 1)
+
+
+def _plan_subject(study: StudyDesignConfig, policy: SizingPolicy) -> ListSizing:
+    strata = [str(level) for factor in study.stratification_factors
+              for level in study.strata_levels.get(factor, [])] or ['']
+    block_size = int(study.block_size)
+    rows = []
+    for level in strata:
+        if level in policy.strata_targets:
+            demand, source = int(policy.strata_targets[level]), SOURCE_TARGET
+        else:
+            demand, source = int(study.total_sample_size), SOURCE_SAMPLE_SIZE
+        rows.append(StratumDemand(level, demand, source, blocks_for(demand, block_size, policy)))
+    protocols = len(study.protocols) if study.multi_protocol and study.protocols else 1
+    return ListSizing(
+        kind=SUBJECT,
+        block_size=block_size,
+        configured_blocks=int(study.blocks_per_stratum),
+        planned_blocks=max(r.blocks for r in rows),
+        strata=rows,
+        copies=protocols * (2 if study.mirror_replacement else 1),
+    )
+
+
+def _plan_drug(drc: DrugRandomizationConfig, policy: SizingPolicy) -> ListSizing:
+    strata = [str(level) for factor in drc.stratification_factors for level in factor.levels] or ['']
+    batch_totals: Dict[str, int] = {s.level: s.total for s in drc.batch_strata() if s.factor_name is not None}
+    block_size = int(drc.block_size)
+    configured = int(drc.block_layers)
+    rows = []
+    for level in strata:
+        if level in batch_totals:
+            demand = batch_totals[level]
+            rows.append(StratumDemand(level, demand, SOURCE_BATCH,
+                                      blocks_for(demand, block_size, policy, overage=False)))
+        elif level in policy.drug_strata_targets:
+            demand = int(policy.drug_strata_targets[level])
+            rows.append(StratumDemand(level, demand, SOURCE_TARGET, blocks_for(demand, block_size, policy)))
+        else:
+            rows.append(StratumDemand(level, configured * block_size, SOURCE_CONFIGURED, configured))
+    planned = max(r.blocks for r in rows)
+    sizing = ListSizing(kind=DRUG, block_size=block_size, configured_blocks=configured,
+                        planned_blocks=planned, strata=rows)
+    if drc.sec_rand_enabled:
+        for r in rows:
+            if r.source == SOURCE_BATCH and r.demand != planned * block_size:
+                sizing.notes.append(f"分层 {r.stratum} 批次总量 {r.demand} 与每层药物数 {planned * block_size} "
+                                    f"不一致，二次随机时将有药物编号没有取药顺序号")
+    return sizing
+
+
+def plan_sizing(study: StudyDesignConfig, policy: Optional[SizingPolicy] = None) -> SizingPlan:
+    """
+    Compute demand-driven block counts for the subject and drug lists.
+
+    Args:
+        study: 研究设计配置（使用其中配置的区组数作为对比基准）
+        policy: 预留策略与分层目标，默认取 study.sizing
+
+    Returns:
+        SizingPlan: 各列表的配置区组数、计划区组数与节省的行数
+    """
+    policy = policy or study.sizing
+    plan = SizingPlan()
+    if study.variable_block_enabled:
+        plan.notes.append("可变区组按 total_sample_size 生成，受试者区组数无需计算")
+    elif study.treatment_arms:
+        plan.subject = _plan_subject(study, policy)
+    drc = study.drug_randomization_config
+    if drc is not None and drc.enabled and drc.drug_arms:
+        plan.drug = _plan_drug(drc, policy)
+    return plan
+
+
+def apply_sizing(study: StudyDesignConfig) -> SizingPlan:
+    """
+    Replace blocks_per_stratum and the drug block_layers with the planned
+    counts and record the plan in study.sizing_report.
+    """
+    plan = plan_sizing(study)
+    if plan.subject is not None:
+        study.blocks_per_stratum = plan.subject.planned_blocks
+    if plan.drug is not None:
+        study.drug_randomization_config.block_layers = plan.drug.planned_blocks
+    study.sizing_report = plan.to_dict()
+    return plan
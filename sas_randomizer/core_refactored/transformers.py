@@ -2,8 +2,10 @@ from typing import Dict, Any, List
 from .schemas import (
     StudyDesignConfig, CohortConfig, DrugRandomizationConfig, 
     DrugArm, StratificationFactor, StratumBatchSettings, BatchItem, OutputSettings,
-    TreatmentArm, ProtocolConfig
+    TreatmentArm, ProtocolConfig, SizingPolicy
 )
+from .macro_library import library_ref
+from .sizing import apply_sizing
 
 def convert_ui_payload_to_study_design(payload: Dict[str, Any]) -> StudyDesignConfig:
     """
@@ -53,6 +55,9 @@ def convert_ui_payload_to_study_design(payload: Dict[str, Any]) -> StudyDesignCo
         path=payload.get("output_path", "&_rootpath."),
         supplier=supplier
     )
+    # Programs %include the shared macro library from this SAS directory instead of inlining it
+    if payload.get("macro_library_dir"):
+        output_settings.macro_library = library_ref(payload["macro_library_dir"])
     
     cohorts: List[CohortConfig] = []
     protocol_configs: List[ProtocolConfig] = []
@@ -104,7 +109,7 @@ def convert_ui_payload_to_study_design(payload: Dict[str, Any]) -> StudyDesignCo
             config=drc_model
         ))
         
-    return StudyDesignConfig(
+    study = StudyDesignConfig(
         study_id=study_id,
         protocol_title=payload.get("protocol_title", ""),
         client=client,
@@ -137,8 +142,13 @@ def convert_ui_payload_to_study_design(payload: Dict[str, Any]) -> StudyDesignCo
         cohorts=cohorts,
         is_double_blind=is_double_blind,
         supplier=supplier,
-        drug_randomization_config=drc_model # Populate top-level config for global macro generation
+        drug_randomization_config=drc_model, # Populate top-level config for global macro generation
+        sizing=SizingPolicy(**(payload.get("sizing") or {})),
     )
+    # Demand-driven block counts replace the configured ones before any template reads them
+    if study.sizing.enabled:
+        apply_sizing(study)
+    return study
 
 def _parse_drug_config(drc: Dict[str, Any], root_payload: Dict[str, Any]) -> DrugRandomizationConfig:
     """Helper to parse DrugRandomizationConfig from a dict, handling messy UI structures."""
@@ -1,6 +1,17 @@
 import os
 from typing import Any, Dict
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+# Compiled templates are shared through this directory when set (multi-worker server mode)
+TEMPLATE_CACHE_ENV = 'RANGEN_TEMPLATE_CACHE_DIR'
+
+
+def _bytecode_cache():
+    directory = os.environ.get(TEMPLATE_CACHE_ENV)
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
 
 class TemplateRenderer:
     def __init__(self):
@@ -14,7 +25,8 @@ class TemplateRenderer:
             loader=FileSystemLoader(template_dir),
             trim_blocks=True,
             lstrip_blocks=True,
-            extensions=['jinja2.ext.do']
+            extensions=['jinja2.ext.do'],
+            bytecode_cache=_bytecode_cache(),
         )
         
     def render(self, template_name: str, context: Dict[str, Any]) -> str:
@@ -0,0 +1,21 @@
+"""原生 (Python/NumPy) 随机化引擎
+
+与 core_refactored 中基于模板生成 SAS 代码的路径并行，本包直接在 Python 中
+计算随机化分配结果，用于模拟、UAT 替身服务以及无需 SAS 会话的草稿交付。
+"""
+
+from .minimization import MinimizationEngine, MinimizationState
+from .rand_list import NumberSpec, RandList
+from .block import generate_subject_list
+from .drug import generate_drug_list
+from .supplier_csv import read_list_csv
+
+__all__ = [
+    'MinimizationEngine',
+    'MinimizationState',
+    'NumberSpec',
+    'RandList',
+    'generate_drug_list',
+    'generate_subject_list',
+    'read_list_csv',
+]
@@ -0,0 +1,102 @@
+"""紧凑二进制容器
+
+文件布局: 8 字节魔数 | 8 字节小端头长度 | UTF-8 JSON 头 | 按 64 字节对齐的定长数组。
+JSON 头记录每个数组的 dtype/shape/offset；读取时通过 mmap 直接映射数组，
+不做解析也不整体载入内存。
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from ..utils.atomic_io import atomic_open
+
+ALIGN = 64
+_PREFIX = struct.Struct('<8sQ')
+
+
+def _pad(n: int) -> int:
+    return (-n) % ALIGN
+
+
+def write_container(path: str, magic: bytes, header: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Atomically write arrays plus a JSON header to ``path``.
+
+    Args:
+        path: 目标文件
+        magic: 8 字节魔数（标识文件类型）
+        header: 可 JSON 序列化的元数据（'arrays' 键由本函数填充）
+        arrays: 名称 -> 连续数组
+    """
+    if len(magic) != 8:
+        raise ValueError("magic 必须为 8 字节")
+    arrays = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+        layout[name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': offset}
+        offset += arr.nbytes + _pad(arr.nbytes)
+    header = dict(header, arrays=layout)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = _PREFIX.size + len(header_bytes)
+    data_start += _pad(data_start)
+    header_bytes += b' ' * (data_start - _PREFIX.size - len(header_bytes))
+
+    with atomic_open(path) as f:
+        f.write(_PREFIX.pack(magic, len(header_bytes)))
+        f.write(header_bytes)
+        for arr in arrays.values():
+            f.write(memoryview(arr).cast('B'))
+            f.write(b'\0' * _pad(arr.nbytes))
+
+
+def read_header(path: str, magic: bytes) -> Tuple[Dict[str, Any], int]:
+    """Read only the JSON header; returns (header, data_offset)."""
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"文件格式无效: {path}")
+        found, length = _PREFIX.unpack(prefix)
+        if found != magic:
+            raise ValueError(f"文件格式无效: {path}")
+        header = json.loads(f.read(length).decode('utf-8'))
+    return header, _PREFIX.size + length
+
+
+class MappedContainer:
+    """A container opened with mmap; arrays are zero-copy views into the mapping."""
+
+    def __init__(self, path: str, magic: bytes):
+        self.path = path
+        self.header, data_offset = read_header(path, magic)
+        # The mapping keeps its own handle to the file
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, spec in self.header['arrays'].items():
+            count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+            arr = np.frombuffer(self._mmap, dtype=np.dtype(spec['dtype']), count=count,
+                                offset=data_offset + spec['offset']) if count else \
+                np.empty(0, dtype=np.dtype(spec['dtype']))
+            self.arrays[name] = arr.reshape(spec['shape'])
+
+    def close(self):
+        self.arrays = {}
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views are still referenced elsewhere; the mapping is released with them
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,207 @@
+"""原生区组随机引擎（受试者列表）
+
+按 subject_randomization.sas.j2 与 m_rand 的结构在 NumPy 中生成受试者随机列表：
+PROC PLAN 的 StrataN/Block/Rand 因子、可变区组的 (n1, n2) 求解、按比例展开的
+组别映射、num_gap 分层编号、区组号去重、镜像替换号以及最终排序。
+随机数发生器与 SAS 不同，因此结果在结构上与 SAS 一致，而非逐行相同。
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..core_refactored.schemas import StudyDesignConfig
+from ..utils.fingerprint import config_hash
+from .rand_list import SUBJECT, NumberSpec, RandList
+
+SINGLE_PROTOCOL_NAME = '主方案'
+
+
+def resolve_seed(seed) -> Tuple[int, bool]:
+    """
+    Resolve a configured seed. 'RANDOM' draws a seed the same way the emitted
+    program does (ceil(1e6 * uniform)); returns (seed, was_random).
+    """
+    text = str(seed).strip()
+    if text.upper() == 'RANDOM' or not text:
+        return int(np.ceil(1_000_000 * np.random.default_rng().random())), True
+    try:
+        return int(text), False
+    except ValueError:
+        raise ValueError(f"无效的随机种子: {seed}") from None
+
+
+def subject_strata(study: StudyDesignConfig) -> List[str]:
+    """Strata as passed to m_rand: every level of every factor, in order."""
+    return [str(level) for factor in study.stratification_factors
+            for level in study.strata_levels.get(factor, [])]
+
+
+def subject_number_width(study: StudyDesignConfig) -> int:
+    """
+    Digit width m_rand uses for subjno (``%length(&StartNo)``).
+
+    The driver zero-pads startNo to four digits only for a single protocol
+    with subject_number_length == 4; otherwise the raw start number is passed.
+    """
+    if not study.multi_protocol and study.subject_number_length == 4:
+        return max(4, len(str(study.start_subject_number)))
+    return len(str(study.start_subject_number))
+
+
+def solve_variable_blocks(total_n: int, size1: int, size2: int) -> Tuple[int, int]:
+    """
+    Choose (n1, n2) with n1*size1 + n2*size2 == total_n, preferring the most
+    balanced then the fewest blocks — the same ordering m_rand sorts by.
+    """
+    if total_n <= 0:
+        raise ValueError(f"TotalN参数必须是一个正整数。当前值: {total_n}")
+    best = None
+    for n1 in range(total_n // size1 + 1):
+        remainder = total_n - n1 * size1
+        if remainder % size2 == 0:
+            n2 = remainder // size2
+            key = (abs(n1 - n2), n1 + n2)
+            if best is None or key < best[0]:
+                best = (key, n1, n2)
+    if best is None:
+        raise ValueError(f"无法使用区组大小 {size1} 和 {size2} 来精确达到总样本量 {total_n}")
+    return best[1], best[2]
+
+
+def _expanded_arms(study: StudyDesignConfig) -> np.ndarray:
+    """Arm indices repeated by ratio, as the driver builds the armcd= parameter."""
+    return np.repeat(np.arange(len(study.treatment_arms)),
+                     [max(int(a.ratio), 1) for a in study.treatment_arms])
+
+
+def _permuted_blocks(rng: np.random.Generator, n_blocks: int, size: int) -> np.ndarray:
+    """(n_blocks, size) matrix whose rows are random permutations of 1..size."""
+    return rng.random((n_blocks, size)).argsort(axis=1).astype(np.int16) + 1
+
+
+def fixed_block_plan(rng: np.random.Generator, n_groups: int, n_blocks: int, size: int) -> dict:
+    """
+    PROC PLAN ``factors StrataN=n ordered Block=b Rand=r`` plus m_rand's bn
+    counter: stratan/bn/block/blocksize/rand columns in output order.
+    """
+    # Block = &block (random): block labels are a permutation per stratum
+    labels = rng.random((n_groups, n_blocks)).argsort(axis=1).astype(np.int32) + 1
+    rand = _permuted_blocks(rng, n_groups * n_blocks, size)
+    return {
+        'stratan': np.repeat(np.arange(1, n_groups + 1, dtype=np.int16), n_blocks * size),
+        'bn': np.tile(np.repeat(np.arange(1, n_blocks + 1, dtype=np.int32), size), n_groups),
+        'block': np.repeat(labels.ravel(), size),
+        'blocksize': np.full(n_groups * n_blocks * size, size, dtype=np.int16),
+        'rand': rand.ravel(),
+    }
+
+
+def arm_slots(rand: np.ndarray, blocksize: np.ndarray, n_slots: int) -> np.ndarray:
+    """Slot index per row for ``if rand <= BlockSize / Narm * i then arm i`` (integer form of the same test)."""
+    slot = (rand.astype(np.int64) * n_slots + blocksize - 1) // blocksize - 1
+    return np.clip(slot, 0, n_slots - 1)
+
+
+def _m_rand(study: StudyDesignConfig, strata: List[str], seed: int) -> dict:
+    """One %m_rand call; returns raw columns in PROC PLAN output order."""
+    rng = np.random.default_rng(seed)
+    n_groups = max(len(strata), 1)
+    expanded = _expanded_arms(study)
+    n_arm = len(expanded)
+
+    if study.variable_block_enabled:
+        size1, size2 = (list(study.variable_block_sizes) + [0, 0])[:2]
+        n1, n2 = solve_variable_blocks(int(study.total_sample_size), int(size1), int(size2))
+        stratan, bn, block, blocksize, rand = [], [], [], [], []
+        for s in range(n_groups):
+            sizes = np.array([size1] * n1 + [size2] * n2, dtype=np.int16)
+            order = rng.permutation(len(sizes))
+            for new_bn, b in enumerate(order, start=1):
+                size = int(sizes[b])
+                rand.append(_permuted_blocks(rng, 1, size)[0])
+                blocksize.append(np.full(size, size, dtype=np.int16))
+                bn.append(np.full(size, new_bn, dtype=np.int32))
+                block.append(np.full(size, new_bn, dtype=np.int32))
+                stratan.append(np.full(size, s + 1, dtype=np.int16))
+        cols = {
+            'stratan': np.concatenate(stratan), 'bn': np.concatenate(bn),
+            'block': np.concatenate(block), 'blocksize': np.concatenate(blocksize),
+            'rand': np.concatenate(rand),
+        }
+    else:
+        cols = fixed_block_plan(rng, n_groups, int(study.blocks_per_stratum), int(study.block_size))
+
+    cols['armcd'] = expanded[arm_slots(cols['rand'], cols['blocksize'], n_arm)].astype(np.int8)
+
+    offset = np.arange(len(cols['rand']), dtype=np.int64) + int(study.start_subject_number)
+    if study.num_gap and strata:
+        offset += (cols['stratan'].astype(np.int64) - 1) * int(study.num_gap)
+    cols['subjno'] = offset
+    return cols
+
+
+def generate_subject_list(study: StudyDesignConfig, seed: Optional[int] = None) -> RandList:
+    """
+    Generate the subject randomization list the emitted subject program builds.
+
+    Args:
+        study: 研究设计配置
+        seed: 覆盖 study.subject_seed 的随机种子
+
+    Returns:
+        RandList: kind='subject'，按 protocol_order/StrataN/catord/SubjNo 排序
+    """
+    if not study.treatment_arms:
+        raise ValueError("治疗组别配置不能为空")
+    seed, was_random = resolve_seed(study.subject_seed if seed is None else seed)
+    strata = subject_strata(study)
+
+    if study.multi_protocol and study.protocols:
+        protocols = [p.name for p in study.protocols]
+    else:
+        protocols = [SINGLE_PROTOCOL_NAME]
+
+    parts = []
+    for order, _name in enumerate(protocols, start=1):
+        cols = _m_rand(study, strata, seed)
+        cols['protocol'] = np.full(len(cols['rand']), order - 1, dtype=np.int16)
+        cols['protocol_order'] = np.full(len(cols['rand']), order, dtype=np.int16)
+        parts.append(cols)
+    cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+    # 确保有分层的情况下，区组号是唯一的
+    cols['bn'] = cols['bn'] + (cols['stratan'].astype(np.int32) - 1) * int(study.mirror_gap)
+    cols['catord'] = np.ones(len(cols['rand']), dtype=np.int8)
+
+    if study.mirror_replacement:
+        mirror = {k: v.copy() for k, v in cols.items()}
+        mirror['catord'][:] = 2
+        mirror['bn'] += int(study.mirror_gap)
+        cols = {k: np.concatenate([cols[k], mirror[k]]) for k in cols}
+
+    order = np.lexsort((cols['subjno'], cols['catord'], cols['stratan'],
+                        cols['protocol'], cols['protocol_order']))
+    cols = {k: v[order] for k, v in cols.items()}
+    cols['strata'] = (cols['stratan'] - 1) if strata else np.zeros(len(order), dtype=np.int16)
+    cols['arm'] = cols['armcd'].copy()
+    cols['seq'] = np.arange(1, len(order) + 1, dtype=np.int64)
+
+    return RandList(
+        kind=SUBJECT,
+        columns=cols,
+        dictionaries={
+            'protocol': protocols,
+            'strata': strata or [''],
+            'armcd': [a.armcd for a in study.treatment_arms],
+            'arm': [a.name for a in study.treatment_arms],
+        },
+        number=NumberSpec(prefix=study.subject_number_prefix or '', width=subject_number_width(study)),
+        meta={
+            'study_id': study.study_id,
+            'protocol_title': study.protocol_title,
+            'seed': seed,
+            'seed_was_random': was_random,
+            'config_hash': config_hash(study),
+        },
+    )
@@ -0,0 +1,182 @@
+"""紧凑列式盲底文件 (.rgl)
+
+原生引擎输出的 RandList 按列写入 binfile 容器：整数列以最窄可容纳的定长
+dtype 保存，字典编码列只存代码，随机号/药物编号存整数 + 前缀/宽度规格。
+常量列、分段等差列（如 seq、按区组重复的 bn、按 num_gap 跳号的随机号）以及
+与其他列相同的列只在 JSON 头中记录规则，不占数据空间。JSON 头同时记录生成配置的哈希。
+
+读取时 mmap 映射文件，存储列直接是零拷贝数组视图，无需解析。
+"""
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .binfile import MappedContainer, read_header, write_container
+from .rand_list import NumberSpec, RandList
+
+MAGIC = b'RGLIST01'
+LIST_SUFFIX = '.rgl'
+FORMAT_VERSION = 1
+
+_INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def _narrow_dtype(values: np.ndarray) -> np.dtype:
+    """Smallest signed integer dtype holding every value (non-integer columns are kept)."""
+    if values.dtype.kind not in 'iu' or not len(values):
+        return values.dtype
+    lo, hi = int(values.min()), int(values.max())
+    for dtype in _INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return values.dtype
+
+
+# Columns needing more segments than this are stored as plain arrays
+MAX_SEGMENTS = 64
+
+
+def _affine_segments(values: np.ndarray) -> Optional[list]:
+    """
+    Split a column into segments where value[i] = start + ((i - row) // repeat) * step.
+    This covers constants, plain ranges (seq), per-block numbering repeated
+    block-size times (bn) and numbering that jumps by num_gap at each stratum.
+
+    Returns:
+        [[row, start, step, repeat], ...] or None when the column is not piecewise affine
+    """
+    n = len(values)
+    if n == 0 or values.dtype.kind not in 'iu':
+        return None
+    segments = []
+    row = 0
+    while row < n:
+        if len(segments) == MAX_SEGMENTS:
+            return None
+        rest = values[row:]
+        start = int(rest[0])
+        changed = np.flatnonzero(rest != start)
+        if not len(changed):
+            segments.append([row, start, 0, 1])
+            break
+        repeat = int(changed[0])
+        step = int(rest[repeat]) - start
+        expected = start + (np.arange(len(rest), dtype=np.int64) // repeat) * step
+        mismatch = np.flatnonzero(rest != expected)
+        if len(mismatch):
+            # A segment ends at the first mismatch, rounded down to a whole repeat
+            length = max(int(mismatch[0]) // repeat * repeat, repeat)
+        else:
+            length = len(rest)
+        segments.append([row, start, step, repeat])
+        row += length
+    return segments
+
+
+def _encode_columns(columns: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    specs: Dict[str, Any] = {}
+    stored: Dict[str, np.ndarray] = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        spec: Dict[str, Any] = {'dtype': values.dtype.str}
+        alias = next((other for other in specs
+                      if specs[other]['encoding'] != 'alias'
+                      and np.array_equal(columns[other], values)), None)
+        segments = None if alias else _affine_segments(values)
+        if alias:
+            spec.update(encoding='alias', of=alias)
+        elif segments:
+            spec.update(encoding='affine', segments=segments)
+        else:
+            storage = _narrow_dtype(values)
+            spec.update(encoding='plain', storage=storage.str)
+            stored[name] = values.astype(storage, copy=False)
+        specs[name] = spec
+    return specs, stored
+
+
+def save_list(rand_list: RandList, path: str, config_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write ``rand_list`` to a columnar .rgl file (atomically).
+
+    Args:
+        rand_list: 原生引擎或 CSV 解析得到的列表
+        path: 目标文件
+        config_hash: 生成配置的哈希，默认取 rand_list.meta['config_hash']
+
+    Returns:
+        dict: 文件头摘要（行数、各列编码、文件大小）
+    """
+    specs, stored = _encode_columns(rand_list.columns)
+    header = {
+        'format': FORMAT_VERSION,
+        'kind': rand_list.kind,
+        'rows': len(rand_list),
+        'number': vars(rand_list.number),
+        'dictionaries': rand_list.dictionaries,
+        'columns': specs,
+        'config_hash': config_hash or rand_list.meta.get('config_hash'),
+        'meta': {k: v for k, v in rand_list.meta.items() if isinstance(v, (str, int, float, bool))},
+    }
+    write_container(path, MAGIC, header, stored)
+    return {'rows': header['rows'], 'kind': header['kind'], 'config_hash': header['config_hash'],
+            'columns': {k: v['encoding'] for k, v in specs.items()}, 'size_bytes': os.path.getsize(path)}
+
+
+def read_list_header(path: str) -> Dict[str, Any]:
+    """Header only (kind, rows, config hash, column encodings) without mapping the data."""
+    return read_header(path, MAGIC)[0]
+
+
+def _affine_values(segments: list, rows: int, dtype: np.dtype) -> np.ndarray:
+    out = np.empty(rows, dtype=dtype)
+    bounds = [seg[0] for seg in segments[1:]] + [rows]
+    for (row, start, step, repeat), end in zip(segments, bounds):
+        length = end - row
+        if step == 0:
+            out[row:end] = start
+        elif repeat == 1:
+            out[row:end] = np.arange(start, start + length * step, step)
+        else:
+            blocks = -(-length // repeat)
+            out[row:end] = np.repeat(np.arange(start, start + blocks * step, step), repeat)[:length]
+    return out
+
+
+def _materialize(specs: Dict[str, Any], rows: int, stored: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    columns: Dict[str, np.ndarray] = {}
+    for name, spec in specs.items():
+        dtype = np.dtype(spec['dtype'])
+        if spec['encoding'] == 'plain':
+            values = stored[name]
+            columns[name] = values if values.dtype == dtype else values.astype(dtype)
+        elif spec['encoding'] == 'affine':
+            columns[name] = _affine_values(spec['segments'], rows, dtype)
+        else:
+            columns[name] = columns[spec['of']].astype(dtype, copy=False)
+    return columns
+
+
+def load_list(path: str) -> RandList:
+    """
+    Open a .rgl file as a RandList. Columns stored at their original dtype
+    are read-only views into the mapping; the rest are rebuilt from the header.
+    """
+    container = MappedContainer(path, MAGIC)
+    header = container.header
+    if header.get('format', 0) > FORMAT_VERSION:
+        container.close()
+        raise ValueError(f"不支持的盲底文件版本: {header.get('format')}")
+    meta = dict(header.get('meta', {}))
+    if header.get('config_hash'):
+        meta['config_hash'] = header['config_hash']
+    return RandList(
+        kind=header['kind'],
+        columns=_materialize(header['columns'], header['rows'], container.arrays),
+        dictionaries=header['dictionaries'],
+        number=NumberSpec(**header['number']),
+        meta=meta,
+    )
@@ -0,0 +1,196 @@
+"""原生药物盲底引擎（药物列表）
+
+按 drug_randomization.sas.j2 与 m_rpe_drug 的结构在 NumPy 中生成药物盲底：
+m_rand 对 drug_arms 按 block_layers × block_size 分层区组随机、drugsize/drugcds
+标签、二次随机（secRand/secRand_ 排序键）以及按 drug_batch_configs 累计数量
+分配批次。批次查找与取药顺序号均为整列向量化计算。
+与受试者引擎相同，随机数发生器与 SAS 不同，结果在结构上一致而非逐行相同。
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..core_refactored.schemas import DrugRandomizationConfig, StudyDesignConfig
+from ..utils.fingerprint import config_hash
+from .block import arm_slots, fixed_block_plan, resolve_seed
+from .rand_list import DRUG, NumberSpec, RandList
+
+# Strata values the driver leaves out of drugsize (upcase(Strata) not in (...))
+SUPPLY_STRATA = ('批次', '批号', 'BATCH')
+
+# secorder = secorder + 10000 * StrataN in _secrand1
+SECORDER_STRATUM_STEP = 10000
+
+
+def drug_strata(drc: DrugRandomizationConfig) -> List[str]:
+    """Strata as passed to m_rand: every level of every drug factor, in order."""
+    return [str(level) for factor in drc.stratification_factors for level in factor.levels]
+
+
+def drug_number_width(drc: DrugRandomizationConfig) -> int:
+    """Digit width of drugno: startNo is zero-padded to number_length only with a prefix."""
+    if drc.number_prefix:
+        return max(int(drc.number_length), len(str(drc.start_number)))
+    return len(str(drc.start_number))
+
+
+def drug_labels(drc: DrugRandomizationConfig, strata: List[str]) -> List[List[str]]:
+    """drugsize per [arm][stratum]: "<name> <spec>" followed by the stratum unless it is a supply stratum."""
+    labels = []
+    for arm in drc.drug_arms:
+        base = f"{arm.name} {arm.drug_spec or ''}"
+        labels.append([(base if level.upper() in SUPPLY_STRATA else base + level).rstrip()
+                       for level in (strata or [''])])
+    return labels
+
+
+def _secondary_plan(drc: DrugRandomizationConfig, stratan: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Rows of the _secrand data step: (StrataN, batch index, secorder).
+    Batch strata come from drug_config.batch_strata(); otherwise every m_rand
+    stratum repeats the row count of stratum 1, as the macro's count(*) does.
+    """
+    batch_strata = drc.batch_strata() if drc.has_complex_batch_logic() else []
+    if batch_strata:
+        totals = np.array([s.total for s in batch_strata], dtype=np.int64)
+        starts = np.cumsum(totals) - totals
+        strata = np.repeat(np.arange(1, len(batch_strata) + 1, dtype=np.int64), totals)
+        position = np.arange(1, len(strata) + 1, dtype=np.int64)
+        secorder = position - starts[strata - 1]
+        # One sorted threshold array for all strata: shift each stratum by its start,
+        # then the first threshold >= position is that row's batch (as in logic.sas.j2)
+        thresholds = np.concatenate([np.asarray(s.thresholds, dtype=np.int64) + start
+                                     for s, start in zip(batch_strata, starts)] or [np.zeros(0, np.int64)])
+        first_batch = np.cumsum([0] + [len(s.thresholds) for s in batch_strata])[:-1]
+        batch = np.searchsorted(thresholds, position, side='left') - first_batch[strata - 1]
+        return strata, batch, secorder
+    n_strata = int(stratan.max()) if len(stratan) else 0
+    per_stratum = int(np.count_nonzero(stratan == 1))
+    strata = np.repeat(np.arange(1, n_strata + 1, dtype=np.int64), per_stratum)
+    secorder = np.tile(np.arange(1, per_stratum + 1, dtype=np.int64), n_strata)
+    return strata, np.zeros(len(strata), dtype=np.int64), secorder
+
+
+def _secondary_randomization(drc: DrugRandomizationConfig, rng: np.random.Generator,
+                             stratan: np.ndarray, drugno: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    m_rpe_drug with secRand=Y: kits numbered in (StrataN, batch, secRand)
+    order receive their batch and 取药顺序号, and seq is the rank in
+    (StrataN, batch, secRand_) order.
+
+    Returns (row order by seq, seq, secondary StrataN, batch index, secorder) per drug row.
+    """
+    strata, batch, secorder = _secondary_plan(drc, stratan)
+    draws = rng.random((len(strata), 2))  # secRand, secRand_ drawn in pairs as in the data step
+
+    numbered = np.empty(len(strata), dtype=np.int64)
+    numbered[np.lexsort((draws[:, 0], batch, strata))] = np.arange(len(strata))
+    numbered += int(drc.start_number)
+    if drc.stratification_factors:
+        numbered += (strata - 1) * int(drc.num_gap)
+        secorder = secorder + SECORDER_STRATUM_STEP * strata
+
+    # merge ... by drugno; secondary rows without a kit are dropped
+    slot = np.minimum(np.searchsorted(drugno, numbered), len(drugno) - 1)
+    matched = drugno[slot] == numbered
+    row_of = np.full(len(drugno), -1, dtype=np.int64)
+    row_of[slot[matched]] = np.flatnonzero(matched)
+    missing = int(np.count_nonzero(row_of < 0))
+    if missing:
+        raise ValueError(f"二次随机（批次）总量与药物数量不一致：{missing} 个药物编号没有取药顺序号")
+
+    strata, batch, secorder = strata[row_of], batch[row_of], secorder[row_of]
+    order = np.lexsort((draws[row_of, 1], batch, strata))
+    seq = np.empty(len(drugno), dtype=np.int64)
+    seq[order] = np.arange(1, len(drugno) + 1)
+    return order, seq, strata, batch, secorder
+
+
+def _batch_codes(drc: DrugRandomizationConfig, strata: np.ndarray,
+                 batch: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary-encode batch numbers per kit; code 0 ('') marks kits without a batch."""
+    table = {'': 0}
+    lookup = [np.zeros(1, dtype=np.int16)]  # secondary stratum 0 is unused
+    for stratum in drc.batch_strata() if drc.has_complex_batch_logic() else []:
+        lookup.append(np.asarray([table.setdefault(b, len(table)) for b in stratum.batch_nos] or [0],
+                                 dtype=np.int16))
+    if len(lookup) == 1:
+        return np.zeros(len(batch), dtype=np.int16), ['']
+    offsets = np.cumsum([0] + [len(codes) for codes in lookup])[:-1]
+    return np.concatenate(lookup)[offsets[strata] + batch], list(table)
+
+
+def generate_drug_list(study: StudyDesignConfig, seed: Optional[int] = None) -> RandList:
+    """
+    Generate the drug blind list the emitted drug program delivers.
+
+    Args:
+        study: 研究设计配置（使用 drug_randomization_config 与 drug_seed）
+        seed: 覆盖 study.drug_seed 的随机种子
+
+    Returns:
+        RandList: kind='drug'；二次随机时按 seq（取药顺序）排序，否则按药物编号排序
+    """
+    drc = study.drug_randomization_config
+    if drc is None or not drc.enabled:
+        raise ValueError("配置中没有启用药物随机化")
+    if not drc.drug_arms:
+        raise ValueError("药物组别配置不能为空")
+    seed, was_random = resolve_seed(study.drug_seed if seed is None else seed)
+    strata = drug_strata(drc)
+    n_groups = max(len(strata), 1)
+    n_arms = len(drc.drug_arms)
+
+    rng = np.random.default_rng(seed)
+    cols = fixed_block_plan(rng, n_groups, int(drc.block_layers), int(drc.block_size))
+    n = len(cols['rand'])
+    # The drug driver passes arm codes without ratio expansion
+    arm = arm_slots(cols['rand'], cols['blocksize'], n_arms).astype(np.int8)
+    stratum = cols['stratan'].astype(np.int64) - 1
+
+    drugno = np.arange(n, dtype=np.int64) + int(drc.start_number)
+    if drc.num_gap and strata:
+        drugno += stratum * int(drc.num_gap)
+
+    label_table = {}
+    label_codes = np.asarray([[label_table.setdefault(label, len(label_table)) for label in row]
+                              for row in drug_labels(drc, strata)], dtype=np.int16)
+    cols['drugcd'] = arm
+    cols['drug'] = arm.copy()
+    cols['drugsize'] = label_codes[arm, stratum]
+    cols['strata'] = stratum.astype(np.int16) if strata else np.zeros(n, dtype=np.int16)
+    cols['drugno'] = drugno
+
+    dictionaries = {
+        'drugcd': [a.code for a in drc.drug_arms],
+        'drug': [a.name for a in drc.drug_arms],
+        'drugsize': list(label_table),
+        'strata': strata or [''],
+        'batch': [''],
+    }
+    if drc.sec_rand_enabled:
+        order, seq, sec_strata, batch, secorder = _secondary_randomization(drc, rng, cols['stratan'], drugno)
+        cols['batch'], dictionaries['batch'] = _batch_codes(drc, sec_strata, batch)
+        cols['secorder'] = secorder
+        cols['seq'] = seq
+        cols = {k: v[order] for k, v in cols.items()}
+    else:
+        cols['seq'] = np.arange(1, n + 1, dtype=np.int64)
+        cols['secorder'] = cols['seq'].copy()
+        cols['batch'] = np.zeros(n, dtype=np.int16)
+
+    return RandList(
+        kind=DRUG,
+        columns=cols,
+        dictionaries=dictionaries,
+        number=NumberSpec(prefix=drc.number_prefix or '', width=drug_number_width(drc), replacement_suffix=''),
+        meta={
+            'study_id': study.study_id,
+            'protocol_title': study.protocol_title,
+            'seed': seed,
+            'seed_was_random': was_random,
+            'sec_rand': bool(drc.sec_rand_enabled),
+            'config_hash': config_hash(study),
+        },
+    )
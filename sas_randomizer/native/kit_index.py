@@ -0,0 +1,143 @@
+"""药物编号 / 随机号紧急揭盲索引
+
+由生成的列表构建紧凑的二进制索引（.rgx）：排序后的整数键、按类别编码的组别、
+分层与批次列，以及字符串表。打开时通过 mmap 映射，查找为对排序键的二分查找，
+只触及 O(log n) 个页面，无需载入整个 CSV。
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .binfile import MappedContainer, write_container
+from .rand_list import CATEGORY_LABELS, DRUG, SUBJECT, NumberSpec, RandList
+
+MAGIC = b'RGKIDX01'
+INDEX_SUFFIX = '.rgx'
+
+
+def default_index_path(list_path: str) -> str:
+    """Index location next to a delivered list: DEMO_Drug_List.csv -> DEMO_Drug_List.rgx"""
+    return os.path.splitext(list_path)[0] + INDEX_SUFFIX
+
+
+def _keys(rand_list: RandList) -> np.ndarray:
+    numbers = rand_list.columns[rand_list.number_column].astype(np.int64)
+    if rand_list.kind == SUBJECT and 'catord' in rand_list.columns:
+        # Replacement numbers share digits with their originals: keep them apart
+        return numbers * 2 + (rand_list.columns['catord'] == 2)
+    return numbers * 2
+
+
+def build_index(rand_list: RandList, path: str) -> Dict[str, Any]:
+    """
+    Build and atomically write an index for ``rand_list``.
+
+    Returns:
+        dict: 索引头信息（行数、类型等）
+    """
+    cols = rand_list.columns
+    n = len(rand_list)
+    keys = _keys(rand_list)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    if n > 1 and np.any(keys[1:] == keys[:-1]):
+        raise ValueError("列表中存在重复编号，无法建立索引")
+
+    zeros = np.zeros(n, dtype=np.int64)
+    if rand_list.kind == SUBJECT:
+        arm, arm_table = cols['armcd'], rand_list.dictionaries.get('armcd', [])
+        label, label_table = cols.get('arm', cols['armcd']), rand_list.dictionaries.get('arm', [])
+    else:
+        arm, arm_table = cols['drugcd'], rand_list.dictionaries.get('drugcd', [])
+        label, label_table = cols.get('drugsize', cols['drugcd']), rand_list.dictionaries.get('drugsize', [])
+
+    arrays = {
+        'keys': keys,
+        'seq': cols['seq'][order].astype(np.int64),
+        'arm': arm[order].astype(np.uint8),
+        'label': label[order].astype(np.uint16),
+        'stratum': cols.get('strata', zeros)[order].astype(np.uint16),
+        'batch': cols.get('batch', zeros)[order].astype(np.uint16),
+        'bn': cols.get('bn', zeros)[order].astype(np.int32),
+    }
+    header = {
+        'kind': rand_list.kind,
+        'rows': n,
+        'number': vars(rand_list.number),
+        'tables': {
+            'arm': list(arm_table),
+            'label': list(label_table),
+            'stratum': list(rand_list.dictionaries.get('strata', [''])),
+            'batch': list(rand_list.dictionaries.get('batch', [''])),
+        },
+        'meta': {k: v for k, v in rand_list.meta.items() if isinstance(v, (str, int, float, bool))},
+    }
+    write_container(path, MAGIC, header, arrays)
+    return {k: header[k] for k in ('kind', 'rows', 'meta')}
+
+
+class KitIndex:
+    """
+    Read-only view of an index file. Opening maps the file without reading
+    the arrays; each lookup is a binary search over the sorted key column.
+    """
+
+    def __init__(self, path: str):
+        self._container = MappedContainer(path, MAGIC)
+        header = self._container.header
+        self.path = path
+        self.kind: str = header['kind']
+        self.rows: int = header['rows']
+        self.number = NumberSpec(**header['number'])
+        self.tables: Dict[str, List[str]] = header['tables']
+        self.meta: Dict[str, Any] = header['meta']
+        self._arrays = self._container.arrays
+
+    def close(self):
+        self._arrays = {}
+        self._container.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @staticmethod
+    def _label(table: List[str], code: int) -> str:
+        return table[code] if code < len(table) else ''
+
+    def lookup(self, number: str) -> Optional[Dict[str, Any]]:
+        """Resolve one delivered number (e.g. 'D0123' or 'R0001S'); None if absent."""
+        try:
+            value, replacement = self.number.parse(number)
+        except ValueError:
+            return None
+        key = value * 2 + (1 if replacement and self.kind == SUBJECT else 0)
+        keys = self._arrays['keys']
+        i = int(np.searchsorted(keys, key))
+        if i >= len(keys) or int(keys[i]) != key:
+            return None
+        arrays = self._arrays
+        result = {
+            'number': self.number.format_one(value, replacement and self.kind == SUBJECT),
+            'kind': self.kind,
+            'seq': int(arrays['seq'][i]),
+            'arm_code': self._label(self.tables['arm'], int(arrays['arm'][i])),
+            'arm': self._label(self.tables['label'], int(arrays['label'][i])),
+            'stratum': self._label(self.tables['stratum'], int(arrays['stratum'][i])),
+            'bn': int(arrays['bn'][i]),
+        }
+        if self.kind == SUBJECT:
+            result['category'] = CATEGORY_LABELS[2 if replacement else 1]
+        if self.kind == DRUG:
+            result['batch'] = self._label(self.tables['batch'], int(arrays['batch'][i]))
+        return result
+
+    def lookup_many(self, numbers: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return [self.lookup(n) for n in numbers]
@@ -0,0 +1,125 @@
+"""供应商 CSV 版式定义
+
+与 m_rpe / m_rpe_drug 中 PUT 语句一一对应：表头行、是否输出"项目名称/项目代码"
+两行前导、以及数据行按顺序输出的 SAS 变量。原生写出器与解析器共用这些定义。
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+from .rand_list import DRUG, SUBJECT
+
+SUPPLIER_A = '供应商A'
+SUPPLIER_B6 = '供应商B 6.X'
+SUPPLIER_B5 = '供应商B 5.X'
+SUPPLIER_B_LITE = '供应商B Lite'
+SUPPLIERS = (SUPPLIER_A, SUPPLIER_B6, SUPPLIER_B5, SUPPLIER_B_LITE)
+
+
+@dataclass(frozen=True)
+class Layout:
+    """One supplier export layout."""
+    supplier: str
+    kind: str
+    header: str
+    fields: Tuple[str, ...]
+    preamble: bool = False
+    sec_rand: bool = False
+    # Sheet name used by the ODS EXCEL export (供应商B 5.X only)
+    sheet_name: Optional[str] = None
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(self.header.split(','))
+
+
+_SUBJECT_A = Layout(
+    supplier=SUPPLIER_A, kind=SUBJECT, preamble=True,
+    header='序号,子方案,随机号,分层因素,区组,区组编号,中心编号,分组代码,分组名称,随机次数,替换序号,号码类别',
+    fields=('seq', 'protocol', 'subjno', 'strata', 'bn', 'rand', 'site', 'group', 'arm',
+            'randcount', 'Subsnumber', 'category'),
+)
+
+SUBJECT_LAYOUTS = {
+    SUPPLIER_A: _SUBJECT_A,
+    SUPPLIER_B6: Layout(
+        supplier=SUPPLIER_B6, kind=SUBJECT,
+        header='*Sequence Number,Strata Code,*Block Number,*Arm Code,*Rand Number in Block,'
+               '*Cohort OID,*Randomization Number,*Type,Parent Randomization Number',
+        fields=('seq', 'strata', 'bn', 'group', 'rand', 'CO', 'subjno', 'Type', 'PRN'),
+    ),
+    SUPPLIER_B5: Layout(
+        supplier=SUPPLIER_B5, kind=SUBJECT, sheet_name='Randomization',
+        header='分层因子代码(Strata Coding),区组编号(Block No.),治疗分组(Treatment Arm),'
+               '区组内随机数(Block Random No.),随机编号(Random No.),替换编号1(Replace Random No. 1),'
+               '替换编号2(Replace Random No. 2),标记(Remarks),描述(Description)',
+        fields=('strata', 'bn', 'group', 'rand', 'subjno', 'RR1', 'RR2', 'RE', 'Des'),
+    ),
+    SUPPLIER_B_LITE: Layout(
+        supplier=SUPPLIER_B_LITE, kind=SUBJECT,
+        header='*分层 Strata,*区组编号 Block No.,*分组 Treatment Arm,*区组内随机数 Rand in Block,'
+               '*随机编号 Random No.,父随机编号Parent Random NO.,类型 Type',
+        fields=('strata', 'bn', 'group', 'rand', 'subjno', 'PRN', 'Type'),
+    ),
+}
+
+_DRUG_B6_HEADER = ('*Sequence Number,Package Number,*Kit Number,*Material Name,*Random Number,'
+                   'Verification Code,Site Number,Lot Number')
+_DRUG_B6_FIELDS = ('seq', 'pn', 'drugno', 'drugsize', 'secorder', 'VC', 'SN', 'LN')
+_DRUG_B5_HEADER = ('药物编码(Kit No.),药物类型(Drug Code),中心编号(Site No.),批次号(Lot No.),'
+                   '过期日期(Expiration Date),随机数(Random No),序列号(Sequence No),'
+                   '药物描述(Drug Description),区组编号(Block No),区组内随机数(Block Random No.),'
+                   'Attribute1,Attribute2,Attribute3')
+_DRUG_B5_FIELDS = ('drugno', 'drugsize', 'SN', 'LN', 'expdate', 'secorder', 'seq', 'DD',
+                   'bn', 'rand', 'attr1', 'attr2', 'attr3')
+
+DRUG_LAYOUTS = {
+    (SUPPLIER_A, False): Layout(
+        supplier=SUPPLIER_A, kind=DRUG, preamble=True,
+        header='序号,治疗物品编号,治疗物品代码,治疗物品名称,子规格,症型',
+        fields=('seq', 'drugno', 'drugcds', 'drugsize', 'size', 'symptons'),
+    ),
+    (SUPPLIER_A, True): Layout(
+        supplier=SUPPLIER_A, kind=DRUG, preamble=True, sec_rand=True,
+        header='序号,治疗物品编号,治疗物品代码,治疗物品名称,子规格,症型,取药顺序号',
+        fields=('seq', 'drugno', 'drugcds', 'drugsize', 'size', 'symptons', 'secorder'),
+    ),
+    (SUPPLIER_B6, False): Layout(supplier=SUPPLIER_B6, kind=DRUG, header=_DRUG_B6_HEADER,
+                                 fields=_DRUG_B6_FIELDS),
+    (SUPPLIER_B6, True): Layout(supplier=SUPPLIER_B6, kind=DRUG, header=_DRUG_B6_HEADER,
+                                fields=_DRUG_B6_FIELDS, sec_rand=True),
+    (SUPPLIER_B5, False): Layout(supplier=SUPPLIER_B5, kind=DRUG, header=_DRUG_B5_HEADER,
+                                 fields=_DRUG_B5_FIELDS, sheet_name='KIT LIST'),
+    (SUPPLIER_B5, True): Layout(supplier=SUPPLIER_B5, kind=DRUG, header=_DRUG_B5_HEADER,
+                                fields=_DRUG_B5_FIELDS, sheet_name='KIT LIST', sec_rand=True),
+}
+
+
+def get_layout(kind: str, supplier: str, sec_rand: bool = False) -> Layout:
+    """
+    Layout written for ``supplier``. Unknown suppliers (and 供应商B Lite for
+    drug lists) fall through to the 供应商A branch, as in the macros' %else.
+    """
+    if kind == SUBJECT:
+        return SUBJECT_LAYOUTS.get(supplier, _SUBJECT_A)
+    if kind == DRUG:
+        return DRUG_LAYOUTS.get((supplier, bool(sec_rand)), DRUG_LAYOUTS[(SUPPLIER_A, bool(sec_rand))])
+    raise ValueError(f"未知的列表类型: {kind}")
+
+
+def detect_layout(lines: Iterable[str]) -> Tuple[Layout, int]:
+    """
+    Identify the layout from the first lines of a delivered CSV.
+
+    Returns:
+        (Layout, header_line_index)
+    """
+    candidates = list(SUBJECT_LAYOUTS.values()) + list(DRUG_LAYOUTS.values())
+    for i, line in enumerate(lines):
+        line = line.lstrip('﻿').rstrip('\r\n')
+        for layout in candidates:
+            if line == layout.header:
+                return layout, i
+        if i >= 3:
+            break
+    raise ValueError("无法识别的供应商CSV版式")
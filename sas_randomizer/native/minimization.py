@@ -0,0 +1,239 @@
+"""Pocock–Simon 最小化动态随机引擎
+
+按 (分层因素水平 × 组别) 维护边际计数，每次分配只读取受试者所在的 F 个水平行，
+单次分配代价为 O(因素数 × 组别数)。计数保存在紧凑的 int32 数组中，
+快照/恢复仅需复制该数组与随机数发生器状态。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from ..core_refactored.schemas import StudyDesignConfig
+
+METHODS = ('range', 'variance')
+
+
+@dataclass
+class MinimizationState:
+    """A cheap, restorable snapshot of a MinimizationEngine."""
+    counts: np.ndarray
+    n_allocated: int
+    rng_state: Dict[str, Any]
+
+
+class MinimizationEngine:
+    """
+    Pocock–Simon minimization over marginal counts.
+
+    Counts are stored as a single (total_levels, n_arms) int32 array; each
+    factor owns a contiguous slice of rows starting at ``offsets[f]``.
+    Imbalance is measured on ratio-adjusted counts (count / ratio), so unequal
+    allocation ratios are honoured. The arm(s) with the lowest weighted
+    imbalance are chosen with probability ``p_best``; otherwise a random
+    non-minimizing arm is assigned.
+    """
+
+    def __init__(
+        self,
+        factors: Sequence[str],
+        levels: Mapping[str, Sequence[str]],
+        arms: Sequence[str],
+        ratios: Optional[Sequence[int]] = None,
+        weights: Optional[Union[Mapping[str, float], Sequence[float]]] = None,
+        p_best: float = 0.8,
+        method: str = 'range',
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            factors: 分层因素名称（顺序即受试者水平向量的顺序）
+            levels: 每个因素的水平列表
+            arms: 组别代码 (armcd)
+            ratios: 组别分配比例，默认等比例
+            weights: 因素权重（按名称或按顺序），默认均为 1
+            p_best: 分配给最小不平衡组的概率 (0, 1]
+            method: 不平衡度量，'range' 或 'variance'
+            seed: 随机种子
+        """
+        if not arms:
+            raise ValueError("治疗组别配置不能为空")
+        if method not in METHODS:
+            raise ValueError(f"不支持的不平衡度量: {method}")
+        if not 0.0 < p_best <= 1.0:
+            raise ValueError("p_best 必须在 (0, 1] 区间内")
+
+        self.factors: List[str] = list(factors)
+        self.arms: List[str] = [str(a) for a in arms]
+        self.method = method
+        self.p_best = float(p_best)
+
+        ratios = list(ratios) if ratios is not None else [1] * len(self.arms)
+        if len(ratios) != len(self.arms) or any(int(r) <= 0 for r in ratios):
+            raise ValueError("组别比例必须为与组别一一对应的正整数")
+        self.inv_ratio = 1.0 / np.asarray(ratios, dtype=np.float64)
+
+        # Level lookup tables: factor -> {level: global row}
+        self._level_rows: List[Dict[str, int]] = []
+        offsets = []
+        total = 0
+        for factor in self.factors:
+            if factor not in levels or not levels[factor]:
+                raise ValueError(f"分层因子'{factor}'缺少对应的水平定义")
+            offsets.append(total)
+            self._level_rows.append({str(lvl): total + i for i, lvl in enumerate(levels[factor])})
+            total += len(levels[factor])
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+        if weights is None:
+            w = [1.0] * len(self.factors)
+        elif isinstance(weights, Mapping):
+            w = [float(weights.get(f, 1.0)) for f in self.factors]
+        else:
+            w = [float(x) for x in weights]
+        if len(w) != len(self.factors):
+            raise ValueError("因素权重数量必须与分层因素数量一致")
+        self.weights = np.asarray(w, dtype=np.float64)
+
+        self.counts = np.zeros((total, len(self.arms)), dtype=np.int32)
+        self.n_allocated = 0
+        self.rng = np.random.default_rng(seed)
+        self._arm_index = np.arange(len(self.arms))
+
+    @classmethod
+    def from_study_design(cls, study: StudyDesignConfig, **kwargs) -> 'MinimizationEngine':
+        """Build an engine from the subject-level factors and arms of a study."""
+        return cls(
+            factors=study.stratification_factors,
+            levels=study.strata_levels,
+            arms=[arm.armcd for arm in study.treatment_arms],
+            ratios=[arm.ratio for arm in study.treatment_arms],
+            **kwargs,
+        )
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+    def encode(self, profile: Union[Mapping[str, str], Sequence[str]]) -> np.ndarray:
+        """Translate a subject's factor levels into global count rows."""
+        if isinstance(profile, Mapping):
+            values = [profile.get(f) for f in self.factors]
+        else:
+            values = list(profile)
+        if len(values) != len(self.factors):
+            raise ValueError("受试者分层水平数量与分层因素数量不一致")
+        rows = np.empty(len(self.factors), dtype=np.int64)
+        for i, (factor, value) in enumerate(zip(self.factors, values)):
+            try:
+                rows[i] = self._level_rows[i][str(value)]
+            except KeyError:
+                raise ValueError(f"分层因子'{factor}'不存在水平'{value}'") from None
+        return rows
+
+    def encode_many(self, level_indices: np.ndarray) -> np.ndarray:
+        """Vectorised encoding of an (n, F) array of per-factor level indices."""
+        return np.asarray(level_indices, dtype=np.int64) + self.offsets
+
+    # ------------------------------------------------------------------
+    # Allocation
+    # ------------------------------------------------------------------
+    def imbalance(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Weighted imbalance that would result from assigning each arm.
+
+        Returns an array of length n_arms. Cost is O(F × A): the effect of
+        incrementing arm k is derived from the per-factor top-2 / bottom-2
+        (range) or running sums (variance) instead of recomputing per arm.
+        """
+        adj = self.counts[rows] * self.inv_ratio           # (F, A)
+        new = adj + self.inv_ratio                          # value of arm k if k is assigned
+        if self.method == 'variance':
+            n = adj.shape[1]
+            s = adj.sum(axis=1, keepdims=True) + self.inv_ratio
+            q = (adj * adj).sum(axis=1, keepdims=True) + 2.0 * adj * self.inv_ratio + self.inv_ratio ** 2
+            per_factor = q / n - (s / n) ** 2
+        else:
+            if adj.shape[1] == 1:
+                return np.zeros(1)
+            f_idx = np.arange(adj.shape[0])
+            hi = adj.argmax(axis=1)
+            lo = adj.argmin(axis=1)
+            max1 = adj[f_idx, hi]
+            min1 = adj[f_idx, lo]
+            masked = adj.copy()
+            masked[f_idx, hi] = -np.inf
+            max2 = masked.max(axis=1)
+            masked[f_idx, hi] = adj[f_idx, hi]
+            masked[f_idx, lo] = np.inf
+            min2 = masked.min(axis=1)
+            is_hi = self._arm_index == hi[:, None]
+            is_lo = self._arm_index == lo[:, None]
+            others_max = np.where(is_hi, max2[:, None], max1[:, None])
+            others_min = np.where(is_lo, min2[:, None], min1[:, None])
+            per_factor = np.maximum(new, others_max) - np.minimum(new, others_min)
+        return self.weights @ per_factor
+
+    def allocate_rows(self, rows: np.ndarray) -> int:
+        """Allocate one subject given encoded rows; returns the arm index."""
+        if len(rows):
+            scores = self.imbalance(rows)
+            best = np.flatnonzero(scores <= scores.min() + 1e-12)
+        else:
+            best = self._arm_index
+        if len(best) == len(self.arms) or self.rng.random() < self.p_best:
+            pool = best
+        else:
+            pool = np.setdiff1d(self._arm_index, best, assume_unique=True)
+        arm = int(pool[self.rng.integers(len(pool))]) if len(pool) > 1 else int(pool[0])
+        self.counts[rows, arm] += 1
+        self.n_allocated += 1
+        return arm
+
+    def allocate(self, profile: Union[Mapping[str, str], Sequence[str]]) -> str:
+        """Allocate one subject and return its armcd."""
+        return self.arms[self.allocate_rows(self.encode(profile))]
+
+    def simulate(self, level_indices: np.ndarray) -> np.ndarray:
+        """
+        Allocate a sequence of subjects.
+
+        Args:
+            level_indices: (n, F) 整数数组，每行为受试者在各因素上的水平序号
+
+        Returns:
+            np.ndarray: 长度为 n 的组别序号数组 (int8)
+        """
+        encoded = self.encode_many(level_indices)
+        out = np.empty(len(encoded), dtype=np.int8)
+        allocate = self.allocate_rows
+        for i in range(len(encoded)):
+            out[i] = allocate(encoded[i])
+        return out
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    def snapshot(self) -> MinimizationState:
+        return MinimizationState(
+            counts=self.counts.copy(),
+            n_allocated=self.n_allocated,
+            rng_state=self.rng.bit_generator.state,
+        )
+
+    def restore(self, state: MinimizationState) -> None:
+        if state.counts.shape != self.counts.shape:
+            raise ValueError("快照与当前引擎的因素/组别结构不一致")
+        np.copyto(self.counts, state.counts)
+        self.n_allocated = state.n_allocated
+        self.rng.bit_generator.state = state.rng_state
+
+    def marginal_counts(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Counts as {factor: {level: {armcd: n}}} for reporting."""
+        result: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for factor, rows in zip(self.factors, self._level_rows):
+            result[factor] = {
+                level: dict(zip(self.arms, self.counts[row].tolist()))
+                for level, row in rows.items()
+            }
+        return result
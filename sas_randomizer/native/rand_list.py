@@ -0,0 +1,164 @@
+"""列式随机化列表容器
+
+原生引擎生成的受试者列表与药物列表、以及从供应商 CSV 解析回来的列表，
+统一用 RandList 表示：整数列为定长 NumPy 数组，重复字符串列为字典编码
+(整数代码 + 字符串字典)，随机号/药物编号以整数 + 前缀/宽度规格保存。
+
+列名沿用 SAS 数据集中的变量名（小写）：
+    受试者: seq protocol protocol_order stratan strata bn blocksize block rand
+            subjno catord armcd arm
+    药物:   seq drugno drugcd drug drugcds drugsize stratan strata bn blocksize
+            block rand batch secorder
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SUBJECT = 'subject'
+DRUG = 'drug'
+KINDS = (SUBJECT, DRUG)
+
+# 号码类别 (catord)
+CATEGORY_LABELS = {1: '正式号', 2: '替换号'}
+
+# Which integer column carries the list's number, per kind
+NUMBER_COLUMN = {SUBJECT: 'subjno', DRUG: 'drugno'}
+
+
+@dataclass
+class NumberSpec:
+    """How an integer number column is rendered: prefix + zero-padded digits (+ suffix)."""
+    prefix: str = ''
+    width: int = 4
+    # Appended to replacement (catord=2) numbers, mirroring cats(SubjNo, 'S')
+    replacement_suffix: str = 'S'
+
+    def format(self, numbers: np.ndarray, catord: Optional[np.ndarray] = None) -> np.ndarray:
+        """Vectorised rendering of numbers to their delivered string form."""
+        digits = np.char.zfill(np.asarray(numbers).astype(np.int64).astype(str), self.width)
+        out = np.char.add(self.prefix, digits) if self.prefix else digits
+        if catord is not None and self.replacement_suffix:
+            out = np.where(np.asarray(catord) == 2, np.char.add(out, self.replacement_suffix), out)
+        return out
+
+    def format_one(self, number: int, replacement: bool = False) -> str:
+        text = f"{self.prefix}{int(number):0{self.width}d}"
+        return text + self.replacement_suffix if replacement else text
+
+    def parse(self, text: str) -> Tuple[int, bool]:
+        """Parse a delivered number string back to (integer, is_replacement)."""
+        text = text.strip()
+        replacement = bool(self.replacement_suffix) and text.upper().endswith(self.replacement_suffix.upper())
+        if replacement:
+            text = text[:-len(self.replacement_suffix)]
+        if self.prefix and text.startswith(self.prefix):
+            text = text[len(self.prefix):]
+        if not text.isdigit():
+            raise ValueError(f"无法解析编号: {text}")
+        return int(text), replacement
+
+    @classmethod
+    def infer(cls, sample: str) -> 'NumberSpec':
+        """Infer prefix/width from one delivered number such as 'R0001' or 'D0012'."""
+        sample = sample.strip()
+        if sample.upper().endswith('S') and len(sample) > 1 and sample[-2].isdigit():
+            sample = sample[:-1]
+        i = len(sample)
+        while i > 0 and sample[i - 1].isdigit():
+            i -= 1
+        if i == len(sample):
+            raise ValueError(f"无法解析编号: {sample}")
+        return cls(prefix=sample[:i], width=len(sample) - i)
+
+
+@dataclass
+class RandList:
+    """A generated or parsed randomization list held as columnar arrays."""
+    kind: str
+    columns: Dict[str, np.ndarray]
+    dictionaries: Dict[str, List[str]] = field(default_factory=dict)
+    number: NumberSpec = field(default_factory=NumberSpec)
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.kind not in KINDS:
+            raise ValueError(f"未知的列表类型: {self.kind}")
+        lengths = {len(v) for v in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("列表各列长度不一致")
+
+    def __len__(self) -> int:
+        for values in self.columns.values():
+            return len(values)
+        return 0
+
+    @property
+    def number_column(self) -> str:
+        return NUMBER_COLUMN[self.kind]
+
+    def has(self, name: str) -> bool:
+        return name in self.columns
+
+    def codes(self, name: str, value: str) -> int:
+        """Dictionary code of ``value`` in column ``name`` (ValueError if absent)."""
+        try:
+            return self.dictionaries[name].index(value)
+        except ValueError:
+            raise ValueError(f"列 {name} 中不存在取值 '{value}'") from None
+
+    def decode(self, name: str) -> np.ndarray:
+        """Column values as strings (dictionary-decoded if coded)."""
+        values = self.columns[name]
+        if name in self.dictionaries:
+            table = np.asarray(self.dictionaries[name] or [''], dtype=object)
+            return table[values]
+        return values.astype(str)
+
+    def number_strings(self) -> np.ndarray:
+        catord = self.columns.get('catord')
+        return self.number.format(self.columns[self.number_column], catord)
+
+    def take(self, index: np.ndarray) -> 'RandList':
+        return RandList(
+            kind=self.kind,
+            columns={k: v[index] for k, v in self.columns.items()},
+            dictionaries=self.dictionaries,
+            number=self.number,
+            meta=self.meta,
+        )
+
+    def chunks(self, size: int) -> Iterator['RandList']:
+        """Yield consecutive zero-copy slices of at most ``size`` rows."""
+        for start in range(0, len(self), size):
+            yield self.take(slice(start, start + size))
+
+    @classmethod
+    def concat(cls, parts: Sequence['RandList']) -> 'RandList':
+        """
+        Concatenate lists that share kind, number spec and dictionary codes.
+        Dictionaries are taken from the last part: chunked readers only ever
+        append to them, so the last one covers every earlier chunk.
+        """
+        if not parts:
+            raise ValueError("没有可合并的列表")
+        first = parts[0]
+        return cls(
+            kind=first.kind,
+            columns={k: np.concatenate([p.columns[k] for p in parts]) for k in first.columns},
+            dictionaries=parts[-1].dictionaries,
+            number=first.number,
+            meta=first.meta,
+        )
+
+
+def encode_strings(values: Sequence[str], dtype=np.int16,
+                   table: Optional[Dict[str, int]] = None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Dictionary-encode strings preserving first-appearance order. Passing the
+    same ``table`` across calls keeps codes stable between chunks.
+    """
+    table = {} if table is None else table
+    codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=dtype, count=len(values))
+    return codes, list(table)
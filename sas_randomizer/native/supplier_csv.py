@@ -0,0 +1,223 @@
+"""供应商 CSV 盲底读取
+
+将 m_rpe / m_rpe_drug 输出（或供应商返回）的 _Rand_List / _Drug_List CSV
+解析回 RandList，版式由表头自动识别。按块流式读取：每块是一个列式 RandList，
+字典编码在块之间共享，内存占用只与块大小有关，可处理数 GB 的文件。
+"""
+
+import csv
+import os
+from typing import IO, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from .layouts import SUPPLIER_B5, SUPPLIER_B_LITE, Layout, detect_layout
+from .rand_list import DRUG, SUBJECT, NumberSpec, RandList, encode_strings
+
+Source = Union[str, os.PathLike, IO[str]]
+
+CHUNK_ROWS = 65536
+# detect_layout looks at most this many lines for the header
+_HEADER_PROBE = 4
+
+
+def _open(source: Source) -> IO[str]:
+    if hasattr(source, 'read'):
+        return source
+    return open(source, 'r', encoding='utf-8-sig', newline='')
+
+
+def _to_int(values: List[str]) -> np.ndarray:
+    """Numeric SAS values; missing ('' or '.') become 0."""
+    return np.array([int(float(v)) if v not in ('', '.') else 0 for v in values], dtype=np.int64)
+
+
+class _ChunkDecoder:
+    """
+    Converts raw CSV rows to RandList chunks. Holds the state that must
+    persist across chunks: dictionary tables, the number spec and row offsets.
+    """
+
+    def __init__(self, layout: Layout, meta: dict, line_numbers: bool):
+        self.layout = layout
+        self.meta = meta
+        self.line_numbers = line_numbers
+        self.next_seq = 1
+        self.spec: Optional[NumberSpec] = None
+        self.tables: Dict[str, Dict[str, int]] = {}
+
+    def _encode(self, name: str, values: List[str], dtype=np.int16):
+        return encode_strings(values, dtype=dtype, table=self.tables.setdefault(name, {}))
+
+    def _parse_numbers(self, values: List[str], lines: np.ndarray):
+        spec = self.spec
+        numbers = np.empty(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            try:
+                numbers[i] = spec.parse(value)[0]
+            except ValueError as e:
+                raise ValueError(f"第 {int(lines[i])} 行: {e}") from None
+        return numbers
+
+    def decode(self, rows: List[List[str]], lines: List[int]) -> RandList:
+        lines = np.asarray(lines, dtype=np.int64)
+        raw: Dict[str, List[str]] = {
+            name: [r[i].strip() if i < len(r) else '' for r in rows]
+            for i, name in enumerate(self.layout.fields)
+        }
+        if self.layout.kind == SUBJECT:
+            rand_list = self._subject(raw, lines)
+        else:
+            rand_list = self._drug(raw, lines)
+        self.next_seq += len(rand_list)
+        return rand_list
+
+    def _subject(self, raw: Dict[str, List[str]], lines: np.ndarray) -> RandList:
+        numbers = raw['subjno']
+        if self.spec is None:
+            self.spec = NumberSpec.infer(numbers[0])
+        n_rows = len(numbers)
+
+        if self.layout.supplier == SUPPLIER_B5:
+            # Replacement numbers live in RR1 of their parent row: expand them back
+            replacements = [i for i, v in enumerate(raw['RR1']) if v]
+            for name in raw:
+                raw[name] = raw[name] + [raw[name][i] for i in replacements]
+            raw['subjno'] = raw['subjno'][:n_rows] + [raw['RR1'][i] for i in replacements]
+            lines = np.concatenate([lines, lines[replacements]])
+            catord = np.array([1] * n_rows + [2] * len(replacements), dtype=np.int8)
+        elif 'category' in raw:
+            catord = np.array([2 if c == '替换号' else 1 for c in raw['category']], dtype=np.int8)
+        elif 'Type' in raw:
+            replacement_type = '1' if self.layout.supplier == SUPPLIER_B_LITE else '2'
+            catord = np.array([2 if t == replacement_type else 1 for t in raw['Type']], dtype=np.int8)
+        else:
+            catord = np.ones(n_rows, dtype=np.int8)
+
+        n = len(raw['subjno'])
+        strata, strata_table = self._encode('strata', raw['strata'])
+        armcd, armcd_table = self._encode('armcd', raw['group'], dtype=np.int8)
+        if 'arm' in raw:
+            arm, arm_table = self._encode('arm', raw['arm'], dtype=np.int8)
+        else:
+            arm, arm_table = armcd.copy(), list(armcd_table)
+        protocol, protocol_table = self._encode('protocol', raw.get('protocol') or [''] * n)
+        columns = {
+            'seq': _to_int(raw['seq']) if 'seq' in raw else np.arange(self.next_seq, self.next_seq + n),
+            'protocol': protocol,
+            'protocol_order': (protocol + 1).astype(np.int16),
+            'stratan': (strata + 1).astype(np.int16),
+            'strata': strata,
+            'bn': _to_int(raw['bn']).astype(np.int32),
+            'rand': _to_int(raw['rand']).astype(np.int16),
+            'subjno': self._parse_numbers(raw['subjno'], lines),
+            'catord': catord,
+            'armcd': armcd,
+            'arm': arm,
+        }
+        if self.line_numbers:
+            columns['line'] = lines
+        return RandList(
+            kind=SUBJECT, columns=columns, number=self.spec, meta=self.meta,
+            dictionaries={'protocol': protocol_table, 'strata': strata_table,
+                          'armcd': armcd_table, 'arm': arm_table},
+        )
+
+    def _drug(self, raw: Dict[str, List[str]], lines: np.ndarray) -> RandList:
+        numbers = raw['drugno']
+        if self.spec is None:
+            self.spec = NumberSpec.infer(numbers[0])
+            self.spec.replacement_suffix = ''
+        n = len(numbers)
+        drugsize, drugsize_table = self._encode('drugsize', raw['drugsize'])
+        if 'drugcds' in raw:
+            drugcd, drugcd_table = self._encode('drugcd', raw['drugcds'], dtype=np.int8)
+        else:
+            drugcd, drugcd_table = drugsize.astype(np.int8), list(drugsize_table)
+        batch, batch_table = self._encode('batch', raw.get('LN') or [''] * n)
+        seq = _to_int(raw['seq']) if 'seq' in raw else np.arange(self.next_seq, self.next_seq + n)
+        columns = {
+            'seq': seq,
+            'drugno': self._parse_numbers(numbers, lines),
+            'drugcd': drugcd,
+            'drugsize': drugsize,
+            'batch': batch,
+            'secorder': _to_int(raw['secorder']) if 'secorder' in raw else seq.copy(),
+            'bn': _to_int(raw['bn']).astype(np.int32) if 'bn' in raw else np.zeros(n, dtype=np.int32),
+            'rand': _to_int(raw['rand']).astype(np.int16) if 'rand' in raw else np.zeros(n, dtype=np.int16),
+        }
+        if self.line_numbers:
+            columns['line'] = lines
+        return RandList(
+            kind=DRUG, columns=columns, number=self.spec, meta=self.meta,
+            dictionaries={'drugcd': drugcd_table, 'drugsize': drugsize_table, 'batch': batch_table},
+        )
+
+
+def iter_list_chunks(source: Source, chunk_rows: int = CHUNK_ROWS,
+                     line_numbers: bool = False) -> Iterator[RandList]:
+    """
+    Stream a delivered subject or drug list CSV as RandList chunks.
+
+    Args:
+        source: 文件路径或已打开的文本流 (UTF-8)
+        chunk_rows: 每块的 CSV 数据行数
+        line_numbers: 为 True 时每块附加 'line' 列（CSV 文件中的 1 起始行号，
+                      供应商B 5.X 展开的替换号沿用其父行行号）
+
+    Yields:
+        RandList: 同一文件的各块共享编号规格与字典编码
+    """
+    handle = _open(source)
+    try:
+        probe = []
+        for _ in range(_HEADER_PROBE):
+            line = handle.readline()
+            if not line:
+                break
+            probe.append(line)
+        layout, header_at = detect_layout(probe)
+        meta = {'supplier': layout.supplier}
+        if layout.preamble and header_at >= 2:
+            meta['protocol_title'] = probe[0].lstrip('﻿').rstrip('\r\n').split(',')[1]
+            meta['study_id'] = probe[1].rstrip('\r\n').split(',')[1]
+
+        decoder = _ChunkDecoder(layout, meta, line_numbers=line_numbers)
+        rows: List[List[str]] = []
+        lines: List[int] = []
+        # Lines already pulled past the header while probing, then the rest of the stream
+        reader = csv.reader(_chain(probe[header_at + 1:], handle))
+        for row in reader:
+            if not row:
+                continue
+            rows.append(row)
+            lines.append(header_at + 1 + reader.line_num)
+            if len(rows) >= chunk_rows:
+                yield decoder.decode(rows, lines)
+                rows, lines = [], []
+        if rows:
+            yield decoder.decode(rows, lines)
+    finally:
+        if handle is not source:
+            handle.close()
+
+
+def _chain(head: List[str], handle: IO[str]) -> Iterator[str]:
+    yield from head
+    yield from handle
+
+
+def read_list_csv(source: Source) -> RandList:
+    """
+    Read a delivered subject or drug list CSV.
+
+    Args:
+        source: 文件路径或已打开的文本流 (UTF-8)
+
+    Returns:
+        RandList: 列布局与原生引擎输出一致
+    """
+    parts = list(iter_list_chunks(source))
+    if not parts:
+        raise ValueError("CSV中没有随机号数据")
+    return RandList.concat(parts)
@@ -0,0 +1,591 @@
+"""交付盲底核对
+
+按生成盲底的 StudyDesignConfig 核对 SAS 输出或供应商返回的受试者 / 药物列表 CSV：
+编号范围与 num_gap 间隔、重复编号、各分层编号是否齐全、区组内组别比例、
+批次数量以及镜像 / 替换号配对。
+
+CSV 按块流式解析为列式数组，每项检查在块内向量化完成；跨块只保留按分层、
+区组汇总的状态和按编号索引的紧凑数组（大小由配置的编号范围决定，与文件大小无关），
+因此可以在有限内存内核对数 GB 的文件。发现的问题附带 CSV 行号。
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..core_refactored.schemas import BatchStratum, StudyDesignConfig
+from .block import subject_strata
+from .layouts import SUPPLIER_A
+from .rand_list import SUBJECT, RandList
+from .supplier_csv import CHUNK_ROWS, Source, iter_list_chunks
+
+NUMBER_RANGE = 'number_range'
+DUPLICATES = 'duplicates'
+COMPLETENESS = 'completeness'
+BLOCK_RATIO = 'block_ratio'
+BATCH_QUANTITY = 'batch_quantity'
+REPLACEMENT_PAIRING = 'replacement_pairing'
+CHECKS = (NUMBER_RANGE, DUPLICATES, COMPLETENESS, BLOCK_RATIO, BATCH_QUANTITY, REPLACEMENT_PAIRING)
+
+# Row references kept per issue; the count is always exact
+MAX_ROW_REFS = 20
+
+@dataclass
+class Issue:
+    """One kind of mismatch, with the CSV line numbers of the first rows involved."""
+    check: str
+    message: str
+    count: int = 0
+    rows: List[int] = field(default_factory=list)
+
+
+@dataclass
+class VerificationReport:
+    kind: str
+    supplier: str
+    rows: int
+    checks: Dict[str, str]
+    issues: List[Issue]
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def to_dict(self) -> dict:
+        return {'ok': self.ok, 'kind': self.kind, 'supplier': self.supplier, 'rows': self.rows,
+                'checks': self.checks, 'issues': [asdict(i) for i in self.issues]}
+
+
+class _Issues:
+    """Collects issues keyed by (check, message) so repeated mismatches aggregate."""
+
+    def __init__(self):
+        self._issues: Dict[Tuple[str, str], Issue] = {}
+
+    def add(self, check: str, message: str, lines: Iterable[int] = (), count: Optional[int] = None):
+        issue = self._issues.get((check, message))
+        if issue is None:
+            issue = self._issues[(check, message)] = Issue(check, message)
+        lines = [int(v) for v in lines]
+        issue.count += len(lines) if count is None else count
+        room = MAX_ROW_REFS - len(issue.rows)
+        if room > 0:
+            issue.rows.extend(lines[:room])
+
+    def failed(self) -> set:
+        return {check for check, _ in self._issues}
+
+    def all(self) -> List[Issue]:
+        return list(self._issues.values())
+
+
+def _batch_quantities(stratum: BatchStratum) -> List[int]:
+    """Kits per batch of a stratum, from the cumulative thresholds the generator emits."""
+    return [t - prev for prev, t in zip([0] + stratum.thresholds[:-1], stratum.thresholds)]
+
+
+def expected_arm_counts(block_size: int, n_slots: int) -> np.ndarray:
+    """
+    Rows per arm slot in a block: ``if rand <= BlockSize / Narm * i then arm i``
+    evaluated for rand = 1..BlockSize.
+    """
+    rand = np.arange(1, block_size + 1, dtype=np.int64)
+    slot = (rand * n_slots + block_size - 1) // block_size - 1
+    return np.bincount(np.clip(slot, 0, n_slots - 1), minlength=n_slots)
+
+
+class _Numbering:
+    """
+    Expected number ranges: subjno = _N_ + startNo - 1 + (StrataN - 1) * num_gap,
+    with _N_ running across strata (num_gap applies only when stratified).
+    """
+
+    def __init__(self, start: int, sizes: List[int], gap: int):
+        self.start = int(start)
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(self.sizes)[:-1]])
+        gap = int(gap) if len(sizes) > 1 else 0
+        self.lo = self.start + offsets + np.arange(len(sizes)) * gap
+        self.hi = self.lo + self.sizes - 1
+        self.span = int(self.hi[-1] - self.start + 1) if len(sizes) else 0
+
+    def stratum_of(self, numbers: np.ndarray) -> np.ndarray:
+        """Stratum index for each number, or -1 when it falls outside every range."""
+        i = np.searchsorted(self.lo, numbers, side='right') - 1
+        valid = (i >= 0) & (numbers <= self.hi[np.clip(i, 0, None)])
+        return np.where(valid, i, -1)
+
+
+class _NumberTracker:
+    """Dense per-number state (line of first occurrence, arm) for one number series."""
+
+    def __init__(self, span: int):
+        self.line = np.zeros(span, dtype=np.int32)
+        self.arm = np.full(span, -1, dtype=np.int8)
+
+    def record(self, offsets: np.ndarray, lines: np.ndarray, arms: np.ndarray) -> np.ndarray:
+        """Store rows; returns the mask of rows whose number was already present."""
+        dup = self.line[offsets] != 0
+        # Repeats within the chunk itself
+        order = np.argsort(offsets, kind='stable')
+        repeat = np.zeros(len(offsets), dtype=bool)
+        repeat[order[1:]] = offsets[order[1:]] == offsets[order[:-1]]
+        dup |= repeat
+        fresh = ~dup
+        self.line[offsets[fresh]] = lines[fresh]
+        self.arm[offsets[fresh]] = arms[fresh]
+        return dup
+
+
+class _BlockStream:
+    """
+    Block-level arm counts over a row stream where each block's rows are
+    contiguous. The trailing run of a chunk is carried into the next one.
+    """
+
+    def __init__(self, slot_arms: List[int], n_arms: int, allowed_sizes: Optional[set],
+                 issues: _Issues, label: str):
+        # Arm index behind each expanded arm slot (ratio expansion repeats arms)
+        self.slot_arms = np.asarray(slot_arms, dtype=np.int64)
+        self.n_arms = n_arms
+        self.allowed_sizes = allowed_sizes
+        self.issues = issues
+        self.label = label
+        self.carry: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self.expected: Dict[int, np.ndarray] = {}
+        self.blocks = 0
+
+    def feed(self, keys: np.ndarray, arms: np.ndarray, lines: np.ndarray):
+        if self.carry is not None:
+            keys = np.concatenate([self.carry[0], keys])
+            arms = np.concatenate([self.carry[1], arms])
+            lines = np.concatenate([self.carry[2], lines])
+        if not len(keys):
+            return
+        change = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        last = change[-1] if len(change) else 0
+        self.carry = (keys[last:], arms[last:], lines[last:])
+        if last:
+            self._check(keys[:last], arms[:last], lines[:last], np.concatenate([[0], change[:-1]]))
+
+    def finish(self):
+        if self.carry is not None and len(self.carry[0]):
+            self._check(*self.carry, np.array([0]))
+        self.carry = None
+
+    def _check(self, keys, arms, lines, starts):
+        ends = np.append(starts[1:], len(keys))
+        sizes = ends - starts
+        run = np.repeat(np.arange(len(starts)), sizes)
+        counts = np.zeros((len(starts), self.n_arms), dtype=np.int64)
+        np.add.at(counts, (run, arms), 1)
+        self.blocks += len(starts)
+        for size in np.unique(sizes):
+            size = int(size)
+            of_size = sizes == size
+            if self.allowed_sizes is not None and size not in self.allowed_sizes:
+                self.issues.add(BLOCK_RATIO, f"{self.label}区组大小 {size} 不在配置的区组大小中",
+                                lines[starts[of_size]])
+                continue
+            expected = self.expected.get(size)
+            if expected is None:
+                expected = self.expected[size] = self._expected(size)
+            bad = of_size & np.any(counts != expected, axis=1)
+            if bad.any():
+                self.issues.add(BLOCK_RATIO,
+                                f"{self.label}区组内组别数量与分配比例不符（区组大小 {size}，"
+                                f"期望 {expected.tolist()}）", lines[starts[bad]])
+
+    def _expected(self, size: int) -> np.ndarray:
+        per_slot = expected_arm_counts(size, len(self.slot_arms))
+        return np.bincount(self.slot_arms, weights=per_slot, minlength=self.n_arms).astype(np.int64)
+
+
+class ListVerifier:
+    """
+    Incremental verifier: feed RandList chunks (with a 'line' column) and call
+    :meth:`finish` for the report.
+    """
+
+    def __init__(self, study: StudyDesignConfig):
+        self.study = study
+        self.issues = _Issues()
+        self.kind: Optional[str] = None
+        self.supplier = ''
+        self.rows = 0
+        self.skipped: Dict[str, str] = {}
+
+    # ------------------------------------------------------------------
+    # Setup (on the first chunk, once the list kind is known)
+    # ------------------------------------------------------------------
+    def _setup(self, chunk: RandList):
+        self.kind = chunk.kind
+        self.supplier = chunk.meta.get('supplier', '')
+        if self.kind == SUBJECT:
+            self._setup_subject()
+        else:
+            self._setup_drug(chunk)
+
+    def _setup_subject(self):
+        study = self.study
+        if not study.treatment_arms:
+            raise ValueError("治疗组别配置不能为空")
+        self.strata = subject_strata(study)
+        if study.variable_block_enabled:
+            per_stratum = int(study.total_sample_size)
+            allowed = {int(s) for s in study.variable_block_sizes if s}
+        else:
+            per_stratum = int(study.blocks_per_stratum) * int(study.block_size)
+            allowed = {int(study.block_size)}
+        n_strata = max(len(self.strata), 1)
+        self.numbering = _Numbering(study.start_subject_number, [per_stratum] * n_strata,
+                                    study.num_gap if self.strata else 0)
+        self.arm_codes = [a.armcd for a in study.treatment_arms]
+        # armcd= is built with each arm repeated by its ratio
+        slots = [i for i, a in enumerate(study.treatment_arms) for _ in range(max(int(a.ratio), 1))]
+        self.trackers: Dict[Tuple[int, int], _NumberTracker] = {}
+        self.counts: Dict[Tuple[int, int], np.ndarray] = {}
+        self.blocks: Dict[int, _BlockStream] = {}
+        for catord, label in ((1, ''), (2, '替换号')):
+            self.blocks[catord] = _BlockStream(slots, len(self.arm_codes), allowed, self.issues, label)
+        self.skipped[BATCH_QUANTITY] = '受试者列表无批次'
+        self.protocol_names: List[str] = []
+
+    def _setup_drug(self, chunk: RandList):
+        drc = self.study.drug_randomization_config
+        if drc is None or not drc.drug_arms:
+            raise ValueError("配置中没有药物随机化设置，无法核对药物列表")
+        self.drc = drc
+        levels = [str(level) for f in drc.stratification_factors for level in f.levels]
+        # Same strata, order and thresholds as the generated program (schemas.batch_strata)
+        self.batch_strata: List[BatchStratum] = drc.batch_strata()
+        per_stratum = int(drc.block_layers) * int(drc.block_size)
+        n_strata = max(len(levels), 1)
+        self.numbering = _Numbering(drc.start_number, [per_stratum] * n_strata, drc.num_gap if levels else 0)
+        self.arm_codes = [a.code for a in drc.drug_arms]
+        # The drug driver passes arm codes without ratio expansion
+        n_arms = len(self.arm_codes)
+        self.blocks = {1: _BlockStream(list(range(n_arms)), n_arms, {int(drc.block_size)}, self.issues, '')}
+        self.trackers = {}
+        self.counts = {}
+        self.batch_counts: Dict[Tuple[int, int], int] = {}
+        self.lot_counts: Dict[str, int] = {}
+        self.arm_labels = sorted(
+            ((f"{a.name} {a.drug_spec or ''}".rstrip(), i) for i, a in enumerate(drc.drug_arms)),
+            key=lambda item: -len(item[0]),
+        )
+        self.secorder_batches = (bool(drc.sec_rand_enabled) and drc.has_complex_batch_logic()
+                                 and self.supplier == SUPPLIER_A)
+        self.skipped[REPLACEMENT_PAIRING] = '药物列表无替换号'
+
+    # ------------------------------------------------------------------
+    # Chunk processing
+    # ------------------------------------------------------------------
+    def feed(self, chunk: RandList):
+        if self.kind is None:
+            self._setup(chunk)
+        elif chunk.kind != self.kind:
+            raise ValueError("同一文件中出现不同类型的列表")
+        n = len(chunk)
+        if not n:
+            return
+        self.rows += n
+        lines = chunk.columns.get('line')
+        if lines is None:
+            lines = np.arange(self.rows - n + 1, self.rows + 1, dtype=np.int64)
+        if self.kind == SUBJECT:
+            self._feed_subject(chunk, lines)
+        else:
+            self._feed_drug(chunk, lines)
+
+    def _map_codes(self, table: List[str], resolve) -> np.ndarray:
+        return np.array([resolve(v) for v in (table or [''])], dtype=np.int64)
+
+    def _record_numbers(self, series: Tuple[int, int], numbers: np.ndarray, stratum: np.ndarray,
+                        arms: np.ndarray, lines: np.ndarray, label: str):
+        tracker = self.trackers.get(series)
+        if tracker is None:
+            tracker = self.trackers[series] = _NumberTracker(self.numbering.span)
+            self.counts[series] = np.zeros(len(self.numbering.sizes), dtype=np.int64)
+        in_range = stratum >= 0
+        offsets = numbers[in_range] - self.numbering.start
+        dup = tracker.record(offsets, lines[in_range].astype(np.int32), arms[in_range])
+        if dup.any():
+            self.issues.add(DUPLICATES, f"{label}编号重复", lines[in_range][dup])
+        np.add.at(self.counts[series], stratum[in_range][~dup], 1)
+
+    def _range_issues(self, numbers, stratum, lines, expected_stratum=None):
+        """Flag out-of-range numbers, naming the num_gap region when that is where they fall."""
+        numbering = self.numbering
+        out = stratum < 0
+        if expected_stratum is not None:
+            wrong = ~out & (stratum != expected_stratum)
+            if wrong.any():
+                for s in np.unique(expected_stratum[wrong]):
+                    sel = wrong & (expected_stratum == s)
+                    self.issues.add(NUMBER_RANGE,
+                                    f"编号不在分层 {self._stratum_label(int(s))} 的范围 "
+                                    f"{numbering.lo[s]}-{numbering.hi[s]} 内", lines[sel])
+            out = out | wrong
+        if (stratum < 0).any():
+            bad = numbers[stratum < 0]
+            in_gap = (bad >= numbering.start) & (bad <= numbering.hi[-1])
+            gap_lines = lines[stratum < 0]
+            if in_gap.any():
+                self.issues.add(NUMBER_RANGE, "编号落在分层之间的 num_gap 间隔内", gap_lines[in_gap])
+            if (~in_gap).any():
+                self.issues.add(NUMBER_RANGE,
+                                f"编号超出配置范围 {numbering.start}-{numbering.hi[-1]}", gap_lines[~in_gap])
+        return out
+
+    def _stratum_label(self, s: int) -> str:
+        names = self.strata if self.kind == SUBJECT else [
+            str(level) for f in self.drc.stratification_factors for level in f.levels]
+        return names[s] if s < len(names) else str(s + 1)
+
+    def _feed_subject(self, chunk: RandList, lines: np.ndarray):
+        cols = chunk.columns
+        strata_table = chunk.dictionaries.get('strata', [''])
+        if self.strata:
+            index = {name: i for i, name in enumerate(self.strata)}
+            strata_map = self._map_codes(strata_table, lambda v: index.get(v, -1))
+        else:
+            strata_map = self._map_codes(strata_table, lambda v: 0 if v == '' else -1)
+        arm_index = {code: i for i, code in enumerate(self.arm_codes)}
+        arm_map = self._map_codes(chunk.dictionaries.get('armcd'), lambda v: arm_index.get(v, -1))
+        self.protocol_names = list(chunk.dictionaries.get('protocol', ['']))
+
+        expected_stratum = strata_map[cols['strata']]
+        arms = arm_map[cols['armcd']]
+        numbers = cols['subjno']
+        unknown_stratum = expected_stratum < 0
+        if unknown_stratum.any():
+            self.issues.add(NUMBER_RANGE, "分层取值不在配置的分层水平中", lines[unknown_stratum])
+        unknown_arm = arms < 0
+        if unknown_arm.any():
+            self.issues.add(BLOCK_RATIO, "组别代码不在配置的治疗组别中", lines[unknown_arm])
+
+        stratum = self.numbering.stratum_of(numbers)
+        known = ~unknown_stratum
+        out = np.ones(len(numbers), dtype=bool)
+        out[known] = self._range_issues(numbers[known], stratum[known], lines[known], expected_stratum[known])
+        stratum = np.where(out, -1, stratum)
+
+        for catord in (1, 2):
+            sel = cols['catord'] == catord
+            if not sel.any():
+                continue
+            label = '替换号' if catord == 2 else ''
+            for protocol in np.unique(cols['protocol'][sel]):
+                psel = sel & (cols['protocol'] == protocol)
+                valid_arm = psel & ~unknown_arm
+                self._record_numbers((int(protocol), catord), numbers[valid_arm], stratum[valid_arm],
+                                     arms[valid_arm].astype(np.int8), lines[valid_arm], label)
+            keyed = sel & ~unknown_arm
+            keys = (cols['protocol'][keyed].astype(np.int64) << 48) \
+                | (cols['strata'][keyed].astype(np.int64) << 32) | cols['bn'][keyed].astype(np.int64)
+            self.blocks[catord].feed(keys, arms[keyed], lines[keyed])
+
+    def _resolve_drug_arm(self, value: str) -> int:
+        if value in self.arm_codes:
+            return self.arm_codes.index(value)
+        for label, i in self.arm_labels:
+            if label and value.startswith(label):
+                return i
+        return -1
+
+    def _feed_drug(self, chunk: RandList, lines: np.ndarray):
+        cols = chunk.columns
+        arm_map = self._map_codes(chunk.dictionaries.get('drugcd'), self._resolve_drug_arm)
+        arms = arm_map[cols['drugcd']]
+        numbers = cols['drugno']
+        unknown_arm = arms < 0
+        if unknown_arm.any():
+            self.issues.add(BLOCK_RATIO, "药物类型不在配置的药物组别中", lines[unknown_arm])
+
+        stratum = self.numbering.stratum_of(numbers)
+        out = self._range_issues(numbers, stratum, lines)
+        stratum = np.where(out, -1, stratum)
+        valid_arm = ~unknown_arm
+        self._record_numbers((0, 1), numbers[valid_arm], stratum[valid_arm],
+                             arms[valid_arm].astype(np.int8), lines[valid_arm], '')
+
+        has_block = valid_arm & (cols['bn'] > 0)
+        if has_block.any():
+            keys = (stratum[has_block].astype(np.int64) << 32) | cols['bn'][has_block].astype(np.int64)
+            self.blocks[1].feed(keys, arms[has_block], lines[has_block])
+
+        lots = chunk.dictionaries.get('batch', [''])
+        if any(lots):
+            codes, counts = np.unique(cols['batch'], return_counts=True)
+            for code, count in zip(codes.tolist(), counts.tolist()):
+                lot = lots[code] if code < len(lots) else ''
+                if lot:
+                    self.lot_counts[lot] = self.lot_counts.get(lot, 0) + count
+        if self.secorder_batches:
+            self._feed_secorder_batches(cols['secorder'], lines)
+
+    def _feed_secorder_batches(self, secorder: np.ndarray, lines: np.ndarray):
+        """
+        Batch of each kit from its 取药顺序号: secorder = k + 10000 * StrataN,
+        batch i covers k up to the i-th cumulative quantity (logic.sas.j2).
+        """
+        strata_n = secorder // 10000
+        k = secorder % 10000
+        for s in np.unique(strata_n):
+            s = int(s)
+            sel = strata_n == s
+            if not 1 <= s <= len(self.batch_strata):
+                self.issues.add(BATCH_QUANTITY, "取药顺序号对应的分层不在批次配置中", lines[sel])
+                continue
+            stratum = self.batch_strata[s - 1]
+            batch = np.searchsorted(np.asarray(stratum.thresholds), k[sel], side='left')
+            beyond = batch >= len(stratum.thresholds)
+            if beyond.any():
+                self.issues.add(BATCH_QUANTITY, f"取药顺序号超出 {stratum.level} 批次总量 {stratum.total}",
+                                lines[sel][beyond])
+            for b, count in zip(*np.unique(batch[~beyond], return_counts=True)):
+                key = (s, int(b))
+                self.batch_counts[key] = self.batch_counts.get(key, 0) + int(count)
+
+    # ------------------------------------------------------------------
+    # Final cross-chunk checks
+    # ------------------------------------------------------------------
+    def finish(self) -> VerificationReport:
+        if self.kind is None:
+            raise ValueError("CSV中没有随机号数据")
+        for stream in self.blocks.values():
+            stream.finish()
+        self._check_completeness()
+        if self.kind == SUBJECT:
+            self._check_pairing()
+        else:
+            self._check_batches()
+        if not any(s.blocks for s in self.blocks.values()) and BLOCK_RATIO not in self.issues.failed():
+            self.skipped[BLOCK_RATIO] = '列表中没有区组编号'
+        failed = self.issues.failed()
+        checks = {}
+        for check in CHECKS:
+            if check in failed:
+                checks[check] = 'failed'
+            elif check in self.skipped:
+                checks[check] = f"skipped: {self.skipped[check]}"
+            else:
+                checks[check] = 'passed'
+        return VerificationReport(self.kind, self.supplier, self.rows, checks, self.issues.all())
+
+    def _series_label(self, series: Tuple[int, int]) -> str:
+        protocol, catord = series
+        parts = []
+        if self.kind == SUBJECT and len(self.protocol_names) > 1:
+            parts.append(self.protocol_names[protocol])
+        if catord == 2:
+            parts.append('替换号')
+        return ' '.join(parts)
+
+    def _check_completeness(self):
+        numbering = self.numbering
+        for series, counts in self.counts.items():
+            if series[1] == 2 and not self.study.mirror_replacement:
+                continue  # reported by the pairing check
+            tracker = self.trackers[series]
+            label = self._series_label(series)
+            for s, (lo, hi) in enumerate(zip(numbering.lo, numbering.hi)):
+                if counts[s] == numbering.sizes[s]:
+                    continue
+                window = tracker.line[lo - numbering.start:hi - numbering.start + 1]
+                missing = np.flatnonzero(window == 0)
+                first = ', '.join(str(int(lo + m)) for m in missing[:5])
+                self.issues.add(
+                    COMPLETENESS,
+                    f"{label + ' ' if label else ''}分层 {self._stratum_label(s)} 编号 {lo}-{hi} "
+                    f"应有 {int(numbering.sizes[s])} 个，实际 {int(counts[s])} 个（缺少: {first}"
+                    f"{' …' if len(missing) > 5 else ''}）",
+                    count=int(len(missing)),
+                )
+
+    def _check_pairing(self):
+        if not self.study.mirror_replacement:
+            replacement_series = [s for s in self.trackers if s[1] == 2]
+            if replacement_series:
+                for series in replacement_series:
+                    tracker = self.trackers[series]
+                    lines = tracker.line[tracker.line != 0]
+                    self.issues.add(REPLACEMENT_PAIRING, "未启用镜像替换，但列表中存在替换号", lines)
+            else:
+                self.skipped[REPLACEMENT_PAIRING] = '未启用镜像替换'
+            return
+        protocols = {s[0] for s in self.trackers}
+        for protocol in protocols:
+            original = self.trackers.get((protocol, 1))
+            replacement = self.trackers.get((protocol, 2))
+            if original is None or replacement is None:
+                self.issues.add(REPLACEMENT_PAIRING, "启用了镜像替换，但缺少正式号或替换号",
+                                count=1)
+                continue
+            has_original = original.line != 0
+            has_replacement = replacement.line != 0
+            orphan = has_replacement & ~has_original
+            if orphan.any():
+                self.issues.add(REPLACEMENT_PAIRING, "替换号没有对应的正式号", replacement.line[orphan])
+            unpaired = has_original & ~has_replacement
+            if unpaired.any():
+                self.issues.add(REPLACEMENT_PAIRING, "正式号缺少对应的替换号", original.line[unpaired])
+            both = has_original & has_replacement
+            differs = both & (original.arm != replacement.arm)
+            if differs.any():
+                self.issues.add(REPLACEMENT_PAIRING, "替换号与正式号的组别不一致", replacement.line[differs])
+
+    def _check_batches(self):
+        configured: Dict[str, int] = {}
+        for stratum in self.batch_strata:
+            for batch_no, quantity in zip(stratum.batch_nos, _batch_quantities(stratum)):
+                configured[batch_no] = configured.get(batch_no, 0) + quantity
+        if not configured:
+            self.skipped[BATCH_QUANTITY] = '未配置批次'
+            return
+        checked = False
+        if self.lot_counts:
+            checked = True
+            for lot, count in sorted(self.lot_counts.items()):
+                expected = configured.get(lot)
+                if expected is None:
+                    self.issues.add(BATCH_QUANTITY, f"批次号 {lot} 不在批次配置中", count=count)
+                elif expected != count:
+                    self.issues.add(BATCH_QUANTITY, f"批次 {lot} 应有 {expected} 个，实际 {count} 个", count=1)
+        if self.secorder_batches:
+            checked = True
+            for stratum in self.batch_strata:
+                for b, (batch_no, expected) in enumerate(zip(stratum.batch_nos, _batch_quantities(stratum))):
+                    count = self.batch_counts.get((stratum.strata_n, b), 0)
+                    if count != expected:
+                        self.issues.add(BATCH_QUANTITY,
+                                        f"{stratum.level} 批次 {batch_no} 应有 {expected} 个，实际 {count} 个",
+                                        count=1)
+        if not checked:
+            self.skipped[BATCH_QUANTITY] = '列表中没有批次号或取药顺序号'
+
+
+def verify_list(source: Source, study: StudyDesignConfig, chunk_rows: int = CHUNK_ROWS,
+                progress: Optional[Callable[[int], None]] = None) -> VerificationReport:
+    """
+    Verify a delivered list CSV against the configuration that produced it.
+
+    Args:
+        source: CSV 路径或文本流
+        study: 生成该盲底的研究设计配置
+        chunk_rows: 每块解析的行数
+        progress: 每校验完一块调用 progress(已校验行数)
+
+    Returns:
+        VerificationReport: 各项检查状态与带行号的问题列表
+    """
+    verifier = ListVerifier(study)
+    rows = 0
+    for chunk in iter_list_chunks(source, chunk_rows=chunk_rows, line_numbers=True):
+        verifier.feed(chunk)
+        rows += len(chunk)
+        if progress:
+            progress(rows)
+    return verifier.finish()
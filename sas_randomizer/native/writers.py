@@ -0,0 +1,356 @@
+"""供应商 CSV / XLSX 原生写出
+
+按 m_rpe / m_rpe_drug 的 PUT 语句逐字节复现各供应商版式（DSD 引号规则、
+"项目名称/项目代码"前导行、供应商B 5.X 的替换号 RR1 关联），按块流式写出，
+内存占用与列表长度无关。供应商B 5.X 另写出 XLSX（对应 ODS EXCEL 输出），
+以流式 zip 写入工作表 XML。
+"""
+
+import csv
+import os
+import zipfile
+from typing import IO, Iterator, List, Optional, Sequence, Union
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from ..utils.atomic_io import atomic_open
+from .layouts import SUPPLIER_A, SUPPLIER_B5, SUPPLIER_B_LITE, Layout, get_layout
+from .rand_list import CATEGORY_LABELS, DRUG, SUBJECT, RandList
+
+CHUNK_ROWS = 65536
+# SAS on Windows terminates PUT records with CRLF
+NEWLINE = '\r\n'
+# DSD output of a missing numeric value
+MISSING = '.'
+
+_FILE_STEMS = {SUBJECT: 'Rand_List', DRUG: 'Drug_List'}
+
+
+def list_file_name(study_id: str, kind: str, status: str = '', ext: str = 'csv') -> str:
+    """Delivered file name as built by the macros: &studyID._Rand_List&_sfx..csv"""
+    sfx = f"_{status}" if status and status.upper() != 'FINAL' else ''
+    return f"{study_id}_{_FILE_STEMS[kind]}{sfx}.{ext}"
+
+
+def _dsd(value: str) -> str:
+    """One DSD field: trailing blanks dropped, quoted when it holds a delimiter or quote."""
+    value = value.rstrip()
+    if ',' in value or '"' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _text_column(values: Sequence[str]) -> List[str]:
+    return [_dsd(str(v)) for v in values]
+
+
+def _numeric_column(values: np.ndarray) -> List[str]:
+    return np.asarray(values).astype(np.int64).astype(str).tolist()
+
+
+def _blank(n: int) -> List[str]:
+    return [''] * n
+
+
+def _compress_s(number: str) -> str:
+    """compress(subjno, "Ss")"""
+    return number.replace('S', '').replace('s', '')
+
+
+class _RowPlan:
+    """
+    Row order and per-row lookups for one export, computed once up front.
+    Only integer index arrays are held; field strings are built per chunk.
+    """
+
+    def __init__(self, rand_list: RandList, layout: Layout):
+        self.list = rand_list
+        self.layout = layout
+        cols = rand_list.columns
+        n = len(rand_list)
+        if rand_list.kind == SUBJECT:
+            # proc sort by protocol_order protocol StrataN Strata catord category SubjNo
+            self.order = np.lexsort((cols['subjno'], cols['catord'], cols['stratan'],
+                                     cols['protocol'], cols['protocol_order']))
+        else:
+            # proc sort by seq
+            self.order = np.argsort(cols['seq'], kind='stable')
+        self.replacement_of: Optional[np.ndarray] = None
+
+        if rand_list.kind == SUBJECT and layout.supplier == SUPPLIER_B5:
+            replacement = cols['catord'][self.order] == 2
+            if replacement.any():
+                self._join_replacements(replacement)
+        self.rows = len(self.order) if n else 0
+
+    def _join_replacements(self, replacement: np.ndarray):
+        """
+        B5.X: each replacement number is moved into RR1 of its parent row;
+        as in the left join from the replacement side, only parents that
+        have a replacement are kept.
+        """
+        subjno = self.list.columns['subjno']
+        originals = self.order[~replacement]
+        replacements = self.order[replacement]
+        parent_numbers = subjno[originals]
+        by_number = np.argsort(parent_numbers, kind='stable')
+        pos = np.searchsorted(parent_numbers[by_number], subjno[replacements])
+        pos = np.minimum(pos, len(by_number) - 1)
+        parent = by_number[pos]
+        found = parent_numbers[parent] == subjno[replacements]
+        parent, replacements = parent[found], replacements[found]
+        by_parent = np.argsort(parent, kind='stable')
+        self.order = originals[parent[by_parent]]
+        self.replacement_of = replacements[by_parent]
+
+    def chunks(self, size: int = CHUNK_ROWS) -> Iterator[List[str]]:
+        for start in range(0, self.rows, size):
+            yield self._fields(slice(start, start + size))
+
+    def _fields(self, window: slice) -> List[str]:
+        rows = self.order[window]
+        part = self.list.take(rows)
+        if self.list.kind == SUBJECT:
+            values = self._subject_values(part, window)
+        else:
+            values = self._drug_values(part)
+        return [','.join(r) for r in zip(*(values[f] for f in self.layout.fields))]
+
+    def _subject_values(self, part: RandList, window: slice) -> dict:
+        n = len(part)
+        numbers = part.number_strings().tolist()
+        catord = part.columns['catord']
+        replacement = catord == 2
+        if self.layout.supplier == SUPPLIER_B_LITE:
+            types = np.where(replacement, '1', '0').tolist()
+        else:
+            types = np.where(replacement, '2', '1').tolist()
+        prn = [_compress_s(s) if r else '' for s, r in zip(numbers, replacement.tolist())]
+        rr1 = _blank(n)
+        if self.replacement_of is not None:
+            rr1 = self.list.take(self.replacement_of[window]).number_strings().tolist()
+        return {
+            # seq=_n_ after the export sort
+            'seq': _numeric_column(np.arange(window.start + 1, window.start + n + 1)),
+            'protocol': _text_column(part.decode('protocol')),
+            'subjno': _text_column(numbers),
+            'strata': _text_column(part.decode('strata')),
+            'bn': _numeric_column(part.columns['bn']),
+            'rand': _numeric_column(part.columns['rand']),
+            'site': _blank(n),
+            'group': _text_column(part.decode('armcd')),
+            'arm': _text_column(part.decode('arm')),
+            'randcount': _blank(n),
+            'Subsnumber': _blank(n),
+            'category': [CATEGORY_LABELS[int(c)] for c in catord],
+            'CO': ['All'] * n,
+            'Type': types,
+            'PRN': _text_column(prn),
+            'RR1': _text_column(rr1),
+            'RR2': _blank(n), 'RE': _blank(n), 'Des': _blank(n),
+        }
+
+    def _drug_values(self, part: RandList) -> dict:
+        n = len(part)
+        cols = part.columns
+        seq = _numeric_column(cols['seq'])
+        if self.layout.sec_rand and self.layout.supplier == SUPPLIER_A:
+            secorder = _numeric_column(cols['secorder'])
+        else:
+            # secorder=seq without secRand, and for every 供应商B system
+            secorder = seq
+        if self.layout.supplier == SUPPLIER_B5 and self.layout.sec_rand:
+            bn = rand = [MISSING] * n
+        else:
+            bn = _numeric_column(cols['bn']) if 'bn' in cols else [MISSING] * n
+            rand = _numeric_column(cols['rand']) if 'rand' in cols else [MISSING] * n
+        drugcds = part.decode('drugcd') if 'drugcd' in cols else part.decode('drugsize')
+        return {
+            'seq': seq,
+            'drugno': _text_column(part.number_strings().tolist()),
+            'drugcds': _text_column(drugcds),
+            'drugsize': _text_column(part.decode('drugsize')),
+            'secorder': secorder,
+            'bn': bn,
+            'rand': rand,
+            'size': _blank(n), 'symptons': _blank(n), 'pn': _blank(n), 'VC': _blank(n),
+            'SN': _blank(n), 'LN': _blank(n), 'expdate': _blank(n), 'DD': _blank(n),
+            'attr1': _blank(n), 'attr2': _blank(n), 'attr3': _blank(n),
+        }
+
+
+def _resolve_layout(rand_list: RandList, supplier: str, sec_rand: bool) -> Layout:
+    return get_layout(rand_list.kind, supplier, sec_rand and rand_list.kind == DRUG)
+
+
+def _preamble(layout: Layout, rand_list: RandList, protocol_title: Optional[str],
+              study_id: Optional[str]) -> List[str]:
+    lines = []
+    if layout.preamble:
+        title = protocol_title if protocol_title is not None else rand_list.meta.get('protocol_title', '')
+        sid = study_id if study_id is not None else rand_list.meta.get('study_id', '')
+        lines += [f"项目名称,{title},,,,,,,,,,", f"项目代码,{sid},,,,,,,,,,"]
+    lines.append(layout.header)
+    return lines
+
+
+def iter_list_csv(rand_list: RandList, supplier: str = SUPPLIER_A, sec_rand: bool = False,
+                  protocol_title: Optional[str] = None, study_id: Optional[str] = None,
+                  chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Yield the delivered CSV as UTF-8 byte chunks of at most ``chunk_rows`` records.
+
+    Args:
+        rand_list: 原生引擎生成或解析得到的列表
+        supplier: 供应商版式（未知供应商按 供应商A 输出，同宏中的 %else 分支）
+        sec_rand: 药物列表是否二次随机（影响 供应商A 表头与 供应商B 5.X 区组列）
+        protocol_title / study_id: 前导行内容，默认取 rand_list.meta
+    """
+    layout = _resolve_layout(rand_list, supplier, sec_rand)
+    yield (NEWLINE.join(_preamble(layout, rand_list, protocol_title, study_id)) + NEWLINE).encode('utf-8')
+    for lines in _RowPlan(rand_list, layout).chunks(chunk_rows):
+        if lines:
+            yield (NEWLINE.join(lines) + NEWLINE).encode('utf-8')
+
+
+def write_list_csv(rand_list: RandList, target: Union[str, IO[bytes]], supplier: str = SUPPLIER_A,
+                   sec_rand: bool = False, protocol_title: Optional[str] = None,
+                   study_id: Optional[str] = None, chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Write the delivered CSV to a path (atomically) or a binary stream.
+
+    Returns:
+        int: 写出的字节数
+    """
+    chunks = iter_list_csv(rand_list, supplier, sec_rand, protocol_title, study_id, chunk_rows)
+    if hasattr(target, 'write'):
+        return sum(target.write(c) for c in chunks)
+    with atomic_open(target) as f:
+        return sum(f.write(c) for c in chunks)
+
+
+# ---------------------------------------------------------------------------
+# XLSX (供应商B 5.X)
+# ---------------------------------------------------------------------------
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Style 1 is the bold header row PROC PRINT produces
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+    '<cellXfs count="2"><xf/><xf fontId="1" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+               '<sheetData>')
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def _cell(value: str, style: str = '') -> str:
+    if not value:
+        return '<c t="inlineStr"%s/>' % style
+    return '<c t="inlineStr"%s><is><t>%s</t></is></c>' % (style, escape(value))
+
+
+def _split_dsd(line: str) -> List[str]:
+    """Inverse of the DSD quoting above (the INFILE ... DSD read-back in the macros)."""
+    if '"' not in line:
+        return line.split(',')
+    return next(csv.reader([line]))
+
+
+def write_list_xlsx(rand_list: RandList, path: str, supplier: str = SUPPLIER_B5,
+                    sec_rand: bool = False, chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Write the ODS EXCEL workbook the B5.X branch produces: the CSV read back
+    with every column as text, the header labels as the first row.
+
+    Returns:
+        int: 数据行数
+    """
+    layout = _resolve_layout(rand_list, supplier, sec_rand)
+    sheet_name = layout.sheet_name or ('Randomization' if rand_list.kind == SUBJECT else 'KIT LIST')
+    count = 0
+    with atomic_open(path) as out:
+        with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+            zf.writestr('_rels/.rels', _ROOT_RELS)
+            zf.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name)))
+            zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+            zf.writestr('xl/styles.xml', _STYLES)
+            with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(_SHEET_HEAD.encode('utf-8'))
+                header = ''.join(_cell(h, ' s="1"') for h in layout.columns)
+                sheet.write(f'<row r="1">{header}</row>'.encode('utf-8'))
+                for lines in _RowPlan(rand_list, layout).chunks(chunk_rows):
+                    parts = []
+                    for line in lines:
+                        count += 1
+                        cells = ''.join(_cell(v) for v in _split_dsd(line))
+                        parts.append(f'<row r="{count + 1}">{cells}</row>')
+                    sheet.write(''.join(parts).encode('utf-8'))
+                sheet.write(_SHEET_TAIL.encode('utf-8'))
+    return count
+
+
+def write_deliverables(rand_list: RandList, out_dir: str, supplier: str = SUPPLIER_A,
+                       sec_rand: bool = False, status: str = '', study_id: Optional[str] = None,
+                       protocol_title: Optional[str] = None) -> List[str]:
+    """
+    Write the files the export macro would produce into ``out_dir``
+    (CSV, plus the XLSX for 供应商B 5.X). Returns the written paths.
+    """
+    sid = study_id if study_id is not None else rand_list.meta.get('study_id', 'STUDY')
+    os.makedirs(out_dir, exist_ok=True)
+    csv_path = os.path.join(out_dir, list_file_name(sid, rand_list.kind, status))
+    write_list_csv(rand_list, csv_path, supplier, sec_rand, protocol_title, sid)
+    paths = [csv_path]
+    if supplier == SUPPLIER_B5:
+        xlsx_path = os.path.join(out_dir, list_file_name(sid, rand_list.kind, status, 'xlsx'))
+        write_list_xlsx(rand_list, xlsx_path, supplier, sec_rand)
+        paths.append(xlsx_path)
+    return paths
@@ -1,5 +1,7 @@
 """工具模块"""
 
-from .logger import setup_logger, log_operation, log_validation_error, log_code_generation
+from .logger import (setup_logger, log_operation, log_validation_error, log_code_generation,
+                     JsonFormatter, StageTimer, start_queue_logging, stop_queue_logging)
 
-__all__ = ['setup_logger', 'log_operation', 'log_validation_error', 'log_code_generation']
\ No newline at end of file
+__all__ = ['setup_logger', 'log_operation', 'log_validation_error', 'log_code_generation',
+           'JsonFormatter', 'StageTimer', 'start_queue_logging', 'stop_queue_logging']
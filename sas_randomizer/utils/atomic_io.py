@@ -0,0 +1,48 @@
+"""原子文件写入 - 先写同目录临时文件再 os.replace，中断或出错不会留下半截文件"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional, Union
+
+# Temp files live next to their target under this prefix (directory scans skip them)
+TEMP_PREFIX = '.tmp-'
+
+PathLike = Union[str, 'os.PathLike[str]']
+
+
+@contextmanager
+def atomic_open(path: PathLike, mode: str = 'wb', encoding: Optional[str] = None,
+                newline: Optional[str] = None) -> Iterator[IO]:
+    """
+    Open a temp file beside ``path`` for writing; it replaces ``path`` when the
+    block exits normally and is removed when it raises.
+
+    Args:
+        path: 目标文件，所在目录不存在时创建
+        mode: 'wb' 或 'w'
+        encoding / newline: 文本模式参数
+    """
+    path = os.fspath(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX, suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, mode, encoding=encoding, newline=newline) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def atomic_write_text(path: PathLike, text: str) -> None:
+    """Write ``text`` (UTF-8, newlines untranslated) to ``path`` atomically."""
+    with atomic_open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def is_temp_file(name: str) -> bool:
+    """Whether a file name is an in-flight atomic_open temp file."""
+    return name.startswith(TEMP_PREFIX)
@@ -0,0 +1,24 @@
+"""配置指纹模块 - 规范化 JSON 与配置哈希"""
+
+import hashlib
+import json
+from typing import Any
+
+
+def canonical_json(data: Any) -> str:
+    """规范化 JSON：键排序、无多余空白、保留中文。
+
+    Args:
+        data: dict 或 pydantic 模型
+
+    Returns:
+        str: 对同一配置恒定不变的 JSON 文本
+    """
+    if hasattr(data, 'model_dump'):
+        data = data.model_dump(mode='json')
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def config_hash(data: Any) -> str:
+    """配置的 SHA-256 指纹（规范化 JSON 的十六进制摘要）"""
+    return hashlib.sha256(canonical_json(data).encode('utf-8')).hexdigest()
@@ -1,8 +1,31 @@
-"""简单的日志系统"""
+"""日志系统
 
+setup_logger 与 log_* 辅助函数供库代码使用；服务端通过 start_queue_logging
+把日志记录放入有界队列，由后台线程写盘，请求线程只做入队（队列满时丢弃并计数）。
+记录可输出为结构化 JSON（JsonFormatter），携带 request_id、配置哈希与分阶段耗时；
+标记 sample=True 的高频记录按比例与每秒上限抽样。
+"""
+
+import atexit
+import json
 import logging
-import os
-from datetime import datetime
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, Optional
+
+# Request id of the request being handled (set by the backend's request middleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("rangen_request_id", default=None)
+
+_configured: Dict[str, logging.Logger] = {}
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["BoundedQueueHandler"] = None
+_listener_lock = threading.Lock()
+
 
 def setup_logger(name: str = "sas_randomizer", log_level: str = "INFO") -> logging.Logger:
     """
@@ -15,10 +38,14 @@ def setup_logger(name: str = "sas_randomizer", log_level: str = "INFO") -> loggi
     Returns:
         配置好的日志记录器
     """
+    logger = _configured.get(name)
+    if logger is not None:
+        return logger
     logger = logging.getLogger(name)
     
-    # 避免重复添加处理器
+    # 避免重复添加处理器（包括 start_queue_logging 已接管的记录器）
     if logger.handlers:
+        _configured[name] = logger
         return logger
     
     # 设置日志级别
@@ -38,6 +65,7 @@ def setup_logger(name: str = "sas_randomizer", log_level: str = "INFO") -> loggi
     
     # 添加处理器到日志记录器
     logger.addHandler(console_handler)
+    _configured[name] = logger
     
     return logger
 
@@ -88,4 +116,156 @@ def log_code_generation(study_id: str, code_length: int):
         code_length: 生成代码的长度
     """
     logger = setup_logger()
-    logger.info(f"SAS code generated for study {study_id} | Code length: {code_length} characters")
\ No newline at end of file
+    logger.info(f"SAS code generated for study {study_id} | Code length: {code_length} characters")
+
+
+# 标准 LogRecord 属性；其余属性（extra=...）作为结构化字段输出
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sample"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message plus every ``extra`` field."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_") and value is not None:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the current request id (runs on the logging thread, before queueing)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps WARNING+ and unmarked records. Records logged with ``extra={"sample": True}``
+    are kept with probability ``rate`` and at most ``max_per_second`` per second.
+    """
+
+    def __init__(self, rate: float = 1.0, max_per_second: int = 100):
+        super().__init__()
+        self.rate = rate
+        self.max_per_second = max_per_second
+        self.suppressed = 0
+        self._second = 0
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "sample", False):
+            return True
+        if self.rate < 1.0 and random.random() >= self.rate:
+            self.suppressed += 1
+            return False
+        second = int(time.monotonic())
+        if second != self._second:
+            self._second, self._count = second, 0
+        self._count += 1
+        if self._count > self.max_per_second:
+            self.suppressed += 1
+            return False
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped and counted."""
+
+    def __init__(self, q: "queue.Queue"):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def start_queue_logging(handlers: Iterable[logging.Handler],
+                        loggers: Iterable[str] = ("rangen", "sas_randomizer"),
+                        level: int = logging.INFO,
+                        max_queue: int = 10000,
+                        sample_rate: float = 1.0,
+                        max_per_second: int = 100) -> QueueListener:
+    """
+    Route ``loggers`` through a bounded queue to ``handlers``, written by a background thread.
+
+    The named loggers get a single BoundedQueueHandler (existing handlers are removed)
+    and stop propagating. Calling it again replaces the previous listener.
+
+    Returns:
+        QueueListener: 已启动的后台写入线程（进程退出时自动停止并刷新）
+    """
+    global _listener, _queue_handler
+    with _listener_lock:
+        _stop_listener()
+        handler = BoundedQueueHandler(queue.Queue(maxsize=max_queue))
+        handler.addFilter(SamplingFilter(sample_rate, max_per_second))
+        handler.addFilter(ContextFilter())
+        for name in loggers:
+            logger = logging.getLogger(name)
+            for old in list(logger.handlers):
+                logger.removeHandler(old)
+            logger.addHandler(handler)
+            logger.setLevel(level)
+            logger.propagate = False
+            _configured[name] = logger
+        _listener = QueueListener(handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _queue_handler = handler
+        return _listener
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # drains the queue before returning
+        _listener = None
+
+
+def stop_queue_logging():
+    """Flush queued records and stop the background writer."""
+    with _listener_lock:
+        _stop_listener()
+
+
+def queue_logging_stats() -> Dict[str, int]:
+    """Records dropped (queue full) and suppressed (sampling) since start_queue_logging."""
+    handler = _queue_handler
+    if handler is None:
+        return {"dropped": 0, "suppressed": 0, "queued": 0}
+    sampling = next(f for f in handler.filters if isinstance(f, SamplingFilter))
+    return {"dropped": handler.dropped, "suppressed": sampling.suppressed, "queued": handler.queue.qsize()}
+
+
+atexit.register(stop_queue_logging)
+
+
+class StageTimer:
+    """Collects per-stage wall times in milliseconds: ``with timer.stage("render"): ...``."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - started) * 1000, 3)
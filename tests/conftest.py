@@ -59,3 +59,20 @@ def client():
     """FastAPI TestClient for endpoint tests."""
     from backend.app.main import app
     return TestClient(app)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Isolated RanGen data directory for services that persist state."""
+    from backend.app.services import allocation_service, config_store, index_service, job_service
+
+    monkeypatch.setenv("RANGEN_DATA_DIR", str(tmp_path))
+    allocation_service.reset_allocation_service()
+    index_service.reset_index_service()
+    job_service.reset_job_service()
+    config_store.reset_config_store()
+    yield tmp_path
+    config_store.reset_config_store()
+    job_service.reset_job_service()
+    allocation_service.reset_allocation_service()
+    index_service.reset_index_service()
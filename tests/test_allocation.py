@@ -0,0 +1,132 @@
+"""Tests for the native subject engine and the local allocation service."""
+
+import io
+import threading
+
+import numpy as np
+import pytest
+
+from backend.app.services.allocation_service import AllocationService, ListExhaustedError
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.block import generate_subject_list, solve_variable_blocks
+
+
+def _study(default_request_data, **overrides):
+    return convert_ui_payload_to_study_design({**default_request_data, **overrides})
+
+
+STRATIFIED = {
+    "stratification_factors": ["site"],
+    "strata_levels": {"site": ["Site1", "Site2"]},
+    "num_gap": 100,
+}
+
+
+class TestNativeSubjectList:
+
+    def test_blocks_are_balanced(self, default_request_data):
+        rl = generate_subject_list(_study(default_request_data, **STRATIFIED))
+        cols = rl.columns
+        assert len(rl) == 2 * 10 * 4
+        for stratum in (1, 2):
+            for bn in np.unique(cols["bn"][cols["stratan"] == stratum]):
+                in_block = (cols["stratan"] == stratum) & (cols["bn"] == bn)
+                assert np.bincount(cols["armcd"][in_block], minlength=2).tolist() == [2, 2]
+
+    def test_numbering_follows_num_gap(self, default_request_data):
+        rl = generate_subject_list(_study(default_request_data, **STRATIFIED))
+        numbers = rl.number_strings()
+        assert numbers[0] == "R0001"
+        assert numbers[40] == "R0141"  # stratum 2 starts at start + num_gap + 40
+
+    def test_mirror_replacement(self, default_request_data):
+        rl = generate_subject_list(_study(default_request_data, mirror_replacement=True))
+        numbers = rl.number_strings()
+        assert len(rl) == 80
+        assert numbers[40] == "R0001S"
+        assert (rl.columns["bn"][40:] == rl.columns["bn"][:40] + 1000).all()
+
+    def test_variable_block_solver(self):
+        assert solve_variable_blocks(40, 4, 6) == (4, 4)
+        with pytest.raises(ValueError, match="无法使用区组大小"):
+            solve_variable_blocks(7, 4, 6)
+
+
+class TestAllocationService:
+
+    def test_claims_are_sequential_and_exhaust(self, default_request_data, tmp_path):
+        service = AllocationService(tmp_path)
+        summary = service.register(generate_subject_list(_study(default_request_data, **STRATIFIED)))
+        list_id = summary["list_id"]
+        first = service.next_subject(list_id, stratum="Site2")
+        second = service.next_subject(list_id, stratum="Site2")
+        assert (first["number"], second["number"]) == ("R0141", "R0142")
+        for _ in range(38):
+            service.next_subject(list_id, stratum="Site2")
+        with pytest.raises(ListExhaustedError):
+            service.next_subject(list_id, stratum="Site2")
+
+    def test_ref_makes_claims_idempotent(self, default_request_data, tmp_path):
+        service = AllocationService(tmp_path)
+        list_id = service.register(generate_subject_list(_study(default_request_data)))["list_id"]
+        a = service.next_subject(list_id, ref="SUBJ-1")
+        b = service.next_subject(list_id, ref="SUBJ-1")
+        assert a["number"] == b["number"] and b["replay"] is True
+
+    def test_concurrent_claims_are_unique(self, default_request_data, tmp_path):
+        service = AllocationService(tmp_path)
+        list_id = service.register(generate_subject_list(_study(default_request_data)))["list_id"]
+        results = []
+
+        def worker():
+            for _ in range(5):
+                results.append(service.next_subject(list_id)["number"])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(results) == 40 and len(set(results)) == 40
+
+    def test_state_survives_restart(self, default_request_data, tmp_path):
+        service = AllocationService(tmp_path)
+        list_id = service.register(generate_subject_list(_study(default_request_data)))["list_id"]
+        service.next_subject(list_id)
+        service.close()
+        reopened = AllocationService(tmp_path)
+        assert reopened.next_subject(list_id)["number"] == "R0002"
+
+
+class TestAllocationEndpoints:
+
+    def test_native_list_round_trip(self, client, default_request_data, data_dir):
+        response = client.post("/api/v1/allocation/lists", json={"request": default_request_data, "seed": 1})
+        assert response.status_code == 200
+        list_id = response.json()["list_id"]
+        claim = client.post(f"/api/v1/allocation/lists/{list_id}/subjects/next", json={"ref": "S1"})
+        assert claim.status_code == 200
+        assert claim.json()["number"] == "R0001"
+        assert claim.json()["armcd"] in ("TRT", "PBO")
+
+    def test_csv_upload_and_kit_claims(self, client, data_dir):
+        csv_text = (
+            "项目名称,Demo,,,,,,,,,,\r\n项目代码,DEMO,,,,,,,,,,\r\n"
+            "序号,治疗物品编号,治疗物品代码,治疗物品名称,子规格,症型\r\n"
+            "1,D0001,A,Drug A 10mg,,\r\n2,D0002,B,Drug B 10mg,,\r\n3,D0003,A,Drug A 10mg,,\r\n"
+        )
+        response = client.post(
+            "/api/v1/allocation/lists/upload",
+            files={"file": ("DEMO_Drug_List.csv", io.BytesIO(csv_text.encode("utf-8")), "text/csv")},
+        )
+        assert response.status_code == 200
+        list_id = response.json()["list_id"]
+        numbers = [client.post(f"/api/v1/allocation/lists/{list_id}/kits/next", json={"arm": "A"}).json()["number"]
+                   for _ in range(2)]
+        assert numbers == ["D0001", "D0003"]
+        exhausted = client.post(f"/api/v1/allocation/lists/{list_id}/kits/next", json={"arm": "A"})
+        assert exhausted.status_code == 409
+
+    def test_unknown_list_is_404(self, client, data_dir):
+        response = client.post("/api/v1/allocation/lists/nope/subjects/next", json={})
+        assert response.status_code == 404
@@ -0,0 +1,64 @@
+"""Tests for precomputed batch thresholds and the emitted batch lookup."""
+
+from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
+from sas_randomizer.core_refactored.schemas import (
+    AUTO_BATCH_QUANTITY,
+    BatchItem,
+    DrugRandomizationConfig,
+    StratificationFactor,
+    StratumBatchSettings,
+    cumulative_thresholds,
+)
+
+
+def _batches(*quantities):
+    return [BatchItem(batch_no=i, quantity=q) for i, q in enumerate(quantities, 1)]
+
+
+class TestThresholds:
+
+    def test_cumulative_with_auto(self):
+        assert cumulative_thresholds(_batches(100, "auto", 0, 50)) == [100, 100 + AUTO_BATCH_QUANTITY,
+                                                                      100 + AUTO_BATCH_QUANTITY,
+                                                                      150 + AUTO_BATCH_QUANTITY]
+
+    def test_batch_strata_are_numbered_across_levels(self):
+        config = DrugRandomizationConfig(stratification_factors=[
+            StratificationFactor(factor_name="中心", levels=["A", "B"]),
+            StratificationFactor(factor_name="批次", levels=["CN", "EU"], batch_settings=StratumBatchSettings(
+                levels={"CN": _batches(10, 20), "EU": _batches(5)})),
+        ])
+        strata = config.batch_strata()
+        assert [(s.strata_n, s.factor_name, s.level, s.thresholds, s.total) for s in strata] == [
+            (1, "批次", "CN", [10, 30], 30), (2, "批次", "EU", [5], 5)]
+
+    def test_independent_settings_when_no_factor_has_batches(self):
+        config = DrugRandomizationConfig(independent_batch_settings={"ALL": _batches(3, 4)})
+        (stratum,) = config.batch_strata()
+        assert stratum.factor_name is None and stratum.thresholds == [3, 7]
+
+
+class TestEmittedLookup:
+
+    def _code(self, default_request_data, batches):
+        data = dict(default_request_data, drug_randomization_config={
+            "enabled": True, "drug_sec_rand_enabled": True, "drug_block_layers": 1000,
+            "drug_arms": [{"code": "A", "name": "A", "ratio": 1}, {"code": "B", "name": "B", "ratio": 1}],
+            "drug_stratification_factors": ["批次"],
+            "drug_strata_levels": {"批次": ["CN", "EU"]},
+            "drug_batch_configs": {"supply_factor": "批次", "configs": {
+                "CN": [{"batch_no": str(i), "quantity": 10} for i in range(batches)],
+                "EU": [{"batch_no": "1", "quantity": 7}]}},
+        })
+        return SASRandomizationGenerator(**data).generate_sas_code()
+
+    def test_binary_search_over_temporary_array(self, default_request_data):
+        code = self._code(default_request_data, batches=45)
+        assert "array _batch_end1[45] _temporary_" in code and "array _batch_end2[1] _temporary_" in code
+        assert "StrataN = 1;" in code and "StrataN = 2;" in code
+        assert "do while (_lo < _hi);" in code and "else if secorder" not in code
+        assert " 440 450\n" in code  # thresholds are wrapped, last line ends at the total
+
+    def test_render_is_linear_in_batches(self, default_request_data):
+        size = len(self._code(default_request_data, batches=400))
+        assert size - len(self._code(default_request_data, batches=200)) < 4000
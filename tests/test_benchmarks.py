@@ -0,0 +1,44 @@
+"""Smoke tests for the generation benchmark harness (benchmarks/generation.py)."""
+
+from benchmarks import generation
+from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
+
+
+class TestSyntheticMatrix:
+
+    def test_matrix_covers_each_axis_once(self):
+        names = [generation.case_name(c) for c in generation.matrix()]
+        assert len(names) == len(set(names))
+        assert generation.case_name(generation.BASE_CASE) in names
+        assert generation.case_name(generation.MAX_CASE) in names
+        for axis, values in generation.AXES.items():
+            assert {c[axis] for c in generation.matrix()} == set(values)
+
+    def test_payload_dimensions_reach_the_output(self):
+        payload = generation.synthetic_payload(arms=3, strata=60, protocols=4, batches=7, variable=True)
+        code = SASRandomizationGenerator(**payload).generate_sas_code()
+        assert len(payload["strata_levels"]) == 2
+        assert "Cohort 4" in code and "_batch_end1[7]" in code and "VarBlock=Y" in code
+
+
+class TestMeasureAndCompare:
+
+    def test_measure_records_time_memory_and_size(self):
+        result = generation.measure(lambda: "x" * 10, repeat=3, min_seconds=0)
+        assert result["runs"] >= 3 and result["output_bytes"] == 10
+        assert result["seconds"] >= 0 and result["peak_kib"] >= 0
+
+    def test_compare_flags_only_growth_beyond_tolerance(self):
+        base = {"c": {"generate": {"seconds": 0.010, "peak_kib": 100, "output_bytes": 5}}}
+        same = {"c": {"generate": {"seconds": 0.011, "peak_kib": 110, "output_bytes": 5}}}
+        slow = {"c": {"generate": {"seconds": 0.020, "peak_kib": 100, "output_bytes": 6},
+                      "transform": {"seconds": 0.001, "peak_kib": 1, "output_bytes": 1}}}
+        assert generation.compare(same, base, tolerance=0.25) == ([], [])
+        regressions, notes = generation.compare(slow, base, tolerance=0.25)
+        assert len(regressions) == 1 and "time" in regressions[0]
+        assert any("output 5 -> 6" in n for n in notes) and any("no baseline" in n for n in notes)
+
+    def test_tiny_absolute_changes_are_noise(self):
+        base = {"c": {"t": {"seconds": 0.0001, "peak_kib": 1, "output_bytes": 1}}}
+        now = {"c": {"t": {"seconds": 0.0003, "peak_kib": 3, "output_bytes": 1}}}
+        assert generation.compare(now, base, tolerance=0.25)[0] == []
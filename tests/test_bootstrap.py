@@ -0,0 +1,75 @@
+"""Tests for the lazy start-up ASGI wrapper used by backend/run.py."""
+
+import sys
+import textwrap
+
+import pytest
+from starlette.testclient import TestClient
+
+from backend.app.bootstrap import LazyApp
+
+
+@pytest.fixture
+def slow_module(tmp_path, monkeypatch):
+    """A target app whose import blocks until the test releases it."""
+    (tmp_path / "slow_target.py").write_text(textwrap.dedent("""
+        warmed = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"real"})
+
+        def warmup():
+            warmed.append(True)
+    """), encoding="utf-8")
+    (tmp_path / "gate.py").write_text("import threading\nopen_ = threading.Event()\n", encoding="utf-8")
+    (tmp_path / "gated_target.py").write_text(textwrap.dedent("""
+        import gate
+        gate.open_.wait(5)
+        from slow_target import app, warmup
+    """), encoding="utf-8")
+    (tmp_path / "broken_target.py").write_text("raise RuntimeError('boom')\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import gate
+    yield gate
+    gate.open_.set()
+    for name in ("gate", "slow_target", "gated_target", "broken_target"):
+        sys.modules.pop(name, None)
+
+
+class TestLazyApp:
+
+    def test_health_answers_before_the_app_is_loaded(self, slow_module):
+        lazy = LazyApp("gated_target:app").start()
+        client = TestClient(lazy)
+        response = client.get("/api/health")
+        assert response.status_code == 200 and response.json()["ready"] is False
+        assert not lazy.ready
+
+        slow_module.open_.set()
+        assert client.get("/anything").text == "real"
+        assert lazy.ready
+
+    def test_warmup_hook_runs_after_load(self, slow_module):
+        import slow_target
+
+        lazy = LazyApp("slow_target:app").start()
+        assert lazy.wait(5)
+        lazy._thread.join(5)
+        assert slow_target.warmed == [True]
+
+    def test_failed_import_returns_500(self, slow_module):
+        client = TestClient(LazyApp("broken_target:app"))
+        response = client.get("/api/v1/generate")
+        assert response.status_code == 500 and "boom" in response.json()["detail"]
+
+    def test_lifespan_starts_loading(self, slow_module):
+        lazy = LazyApp("slow_target:app", warmup=None)
+        with TestClient(lazy) as client:
+            assert lazy.wait(5)
+            assert client.get("/").text == "real"
+
+    def test_real_application(self):
+        lazy = LazyApp("backend.app.main:app", warmup=None).start()
+        assert lazy.wait(30) and lazy.ready
+        assert TestClient(lazy).get("/api/health").json()["ready"] is True
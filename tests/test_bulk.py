@@ -0,0 +1,121 @@
+"""Tests for the bulk generator and its incremental manifest."""
+
+import json
+import shutil
+
+import pytest
+
+from sas_randomizer import bulk
+from sas_randomizer.cli import main as cli_main
+from sas_randomizer.utils.atomic_io import atomic_open, atomic_write_text, is_temp_file
+
+
+@pytest.fixture
+def portfolio(tmp_path, default_request_data):
+    configs = tmp_path / "configs"
+    for rel, study_id in (("a/S001.json", "S001"), ("a/S002.json", "S002"), ("b/S003.json", "S003")):
+        path = configs / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({**default_request_data, "study_id": study_id}), encoding="utf-8")
+    return configs
+
+
+class TestBulkGenerate:
+
+    def test_first_run_renders_tree(self, portfolio, tmp_path):
+        out = tmp_path / "out"
+        result = bulk.generate_tree(str(portfolio), str(out), jobs=2)
+        assert result.ok and sorted(result.generated) == ["a/S001.json", "a/S002.json", "b/S003.json"]
+        assert "S003" in (out / "b" / "S003.sas").read_text(encoding="utf-8")
+        manifest = json.loads((out / bulk.MANIFEST_NAME).read_text(encoding="utf-8"))
+        assert set(manifest["studies"]) == set(result.generated)
+        assert not list(out.rglob(".tmp-*"))
+
+    def test_only_changed_configs_rerender(self, portfolio, tmp_path, default_request_data):
+        out = tmp_path / "out"
+        bulk.generate_tree(str(portfolio), str(out), jobs=1)
+        # Reformatting alone does not change the canonical hash
+        path = portfolio / "a" / "S001.json"
+        path.write_text(json.dumps(json.loads(path.read_text(encoding="utf-8")), indent=4), encoding="utf-8")
+        (portfolio / "a" / "S002.json").write_text(
+            json.dumps({**default_request_data, "study_id": "S002", "block_size": 6}), encoding="utf-8")
+        (portfolio / "b" / "S003.json").unlink()
+
+        result = bulk.generate_tree(str(portfolio), str(out), jobs=1)
+        assert result.generated == ["a/S002.json"]
+        assert result.unchanged == ["a/S001.json"]
+        assert result.removed == ["b/S003.json"]
+        assert not (out / "b" / "S003.sas").exists() and (out / "a" / "S001.sas").exists()
+        assert "b/S003.json" not in json.loads((out / bulk.MANIFEST_NAME).read_text(encoding="utf-8"))["studies"]
+
+    def test_template_change_rerenders_everything(self, portfolio, tmp_path, monkeypatch):
+        out = tmp_path / "out"
+        bulk.generate_tree(str(portfolio), str(out), jobs=1)
+        assert bulk.generate_tree(str(portfolio), str(out), jobs=1).generated == []
+        monkeypatch.setattr(bulk, "template_hash", lambda: "changed")
+        assert len(bulk.generate_tree(str(portfolio), str(out), jobs=1).generated) == 3
+
+    def test_missing_output_and_failures(self, portfolio, tmp_path):
+        out = tmp_path / "out"
+        bulk.generate_tree(str(portfolio), str(out), jobs=1)
+        (out / "a" / "S001.sas").unlink()
+        (portfolio / "bad.json").write_text(json.dumps({"study_id": ""}), encoding="utf-8")
+        (portfolio / "broken.json").write_text("{", encoding="utf-8")
+
+        result = bulk.generate_tree(str(portfolio), str(out), jobs=1)
+        assert result.generated == ["a/S001.json"]
+        assert set(result.failed) == {"bad.json", "broken.json"}
+        assert not result.ok
+
+    def test_malformed_config_fails_alone(self, portfolio, tmp_path, default_request_data):
+        (portfolio / "BAD.json").write_text(
+            json.dumps({**default_request_data, "study_id": "BAD", "drug_randomization_config": "yes"}),
+            encoding="utf-8")
+        for jobs in (1, 2):
+            out = tmp_path / f"out{jobs}"
+            result = bulk.generate_tree(str(portfolio), str(out), jobs=jobs)
+            assert sorted(result.generated) == ["a/S001.json", "a/S002.json", "b/S003.json"]
+            assert list(result.failed) == ["BAD.json"]
+            manifest = json.loads((out / bulk.MANIFEST_NAME).read_text(encoding="utf-8"))
+            assert set(manifest["studies"]) == set(result.generated)
+
+    def test_template_hash_is_stable(self):
+        assert bulk.template_hash() == bulk.template_hash()
+
+    def test_template_hash_covers_generator_modules(self, tmp_path):
+        root = tmp_path / "core"
+        shutil.copytree(bulk._CORE_DIR, root, ignore=shutil.ignore_patterns("__pycache__"))
+        before = bulk.template_hash(root)
+        assert before == bulk.template_hash()
+        for rel in ("schemas.py", "utils/template_renderer.py", "templates/macros/m_rand.sas"):
+            path = root / rel
+            path.write_bytes(path.read_bytes() + b"\n")
+            after = bulk.template_hash(root)
+            assert after != before, rel
+            before = after
+
+
+class TestAtomicWrite:
+
+    def test_failed_write_leaves_target_and_no_temp_file(self, tmp_path):
+        target = tmp_path / "sub" / "out.sas"
+        atomic_write_text(target, "old")
+        with pytest.raises(RuntimeError):
+            with atomic_open(target) as f:
+                f.write(b"partial")
+                raise RuntimeError("interrupted")
+        assert target.read_text(encoding="utf-8") == "old"
+        assert [p.name for p in target.parent.iterdir()] == ["out.sas"]
+        assert is_temp_file(".tmp-abcout.sas") and not is_temp_file("out.sas")
+
+
+class TestGenerateCommand:
+
+    def test_cli_reports_counts(self, portfolio, tmp_path, capsys):
+        out = str(tmp_path / "out")
+        assert cli_main(["generate", str(portfolio), "-o", out, "-j", "1"]) == 0
+        assert "3 generated, 0 unchanged" in capsys.readouterr().out
+        assert cli_main(["generate", str(portfolio), "-o", out, "-j", "1"]) == 0
+        assert "0 generated, 3 unchanged" in capsys.readouterr().out
+        assert cli_main(["generate", str(portfolio), "-o", out, "-j", "1", "--force"]) == 0
+        assert "3 generated" in capsys.readouterr().out
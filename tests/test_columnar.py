@@ -0,0 +1,90 @@
+"""Tests for the compact columnar list format (.rgl)."""
+
+import io
+
+import numpy as np
+import pytest
+
+from sas_randomizer.cli import main as cli_main
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.block import generate_subject_list
+from sas_randomizer.native.columnar import _affine_segments, load_list, read_list_header, save_list
+from sas_randomizer.native.supplier_csv import read_list_csv
+from sas_randomizer.native.writers import iter_list_csv
+from sas_randomizer.utils.fingerprint import config_hash
+
+from .test_kit_index import _drug_csv
+
+
+def _assert_same(a, b):
+    assert a.kind == b.kind and len(a) == len(b)
+    assert a.dictionaries == b.dictionaries and vars(a.number) == vars(b.number)
+    for name, values in a.columns.items():
+        assert b.columns[name].dtype == values.dtype, name
+        np.testing.assert_array_equal(b.columns[name], values, err_msg=name)
+
+
+class TestAffineSegments:
+
+    def test_shapes(self):
+        assert _affine_segments(np.arange(1, 11)) == [[0, 1, 1, 1]]
+        assert _affine_segments(np.full(5, 3)) == [[0, 3, 0, 1]]
+        assert _affine_segments(np.repeat(np.arange(1, 4), 4)[:-1]) == [[0, 1, 1, 4]]
+        # Numbering that jumps by num_gap at a stratum boundary
+        jumped = np.concatenate([np.arange(1, 41), np.arange(1041, 1081)])
+        assert _affine_segments(jumped) == [[0, 1, 1, 1], [40, 1041, 1, 1]]
+
+    def test_random_column_is_not_affine(self):
+        values = np.random.default_rng(0).integers(0, 1000, size=5000)
+        assert _affine_segments(values) is None
+
+
+class TestColumnarFormat:
+
+    def test_subject_round_trip(self, default_request_data, tmp_path):
+        request = {**default_request_data, "mirror_replacement": True, "blocks_per_stratum": 200}
+        study = convert_ui_payload_to_study_design(request)
+        rand_list = generate_subject_list(study, seed=3)
+        path = str(tmp_path / "subjects.rgl")
+        info = save_list(rand_list, path)
+
+        assert info["config_hash"] == config_hash(study)
+        assert info["columns"]["seq"] == "affine"
+        assert info["columns"]["armcd"] == "plain"
+        loaded = load_list(path)
+        _assert_same(rand_list, loaded)
+        assert loaded.meta["config_hash"] == config_hash(study)
+        assert b"".join(iter_list_csv(loaded)) == b"".join(iter_list_csv(rand_list))
+
+    def test_drug_round_trip_and_header(self, tmp_path):
+        rand_list = read_list_csv(io.StringIO(_drug_csv(300)))
+        path = str(tmp_path / "kits.rgl")
+        save_list(rand_list, path, config_hash="abc123")
+        header = read_list_header(path)
+        assert header["kind"] == "drug" and header["rows"] == 300
+        assert header["config_hash"] == "abc123"
+        assert header["columns"]["seq"]["encoding"] == "affine"
+        assert header["columns"]["drugno"] == {"dtype": "<i8", "encoding": "alias", "of": "seq"}
+        _assert_same(rand_list, load_list(path))
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "not_a_list.rgl"
+        path.write_bytes(b"hello world, not a list")
+        with pytest.raises(ValueError):
+            load_list(str(path))
+
+    def test_cli_pack(self, tmp_path, capsys):
+        csv_path = tmp_path / "DEMO_Drug_List.csv"
+        csv_path.write_text(_drug_csv(), encoding="utf-8")
+        assert cli_main(["pack", str(csv_path), "-v"]) == 0
+        out = capsys.readouterr().out
+        assert "200 rows" in out and "drugno" in out
+        packed = load_list(str(tmp_path / "DEMO_Drug_List.rgl"))
+        _assert_same(read_list_csv(str(csv_path)), packed)
+
+    def test_allocation_lists_are_stored_columnar(self, client, data_dir, default_request_data):
+        created = client.post("/api/v1/allocation/lists", json={"request": default_request_data, "seed": 1})
+        list_id = created.json()["list_id"]
+        assert list(data_dir.rglob(f"{list_id}.rgl"))
+        claim = client.post(f"/api/v1/allocation/lists/{list_id}/subjects/next", json={"ref": "S1"})
+        assert claim.status_code == 200
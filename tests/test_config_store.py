@@ -0,0 +1,221 @@
+"""Tests for the versioned study configuration store and the /configs API."""
+
+import copy
+import threading
+import time
+
+import pytest
+
+from backend.app.api.schemas import SASGenerationRequest
+from backend.app.metrics import reset_metrics
+from backend.app.services import config_store
+from backend.app.services.config_store import ConfigNotFoundError, ConfigStore, diff, patch
+from sas_randomizer.utils.fingerprint import config_hash
+
+
+@pytest.fixture
+def base_config(default_request_data):
+    return SASGenerationRequest.model_validate(default_request_data).model_dump(mode="json")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ConfigStore(tmp_path)
+    yield store
+    store.close()
+
+
+def _variant(config, **changes):
+    config = copy.deepcopy(config)
+    config.update(changes)
+    return config
+
+
+class TestDelta:
+
+    def test_round_trip(self):
+        old = {"a": 1, "b": {"c": [1, 2], "d": {"e": "x"}}, "gone": True}
+        new = {"a": 1, "b": {"c": [1, 3], "d": {"e": "x", "f": None}}, "added": "y"}
+        delta = diff(old, new)
+        assert delta["unset"] == ["gone"] and "a" not in delta.get("set", {})
+        assert delta["sub"]["b"]["set"] == {"c": [1, 3]}
+        assert patch(old, delta) == new
+        assert old["b"]["d"] == {"e": "x"}  # not modified
+        assert diff(new, new) == {}
+
+
+class TestConfigStore:
+
+    def test_versions_and_dedup(self, store, base_config):
+        created = store.create(base_config, name="Main", message="initial")
+        config_id = created["config_id"]
+        assert created["head_version"] == 1 and created["head_hash"] == config_hash(base_config)
+
+        changed = _variant(base_config, status="Final")
+        assert store.save(config_id, changed, message="final")["head_version"] == 2
+        # Unchanged content: no new version
+        assert store.save(config_id, changed)["head_version"] == 2
+        # A second config with the same content shares the stored content
+        store.create(changed)
+        stats = store.stats()
+        assert stats["studies"] == 2 and stats["versions"] == 3 and stats["contents"] == 2
+
+        assert [v["version"] for v in store.versions(config_id)] == [2, 1]
+        assert store.get_config(config_id, 1) == base_config
+        assert store.get_config(config_id) == changed
+        assert store.summary(config_id)["status"] == "Final"
+
+    def test_delta_chain_is_bounded(self, store, base_config):
+        config_id = store.create(base_config)["config_id"]
+        configs = [base_config]
+        for i in range(1, config_store.MAX_CHAIN + 4):
+            configs.append(_variant(base_config, blocks_per_stratum=10 + i))
+            store.save(config_id, configs[-1])
+        depths = [row[0] for row in store._conn.execute("SELECT depth FROM contents")]
+        assert max(depths) == config_store.MAX_CHAIN - 1 and depths.count(0) == 2
+
+        # Decoding from disk (cold cache) gives back every version exactly
+        store._contents.clear()
+        for version, config in enumerate(configs, start=1):
+            assert store.get_config(config_id, version) == config
+        assert store.stats()["content_bytes"] < len(configs) * len(config_store._pack(base_config)) / 2
+
+    def test_search(self, store, base_config):
+        for i in range(30):
+            study = f"{'ONC' if i % 2 else 'CARD'}-{i:03d}"
+            config_id = store.create(_variant(base_config, study_id=study, client=f"C{i % 3}"))["config_id"]
+            if i % 5 == 0:
+                store.save(config_id, _variant(base_config, study_id=study, client=f"C{i % 3}", status="Final"))
+
+        everything = store.search()
+        assert everything["total"] == 30
+        updated = [item["updated_at"] for item in everything["items"]]
+        assert updated == sorted(updated, reverse=True)
+        assert store.search(q="ONC")["total"] == 15
+        assert store.search(q="ONC", client="C1")["total"] == 5
+        assert store.search(status="Final")["total"] == 6
+        assert store.search(study_id="CARD-004")["items"][0]["study_id"] == "CARD-004"
+        page = store.search(limit=10, offset=25)
+        assert page["total"] == 30 and len(page["items"]) == 5
+
+    def test_search_uses_indexes(self, store):
+        for column in ("study_id", "client", "status"):
+            plan = " ".join(row[-1] for row in store._conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT config_id FROM studies WHERE {column}=? ORDER BY updated_at DESC",
+                ("x",)))
+            assert "USING INDEX" in plan and "TEMP B-TREE" not in plan
+
+    def test_search_stays_fast(self, store, base_config):
+        ids = [store.create(_variant(base_config, study_id=f"S{i:04d}", client=f"C{i % 20}"))["config_id"]
+               for i in range(500)]
+        for version in range(2, 5):
+            for i, config_id in enumerate(ids):
+                store.save(config_id, _variant(base_config, study_id=f"S{i:04d}", client=f"C{i % 20}",
+                                               blocks_per_stratum=10 + version))
+        assert store.stats()["versions"] == 2000
+        started = time.perf_counter()
+        for i in range(50):
+            assert store.search(client=f"C{i % 20}", limit=20)["total"] == 25
+            assert store.search(q=f"S0{i % 5}")["total"] == 100
+        assert (time.perf_counter() - started) / 100 < 0.02
+
+    def test_concurrent_readers_and_writers(self, store, base_config):
+        config_id = store.create(base_config)["config_id"]
+        digest = store.summary(config_id)["head_hash"]
+        errors = []
+
+        def write():
+            try:
+                for i in range(100):
+                    store.save(config_id, _variant(base_config, blocks_per_stratum=20 + i))
+            except Exception as e:
+                errors.append(e)
+
+        def read():
+            try:
+                for _ in range(200):
+                    store.summary(config_id)
+                    store.search(q="TEST")
+                    store.get_render(digest, "v1")
+                    store.versions(config_id)
+            except Exception as e:  # sqlite raises on unsynchronized use of one connection
+                errors.append(e)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors and store.summary(config_id)["head_version"] == 101
+
+    def test_renders(self, store, base_config):
+        digest = store.create(base_config)["head_hash"]
+        assert store.put_render("unsaved", "v1", "data x;") is False
+        assert store.put_render(digest, "v1", "data a;") is True
+        assert store.get_render(digest, "v1") == "data a;"
+        assert store.put_render(digest, "v2", "data b;") is True
+        assert store.get_render(digest, "v1") is None and store.get_render(digest, "v2") == "data b;"
+
+    def test_unknown(self, store, base_config):
+        config_id = store.create(base_config)["config_id"]
+        with pytest.raises(ConfigNotFoundError):
+            store.summary("missing")
+        with pytest.raises(ConfigNotFoundError):
+            store.save("missing", base_config)
+        with pytest.raises(ConfigNotFoundError):
+            store.get_config(config_id, 9)
+
+
+class TestConfigsApi:
+
+    def test_save_list_and_versions(self, client, data_dir, default_request_data):
+        created = client.post("/api/v1/configs", json={"request": default_request_data, "name": "Main"})
+        assert created.status_code == 200
+        config_id = created.json()["config_id"]
+
+        changed = {**default_request_data, "status": "Final"}
+        saved = client.put(f"/api/v1/configs/{config_id}", json={"request": changed, "message": "lock"}).json()
+        assert saved["head_version"] == 2 and saved["name"] == "Main"
+
+        detail = client.get(f"/api/v1/configs/{config_id}").json()
+        assert detail["config"]["status"] == "Final"
+        versions = client.get(f"/api/v1/configs/{config_id}/versions").json()
+        assert [(v["version"], v["message"]) for v in versions] == [(2, "lock"), (1, None)]
+        first = client.get(f"/api/v1/configs/{config_id}/versions/1")
+        assert first.json()["status"] == default_request_data["status"]
+        assert client.get(f"/api/v1/configs/{config_id}/versions/1",
+                          headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+        listing = client.get("/api/v1/configs", params={"status": "Final"}).json()
+        assert listing["total"] == 1 and listing["items"][0]["config_id"] == config_id
+        assert client.get("/api/v1/configs", params={"q": "no-such-study"}).json()["total"] == 0
+
+    def test_sas_of_saved_version_and_generate_reuse(self, client, data_dir, default_request_data):
+        reset_metrics()
+        try:
+            config_id = client.post("/api/v1/configs", json={"request": default_request_data}).json()["config_id"]
+            sas = client.get(f"/api/v1/configs/{config_id}/sas")
+            assert sas.status_code == 200 and "data" in sas.text.lower()
+            assert client.get(f"/api/v1/configs/{config_id}/sas?version=1",
+                              headers={"If-None-Match": sas.headers["ETag"]}).status_code == 304
+
+            generated = client.post("/api/v1/generate", json=default_request_data)
+            assert generated.text == sas.text and generated.headers["ETag"] == sas.headers["ETag"]
+            counters = client.get("/api/v1/metrics").json()["counters"]
+            assert counters["generate"] == 1 and counters["config_store_hits"] == 1
+        finally:
+            reset_metrics()
+
+    def test_generate_does_not_create_the_store(self, client, data_dir, default_request_data):
+        assert client.post("/api/v1/generate", json=default_request_data).status_code == 200
+        assert not (data_dir / config_store.DB_NAME).exists()
+
+    def test_errors(self, client, data_dir, default_request_data):
+        assert client.get("/api/v1/configs/missing").status_code == 404
+        assert client.put("/api/v1/configs/missing", json={"request": default_request_data}).status_code == 404
+        assert client.get("/api/v1/configs/missing/versions").status_code == 404
+        assert client.get("/api/v1/configs/missing/sas").status_code == 404
+        config_id = client.post("/api/v1/configs", json={"request": default_request_data}).json()["config_id"]
+        assert client.get(f"/api/v1/configs/{config_id}/versions/5").status_code == 404
+        assert client.get(f"/api/v1/configs/{config_id}/sas?version=5").status_code == 404
+        assert client.post("/api/v1/configs", json={"request": {}}).status_code == 422
@@ -0,0 +1,111 @@
+"""Tests for the native drug (kit) list engine."""
+
+import io
+
+import numpy as np
+import pytest
+
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.drug import generate_drug_list
+from sas_randomizer.native.layouts import SUPPLIER_A, SUPPLIER_B5, SUPPLIER_B6
+from sas_randomizer.native.verify import verify_list
+from sas_randomizer.native.writers import iter_list_csv
+
+DRUG_ARMS = [{"code": "A", "name": "Drug A", "ratio": 1, "drug_spec": "10mg"},
+             {"code": "B", "name": "Placebo", "ratio": 1}]
+
+BATCHED = {
+    "drug_stratification_factors": ["批次"],
+    "drug_strata_levels": {"批次": ["CN", "EU"]},
+    "drug_sec_rand_enabled": True,
+    "num_gap": 100,
+    "drug_batch_configs": {"supply_factor": "批次", "configs": {
+        "CN": [{"batch_no": "L1", "quantity": 8}, {"batch_no": "L2", "quantity": 4}],
+        "EU": [{"batch_no": "L3", "quantity": "auto"}, {"batch_no": "L4", "quantity": 2}],
+    }},
+}
+
+
+def _drug_config(**drug):
+    return {"enabled": True, "drug_arms": DRUG_ARMS, "drug_block_size": 4, "drug_block_layers": 3,
+            "drug_start_number": 1, "drug_number_prefix": "D", "drug_number_length": 4, **drug}
+
+
+def _study(default_request_data, **drug):
+    return convert_ui_payload_to_study_design(
+        {**default_request_data, "drug_randomization_config": _drug_config(**drug)})
+
+
+class TestDrugEngine:
+
+    def test_plain_list_is_numbered_and_balanced(self, default_request_data):
+        rl = generate_drug_list(_study(default_request_data))
+        cols = rl.columns
+        assert rl.kind == "drug" and len(rl) == 12
+        assert rl.number_strings()[:3].tolist() == ["D0001", "D0002", "D0003"]
+        assert cols["seq"].tolist() == cols["secorder"].tolist() == list(range(1, 13))
+        for bn in (1, 2, 3):
+            assert np.bincount(cols["drugcd"][cols["bn"] == bn], minlength=2).tolist() == [2, 2]
+        assert set(rl.decode("drugsize")) == {"Drug A 10mg", "Placebo"}
+        assert set(rl.decode("batch")) == {""}
+
+    def test_same_seed_same_list(self, default_request_data):
+        study = _study(default_request_data, **BATCHED)
+        first, second = generate_drug_list(study, seed=5), generate_drug_list(study, seed=5)
+        assert all(np.array_equal(first.columns[k], second.columns[k]) for k in first.columns)
+        assert first.meta["seed"] == 5 and first.meta["sec_rand"]
+
+    def test_secondary_randomization_assigns_batches_by_cumulative_quantity(self, default_request_data):
+        rl = generate_drug_list(_study(default_request_data, **BATCHED), seed=7)
+        cols = rl.columns
+        assert cols["seq"].tolist() == list(range(1, 25))  # delivered in dispensing order
+        assert rl.dictionaries["batch"] == ["", "L1", "L2", "L3", "L4"]
+        batches = rl.decode("batch")
+        stratum, k = cols["secorder"] // 10000, cols["secorder"] % 10000
+        # Kits numbered first in each stratum fill the first batch; 'auto' counts as 10
+        for lot, s, lo, hi in (("L1", 1, 1, 8), ("L2", 1, 9, 12), ("L3", 2, 1, 10), ("L4", 2, 11, 12)):
+            sel = batches == lot
+            assert sorted(k[sel].tolist()) == list(range(lo, hi + 1)) and set(stratum[sel]) == {s}
+        assert sorted(cols["drugno"][batches == "L1"].tolist()) == list(range(1, 9))
+        assert sorted(cols["drugno"][batches == "L4"].tolist()) == [123, 124]
+        assert "Placebo CN" in set(rl.decode("drugsize"))
+
+    def test_batch_total_must_cover_every_kit(self, default_request_data):
+        short = {**BATCHED, "drug_batch_configs": {"supply_factor": "批次", "configs": {
+            "CN": [{"batch_no": "L1", "quantity": 12}], "EU": [{"batch_no": "L2", "quantity": 5}]}}}
+        with pytest.raises(ValueError, match="7 个药物编号"):
+            generate_drug_list(_study(default_request_data, **short))
+
+    def test_requires_enabled_drug_config(self, default_request_data):
+        with pytest.raises(ValueError):
+            generate_drug_list(convert_ui_payload_to_study_design(default_request_data))
+
+
+class TestDrugListDelivery:
+
+    @pytest.mark.parametrize("supplier", [SUPPLIER_A, SUPPLIER_B6, SUPPLIER_B5])
+    def test_written_list_verifies(self, default_request_data, supplier):
+        study = _study(default_request_data, **BATCHED)
+        text = b"".join(iter_list_csv(generate_drug_list(study), supplier=supplier, sec_rand=True)).decode("utf-8")
+        report = verify_list(io.StringIO(text), study, chunk_rows=7)
+        assert report.ok, report.issues
+        if supplier == SUPPLIER_A:
+            assert report.checks["batch_quantity"] == "passed"
+
+    def test_cli_export_drug_list(self, default_request_data, tmp_path):
+        import json
+        from sas_randomizer.cli import main as cli_main
+
+        request = tmp_path / "request.json"
+        request.write_text(json.dumps({**default_request_data, "drug_randomization_config": _drug_config()}),
+                           encoding="utf-8")
+        assert cli_main(["export", str(request), "--kind", "drug", "-o", str(tmp_path / "out")]) == 0
+        assert [p.name for p in (tmp_path / "out").iterdir()] == ["TEST001_Drug_List_Draft.csv"]
+
+    def test_allocation_kit_claims(self, client, data_dir, default_request_data):
+        request = {**default_request_data, "drug_randomization_config": _drug_config()}
+        created = client.post("/api/v1/allocation/lists", json={"request": request, "kind": "drug", "seed": 3})
+        assert created.status_code == 200 and created.json()["kind"] == "drug"
+        list_id = created.json()["list_id"]
+        kit = client.post(f"/api/v1/allocation/lists/{list_id}/kits/next", json={"arm": "A"})
+        assert kit.status_code == 200 and kit.json()["number"].startswith("D")
@@ -0,0 +1,124 @@
+"""Tests for the pre-flight feasibility analyzer."""
+
+import time
+
+import pytest
+
+from sas_randomizer.core_refactored.feasibility import (
+    ERROR, WARNING, FeasibilityError, analyze, check_feasibility, variable_block_counts)
+from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.block import solve_variable_blocks
+
+BATCHED_DRUG = {
+    "enabled": True,
+    "drug_arms": [{"code": "A", "name": "Drug A", "ratio": 1}, {"code": "B", "name": "Placebo", "ratio": 1}],
+    "drug_block_size": 4,
+    "drug_block_layers": 3,
+    "drug_stratification_factors": ["批次"],
+    "drug_strata_levels": {"批次": ["CN", "EU"]},
+    "drug_sec_rand_enabled": True,
+    "drug_batch_configs": {"supply_factor": "批次", "configs": {
+        "CN": [{"batch_no": "L1", "quantity": 8}, {"batch_no": "L2", "quantity": 8}],
+        "EU": [{"batch_no": "L3", "quantity": 10}]}},
+}
+
+
+def _report(default_request_data, **overrides):
+    return analyze(convert_ui_payload_to_study_design({**default_request_data, **overrides}))
+
+
+def _found(report):
+    return {(f.path, f.code, f.severity) for f in report.findings}
+
+
+class TestVariableBlockSolver:
+
+    def test_closed_form_matches_m_rand_search(self):
+        for total in range(1, 150):
+            for size1 in range(1, 11):
+                for size2 in range(1, 11):
+                    try:
+                        expected = solve_variable_blocks(total, size1, size2)
+                    except ValueError:
+                        expected = None
+                    assert variable_block_counts(total, size1, size2) == expected, (total, size1, size2)
+
+    def test_large_totals_need_no_enumeration(self):
+        assert variable_block_counts(10 ** 12, 4, 6) == (10 ** 11, 10 ** 11)
+        assert variable_block_counts(10 ** 12 + 1, 4, 6) is None
+
+
+class TestAnalyzer:
+
+    def test_default_design_is_clean(self, default_request_data):
+        report = _report(default_request_data)
+        assert report.ok and report.findings == []
+
+    def test_every_problem_reported_in_one_pass(self, default_request_data):
+        report = _report(
+            default_request_data, block_size=5, num_gap=-10,
+            drug_randomization_config={**BATCHED_DRUG, "drug_block_size": 3})
+        assert {("block_size", "block_ratio", ERROR), ("num_gap", "num_gap", ERROR),
+                ("drug_randomization_config.block_size", "block_ratio", ERROR)} <= _found(report)
+        assert not report.ok and len(report.errors) >= 3
+
+    def test_ratio_expansion_and_variable_blocks(self, default_request_data):
+        arms = [{"armcd": "T", "arm": "T", "ratio": 2}, {"armcd": "P", "arm": "P", "ratio": 1}]
+        assert ("block_size", "block_ratio", ERROR) in _found(_report(default_request_data, treatment_arms=arms))
+        assert _report(default_request_data, treatment_arms=arms, block_size=6).ok
+
+        report = _report(default_request_data, variable_block_enabled=True, variable_block_sizes=[4, 6],
+                         total_sample_size=42)
+        assert report.ok
+        report = _report(default_request_data, variable_block_enabled=True, variable_block_sizes=[4, 6],
+                         total_sample_size=41)
+        assert ("total_sample_size", "variable_block", ERROR) in _found(report)
+        assert "无法使用区组大小 4 和 6" in report.errors[0].message
+
+    def test_number_overflow_and_block_number_overlap(self, default_request_data):
+        report = _report(default_request_data, start_subject_number=9990)
+        assert ("subject_number_length", "number_overflow", ERROR) in _found(report)
+        assert "10029" in report.errors[0].message
+
+        strata = {"stratification_factors": ["site"], "strata_levels": {"site": ["S1", "S2"]}}
+        report = _report(default_request_data, **strata, mirror_gap=5)
+        assert _found(report) == {("mirror_gap", "block_number_overlap", ERROR)}
+        assert _report(default_request_data, **strata, num_gap=100).ok
+
+    def test_batch_totals_against_kit_count(self, default_request_data):
+        report = _report(default_request_data, drug_randomization_config=BATCHED_DRUG)
+        assert _found(report) == {("drug_randomization_config.batch_settings.CN", "batch_quantity", ERROR),
+                                  ("drug_randomization_config.batch_settings.EU", "batch_quantity", WARNING)}
+        assert "16 超过该层药物数量 12" in report.errors[0].message
+
+    def test_typical_design_is_analyzed_under_a_millisecond(self, default_request_data):
+        study = convert_ui_payload_to_study_design({**default_request_data, "drug_randomization_config": BATCHED_DRUG})
+        start = time.perf_counter()
+        for _ in range(100):
+            analyze(study)
+        assert (time.perf_counter() - start) / 100 < 0.001
+
+
+class TestGenerationGate:
+
+    def test_generation_rejects_infeasible_design(self, default_request_data):
+        with pytest.raises(FeasibilityError) as info:
+            SASRandomizationGenerator(**{**default_request_data, "block_size": 5, "num_gap": -1}).generate_sas_code()
+        assert "block_size:" in str(info.value) and "num_gap:" in str(info.value)
+        assert len(info.value.report.errors) == 2
+
+    def test_warnings_do_not_block(self, default_request_data):
+        study = convert_ui_payload_to_study_design({**default_request_data, "num_gap": 100})
+        assert check_feasibility(study).findings[0].severity == WARNING
+
+    def test_validate_and_generate_endpoints(self, client, default_request_data):
+        bad = {**default_request_data, "block_size": 5, "drug_randomization_config": BATCHED_DRUG}
+        report = client.post("/api/v1/validate", json=bad).json()
+        assert report["ok"] is False and report["errors"] == 2 and report["warnings"] == 1
+        assert {f["path"] for f in report["findings"]} == {
+            "block_size", "drug_randomization_config.batch_settings.CN", "drug_randomization_config.batch_settings.EU"}
+
+        response = client.post("/api/v1/generate", json=bad)
+        assert response.status_code == 400 and "block_size" in response.json()["detail"]
+        assert client.post("/api/v1/validate", json=default_request_data).json()["ok"] is True
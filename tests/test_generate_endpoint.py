@@ -1,6 +1,6 @@
 """Contract tests for POST /api/v1/generate."""
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 
 class TestGenerateHappyPath:
@@ -90,10 +90,9 @@ class TestGenerateServerErrors:
         # Simulate a non-business failure deep in the generator carrying
         # sensitive-looking text. It must NOT surface in the HTTP response.
         secret = "SECRET_INTERNAL_DETAIL_9f8e7d"
-        with patch(
-            "backend.app.services.sas_service.SASRandomizationGenerator"
-        ) as mock_gen:
-            mock_gen.return_value.generate_sas_code.side_effect = RuntimeError(secret)
+        mock_gen = MagicMock()
+        mock_gen.return_value.generate_sas_code.side_effect = RuntimeError(secret)
+        with patch("backend.app.services.sas_service.generator_class", return_value=mock_gen):
             response = client.post("/api/v1/generate", json=default_request_data)
 
         assert response.status_code == 500
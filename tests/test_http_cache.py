@@ -0,0 +1,82 @@
+"""Tests for conditional GET (ETag / 304), Range and response compression."""
+
+from urllib.parse import quote
+
+import pytest
+
+from backend.app.compression import choose_encoding
+
+TEMPLATE = "供应商A_受试者分配表模板.xlsx"
+
+
+class TestNegotiation:
+
+    @pytest.mark.parametrize("header, expected", [
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0, identity", None),
+        ("*", "gzip"),
+        ("", None),
+    ])
+    def test_choose_encoding(self, header, expected, monkeypatch):
+        monkeypatch.setattr("backend.app.compression.brotli", None)
+        assert choose_encoding(header) == expected
+
+
+class TestGenerateValidators:
+
+    def test_etag_and_304(self, client, default_request_data):
+        first = client.post("/api/v1/generate", json=default_request_data)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert first.headers["content-encoding"] == "gzip" and etag.endswith('-gzip"')
+
+        again = client.post("/api/v1/generate", json=default_request_data, headers={"If-None-Match": etag})
+        assert again.status_code == 304 and again.content == b""
+
+        changed = client.post("/api/v1/generate", json={**default_request_data, "block_size": 6},
+                              headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+    def test_identity_encoding(self, client, default_request_data):
+        response = client.post("/api/v1/generate", json=default_request_data,
+                               headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert "-gzip" not in response.headers["etag"]
+
+    def test_small_responses_are_not_compressed(self, client):
+        assert "content-encoding" not in client.get("/api/health").headers
+
+
+class TestStaticValidators:
+
+    def test_defaults_etag(self, client):
+        first = client.get("/api/v1/config/defaults")
+        again = client.get("/api/v1/config/defaults", headers={"If-None-Match": first.headers["etag"]})
+        assert again.status_code == 304
+
+    def test_template_conditional_and_range(self, client):
+        url = f"/api/v1/templates/{quote(TEMPLATE)}"
+        full = client.get(url)
+        assert full.status_code == 200
+        assert "content-encoding" not in full.headers
+        assert full.headers["accept-ranges"] == "bytes"
+
+        by_etag = client.get(url, headers={"If-None-Match": full.headers["etag"]})
+        by_date = client.get(url, headers={"If-Modified-Since": full.headers["last-modified"]})
+        assert by_etag.status_code == 304 and by_date.status_code == 304
+
+        partial = client.get(url, headers={"Range": "bytes=0-99"})
+        assert partial.status_code == 206
+        assert partial.content == full.content[:100]
+        assert partial.headers["content-range"].startswith("bytes 0-99/")
+
+
+class TestStreamingCompression:
+
+    def test_streamed_export_is_compressed(self, client, data_dir, default_request_data):
+        created = client.post("/api/v1/allocation/lists", json={"request": default_request_data, "seed": 3})
+        response = client.get(f"/api/v1/allocation/lists/{created.json()['list_id']}/export")
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text.count("\r\n") > 40
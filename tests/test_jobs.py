@@ -0,0 +1,217 @@
+"""Tests for the background job manager and the /jobs API."""
+
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from backend.app.services import job_service
+from backend.app.services.job_service import (
+    CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobManager, JobNotFoundError, JobQueueFullError, job_kind)
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.block import generate_subject_list
+from sas_randomizer.native.layouts import SUPPLIER_A
+from sas_randomizer.native.writers import iter_list_csv
+
+GATE = threading.Event()
+
+
+@job_kind("test_wait")
+def _wait_job(ctx):
+    """Reports progress until the gate opens (or the job is cancelled)."""
+    for step in range(1000):
+        ctx.progress(step, 1000)
+        if GATE.wait(0.01):
+            return {"steps": step}
+    raise RuntimeError("gate never opened")
+
+
+@job_kind("test_fail")
+def _fail_job(ctx):
+    raise ValueError("配置错误")
+
+
+def _wait(manager, job_id, statuses=(SUCCEEDED, FAILED, CANCELLED), timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+@pytest.fixture
+def manager(tmp_path):
+    GATE.clear()
+    manager = JobManager(tmp_path, max_concurrent=1, max_queued=2)
+    yield manager
+    GATE.set()
+    manager.close(wait=True)
+
+
+class TestJobManager:
+
+    def test_bounded_concurrency_and_result(self, manager):
+        first = manager.submit("test_wait")
+        second = manager.submit("test_wait")
+        assert _wait(manager, first["job_id"], (RUNNING,))["status"] == RUNNING
+        time.sleep(0.05)
+        assert manager.get(second["job_id"])["status"] == QUEUED
+        GATE.set()
+        done = _wait(manager, first["job_id"])
+        assert done["status"] == SUCCEEDED and "steps" in done["result"]
+        assert done["done"] == done["total"] == 1000 and done["percent"] == 100.0
+        assert _wait(manager, second["job_id"])["status"] == SUCCEEDED
+
+    def test_queue_limit(self, manager):
+        manager.submit("test_wait")
+        _wait(manager, manager.list_jobs()[0]["job_id"], (RUNNING,))
+        manager.submit("test_wait")
+        manager.submit("test_wait")
+        with pytest.raises(JobQueueFullError):
+            manager.submit("test_wait")
+        with pytest.raises(ValueError):
+            manager.submit("no_such_kind")
+
+    def test_cancel_running_and_queued(self, manager):
+        running = manager.submit("test_wait")["job_id"]
+        queued = manager.submit("test_wait")["job_id"]
+        _wait(manager, running, (RUNNING,))
+        assert manager.cancel(queued)["cancel_requested"] is True
+        manager.cancel(running)
+        assert _wait(manager, running)["status"] == CANCELLED
+        assert _wait(manager, queued)["status"] == CANCELLED
+        assert manager.get(queued)["started_at"] is None
+
+    def test_cancel_through_database_from_another_process(self, manager, tmp_path):
+        job_id = manager.submit("test_wait")["job_id"]
+        _wait(manager, job_id, (RUNNING,))
+        other = sqlite3.connect(str(tmp_path / "jobs.sqlite3"))
+        other.execute("UPDATE jobs SET cancel_requested=1 WHERE job_id=?", (job_id,))
+        other.commit()
+        other.close()
+        assert _wait(manager, job_id)["status"] == CANCELLED
+
+    def test_concurrent_readers_share_the_connection(self, manager):
+        job_id = manager.submit("test_wait")["job_id"]
+        _wait(manager, job_id, (RUNNING,))
+        errors = []
+
+        def read():
+            try:
+                for _ in range(200):
+                    manager.get(job_id)
+                    manager.list_jobs()
+                    manager._cancel_requested(job_id)
+            except Exception as e:  # sqlite raises on unsynchronized use of one connection
+                errors.append(e)
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        GATE.set()
+        assert not errors and _wait(manager, job_id)["status"] == SUCCEEDED
+
+    def test_failure_is_reported(self, manager):
+        job = _wait(manager, manager.submit("test_fail")["job_id"])
+        assert job["status"] == FAILED and job["error"] == "配置错误"
+
+    def test_status_survives_restart_and_ttl_evicts(self, tmp_path):
+        manager = JobManager(tmp_path, ttl_seconds=0.2)
+        job_id = manager.submit("test_fail")["job_id"]
+        _wait(manager, job_id)
+        manager.close(wait=True)
+        # An orphan left running by a process that no longer exists
+        conn = sqlite3.connect(str(tmp_path / "jobs.sqlite3"))
+        conn.execute("INSERT INTO jobs(job_id, kind, status, params, owner_pid, created_at) "
+                     "VALUES('orphan', 'test_wait', 'running', '{}', 999999999, '2026-01-01T00:00:00')")
+        conn.commit()
+        conn.close()
+
+        manager = JobManager(tmp_path, ttl_seconds=0.2)
+        assert manager.get(job_id)["error"] == "配置错误"
+        assert manager.get("orphan")["status"] == FAILED
+        time.sleep(0.3)
+        assert manager.purge_expired() == 2
+        assert not (tmp_path / "jobs" / job_id).exists()
+        with pytest.raises(JobNotFoundError):
+            manager.get(job_id)
+        manager.close()
+
+
+def _events(response):
+    events = []
+    for block in response.text.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestJobsApi:
+
+    def test_verify_job_streams_progress(self, client, data_dir, default_request_data):
+        study = convert_ui_payload_to_study_design(default_request_data)
+        body = b"".join(iter_list_csv(generate_subject_list(study, seed=11), supplier=SUPPLIER_A))
+        response = client.post("/api/v1/jobs/verify", files={"file": ("list.csv", body, "text/csv")},
+                               data={"request": json.dumps(default_request_data)})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        stream = client.get(f"/api/v1/jobs/{job_id}/events")
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        events = _events(stream)
+        kind, job = events[-1]
+        assert kind == "end" and job["status"] == SUCCEEDED and job["result"]["ok"] is True
+        assert job["done"] == job["total"] == len(body)
+        assert client.get(f"/api/v1/jobs/{job_id}").json()["result"]["ok"] is True
+        assert [j["job_id"] for j in client.get("/api/v1/jobs").json()] == [job_id]
+
+    def test_bulk_and_allocation_jobs(self, client, data_dir, default_request_data):
+        configs = data_dir / "bulk" / "configs"
+        configs.mkdir(parents=True)
+        for name in ("A", "B"):
+            (configs / f"{name}.json").write_text(json.dumps({**default_request_data, "study_id": name}),
+                                                  encoding="utf-8")
+        job_id = client.post("/api/v1/jobs/bulk", json={
+            "config_dir": str(configs), "out_dir": "out", "jobs": 1}).json()["job_id"]
+        job = _wait(job_service.get_job_service(), job_id)
+        assert job["status"] == SUCCEEDED and sorted(job["result"]["generated"]) == ["A.json", "B.json"]
+        assert (data_dir / "bulk" / "out" / "A.sas").is_file() and job["total"] == 2
+
+        job_id = client.post("/api/v1/jobs/allocation-lists", json={
+            "request": default_request_data, "seed": 3}).json()["job_id"]
+        job = _wait(job_service.get_job_service(), job_id)
+        assert job["status"] == SUCCEEDED and job["result"]["rows"] == 40
+        assert client.get(f"/api/v1/allocation/lists/{job['result']['list_id']}").status_code == 200
+
+    def test_errors(self, client, data_dir, default_request_data):
+        assert client.get("/api/v1/jobs/missing").status_code == 404
+        assert client.get("/api/v1/jobs/missing/events").status_code == 404
+        assert client.post("/api/v1/jobs/missing/cancel").status_code == 404
+        response = client.post("/api/v1/jobs/verify", files={"file": ("list.csv", b"", "text/csv")},
+                               data={"request": "{}"})
+        assert response.status_code == 400
+
+        job_id = client.post("/api/v1/jobs/bulk", json={
+            "config_dir": "nonexistent", "out_dir": "x"}).json()["job_id"]
+        job = _wait(job_service.get_job_service(), job_id)
+        assert job["status"] == FAILED and "配置目录不存在" in job["error"]
+
+    def test_bulk_paths_are_confined_to_the_bulk_root(self, client, data_dir, tmp_path):
+        outside = tmp_path.parent / f"{tmp_path.name}-outside"
+        (data_dir / "bulk").mkdir()
+        (data_dir / "bulk" / "escape").symlink_to(tmp_path.parent, target_is_directory=True)
+        for body in ({"config_dir": "/etc", "out_dir": "out"},
+                     {"config_dir": "configs", "out_dir": str(outside)},
+                     {"config_dir": "../configs", "out_dir": "out"},
+                     {"config_dir": "configs", "out_dir": "escape/out"}):
+            response = client.post("/api/v1/jobs/bulk", json=body)
+            assert response.status_code == 400, body
+        assert client.get("/api/v1/jobs").json() == []
+        assert not outside.exists()
@@ -0,0 +1,93 @@
+"""Tests for the memory-mapped emergency-unblinding index."""
+
+import io
+
+import numpy as np
+import pytest
+
+from sas_randomizer.cli import main as cli_main
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.block import generate_subject_list
+from sas_randomizer.native.kit_index import KitIndex, build_index
+from sas_randomizer.native.layouts import DRUG_LAYOUTS, SUPPLIER_B6
+from sas_randomizer.native.supplier_csv import read_list_csv
+
+
+def _drug_csv(n=200):
+    layout = DRUG_LAYOUTS[(SUPPLIER_B6, True)]
+    rows = [layout.header]
+    for i in range(1, n + 1):
+        drug = "Drug A" if i % 2 else "Placebo"
+        rows.append(f"{i},,D{i:05d},{drug},{n + 1 - i},,,LOT{1 + i % 3}")
+    return "\r\n".join(rows) + "\r\n"
+
+
+class TestKitIndex:
+
+    def test_drug_lookup(self, tmp_path):
+        rand_list = read_list_csv(io.StringIO(_drug_csv()))
+        path = str(tmp_path / "kits.rgx")
+        build_index(rand_list, path)
+        with KitIndex(path) as index:
+            assert len(index) == 200
+            hit = index.lookup("D00007")
+            assert hit["arm"] == "Drug A" and hit["batch"] == "LOT2" and hit["seq"] == 7
+            assert index.lookup("D00201") is None
+            assert index.lookup("garbage") is None
+
+    def test_subject_replacement_numbers_are_distinct(self, default_request_data, tmp_path):
+        study = convert_ui_payload_to_study_design({**default_request_data, "mirror_replacement": True})
+        rand_list = generate_subject_list(study, seed=1)
+        path = str(tmp_path / "subjects.rgx")
+        build_index(rand_list, path)
+        numbers = rand_list.number_strings()
+        arms = rand_list.decode("arm")
+        with KitIndex(path) as index:
+            for i in (0, 17, 40, 79):
+                hit = index.lookup(numbers[i])
+                assert hit["number"] == numbers[i]
+                assert hit["arm"] == arms[i]
+            assert index.lookup("R0001")["category"] == "正式号"
+            assert index.lookup("R0001S")["category"] == "替换号"
+
+    def test_duplicate_numbers_rejected(self, tmp_path):
+        rand_list = read_list_csv(io.StringIO(_drug_csv(4)))
+        rand_list.columns["drugno"] = np.array([1, 2, 2, 3])
+        with pytest.raises(ValueError, match="重复编号"):
+            build_index(rand_list, str(tmp_path / "dup.rgx"))
+
+    def test_cli_build_and_lookup(self, tmp_path, capsys):
+        csv_path = tmp_path / "DEMO_Drug_List.csv"
+        csv_path.write_text(_drug_csv(), encoding="utf-8")
+        assert cli_main(["index", "build", str(csv_path)]) == 0
+        assert (tmp_path / "DEMO_Drug_List.rgx").exists()
+        capsys.readouterr()
+        assert cli_main(["index", "lookup", str(tmp_path / "DEMO_Drug_List.rgx"), "D00002", "D99999"]) == 1
+        out = capsys.readouterr().out.splitlines()
+        assert '"Placebo"' in out[0] and '"found": false' in out[1]
+
+
+class TestIndexEndpoints:
+
+    def test_upload_and_lookup(self, client, data_dir):
+        files = {"file": ("DEMO_Drug_List.csv", _drug_csv().encode("utf-8"), "text/csv")}
+        response = client.post("/api/v1/index/DEMO/upload", files=files)
+        assert response.status_code == 200, response.text
+        assert response.json()["rows"] == 200
+        assert [i["name"] for i in client.get("/api/v1/index").json()] == ["DEMO"]
+
+        response = client.get("/api/v1/index/DEMO/lookup/D00010")
+        assert response.status_code == 200
+        assert response.json()["arm"] == "Placebo"
+        assert client.get("/api/v1/index/DEMO/lookup/D99999").status_code == 404
+        assert client.get("/api/v1/index/OTHER/lookup/D00010").status_code == 404
+        assert client.post("/api/v1/index/bad name!/upload", files=files).status_code == 400
+
+    def test_build_from_allocation_list(self, client, data_dir, default_request_data):
+        created = client.post("/api/v1/allocation/lists", json={"request": default_request_data, "seed": 3})
+        list_id = created.json()["list_id"]
+        response = client.post(f"/api/v1/index/TEST001/from-list/{list_id}")
+        assert response.status_code == 200, response.text
+        hit = client.get("/api/v1/index/TEST001/lookup/R0001").json()
+        assert hit["arm"] in ("Treatment", "Placebo")
+        assert client.post("/api/v1/index/X/from-list/nope").status_code == 404
@@ -0,0 +1,89 @@
+"""Tests for the HTTP load-test harness (benchmarks/load_test.py)."""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from benchmarks import load_test
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _drive(corpus, mode, **kwargs):
+    from backend.app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://rangen") as client:
+        test = load_test.LoadTest(client, corpus, server_pid=None, **kwargs.pop("init", {}))
+        if mode == "open":
+            return await test.open_loop(**kwargs)
+        return await test.closed_loop(**kwargs)
+
+
+class TestCorpus:
+
+    def test_builtin_payloads_are_valid_requests(self):
+        from backend.app.api.schemas import SASGenerationRequest
+
+        for name, weight, payload in load_test.builtin_corpus():
+            assert weight > 0
+            SASGenerationRequest(**payload)
+
+    def test_load_corpus_from_directory(self, tmp_path):
+        (tmp_path / "one.json").write_text(json.dumps(load_test.default_payload()), encoding="utf-8")
+        (tmp_path / "many.json").write_text(json.dumps([{"a": 1}, {"a": 2}]), encoding="utf-8")
+        names = [name for name, _, _ in load_test.load_corpus(str(tmp_path))]
+        assert names == ["many[0]", "many[1]", "one"]
+        (tmp_path / "empty").mkdir()
+        with pytest.raises(ValueError):
+            load_test.load_corpus(str(tmp_path / "empty"))
+
+
+class TestLoadRuns:
+
+    def test_closed_loop_reports_latency_and_errors(self):
+        corpus = [("defaults", 1, load_test.default_payload()), ("broken", 1, {"study_id": "X"})]
+        result = _run(_drive(corpus, "closed", concurrency=2, duration=30, max_requests=12))
+        summary = result.summary()
+        assert summary["requests"] == 12
+        assert summary["by_payload"]["broken"]["error_rate"] == 1.0
+        assert summary["by_payload"]["defaults"]["errors"] == 0
+        assert set(summary["status_counts"]) <= {"200", "422"}
+        assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"]
+        assert summary["throughput_rps"] > 0
+
+    def test_open_loop_honours_request_limit(self):
+        corpus = [("defaults", 1, load_test.default_payload())]
+        result = _run(_drive(corpus, "open", init={"endpoint": "preview"},
+                             rate=200, concurrency=4, duration=30, max_requests=8))
+        assert len(result.samples) == 8 and all(s.status == 200 for s in result.samples)
+
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        assert load_test.percentile(values, 50) == 50
+        assert load_test.percentile(values, 99) == 99
+        assert load_test.percentile([3.0], 95) == 3.0
+        assert load_test.percentile([], 50) == 0.0
+
+    @pytest.mark.skipif(not os.path.exists(f"/proc/{os.getpid()}/task/{os.getpid()}/children"),
+                        reason="needs /proc/<pid>/task/<tid>/children")
+    def test_rss_includes_child_processes(self):
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        try:
+            deadline = time.monotonic() + 10
+            while load_test._vm_rss(child.pid) is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert child.pid in load_test._process_tree(os.getpid())
+            assert load_test.rss_bytes(os.getpid()) > load_test._vm_rss(os.getpid())
+        finally:
+            child.kill()
+            child.wait()
+        assert load_test.rss_bytes(None) is None
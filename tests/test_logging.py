@@ -0,0 +1,126 @@
+"""Tests for queued structured logging and request ids."""
+
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from sas_randomizer.utils import logger as rlog
+
+
+@pytest.fixture
+def queued():
+    """Route a private logger through the queue into an in-memory JSON stream."""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(rlog.JsonFormatter())
+
+    def start(**kwargs):
+        rlog.start_queue_logging([handler], loggers=("test.queued",), **kwargs)
+        return logging.getLogger("test.queued")
+
+    def records():
+        rlog.stop_queue_logging()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield start, records
+    rlog.stop_queue_logging()
+    test_logger = logging.getLogger("test.queued")
+    for h in list(test_logger.handlers):
+        test_logger.removeHandler(h)
+    test_logger.propagate = True
+
+
+class TestQueueLogging:
+
+    def test_records_are_structured_and_carry_request_id(self, queued):
+        start, records = queued
+        log = start()
+        token = rlog.request_id_var.set("req-1")
+        try:
+            log.info("generate %s", "S1", extra={"config_hash": "abc", "timings_ms": {"render": 1.5}})
+        finally:
+            rlog.request_id_var.reset(token)
+        log.warning("outside a request")
+        first, second = records()
+        assert first["message"] == "generate S1" and first["level"] == "INFO"
+        assert first["request_id"] == "req-1" and first["config_hash"] == "abc"
+        assert first["timings_ms"] == {"render": 1.5}
+        assert "request_id" not in second
+
+    def test_exceptions_are_kept(self, queued):
+        start, records = queued
+        log = start()
+        try:
+            raise KeyError("boom")
+        except KeyError:
+            log.exception("failed")
+        (record,) = records()
+        assert "KeyError" in record["message"] or "KeyError" in record.get("exception", "")
+
+    def test_sampled_records_are_capped_per_second(self, queued):
+        start, records = queued
+        log = start(max_per_second=5)
+        for i in range(50):
+            log.info("tick %d", i, extra={"sample": True})
+        log.info("unsampled")
+        log.warning("warning", extra={"sample": True})
+        stats = rlog.queue_logging_stats()
+        messages = [r["message"] for r in records()]
+        assert "unsampled" in messages and "warning" in messages
+        assert 5 <= sum(m.startswith("tick") for m in messages) <= 10  # the cap may straddle a second
+        assert stats["suppressed"] >= 40
+
+    def test_zero_rate_drops_all_sampled_records(self, queued):
+        start, records = queued
+        log = start(sample_rate=0.0)
+        log.info("sampled", extra={"sample": True})
+        log.info("kept")
+        assert [r["message"] for r in records()] == ["kept"]
+
+
+class TestBoundedQueueHandler:
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = rlog.BoundedQueueHandler(queue.Queue(maxsize=2))
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "m", (), None)
+        for _ in range(5):
+            handler.handle(record)
+        assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+class TestHelpers:
+
+    def test_setup_logger_is_cached(self):
+        assert rlog.setup_logger("test.cached") is rlog.setup_logger("test.cached")
+        assert len(logging.getLogger("test.cached").handlers) == 1
+
+    def test_stage_timer(self):
+        timer = rlog.StageTimer()
+        with timer.stage("a"):
+            pass
+        with pytest.raises(RuntimeError):
+            with timer.stage("b"):
+                raise RuntimeError
+        assert set(timer.timings) == {"a", "b"} and all(v >= 0 for v in timer.timings.values())
+
+
+class TestRequestIds:
+
+    def test_generated_and_echoed_ids(self, client):
+        generated = client.get("/api/health").headers["X-Request-ID"]
+        assert len(generated) == 16
+        assert client.get("/api/health", headers={"X-Request-ID": "abc-123"}).headers["X-Request-ID"] == "abc-123"
+        invalid = client.get("/api/health", headers={"X-Request-ID": "bad id;x"}).headers["X-Request-ID"]
+        assert invalid != "bad id;x" and len(invalid) == 16
+
+    def test_generate_logs_hash_and_timings(self, client, default_request_data, caplog):
+        caplog.set_level(logging.INFO, logger="rangen")
+        client.post("/api/v1/generate", json=default_request_data, headers={"X-Request-ID": "trace-7"})
+        (record,) = [r for r in caplog.records if r.name == "rangen.generate"]
+        assert record.status == 200 and len(record.config_hash) == 64
+        assert set(record.timings_ms) == {"hash", "generate"}
+        access = [r for r in caplog.records if r.name == "rangen.access"]
+        assert access and access[-1].path == "/api/v1/generate" and access[-1].status == 200
@@ -0,0 +1,61 @@
+"""Tests for the shared SAS macro library output mode."""
+
+import hashlib
+import json
+
+from sas_randomizer import bulk
+from sas_randomizer.core_refactored.macro_library import (
+    library_filename, library_sha256, render_macro_library, write_macro_library)
+from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
+
+LIBRARY_DIR = r"&_rootpath.\macros"
+SHARED_MACROS = ("%macro templates;", "%macro m_rand(", "%macro m_rpt(", "%macro m_rpe(", "%macro m_rpt_drug(")
+
+
+class TestMacroLibrary:
+
+    def test_library_holds_study_independent_macros(self, tmp_path):
+        text = render_macro_library()
+        assert all(macro in text for macro in SHARED_MACROS)
+        assert "%macro m_rpe_drug(" not in text
+        path = write_macro_library(tmp_path)
+        assert path.name == library_filename() == f"rangen_macros_{library_sha256()[:12]}.sas"
+        assert hashlib.sha256(path.read_bytes()).hexdigest() == library_sha256()
+
+    def test_program_includes_library_with_checksum_guard(self, default_request_data):
+        inline = SASRandomizationGenerator(**default_request_data).generate_sas_code()
+        shared = SASRandomizationGenerator(**default_request_data, macro_library_dir=LIBRARY_DIR).generate_sas_code()
+        assert all(macro in inline for macro in SHARED_MACROS) and "_maclib" not in inline
+        assert not any(macro in shared for macro in SHARED_MACROS)
+        assert f'filename _maclib "{LIBRARY_DIR}\\{library_filename()}";' in shared
+        assert f"%m_maclib(expected={library_sha256()});" in shared and "%include _maclib;" in shared
+        # m_rpe_drug carries the study's batch logic and stays in the program
+        assert "%macro m_rpe_drug(" in shared
+        assert len(shared) < len(inline) // 2
+
+    def test_bulk_writes_library_once(self, tmp_path, default_request_data):
+        configs = tmp_path / "configs"
+        for rel in ("a/S001.json", "b/S002.json"):
+            (configs / rel).parent.mkdir(parents=True, exist_ok=True)
+            (configs / rel).write_text(json.dumps({**default_request_data, "study_id": rel[2:6]}), encoding="utf-8")
+        out = tmp_path / "out"
+        assert bulk.generate_tree(str(configs), str(out), jobs=1).generated
+        assert "%macro m_rand(" in (out / "a" / "S001.sas").read_text(encoding="utf-8")
+
+        # Switching to the shared library re-renders every program
+        result = bulk.generate_tree(str(configs), str(out), jobs=1, macro_library_dir=LIBRARY_DIR)
+        assert sorted(result.generated) == ["a/S001.json", "b/S002.json"]
+        assert [p.name for p in out.glob("rangen_macros_*.sas")] == [library_filename()]
+        assert "%include _maclib;" in (out / "b" / "S002.sas").read_text(encoding="utf-8")
+        assert bulk.generate_tree(str(configs), str(out), jobs=1, macro_library_dir=LIBRARY_DIR).generated == []
+
+    def test_api_download_and_generate(self, client, default_request_data):
+        library = client.get("/api/v1/macro-library")
+        assert library.status_code == 200 and library_sha256() in library.headers["etag"]
+        assert hashlib.sha256(library.content).hexdigest() == library_sha256()
+        assert library_filename() in library.headers["content-disposition"]
+        cached = client.get("/api/v1/macro-library", headers={"If-None-Match": library.headers["etag"]})
+        assert cached.status_code == 304
+
+        code = client.post("/api/v1/generate", json={**default_request_data, "macro_library_dir": LIBRARY_DIR})
+        assert code.status_code == 200 and "%include _maclib;" in code.text
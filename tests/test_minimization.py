@@ -0,0 +1,95 @@
+"""Unit tests for the Pocock–Simon minimization engine."""
+
+import time
+
+import numpy as np
+import pytest
+
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native import MinimizationEngine
+
+
+FACTORS = ["sex", "site", "age"]
+LEVELS = {"sex": ["M", "F"], "site": ["S1", "S2", "S3"], "age": ["<65", ">=65"]}
+
+
+def _engine(**kwargs):
+    params = {"arms": ["TRT", "PBO"], "p_best": 1.0, "seed": 7}
+    params.update(kwargs)
+    return MinimizationEngine(FACTORS, LEVELS, **params)
+
+
+def _random_profiles(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.integers(len(LEVELS[f]), size=n) for f in FACTORS])
+
+
+class TestAllocation:
+
+    def test_deterministic_minimization_balances_every_margin(self):
+        engine = _engine()
+        engine.simulate(_random_profiles(400))
+        counts = engine.counts
+        assert counts.sum() == 400 * len(FACTORS)
+        # With p_best=1 each margin can drift by at most a couple of subjects
+        assert np.abs(counts[:, 0] - counts[:, 1]).max() <= 2
+
+    def test_ratio_is_respected(self):
+        engine = _engine(arms=["A", "B"], ratios=[2, 1], method="variance")
+        arms = engine.simulate(_random_profiles(600))
+        share = np.bincount(arms, minlength=2) / len(arms)
+        assert share[0] == pytest.approx(2 / 3, abs=0.02)
+
+    def test_allocate_by_level_names(self):
+        engine = _engine()
+        armcd = engine.allocate({"sex": "F", "site": "S2", "age": ">=65"})
+        assert armcd in ("TRT", "PBO")
+        assert engine.marginal_counts()["site"]["S2"][armcd] == 1
+
+    def test_unknown_level_raises(self):
+        engine = _engine()
+        with pytest.raises(ValueError, match="S9"):
+            engine.allocate({"sex": "F", "site": "S9", "age": "<65"})
+
+    def test_missing_levels_raises(self):
+        with pytest.raises(ValueError, match="age"):
+            MinimizationEngine(FACTORS, {"sex": ["M"], "site": ["S1"]}, arms=["A", "B"])
+
+
+class TestState:
+
+    def test_snapshot_restore_replays_identically(self):
+        engine = _engine(p_best=0.8)
+        engine.simulate(_random_profiles(50))
+        state = engine.snapshot()
+        tail = _random_profiles(100, seed=3)
+        first = engine.simulate(tail)
+        engine.restore(state)
+        second = engine.simulate(tail)
+        assert np.array_equal(first, second)
+        assert engine.n_allocated == 150
+
+
+class TestStudyDesign:
+
+    def test_from_study_design(self, default_request_data):
+        payload = {
+            **default_request_data,
+            "stratification_factors": ["site"],
+            "strata_levels": {"site": ["Site1", "Site2"]},
+            "treatment_arms": [
+                {"armcd": "TRT", "arm": "Treatment", "ratio": 2},
+                {"armcd": "PBO", "arm": "Placebo", "ratio": 1},
+            ],
+        }
+        engine = MinimizationEngine.from_study_design(convert_ui_payload_to_study_design(payload), seed=1)
+        assert engine.arms == ["TRT", "PBO"]
+        assert engine.counts.shape == (2, 2)
+        assert engine.allocate(["Site2"]) in ("TRT", "PBO")
+
+    def test_throughput(self):
+        engine = _engine(p_best=0.8)
+        profiles = _random_profiles(5000)
+        start = time.perf_counter()
+        engine.simulate(profiles)
+        assert 5000 / (time.perf_counter() - start) > 1000
@@ -0,0 +1,108 @@
+"""Tests for section-level rendering, the section cache and live preview diffs."""
+
+import pytest
+
+from backend.app.services import preview_service
+from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
+from sas_randomizer.core_refactored.sections import SECTIONS, SectionCache, render_sections
+
+DRUG_CONFIG = {
+    "enabled": True,
+    "drug_arms": [
+        {"code": "A", "name": "Drug A", "ratio": 1},
+        {"code": "B", "name": "Drug B", "ratio": 1},
+    ],
+    "drug_stratification_factors": [],
+    "drug_strata_levels": {},
+    "drug_block_size": 4,
+    "drug_block_layers": 10,
+    "drug_start_number": 1,
+    "drug_number_prefix": "D",
+    "drug_number_length": 4,
+    "drug_num_gap": 0,
+    "drug_report_units": "瓶",
+    "drug_sec_rand_enabled": False,
+    "drug_batch_configs": {},
+}
+
+
+@pytest.fixture
+def drug_request(default_request_data):
+    return {**default_request_data, "drug_randomization_config": DRUG_CONFIG}
+
+
+@pytest.fixture(autouse=True)
+def fresh_preview_service():
+    preview_service.reset_preview_service()
+    yield
+    preview_service.reset_preview_service()
+
+
+class TestSections:
+
+    def test_sections_compose_the_program(self, drug_request):
+        generator = SASRandomizationGenerator(**drug_request)
+        sections = render_sections(generator.build_payload(), now="2024-01-01 00:00:00")
+        assert list(sections) == list(SECTIONS)
+        assert "Generated: 2024-01-01 00:00:00" in sections["common_header"]
+
+    def test_no_drug_section_without_drug_config(self, default_request_data):
+        sections = SASRandomizationGenerator(**default_request_data).generate_sections()
+        assert "drug_randomization" not in sections
+
+    def test_drug_change_reuses_subject_section(self, drug_request):
+        cache = SectionCache()
+        first = SASRandomizationGenerator(**drug_request).generate_sections(cache)
+        changed = {**drug_request, "drug_randomization_config": {**DRUG_CONFIG, "drug_block_size": 6}}
+        second = SASRandomizationGenerator(**changed).generate_sections(cache)
+        assert second["subject_randomization"] is first["subject_randomization"]
+        assert second["drug_randomization"] != first["drug_randomization"]
+        # Cached text equals a fresh render
+        fresh = SASRandomizationGenerator(**changed).generate_sections()
+        assert second["drug_randomization"] == fresh["drug_randomization"]
+
+    def test_cache_is_bounded(self, default_request_data):
+        cache = SectionCache(max_entries=4)
+        for size in (2, 4, 6, 8):
+            SASRandomizationGenerator(**{**default_request_data, "block_size": size}).generate_sections(cache)
+        assert len(cache._texts) <= 4
+
+
+class TestPreviewEndpoint:
+
+    def test_first_call_returns_everything(self, client, drug_request):
+        response = client.post("/api/v1/generate/preview", json={"request": drug_request})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["full"] and list(body["sections"]) == body["order"] == list(SECTIONS)
+
+    def test_changed_sections_only(self, client, drug_request):
+        first = client.post("/api/v1/generate/preview", json={"request": drug_request}).json()
+        changed = {**drug_request, "drug_randomization_config": {**DRUG_CONFIG, "drug_block_size": 6}}
+        body = client.post("/api/v1/generate/preview",
+                           json={"request": changed, "previous": first["fingerprint"]}).json()
+        assert not body["full"]
+        assert "drug_randomization" in body["sections"]
+        assert "subject_randomization" in body["unchanged"]
+
+        same = client.post("/api/v1/generate/preview",
+                           json={"request": changed, "previous": body["fingerprint"]}).json()
+        assert same["fingerprint"] == body["fingerprint"] and same["sections"] == {}
+
+    def test_unified_diff(self, client, drug_request):
+        first = client.post("/api/v1/generate/preview", json={"request": drug_request}).json()
+        changed = {**drug_request, "block_size": 6}
+        body = client.post("/api/v1/generate/preview", json={
+            "request": changed, "previous": first["fingerprint"], "format": "diff"}).json()
+        assert body["diff"].startswith(f"--- {first['fingerprint']}")
+        assert "sections" not in body
+
+    def test_unknown_previous_falls_back_to_full(self, client, default_request_data):
+        body = client.post("/api/v1/generate/preview",
+                           json={"request": default_request_data, "previous": "0" * 16}).json()
+        assert body["full"] and "common_header" in body["sections"]
+
+    def test_invalid_request_is_400(self, client, default_request_data):
+        response = client.post("/api/v1/generate/preview",
+                               json={"request": {**default_request_data, "study_id": ""}})
+        assert response.status_code == 400
@@ -0,0 +1,122 @@
+"""Tests for on-demand per-request profiling of /generate."""
+
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+from backend.app import profiling
+from backend.app.scheduler import INTERACTIVE, get_scheduler, reset_scheduler
+from backend.app.services.sas_service import SASService
+
+PROFILE_HEADERS = {"X-RanGen-Profile": "1"}
+
+
+@pytest.fixture
+def enabled(data_dir, monkeypatch):
+    monkeypatch.setenv("RANGEN_PROFILING", "1")
+    return data_dir
+
+
+class TestSwitch:
+
+    def test_env_flag_overrides_mode(self, monkeypatch):
+        monkeypatch.setenv("RANGEN_PROFILING", "0")
+        assert not profiling.profiling_enabled()
+        monkeypatch.setenv("RANGEN_PROFILING", "on")
+        assert profiling.profiling_enabled()
+
+    def test_frozen_builds_default_to_off(self, monkeypatch):
+        monkeypatch.delenv("RANGEN_PROFILING", raising=False)
+        monkeypatch.setattr("sys.frozen", True, raising=False)
+        assert not profiling.profiling_enabled()
+
+    def test_server_mode_defaults_to_off(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("RANGEN_PROFILING", raising=False)
+        monkeypatch.setenv("RANGEN_SHARED_DIR", str(tmp_path))
+        assert not profiling.profiling_enabled()
+        monkeypatch.setenv("RANGEN_PROFILING", "1")
+        assert profiling.profiling_enabled()
+
+
+class TestProfiledGenerate:
+
+    def test_header_stores_a_downloadable_capture(self, client, enabled, default_request_data):
+        plain = client.post("/api/v1/generate", json=default_request_data)
+        response = client.post("/api/v1/generate", json=default_request_data, headers=PROFILE_HEADERS)
+        assert response.status_code == 200 and response.text == plain.text
+        profile_id = response.headers["X-RanGen-Profile-Id"]
+        assert response.headers["X-RanGen-Profile-Url"] == f"/api/v1/debug/profiles/{profile_id}"
+
+        download = client.get(response.headers["X-RanGen-Profile-Url"])
+        assert download.status_code == 200 and download.headers["content-type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(download.content))
+        files = {name.split("/", 1)[1] for name in archive.namelist()}
+        assert files == {"profile.pstats", "profile.collapsed", "allocations.txt", "request.json", "meta.json"}
+        assert json.loads(archive.read(f"{profile_id}/request.json"))["study_id"] == "TEST001"
+        assert archive.read(f"{profile_id}/allocations.txt").startswith(b"peak traced memory")
+
+        listed = client.get("/api/v1/debug/profiles").json()
+        assert listed[0]["id"] == profile_id and listed[0]["label"] == "TEST001"
+
+    def test_capture_runs_in_an_interactive_slot_off_the_event_loop(self, client, enabled, monkeypatch,
+                                                                   default_request_data):
+        monkeypatch.setenv("RANGEN_SCHED_SLOTS", "1")
+        reset_scheduler()
+        on_loop = []
+        generate = SASService.generate_sas_code
+
+        def recording(request):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return generate(request)
+
+        monkeypatch.setattr(SASService, "generate_sas_code", staticmethod(recording))
+        try:
+            response = client.post("/api/v1/generate", json=default_request_data, headers=PROFILE_HEADERS)
+            assert response.status_code == 200 and "X-RanGen-Profile-Id" in response.headers
+            assert on_loop == [False]
+            interactive = get_scheduler().stats()["classes"][INTERACTIVE]
+            assert interactive["dispatched"] == 1
+        finally:
+            reset_scheduler()
+
+    def test_profiled_request_skips_304(self, client, enabled, default_request_data):
+        etag = client.post("/api/v1/generate", json=default_request_data).headers["ETag"]
+        response = client.post("/api/v1/generate", json=default_request_data,
+                               headers={**PROFILE_HEADERS, "If-None-Match": etag})
+        assert response.status_code == 200 and "X-RanGen-Profile-Id" in response.headers
+
+    def test_disabled_profiling_ignores_header_and_hides_downloads(self, client, data_dir,
+                                                                 monkeypatch, default_request_data):
+        monkeypatch.setenv("RANGEN_PROFILING", "0")
+        response = client.post("/api/v1/generate", json=default_request_data, headers=PROFILE_HEADERS)
+        assert response.status_code == 200 and "X-RanGen-Profile-Id" not in response.headers
+        assert client.get("/api/v1/debug/profiles").status_code == 404
+
+    def test_bad_and_unknown_ids(self, client, enabled):
+        assert client.get("/api/v1/debug/profiles/..%2Fsecrets").status_code in (400, 404)
+        assert client.get("/api/v1/debug/profiles/not-an-id").status_code == 400
+        assert client.get("/api/v1/debug/profiles/20240101-000000-abcdef").status_code == 404
+
+
+class TestCapture:
+
+    def test_collapsed_stacks_and_pruning(self, enabled):
+        def busy():
+            return sum(i * i for i in range(300_000))
+
+        with profiling.ProfileCapture(label="unit") as capture:
+            busy()
+        lines = capture.collapsed_stacks().splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert any("busy (" in line for line in lines)
+
+        ids = [capture.save() for _ in range(3)]
+        profiling.prune_profiles(keep=2)
+        assert [p["id"] for p in profiling.list_profiles()] == sorted(ids, reverse=True)[:2]
@@ -0,0 +1,203 @@
+"""Tests for the priority / fair-queuing execution scheduler."""
+
+import threading
+import time
+
+import pytest
+
+from backend.app.scheduler import BACKGROUND, BULK, INTERACTIVE, Scheduler, reset_scheduler
+
+
+def _queued(scheduler, cls, n, timeout=5):
+    deadline = time.monotonic() + timeout
+    while scheduler.stats()["classes"][cls]["queued"] < n:
+        assert time.monotonic() < deadline, f"{cls} never reached {n} queued"
+        time.sleep(0.002)
+
+
+def _until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.002)
+
+
+def _in_thread(fn, *args):
+    thread = threading.Thread(target=fn, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestScheduler:
+
+    def test_class_caps(self):
+        scheduler = Scheduler(capacity=4)
+        caps = {name: c["cap"] for name, c in scheduler.stats()["classes"].items()}
+        assert caps == {INTERACTIVE: 4, BULK: 3, BACKGROUND: 1}
+        assert scheduler.clamp_cost(BULK, 16) == 3
+
+        bulk = scheduler.acquire(BULK, "a", cost=2)
+        background = scheduler.acquire(BACKGROUND, "b")
+        granted = []
+        _in_thread(lambda: granted.append(scheduler.acquire(BACKGROUND, "c")))
+        _queued(scheduler, BACKGROUND, 1)
+        assert scheduler.stats()["in_use"] == 3 and not granted
+        background.release()
+        _until(lambda: len(granted) == 1)
+        bulk.release()
+        granted[0].release()
+        assert scheduler.stats()["in_use"] == 0
+
+    def test_interactive_reserve(self):
+        # Bulk and background together never take the last slot, even with one CPU
+        scheduler = Scheduler(capacity=1, caps={BULK: 8})
+        assert scheduler.capacity == 2 and scheduler.stats()["classes"][BULK]["cap"] == 1
+        bulk = scheduler.acquire(BULK, cost=4)
+        assert bulk.cost == 1
+        granted = []
+        _in_thread(lambda: granted.append(scheduler.acquire(BACKGROUND)))
+        _queued(scheduler, BACKGROUND, 1)
+        with scheduler.slot(INTERACTIVE):
+            assert scheduler.stats()["in_use"] == 2
+        time.sleep(0.02)
+        assert not granted
+        bulk.release()
+        _until(lambda: len(granted) == 1)
+        granted[0].release()
+
+    def test_lower_classes_do_not_take_capacity_interactive_waits_for(self):
+        scheduler = Scheduler(capacity=2)
+        first = scheduler.acquire(INTERACTIVE)
+        second = scheduler.acquire(BULK)
+        order = []
+        _in_thread(lambda: order.append(("interactive", scheduler.acquire(INTERACTIVE))))
+        _queued(scheduler, INTERACTIVE, 1)
+        _in_thread(lambda: order.append(("background", scheduler.acquire(BACKGROUND))))
+        _queued(scheduler, BACKGROUND, 1)
+        second.release()
+        _until(lambda: len(order) == 1)
+        time.sleep(0.02)
+        assert [name for name, _ in order] == ["interactive"]
+        first.release()
+        _until(lambda: len(order) == 2)
+        assert [name for name, _ in order] == ["interactive", "background"]
+
+    def test_bulk_yields_at_checkpoint(self):
+        scheduler = Scheduler(capacity=2)
+        other = scheduler.acquire(INTERACTIVE, "other")
+        bulk = scheduler.acquire(BULK, "batch")
+        assert bulk.checkpoint() is True  # nobody waiting: keeps running
+        served = threading.Event()
+
+        def interactive():
+            with scheduler.slot(INTERACTIVE, "user"):
+                served.set()
+                time.sleep(0.02)
+
+        _in_thread(interactive)
+        _queued(scheduler, INTERACTIVE, 1)
+        assert bulk.checkpoint() is True  # pauses until the preview has run
+        assert served.is_set()
+        stats = scheduler.stats()["classes"][BULK]
+        assert stats["preempted"] == 1 and stats["dispatched"] == 1
+        bulk.release()
+        other.release()
+
+    def test_checkpoint_abort_releases(self):
+        scheduler = Scheduler(capacity=2)
+        other = scheduler.acquire(INTERACTIVE)
+        bulk = scheduler.acquire(BULK)
+        holder = threading.Event()
+
+        def interactive():
+            with scheduler.slot(INTERACTIVE):
+                holder.wait(5)
+
+        _in_thread(interactive)
+        _queued(scheduler, INTERACTIVE, 1)
+        assert bulk.checkpoint(abort=lambda: True) is False
+        holder.set()
+        other.release()
+        assert scheduler.acquire(BACKGROUND, abort=lambda: False) is not None
+
+    def test_fair_queuing_between_clients(self):
+        scheduler = Scheduler(capacity=2)
+        gate = scheduler.acquire(BULK, "warmup")
+        order = []
+
+        def run(client):
+            with scheduler.slot(BULK, client):
+                order.append(client)
+
+        for i in range(4):
+            _in_thread(run, "batch")
+            _queued(scheduler, BULK, i + 1)
+        _in_thread(run, "other")
+        _queued(scheduler, BULK, 5)
+        gate.release()
+        _until(lambda: len(order) == 5)
+        # The late client is served after one batch item, not after the whole batch
+        assert order.index("other") <= 1
+
+    def test_client_weights(self):
+        scheduler = Scheduler(capacity=2, client_weights={"heavy": 3.0})
+        gate = scheduler.acquire(BULK)
+        order = []
+
+        def run(client):
+            with scheduler.slot(BULK, client):
+                order.append(client)
+
+        for i, client in enumerate(["light"] * 4 + ["heavy"] * 4):
+            _in_thread(run, client)
+            _queued(scheduler, BULK, i + 1)
+        gate.release()
+        _until(lambda: len(order) == 8)
+        assert order[:4].count("heavy") >= 2
+
+    def test_interactive_wait_stays_flat_under_bulk_load(self):
+        scheduler = Scheduler(capacity=2)
+        stop = threading.Event()
+        # Another user's preview holds the reserve slot: bulk must yield its own at checkpoints
+        other = scheduler.acquire(INTERACTIVE, "other")
+
+        def bulk_job():
+            slot = scheduler.acquire(BULK, "batch")
+            while not stop.is_set():
+                time.sleep(0.005)  # one chunk
+                slot.checkpoint()
+            slot.release()
+
+        thread = _in_thread(bulk_job)
+        time.sleep(0.02)
+        for _ in range(20):
+            with scheduler.slot(INTERACTIVE, "user"):
+                time.sleep(0.001)
+        stop.set()
+        thread.join(5)
+        other.release()
+        wait = scheduler.stats()["classes"][INTERACTIVE]["queue_wait_ms"]
+        assert wait["count"] == 21 and wait["p95"] <= 50
+
+    def test_unknown_class(self):
+        with pytest.raises(ValueError):
+            Scheduler(capacity=2).acquire("urgent")
+
+
+class TestSchedulerApi:
+
+    def test_generate_and_preview_use_interactive_slots(self, client, default_request_data, monkeypatch):
+        monkeypatch.setenv("RANGEN_SCHED_SLOTS", "2")
+        reset_scheduler()
+        try:
+            headers = {"X-RanGen-Client": "tester"}
+            assert client.post("/api/v1/generate", json=default_request_data, headers=headers).status_code == 200
+            assert client.post("/api/v1/generate/preview", json={"request": default_request_data},
+                               headers=headers).status_code == 200
+            stats = client.get("/api/v1/scheduler").json()
+            assert stats["capacity"] == 2 and stats["in_use"] == 0
+            interactive = stats["classes"][INTERACTIVE]
+            assert interactive["dispatched"] == 2 and interactive["queue_wait_ms"]["count"] == 2
+            assert sum(interactive["queue_wait_ms"]["buckets"].values()) == 2
+        finally:
+            reset_scheduler()
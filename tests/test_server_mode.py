@@ -0,0 +1,149 @@
+"""Tests for multi-worker server mode: shared render cache, counters and server settings."""
+
+import json
+import os
+
+import pytest
+
+from backend.app import metrics
+from backend.app.metrics import Metrics, aggregate, reset_metrics
+from backend.app.server import parse_server_config, prepare_shared_dirs
+from backend.app.services import render_cache
+from backend.app.services.render_cache import DiskRenderCache, get_render_cache, reset_render_cache
+from sas_randomizer.core_refactored.utils.template_renderer import TEMPLATE_CACHE_ENV, TemplateRenderer
+
+
+@pytest.fixture
+def shared_dir(tmp_path, monkeypatch):
+    """Server-mode environment for this process, with fresh cache and counter singletons."""
+    shared = tmp_path / "shared"
+    monkeypatch.setenv("RANGEN_SHARED_DIR", str(shared))
+    reset_render_cache()
+    reset_metrics()
+    yield shared
+    reset_render_cache()
+    reset_metrics()
+
+
+class TestDiskRenderCache:
+
+    def test_put_get_shared_between_instances(self, tmp_path):
+        first = DiskRenderCache(tmp_path)
+        second = DiskRenderCache(tmp_path)
+        assert first.get('"abc123"') is None
+        first.put('"abc123"', "data x; run;\n")
+        assert second.get('"abc123"') == "data x; run;\n"
+        assert (tmp_path / "ab" / "abc123.sas").is_file()
+        assert first.stats()["misses"] == 1 and second.stats()["hits"] == 1
+
+    def test_rejects_keys_that_are_not_plain_tags(self, tmp_path):
+        with pytest.raises(ValueError):
+            DiskRenderCache(tmp_path).get('"../../etc/passwd"')
+
+    def test_prune_evicts_least_recently_used(self, tmp_path):
+        cache = DiskRenderCache(tmp_path, max_bytes=250)
+        for i, key in enumerate(["aa01", "aa02"]):
+            cache.put(key, "x" * 100)
+            os.utime(tmp_path / "aa" / f"{key}.sas", (1000 + i, 1000 + i))
+        cache.put("aa03", "x" * 100)
+        assert cache.get("aa01") is None
+        assert cache.get("aa02") is not None and cache.get("aa03") is not None
+        assert cache.stats()["bytes"] == 200
+
+    def test_temp_files_and_rewrites_are_not_counted(self, tmp_path):
+        (tmp_path / "aa").mkdir()
+        in_flight = tmp_path / "aa" / ".tmp-x1aa01.sas"
+        in_flight.write_text("x" * 500, encoding="utf-8")
+        cache = DiskRenderCache(tmp_path, max_bytes=250)
+        assert cache.stats()["bytes"] == 0
+        cache.put("aa01", "x" * 100)
+        cache.put("aa01", "y" * 100)
+        cache.put("aa02", "x" * 100)
+        assert cache.stats()["bytes"] == 200
+        cache.prune()
+        assert in_flight.exists() and cache.get("aa01") == "y" * 100
+
+    def test_write_errors_are_not_fatal(self, tmp_path, monkeypatch):
+        cache = DiskRenderCache(tmp_path)
+
+        def fail(path, text):
+            raise PermissionError("read-only file system")
+
+        monkeypatch.setattr(render_cache, "atomic_write_text", fail)
+        cache.put("aa01", "data x;")
+        assert cache.get("aa01") is None and cache.stats()["bytes"] == 0
+
+    def test_disabled_without_shared_dir(self, monkeypatch):
+        monkeypatch.delenv("RANGEN_SHARED_DIR", raising=False)
+        reset_render_cache()
+        assert get_render_cache() is None
+
+
+class TestMetrics:
+
+    def test_aggregate_sums_worker_snapshots(self, tmp_path):
+        one, two = Metrics(), Metrics()
+        two.pid = one.pid + 1
+        one.record_response(200, 0.01)
+        two.record_response(404, 0.02)
+        two.incr("generate")
+        total = aggregate([one.snapshot(), two.snapshot()])
+        assert total["workers"] == 2
+        assert total["counters"]["requests"] == 2 and total["counters"]["generate"] == 1
+        assert total["counters"]["responses_2xx"] == 1 and total["counters"]["responses_4xx"] == 1
+
+    def test_collect_reads_other_workers(self, shared_dir):
+        other = Metrics()
+        other.pid = 999999
+        other.incr("generate", 3)
+        other.flush(shared_dir / "metrics")
+        metrics.get_metrics().incr("generate")
+        total = metrics.collect()
+        assert total["workers"] == 2 and total["counters"]["generate"] == 4
+
+
+class TestServerMode:
+
+    def test_generate_uses_shared_render_cache(self, client, default_request_data, shared_dir):
+        first = client.post("/api/v1/generate", json=default_request_data)
+        assert first.status_code == 200
+        cached = list((shared_dir / "render").glob("*/*.sas"))
+        assert len(cached) == 1 and cached[0].read_text(encoding="utf-8") == first.text
+
+        # Another worker (a fresh cache object) serves the stored program without rendering
+        reset_render_cache()
+        second = client.post("/api/v1/generate", json=default_request_data)
+        assert second.text == first.text
+
+        counters = client.get("/api/v1/metrics").json()["counters"]
+        assert counters["generate"] == 1 and counters["render_cache_hits"] == 1
+        assert counters["render_cache_misses"] == 1 and counters["requests"] >= 2
+
+    def test_template_bytecode_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(TEMPLATE_CACHE_ENV, str(tmp_path / "templates"))
+        renderer = TemplateRenderer()
+        assert renderer.env.bytecode_cache is not None
+        renderer.env.get_template("macro_definitions.sas.j2")
+        assert any((tmp_path / "templates").iterdir())
+
+    def test_config_defaults_to_standalone(self, tmp_path, monkeypatch):
+        for name in ("RANGEN_WORKERS", "RANGEN_HOST", "RANGEN_PORT", "RANGEN_SHARED_DIR"):
+            monkeypatch.delenv(name, raising=False)
+        config = parse_server_config([], tmp_path)
+        assert (config.host, config.port, config.workers, config.server_mode) == ("127.0.0.1", 8000, 1, False)
+        assert config.shared_dir is None
+
+    def test_server_config_prepares_shared_dirs(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("RANGEN_WORKERS", "4")
+        monkeypatch.delenv("RANGEN_SHARED_DIR", raising=False)
+        monkeypatch.delenv(TEMPLATE_CACHE_ENV, raising=False)
+        config = parse_server_config(["--host", "0.0.0.0", "--port", "9000"], tmp_path)
+        assert config.server_mode and config.workers == 4 and config.shared_dir == tmp_path / "shared"
+
+        stale = tmp_path / "shared" / "metrics" / "123.json"
+        stale.parent.mkdir(parents=True)
+        stale.write_text(json.dumps({"pid": 123, "counters": {"requests": 5}}), encoding="utf-8")
+        prepare_shared_dirs(config)
+        assert not stale.exists()
+        assert os.environ["RANGEN_SHARED_DIR"] == str(tmp_path / "shared")
+        assert os.environ[TEMPLATE_CACHE_ENV] == str(tmp_path / "shared" / "templates")
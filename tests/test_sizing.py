@@ -0,0 +1,106 @@
+"""Tests for demand-driven block sizing."""
+
+import shutil
+
+from sas_randomizer import bulk
+from sas_randomizer.core_refactored.sas_generator import SASRandomizationGenerator
+from sas_randomizer.core_refactored.schemas import SizingPolicy
+from sas_randomizer.core_refactored.sizing import blocks_for, plan_sizing
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.drug import generate_drug_list
+
+STRATIFIED = {"stratification_factors": ["site"], "strata_levels": {"site": ["Site1", "Site2"]}}
+
+DRUG = {
+    "enabled": True,
+    "drug_arms": [{"code": "A", "name": "Drug A", "ratio": 1}, {"code": "B", "name": "Placebo", "ratio": 1}],
+    "drug_block_size": 4,
+    "drug_block_layers": 600,
+    "drug_stratification_factors": ["批次"],
+    "drug_strata_levels": {"批次": ["CN", "EU"]},
+    "drug_sec_rand_enabled": True,
+    "drug_batch_configs": {"supply_factor": "批次", "configs": {
+        "CN": [{"batch_no": "L1", "quantity": 8}, {"batch_no": "L2", "quantity": 4}],
+        "EU": [{"batch_no": "L3", "quantity": "auto"}, {"batch_no": "L4", "quantity": 2}],
+    }},
+}
+
+
+def _study(default_request_data, **overrides):
+    return convert_ui_payload_to_study_design({**default_request_data, **overrides})
+
+
+class TestPlanner:
+
+    def test_blocks_cover_demand_overage_and_spares(self):
+        assert blocks_for(40, 4, SizingPolicy()) == 10
+        assert blocks_for(41, 4, SizingPolicy()) == 11
+        assert blocks_for(100, 4, SizingPolicy(overage_percent=10)) == 28  # 110 kits, not 111
+        assert blocks_for(40, 4, SizingPolicy(spare_blocks=2)) == 12
+        assert blocks_for(0, 4, SizingPolicy()) == 1
+
+    def test_subject_strata_share_the_largest_block_count(self, default_request_data):
+        study = _study(default_request_data, **STRATIFIED, mirror_replacement=True)
+        plan = plan_sizing(study, SizingPolicy(strata_targets={"Site1": 20, "Site2": 30}))
+        subject = plan.subject
+        assert [(s.stratum, s.demand, s.source, s.blocks) for s in subject.strata] == [
+            ("Site1", 20, "target", 5), ("Site2", 30, "target", 8)]
+        assert subject.configured_blocks == 10 and subject.planned_blocks == 8
+        assert subject.saved_rows == 2 * (10 - 8) * 4 * 2  # two strata, mirror copies
+
+    def test_drug_demand_from_batches_without_overage(self, default_request_data):
+        study = _study(default_request_data, drug_randomization_config=DRUG)
+        drug = plan_sizing(study, SizingPolicy(overage_percent=50)).drug
+        assert [(s.stratum, s.demand, s.source) for s in drug.strata] == [("CN", 12, "batch"), ("EU", 12, "batch")]
+        assert drug.planned_blocks == 3 and drug.saved_rows == 2 * (600 - 3) * 4
+        assert drug.notes == []
+
+    def test_drug_without_demand_keeps_configuration(self, default_request_data):
+        config = {k: v for k, v in DRUG.items() if not k.startswith("drug_strat") and k != "drug_batch_configs"}
+        study = _study(default_request_data, drug_randomization_config=config)
+        drug = plan_sizing(study).drug
+        assert drug.planned_blocks == 600 and drug.strata[0].source == "configured"
+        targeted = plan_sizing(study, SizingPolicy(drug_strata_targets={"": 30})).drug
+        assert targeted.planned_blocks == 8
+
+    def test_uneven_batch_totals_are_reported(self, default_request_data):
+        uneven = {**DRUG, "drug_batch_configs": {"supply_factor": "批次", "configs": {
+            "CN": [{"batch_no": "L1", "quantity": 12}], "EU": [{"batch_no": "L2", "quantity": 6}]}}}
+        drug = plan_sizing(_study(default_request_data, drug_randomization_config=uneven)).drug
+        assert drug.planned_blocks == 3
+        assert len(drug.notes) == 1 and "EU" in drug.notes[0]
+
+
+class TestAppliedSizing:
+
+    def test_enabled_policy_reaches_templates_and_engines(self, default_request_data):
+        data = {**default_request_data, "drug_randomization_config": DRUG,
+                "sizing": {"enabled": True, "overage_percent": 10}}
+        code = SASRandomizationGenerator(**data).generate_sas_code()
+        assert "Block=11," in code and "Block=3," in code
+        assert "每层 10 -> 11 个区组" in code and "药物编号 4800 -> 24 个" in code
+
+        study = convert_ui_payload_to_study_design(data)
+        assert study.blocks_per_stratum == 11 and study.sizing_report["drug"]["planned_blocks"] == 3
+        assert len(generate_drug_list(study)) == 24
+
+    def test_disabled_policy_changes_nothing(self, default_request_data):
+        code = SASRandomizationGenerator(**default_request_data).generate_sas_code()
+        assert "Block=10," in code and "按需求计算" not in code
+
+    def test_plan_endpoint(self, client, default_request_data):
+        body = {**default_request_data, "drug_randomization_config": DRUG}
+        plan = client.post("/api/v1/sizing/plan", json=body).json()
+        assert plan["drug"]["planned_blocks"] == 3 and plan["subject"]["planned_blocks"] == 10
+        assert plan["saved_rows"] == plan["drug"]["saved_rows"] == 4776
+        bad = client.post("/api/v1/sizing/plan", json={**body, "sizing": {"overage_percent": -1}})
+        assert bad.status_code == 422
+
+    def test_sizing_code_is_part_of_the_template_hash(self, tmp_path):
+        # Sizing rewrites block counts before rendering: changing it must invalidate
+        # bulk manifests, /generate ETags and cached renders
+        root = tmp_path / "core"
+        shutil.copytree(bulk._CORE_DIR, root, ignore=shutil.ignore_patterns("__pycache__"))
+        before = bulk.template_hash(root)
+        (root / "sizing.py").write_text((root / "sizing.py").read_text(encoding="utf-8") + "\n", encoding="utf-8")
+        assert bulk.template_hash(root) != before
@@ -80,3 +80,14 @@ class TestSnapshot:
         # Fixed seeds should be literal in the output
         assert "99999" in code, "Subject seed should appear in output"
         assert "88888" in code, "Drug seed should appear in output"
+
+
+class TestDrugReportMacro:
+    """m_rpt_drug must build stratified drug reports in one sorted pass."""
+
+    def test_stratified_report_has_no_per_stratum_scans(self):
+        code = SASRandomizationGenerator(**SNAPSHOT_KWARGS).generate_sas_code()
+        macro = code[code.index("%macro m_rpt_drug"):code.index("%mend m_rpt_drug")]
+        assert "%do s=1" not in macro
+        assert "where StrataN=&s" not in macro
+        assert "group by StrataN" in macro and "by StrataN &drugby &drugno;" in macro
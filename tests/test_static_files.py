@@ -0,0 +1,84 @@
+"""Tests for the precompressed static file layer used in standalone mode."""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.static_files import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticFiles, precompress_tree
+
+CHUNK = "_next/static/chunks/main-abc123.js"
+
+
+@pytest.fixture
+def web_root(tmp_path):
+    root = tmp_path / "web_root"
+    (root / "_next/static/chunks").mkdir(parents=True)
+    (root / "index.html").write_text("<html>" + "home " * 400 + "</html>", encoding="utf-8")
+    (root / "generate.html").write_text("<html>generate</html>", encoding="utf-8")
+    (root / "404.html").write_text("<html>missing</html>", encoding="utf-8")
+    (root / CHUNK).write_text("console.log('x');" * 500, encoding="utf-8")
+    (root / "logo.png").write_bytes(b"\x89PNG" + b"\0" * 4000)
+    return root
+
+
+def _client(root):
+    app = FastAPI()
+    static = PrecompressedStaticFiles(str(root))
+    app.mount("/", static, name="static")
+    return TestClient(app), static
+
+
+class TestPrecompress:
+
+    def test_writes_siblings_for_large_text_only(self, web_root):
+        raw, packed = precompress_tree(str(web_root))
+        assert (web_root / f"{CHUNK}.gz").exists() and (web_root / "index.html.gz").exists()
+        assert not (web_root / "generate.html.gz").exists()  # below the threshold
+        assert not (web_root / "logo.png.gz").exists()
+        assert packed < raw
+        assert gzip.decompress((web_root / "index.html.gz").read_bytes()) == (web_root / "index.html").read_bytes()
+
+
+class TestStaticServing:
+
+    def test_serves_gzip_sibling_with_immutable_cache(self, web_root):
+        precompress_tree(str(web_root))
+        client, static = _client(web_root)
+        assert f"{CHUNK}.gz" not in static.index
+        response = client.get(f"/{CHUNK}")
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert "javascript" in response.headers["content-type"]
+        assert response.text == (web_root / CHUNK).read_text(encoding="utf-8")
+
+    def test_identity_and_range_use_original(self, web_root):
+        precompress_tree(str(web_root))
+        client, _ = _client(web_root)
+        plain = client.get(f"/{CHUNK}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        partial = client.get(f"/{CHUNK}", headers={"Range": "bytes=0-9"})
+        assert partial.status_code == 206 and partial.content == b"console.lo"
+
+    def test_html_routes_and_revalidation(self, web_root):
+        client, _ = _client(web_root)
+        home = client.get("/")
+        assert "home" in home.text and home.headers["cache-control"] == "no-cache"
+        assert client.get("/generate").text == "<html>generate</html>"
+        again = client.get("/", headers={"If-None-Match": home.headers["etag"]})
+        assert again.status_code == 304
+
+    def test_missing_paths_and_methods(self, web_root):
+        client, _ = _client(web_root)
+        missing = client.get("/nope")
+        assert missing.status_code == 404 and "missing" in missing.text
+        assert client.post("/").status_code == 405
+
+    def test_index_is_used_instead_of_filesystem(self, web_root):
+        client, static = _client(web_root)
+        (web_root / "late.html").write_text("late", encoding="utf-8")
+        assert client.get("/late").status_code == 404
+        static.refresh()
+        assert client.get("/late").text == "late"
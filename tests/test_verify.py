@@ -0,0 +1,211 @@
+"""Tests for the streaming list verifier."""
+
+import io
+import json
+
+import numpy as np
+import pytest
+
+from sas_randomizer.cli import main as cli_main
+from sas_randomizer.core_refactored import schemas
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.block import generate_subject_list
+from sas_randomizer.native.layouts import SUPPLIER_A, SUPPLIER_B5, SUPPLIER_B6
+from sas_randomizer.native.rand_list import DRUG, NumberSpec, RandList
+from sas_randomizer.native.supplier_csv import iter_list_chunks, read_list_csv
+from sas_randomizer.native.verify import expected_arm_counts, verify_list
+from sas_randomizer.native.writers import iter_list_csv
+
+STRATIFIED = {
+    "stratification_factors": ["site"],
+    "strata_levels": {"site": ["Site1", "Site2"]},
+    "num_gap": 100,
+    "mirror_replacement": True,
+}
+
+
+def _study(default_request_data, **overrides):
+    return convert_ui_payload_to_study_design({**default_request_data, **overrides})
+
+
+def _csv_lines(study, supplier=SUPPLIER_A):
+    text = b"".join(iter_list_csv(generate_subject_list(study, seed=11), supplier=supplier)).decode("utf-8")
+    return text.split("\r\n")
+
+
+def _verify(lines, study, chunk_rows=16):
+    return verify_list(io.StringIO("\r\n".join(lines)), study, chunk_rows=chunk_rows)
+
+
+class TestStreamingReader:
+
+    def test_chunks_match_whole_read(self, default_request_data):
+        study = _study(default_request_data, **STRATIFIED)
+        text = "\r\n".join(_csv_lines(study, SUPPLIER_B5))
+        chunks = list(iter_list_chunks(io.StringIO(text), chunk_rows=9, line_numbers=True))
+        assert len(chunks) == 9  # 80 parent rows, replacements ride along in RR1
+        whole = read_list_csv(io.StringIO(text))
+        joined = RandList.concat(chunks)
+        assert sorted(joined.number_strings()) == sorted(whole.number_strings())
+        # Replacement rows expanded from RR1 point at their parent's line
+        first = chunks[0]
+        parent = first.columns["line"][first.columns["catord"] == 1][0]
+        assert first.columns["line"][first.columns["catord"] == 2][0] == parent == 2
+
+
+class TestSubjectVerification:
+
+    @pytest.mark.parametrize("supplier", [SUPPLIER_A, SUPPLIER_B6, SUPPLIER_B5])
+    def test_clean_list_passes(self, default_request_data, supplier):
+        study = _study(default_request_data, **STRATIFIED)
+        report = _verify(_csv_lines(study, supplier), study)
+        assert report.ok, report.issues
+        assert report.checks["block_ratio"] == "passed"
+        assert report.checks["batch_quantity"].startswith("skipped")
+
+    def test_swapped_arm_is_reported_with_line(self, default_request_data):
+        study = _study(default_request_data)
+        lines = _csv_lines(study)
+        fields = lines[5].split(",")
+        fields[7] = "PBO" if fields[7] == "TRT" else "TRT"
+        lines[5] = ",".join(fields)
+        report = _verify(lines, study)
+        assert report.checks["block_ratio"] == "failed"
+        assert [i.rows for i in report.issues] == [[4]]  # block starting on line 4 (the first data row)
+
+    def test_missing_and_gap_numbers(self, default_request_data):
+        study = _study(default_request_data, **STRATIFIED)
+        lines = _csv_lines(study)
+        fields = lines[10].split(",")
+        fields[2] = "R0050"  # inside the num_gap region between Site1 and Site2
+        lines[10] = ",".join(fields)
+        report = _verify(lines, study)
+        messages = {i.check: i for i in report.issues}
+        assert messages["number_range"].rows == [11]
+        assert "num_gap" in messages["number_range"].message
+        assert messages["completeness"].count == 1
+        assert messages["replacement_pairing"].message == "替换号没有对应的正式号"
+
+    def test_duplicates(self, default_request_data):
+        study = _study(default_request_data)
+        lines = _csv_lines(study)
+        fields = lines[4].split(",")
+        fields[2] = "R0001"
+        lines[4] = ",".join(fields)
+        report = _verify(lines, study)
+        duplicate = [i for i in report.issues if i.check == "duplicates"]
+        assert duplicate and duplicate[0].rows == [5]
+
+    def test_replacements_without_mirror(self, default_request_data):
+        mirrored = _study(default_request_data, mirror_replacement=True)
+        report = _verify(_csv_lines(mirrored), _study(default_request_data))
+        assert report.checks["replacement_pairing"] == "failed"
+
+    def test_arm_counts_follow_ratio_slots(self):
+        assert expected_arm_counts(6, 3).tolist() == [2, 2, 2]
+        assert expected_arm_counts(4, 3).tolist() == [1, 1, 2]
+
+
+def _drug_request(default_request_data, **drug):
+    config = {
+        "enabled": True,
+        "drug_arms": [{"code": "A", "name": "Drug A", "ratio": 1}, {"code": "B", "name": "Placebo", "ratio": 1}],
+        "drug_block_size": 4,
+        "drug_block_layers": 3,
+        "drug_start_number": 1,
+        "drug_number_prefix": "D",
+        "drug_number_length": 4,
+        **drug,
+    }
+    return convert_ui_payload_to_study_design({**default_request_data, "drug_randomization_config": config})
+
+
+def _drug_list(secorder=None):
+    n = 12
+    rand = np.tile([1, 3, 2, 4], 3)
+    return RandList(
+        kind=DRUG,
+        columns={
+            "seq": np.arange(1, n + 1), "drugno": np.arange(1, n + 1),
+            "drugcd": (rand > 2).astype(np.int8), "drugsize": (rand > 2).astype(np.int8),
+            "secorder": np.arange(1, n + 1) if secorder is None else secorder,
+            "bn": np.repeat([1, 2, 3], 4).astype(np.int32), "rand": rand.astype(np.int16),
+        },
+        dictionaries={"drugcd": ["A", "B"], "drugsize": ["Drug A", "Placebo"]},
+        number=NumberSpec(prefix="D", width=4, replacement_suffix=""),
+        meta={"study_id": "TEST001", "protocol_title": "Test Protocol"},
+    )
+
+
+class TestDrugVerification:
+
+    def test_clean_drug_list(self, default_request_data):
+        study = _drug_request(default_request_data)
+        text = b"".join(iter_list_csv(_drug_list())).decode("utf-8")
+        report = verify_list(io.StringIO(text), study, chunk_rows=5)
+        assert report.ok, report.issues
+        assert report.kind == "drug" and report.rows == 12
+
+    def test_batch_quantities_from_sec_order(self, default_request_data):
+        study = _drug_request(
+            default_request_data,
+            drug_stratification_factors=["批次"],
+            drug_strata_levels={"批次": ["Lot"]},
+            drug_sec_rand_enabled=True,
+            drug_batch_configs={"supply_factor": "批次",
+                                "configs": {"Lot": [{"batch_no": "L1", "quantity": 8},
+                                                    {"batch_no": "L2", "quantity": 4}]}},
+        )
+        good = _drug_list(secorder=np.arange(1, 13) + 10000)
+        text = b"".join(iter_list_csv(good, sec_rand=True)).decode("utf-8")
+        assert verify_list(io.StringIO(text), study).checks["batch_quantity"] == "passed"
+
+        bad = _drug_list(secorder=np.append(np.arange(1, 12), 13) + 10000)
+        text = b"".join(iter_list_csv(bad, sec_rand=True)).decode("utf-8")
+        report = verify_list(io.StringIO(text), study)
+        assert report.checks["batch_quantity"] == "failed"
+        assert any(i.rows == [15] for i in report.issues)
+
+    def test_auto_batch_quantity_follows_the_generator(self, default_request_data, monkeypatch):
+        monkeypatch.setattr(schemas, "AUTO_BATCH_QUANTITY", 8)
+        study = _drug_request(
+            default_request_data,
+            drug_stratification_factors=["批次"],
+            drug_strata_levels={"批次": ["Lot"]},
+            drug_sec_rand_enabled=True,
+            drug_batch_configs={"supply_factor": "批次",
+                                "configs": {"Lot": [{"batch_no": "L1", "quantity": "auto"},
+                                                    {"batch_no": "L2", "quantity": 4}]}},
+        )
+        assert [s.thresholds for s in study.drug_randomization_config.batch_strata()] == [[8, 12]]
+        text = b"".join(iter_list_csv(_drug_list(secorder=np.arange(1, 13) + 10000), sec_rand=True)).decode("utf-8")
+        assert verify_list(io.StringIO(text), study).checks["batch_quantity"] == "passed"
+
+
+class TestVerifySurfaces:
+
+    def test_cli(self, default_request_data, tmp_path, capsys):
+        config = tmp_path / "request.json"
+        config.write_text(json.dumps({**default_request_data, **STRATIFIED}), encoding="utf-8")
+        listing = tmp_path / "TEST001_Rand_List.csv"
+        lines = _csv_lines(_study(default_request_data, **STRATIFIED))
+        listing.write_bytes("\r\n".join(lines).encode("utf-8"))
+        assert cli_main(["verify", str(listing), "--config", str(config)]) == 0
+        lines[4] = lines[3]
+        listing.write_bytes("\r\n".join(lines).encode("utf-8"))
+        assert cli_main(["verify", str(listing), "--config", str(config), "--json"]) == 1
+        assert '"duplicates": "failed"' in capsys.readouterr().out
+
+    def test_endpoint(self, client, default_request_data):
+        study = _study(default_request_data, **STRATIFIED)
+        body = "\r\n".join(_csv_lines(study, SUPPLIER_B6)).encode("utf-8")
+        response = client.post(
+            "/api/v1/verify",
+            files={"file": ("list.csv", body, "text/csv")},
+            data={"request": json.dumps({**default_request_data, **STRATIFIED})},
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()["ok"] is True
+        response = client.post("/api/v1/verify", files={"file": ("list.csv", b"nonsense\r\n", "text/csv")},
+                               data={"request": json.dumps(default_request_data)})
+        assert response.status_code == 400
@@ -0,0 +1,133 @@
+"""Tests for the native supplier CSV / XLSX writers."""
+
+import io
+import zipfile
+
+import numpy as np
+
+from sas_randomizer.core_refactored.transformers import convert_ui_payload_to_study_design
+from sas_randomizer.native.block import generate_subject_list
+from sas_randomizer.native.layouts import SUPPLIER_A, SUPPLIER_B5, SUPPLIER_B6, SUPPLIER_B_LITE
+from sas_randomizer.native.rand_list import DRUG, NumberSpec, RandList
+from sas_randomizer.native.supplier_csv import read_list_csv
+from sas_randomizer.native.writers import (
+    iter_list_csv,
+    list_file_name,
+    write_deliverables,
+    write_list_csv,
+)
+
+
+def _subjects(default_request_data, **overrides):
+    study = convert_ui_payload_to_study_design({**default_request_data, **overrides})
+    return generate_subject_list(study, seed=7)
+
+
+def _csv(rand_list, **kwargs):
+    return b"".join(iter_list_csv(rand_list, **kwargs)).decode("utf-8")
+
+
+def _drugs():
+    return RandList(
+        kind=DRUG,
+        columns={
+            "seq": np.array([1, 2, 3]),
+            "drugno": np.array([1, 2, 3]),
+            "drugcd": np.array([0, 1, 0], dtype=np.int8),
+            "drugsize": np.array([0, 1, 0], dtype=np.int8),
+            "secorder": np.array([3, 1, 2]),
+            "bn": np.array([1, 1, 1], dtype=np.int32),
+            "rand": np.array([1, 2, 3], dtype=np.int16),
+        },
+        dictionaries={"drugcd": ["A", "B"], "drugsize": ["Drug A, 10mg", "Placebo"]},
+        number=NumberSpec(prefix="D", width=4, replacement_suffix=""),
+        meta={"study_id": "TEST001", "protocol_title": "Test Protocol"},
+    )
+
+
+class TestSubjectWriters:
+
+    def test_supplier_a_layout(self, default_request_data):
+        text = _csv(_subjects(default_request_data), supplier=SUPPLIER_A)
+        lines = text.split("\r\n")
+        assert lines[0] == "项目名称,Test Protocol,,,,,,,,,,"
+        assert lines[1] == "项目代码,TEST001,,,,,,,,,,"
+        assert lines[2].startswith("序号,子方案,随机号")
+        assert lines[3].startswith("1,主方案,R0001,,")
+        assert lines[3].endswith(",,,正式号")
+        assert text.endswith("\r\n") and len(lines) == 3 + 40 + 1
+
+    def test_round_trip_every_layout(self, default_request_data):
+        rl = _subjects(default_request_data, mirror_replacement=True)
+        for supplier in (SUPPLIER_A, SUPPLIER_B6, SUPPLIER_B5, SUPPLIER_B_LITE):
+            parsed = read_list_csv(io.StringIO(_csv(rl, supplier=supplier)))
+            assert sorted(parsed.number_strings().tolist()) == sorted(rl.number_strings().tolist()), supplier
+            got = dict(zip(parsed.number_strings(), parsed.decode("armcd")))
+            want = dict(zip(rl.number_strings(), rl.decode("armcd")))
+            assert got == want, supplier
+
+    def test_b5_replacement_join(self, default_request_data):
+        rl = _subjects(default_request_data, mirror_replacement=True)
+        lines = _csv(rl, supplier=SUPPLIER_B5).split("\r\n")[1:-1]
+        assert len(lines) == 40
+        fields = lines[0].split(",")
+        assert fields[5] == fields[4] + "S"
+
+    def test_b6_replacement_type(self, default_request_data):
+        rl = _subjects(default_request_data, mirror_replacement=True)
+        lines = _csv(rl, supplier=SUPPLIER_B6).split("\r\n")
+        last = lines[-2].split(",")
+        assert last[6].endswith("S") and last[7] == "2" and last[8] == last[6][:-1]
+
+    def test_chunking_is_invisible(self, default_request_data):
+        rl = _subjects(default_request_data, mirror_replacement=True)
+        for supplier in (SUPPLIER_A, SUPPLIER_B5):
+            assert _csv(rl, supplier=supplier, chunk_rows=7) == _csv(rl, supplier=supplier)
+
+
+class TestDrugWriters:
+
+    def test_dsd_quoting_and_sec_order(self):
+        lines = _csv(_drugs(), supplier=SUPPLIER_A, sec_rand=True).split("\r\n")
+        assert lines[2] == "序号,治疗物品编号,治疗物品代码,治疗物品名称,子规格,症型,取药顺序号"
+        assert lines[3] == '1,D0001,A,"Drug A, 10mg",,,3'
+
+    def test_b5_sec_rand_blanks_blocks(self):
+        lines = _csv(_drugs(), supplier=SUPPLIER_B5, sec_rand=True).split("\r\n")
+        assert lines[1] == 'D0001,"Drug A, 10mg",,,,1,1,,.,.,,,'
+
+    def test_deliverables(self, tmp_path):
+        paths = write_deliverables(_drugs(), str(tmp_path), supplier=SUPPLIER_B5, status="UAT")
+        assert [p.rsplit("/", 1)[-1] for p in paths] == ["TEST001_Drug_List_UAT.csv", "TEST001_Drug_List_UAT.xlsx"]
+        with zipfile.ZipFile(paths[1]) as zf:
+            assert zf.testzip() is None
+            sheet = zf.read("xl/worksheets/sheet1.xml").decode("utf-8")
+            assert 'name="KIT LIST"' in zf.read("xl/workbook.xml").decode("utf-8")
+        assert "<t>Drug A, 10mg</t>" in sheet and sheet.count("<row ") == 4
+
+    def test_file_name_and_stream_target(self):
+        assert list_file_name("S1", "subject", "FINAL") == "S1_Rand_List.csv"
+        buf = io.BytesIO()
+        assert write_list_csv(_drugs(), buf, supplier=SUPPLIER_B6) == len(buf.getvalue())
+
+
+class TestExportSurfaces:
+
+    def test_cli_export_from_request(self, default_request_data, tmp_path):
+        import json
+        from sas_randomizer.cli import main as cli_main
+
+        request = tmp_path / "request.json"
+        request.write_text(json.dumps({**default_request_data, "supplier": SUPPLIER_B5}), encoding="utf-8")
+        assert cli_main(["export", str(request), "-o", str(tmp_path / "out"), "--seed", "1"]) == 0
+        assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+            "TEST001_Rand_List_Draft.csv", "TEST001_Rand_List_Draft.xlsx"]
+
+    def test_export_endpoint_streams_csv(self, client, data_dir, default_request_data):
+        created = client.post("/api/v1/allocation/lists", json={"request": default_request_data, "seed": 3})
+        list_id = created.json()["list_id"]
+        response = client.get(f"/api/v1/allocation/lists/{list_id}/export", params={"supplier": SUPPLIER_B6})
+        assert response.status_code == 200
+        assert "TEST001_Rand_List.csv" in response.headers["content-disposition"]
+        assert len(read_list_csv(io.StringIO(response.content.decode("utf-8")))) == 40
+        assert client.get("/api/v1/allocation/lists/nope/export").status_code == 404